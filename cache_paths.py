@@ -0,0 +1,19 @@
+"""Locations of the persistent on-disk caches shared by the Directory tools."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+
+def cache_root() -> Path:
+    """Return the base directory for persistent caches (``DIRECTORY_CACHE_ROOT`` or the working directory)."""
+    root = os.environ.get("DIRECTORY_CACHE_ROOT")
+    if root:
+        return Path(root)
+    return Path.cwd()
+
+
+def repo_cache_dir(*parts: str) -> str:
+    """Return a cache path anchored to the configured cache root."""
+    return str(cache_root().joinpath(*parts))
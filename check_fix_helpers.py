@@ -10,7 +10,7 @@ from fact_descriptor_sync import (
     parse_collection_multi_value_field,
 )
 from fix_proposals import make_fix_proposal
-from k_anonymity import donor_value_violates_k
+from k_anonymity import ComplementaryDisclosure, donor_value_violates_k
 
 
 MULTI_VALUE_COLLECTION_FIELDS = {
@@ -220,12 +220,20 @@ def build_fact_k_anonymity_drop_fixes(
     facts: list[dict[str, Any]],
     *,
     k_limit: int,
+    violating_ids: Iterable[str] | None = None,
 ) -> list[dict[str, Any]]:
-    """Return a fix proposal that drops fact-sheet rows violating donor k-anonymity."""
-    violating_ids = []
-    for fact in facts:
-        if donor_value_violates_k(fact.get("number_of_donors"), k_limit) and fact.get("id"):
-            violating_ids.append(str(fact["id"]))
+    """Return a fix proposal that drops fact-sheet rows violating donor k-anonymity.
+
+    ``violating_ids`` lets bulk callers pass the ids already found by
+    ``FactSheetFrame.scan_k_anonymity`` instead of re-checking every row.
+    """
+    if violating_ids is None:
+        violating_ids = [
+            str(fact["id"])
+            for fact in facts
+            if donor_value_violates_k(fact.get("number_of_donors"), k_limit) and fact.get("id")
+        ]
+    violating_ids = [str(fact_id) for fact_id in violating_ids if fact_id]
     if not violating_ids:
         return []
     violating_ids = sorted(dict.fromkeys(violating_ids))
@@ -249,3 +257,38 @@ def build_fact_k_anonymity_drop_fixes(
             ),
         )
     ]
+
+
+def build_fact_complementary_suppression_fixes(
+    collection: dict[str, Any],
+    disclosure: ComplementaryDisclosure,
+) -> list[dict[str, Any]]:
+    """Return a fix proposal applying secondary suppression to margin rows."""
+    if not disclosure.suppress_fact_ids:
+        return []
+    return [
+        make_fix_proposal(
+            update_id=(
+                f"facts.k_anonymity.secondary_suppression_{disclosure.dimension}_k{disclosure.k_limit}"
+            ),
+            module="FT",
+            entity_type="COLLECTION",
+            entity_id=collection["id"],
+            field="facts",
+            mode="delete_rows",
+            confidence="uncertain",
+            current_value_at_export=list(disclosure.suppress_fact_ids),
+            proposed_value=list(disclosure.suppress_fact_ids),
+            human_explanation=(
+                f"Delete the smallest {disclosure.dimension} margin rows so the all-star "
+                f"{disclosure.count_field} total no longer reveals a residual below k={disclosure.k_limit}."
+            ),
+            rationale=(
+                f"All-star {disclosure.count_field} ({disclosure.all_star_total}) minus the published "
+                f"{disclosure.dimension} margins ({disclosure.published_margin_total}) leaves "
+                f"{disclosure.residual}, which discloses a group smaller than k={disclosure.k_limit}. "
+                "Suppressing the listed margin rows raises the unpublished residual to at least k; "
+                "aggregating the small categories instead is an equally valid fix."
+            ),
+        )
+    ]
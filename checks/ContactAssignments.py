@@ -5,16 +5,11 @@ import logging as log
 from yapsy.IPlugin import IPlugin
 
 from contact_assignment_utils import (
-	build_biobank_contact_maps,
-	build_collection_contact_usage,
 	biobanks_all_same_institution,
 	biobanks_same_institution,
 	count_institution_groups,
 	contact_matches_biobank_institution,
-	get_contact_ids,
-	get_contact_address_key,
-	get_email_domain,
-	get_single_biobank_domain_owner,
+	get_contact_index,
 )
 from customwarnings import DataCheckEntityType, DataCheckWarning, DataCheckWarningLevel, make_check_id
 
@@ -53,13 +48,12 @@ class ContactAssignments(IPlugin):
 		warnings = []
 		log.info("Running probabilistic cross-biobank contact assignment checks (ContactAssignments)")
 
-		contact_to_collections, contact_to_biobank_counts = build_collection_contact_usage(dir)
-		_, main_contact_to_biobanks, domain_to_biobanks, address_to_biobanks, biobank_signatures = build_biobank_contact_maps(dir)
+		contact_index = get_contact_index(dir)
+		contact_to_biobank_counts = contact_index.contact_to_biobank_counts
+		main_contact_to_biobanks = contact_index.main_contact_to_biobanks
+		biobank_signatures = contact_index.biobank_signatures
 
-		for contact in dir.getContacts():
-			contact_id = contact.get('id')
-			if not contact_id:
-				continue
+		for contact_id in contact_index.contacts_by_id:
 			biobank_counts = contact_to_biobank_counts.get(contact_id, {})
 			if len(biobank_counts) <= 1:
 				continue
@@ -68,10 +62,9 @@ class ContactAssignments(IPlugin):
 				continue
 			if count_institution_groups(used_biobanks, biobank_signatures) > 2:
 				continue
-			domain = get_email_domain(contact.get('email', ''))
-			domain_owner = get_single_biobank_domain_owner(domain, domain_to_biobanks)
-			address_key = get_contact_address_key(contact)
-			address_owners = sorted(address_to_biobanks.get(address_key, set())) if address_key else []
+			domain = contact_index.get_contact_domain(contact_id)
+			domain_owner = contact_index.get_domain_owner(contact_id)
+			address_owners = contact_index.get_address_owners(contact_id)
 			main_contact_biobanks = sorted(main_contact_to_biobanks.get(contact_id, set()))
 			# Biobank-level ownership must stay unique enough to be meaningful warning evidence.
 			# If the same contact is the main biobank contact for multiple biobanks, that pattern is
@@ -93,7 +86,7 @@ class ContactAssignments(IPlugin):
 				)
 			if not reasons:
 				continue
-			example_collections = sorted(contact_to_collections.get(contact_id, []))[:3]
+			example_collections = sorted(contact_index.contact_to_collections.get(contact_id, []))[:3]
 			message = (
 				f"Contact is reused by collections in multiple biobanks ({', '.join(used_biobanks)}), but "
 				+ " and ".join(reasons)
@@ -125,18 +118,16 @@ class ContactAssignments(IPlugin):
 			collection_biobank_id = collection.get('biobank', {}).get('id')
 			if not collection_biobank_id:
 				continue
-			for contact_id in get_contact_ids(collection.get('contact')):
+			for contact_id in contact_index.collection_to_contacts.get(collection_id, []):
 				biobank_counts = contact_to_biobank_counts.get(contact_id, {})
 				if len(biobank_counts) <= 1:
 					continue
-				try:
-					contact = dir.getContact(contact_id)
-				except Exception:
+				contact = contact_index.get_contact(contact_id)
+				if contact is None:
 					continue
-				domain = get_email_domain(contact.get('email', ''))
-				domain_owner = get_single_biobank_domain_owner(domain, domain_to_biobanks)
-				address_key = get_contact_address_key(contact)
-				address_owners = sorted(address_to_biobanks.get(address_key, set())) if address_key else []
+				domain = contact_index.get_contact_domain(contact_id)
+				domain_owner = contact_index.get_domain_owner(contact_id)
+				address_owners = contact_index.get_address_owners(contact_id)
 				if contact_matches_biobank_institution(contact, collection_biobank_id, biobank_signatures):
 					continue
 				foreign_reasons = []
@@ -0,0 +1,54 @@
+# vim:ts=8:sw=8:tw=0:noet
+
+import logging as log
+
+from yapsy.IPlugin import IPlugin
+
+from contact_duplicates import find_near_duplicate_contacts
+from customwarnings import DataCheckEntityType, DataCheckWarning, DataCheckWarningLevel, make_check_id
+
+
+CHECK_DOCS = {
+	'CTD:NearDuplicate': {
+		'entity': 'CONTACT',
+		'fields': ['CONTACT.first_name', 'CONTACT.last_name', 'CONTACT.email', 'CONTACT.phone', 'CONTACT.address', 'CONTACT.zip', 'CONTACT.city'],
+		'severity': 'WARNING',
+		'summary': 'Two contact records have near-identical name, email, phone and address data and likely describe the same person.',
+		'fix': 'Verify whether both records describe the same person. If so, keep one contact record, re-point biobank/collection/network references to it and remove the duplicate.'
+	}
+}
+
+
+class ContactDuplicates(IPlugin):
+	CHECK_ID_PREFIX = "CTD"
+
+	def check(self, dir, args):
+		warnings = []
+		log.info("Running near-duplicate contact checks (ContactDuplicates)")
+
+		pairs = find_near_duplicate_contacts(dir.getContacts())
+		log.info(f"   ... found {len(pairs)} candidate duplicate contact pairs")
+		for pair in pairs:
+			message = (
+				f"Contact is likely a duplicate of {pair.other_contact_id} "
+				f"(similarity {pair.similarity:.2f}, name similarity {pair.name_similarity:.2f}; "
+				f"matching signals: {', '.join(pair.shared_signals)})."
+			)
+			action = (
+				f"Verify whether {pair.contact_id} and {pair.other_contact_id} describe the same person. "
+				"If so, merge them into one contact record and update the references; otherwise suppress this warning."
+			)
+			warnings.append(
+				DataCheckWarning(
+					make_check_id(self, "NearDuplicate"),
+					"",
+					dir.getContactNN(pair.contact_id),
+					DataCheckWarningLevel.WARNING,
+					pair.contact_id,
+					DataCheckEntityType.CONTACT,
+					'NA',
+					message,
+					action,
+				)
+			)
+		return warnings
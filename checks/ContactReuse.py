@@ -5,12 +5,8 @@ import logging as log
 from yapsy.IPlugin import IPlugin
 
 from contact_assignment_utils import (
-	build_biobank_contact_maps,
-	build_collection_contact_usage,
 	biobanks_all_same_institution,
-	get_contact_address_key,
-	get_email_domain,
-	get_single_biobank_domain_owner,
+	get_contact_index,
 )
 from customwarnings import DataCheckEntityType, DataCheckWarning, DataCheckWarningLevel, make_check_id
 
@@ -33,13 +29,10 @@ class ContactReuse(IPlugin):
 		warnings = []
 		log.info("Running cross-biobank contact reuse info checks (ContactReuse)")
 
-		contact_to_collections, contact_to_biobank_counts = build_collection_contact_usage(dir)
-		_, main_contact_to_biobanks, domain_to_biobanks, address_to_biobanks, biobank_signatures = build_biobank_contact_maps(dir)
-		for contact in dir.getContacts():
-			contact_id = contact.get('id')
-			if not contact_id:
-				continue
-			biobank_counts = contact_to_biobank_counts.get(contact_id, {})
+		contact_index = get_contact_index(dir)
+		biobank_signatures = contact_index.biobank_signatures
+		for contact_id in contact_index.contacts_by_id:
+			biobank_counts = contact_index.contact_to_biobank_counts.get(contact_id, {})
 			if len(biobank_counts) <= 1:
 				continue
 			biobank_ids = sorted(biobank_counts.keys())
@@ -47,11 +40,9 @@ class ContactReuse(IPlugin):
 				continue
 			# Do not emit the weaker INFO when the same contact already satisfies the
 			# stronger institution-tied WARNING logic.
-			domain = get_email_domain(contact.get('email', ''))
-			domain_owner = get_single_biobank_domain_owner(domain, domain_to_biobanks)
-			address_key = get_contact_address_key(contact)
-			address_owners = sorted(address_to_biobanks.get(address_key, set())) if address_key else []
-			main_contact_biobanks = sorted(main_contact_to_biobanks.get(contact_id, set()))
+			domain_owner = contact_index.get_domain_owner(contact_id)
+			address_owners = contact_index.get_address_owners(contact_id)
+			main_contact_biobanks = sorted(contact_index.main_contact_to_biobanks.get(contact_id, set()))
 			has_unique_warning_evidence = False
 			if len(main_contact_biobanks) == 1:
 				has_unique_warning_evidence = True
@@ -61,7 +52,7 @@ class ContactReuse(IPlugin):
 				has_unique_warning_evidence = True
 			if has_unique_warning_evidence:
 				continue
-			example_collections = sorted(contact_to_collections.get(contact_id, []))[:3]
+			example_collections = sorted(contact_index.contact_to_collections.get(contact_id, []))[:3]
 			message = (
 				f"Contact is reused by collections in multiple biobanks: {', '.join(biobank_ids)}. "
 				f"Example collection assignments: {', '.join(example_collections)}. "
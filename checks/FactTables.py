@@ -3,23 +3,18 @@
 import re
 import logging as log
 import collections as py_collections
-from fact_sheet_utils import (
-	FACT_DIMENSION_KEYS,
-	analyze_collection_fact_sheet,
-	count_star_dimensions,
-	get_dimension_values,
-	get_matching_one_star_rows,
-)
+from fact_sheet_disclosure import find_differencing_disclosures
+from fact_sheet_utils import ADDITIVE_MARGIN_DIMENSIONS
 from fact_descriptor_sync import (
-	collect_fact_descriptor_values,
-	derive_age_range_update,
-	fact_descriptor_values_for_comparison,
+	collect_frame_descriptor_values,
+	derive_frame_age_range_updates,
+	effective_fact_materials,
 	normalize_descriptor_value,
 	parse_collection_multi_value_field,
 )
 from check_fix_helpers import build_fact_alignment_fix_proposals
 from check_fix_helpers import build_fact_k_anonymity_drop_fixes
-from k_anonymity import donor_value_violates_k
+from check_fix_helpers import build_fact_complementary_suppression_fixes
 
 from yapsy.IPlugin import IPlugin
 from customwarnings import DataCheckWarningLevel, DataCheckWarning, DataCheckEntityType, make_check_id
@@ -27,6 +22,7 @@ from customwarnings import DataCheckWarningLevel, DataCheckWarning, DataCheckEnt
 BBMRICohortsNetworkName = 'bbmri-eric:networkID:EU_BBMRI-ERIC:networks:BBMRI-Cohorts'
 BBMRICohortsDNANetworkName = 'bbmri-eric:networkID:EU_BBMRI-ERIC:networks:BBMRI-Cohorts_DNA'
 CHECK_ID_PREFIX = "FT"
+KAnonymityDonorLimit = 10
 
 
 def compareFactsColl(self, dir, factsList, collList, collection, errorDescription, actionDescription, warningsList): # TO improve
@@ -52,8 +48,7 @@ def _format_age_notes(notes):
 	return " " + " ".join(notes)
 
 
-def compareAge(self, dir, collectionFacts, collection, warningsList):
-	age_update = derive_age_range_update(collectionFacts)
+def compareAge(self, dir, age_update, collection, warningsList):
 	derived_low = age_update["age_low"]
 	derived_high = age_update["age_high"]
 	derived_unit = age_update["age_unit"]
@@ -259,6 +254,35 @@ CHECK_DOCS = {'FT:SizeMissing': {'entity': 'COLLECTION',
                                                'severity': 'WARNING',
                                                'summary': 'fact table information has '
                                                           '0 donors/patients'},
+ 'FT:MarginSumExceedsTotal': {'entity': 'COLLECTION',
+                                           'fields': ['facts', 'id', 'number_of_donors', 'number_of_samples'],
+                                           'fix': 'Check the all-but-one-star rows of this dimension against the all-star row; values of this dimension are mutually exclusive, so their margins should not exceed the total.',
+                                           'severity': 'INFO',
+                                           'summary': 'all-but-one-star rows for '
+                                                      "{margin['dimension']} sum to "
+                                                      "{margin['margin_total']} "
+                                                      '{count_field}, more than the '
+                                                      'all-star aggregate '
+                                                      "({margin['all_star_total']})"},
+ 'FT:KAnonDifferencing': {'entity': 'COLLECTION',
+                                           'fields': ['facts', 'id', 'number_of_donors'],
+                                           'fix': 'Suppressing small rows alone is not enough when they can be reconstructed from published totals and margins. Also suppress or aggregate at least one of the published rows used in the derivation.',
+                                           'severity': 'WARNING',
+                                           'summary': 'fact-sheet cell '
+                                                      '{derived.describe_cell()} '
+                                                      '({derived.value} donor(s), below '
+                                                      'k={derived.k_limit}) can be '
+                                                      'derived by differencing '
+                                                      'published rows'},
+ 'FT:KAnonComplementary': {'entity': 'COLLECTION',
+                                           'fields': ['facts', 'id', 'number_of_donors'],
+                                           'fix': 'Small cells can be recovered by subtracting the published margins from the all-star total. Also drop the smallest margin rows of that dimension (secondary suppression) or aggregate the small categories.',
+                                           'severity': 'WARNING',
+                                           'summary': 'all-star {disclosure.count_field} '
+                                                      'minus the published '
+                                                      'all-but-one-star rows for '
+                                                      '{disclosure.dimension} reveals a '
+                                                      'residual below k'},
  'FT:KAnonViolation': {'entity': 'COLLECTION',
                                            'fields': ['all_star_number_of_donors',
                                                       'donors_present',
@@ -278,11 +302,14 @@ class FactTables(IPlugin):
 	def check(self, dir, args):
 		warnings = []
 		log.info("Running content checks on facts tables")
+		fact_sheet_frame = dir.getFactSheetFrame()
+		kAnonymityScan = fact_sheet_frame.scan_k_anonymity(k_donors=KAnonymityDonorLimit)
+		factDescriptorValues = collect_frame_descriptor_values(fact_sheet_frame)
+		factAgeUpdates = derive_frame_age_range_updates(fact_sheet_frame)
 
 		for collection in dir.getCollections():
 			collectionFacts = []
 			collsFactsSamples = 0
-			collsFactsDonors = 0
 
 			biobankId = dir.getCollectionBiobankId(collection['id'])
 			biobank = dir.getBiobankById(biobankId)
@@ -304,15 +331,11 @@ class FactTables(IPlugin):
 
 			if 'facts' in collection.keys() and collection['facts'] != []:
 				collectionFacts = dir.getCollectionFacts(collection['id'])
-				for fact in collectionFacts:
-					if 'number_of_samples' in fact:
-						collsFactsSamples += fact['number_of_samples']
-					if 'number_of_donors' in fact:
-						collsFactsDonors += fact['number_of_donors']
-
-				fact_sheet = analyze_collection_fact_sheet(collection, collectionFacts)
-				raw_fact_descriptor_values = collect_fact_descriptor_values(collectionFacts)
-				fact_descriptor_values = fact_descriptor_values_for_comparison(collectionFacts, collection)
+				collsFactsSamples = fact_sheet_frame.get_samples_total(collection['id'])
+
+				fact_sheet = fact_sheet_frame.analyze_collection(collection)
+				raw_fact_descriptor_values = factDescriptorValues.get(collection['id'], {'diagnosis_available': [], 'sex': [], 'materials': []})
+				fact_descriptor_values = dict(raw_fact_descriptor_values, materials=effective_fact_materials(raw_fact_descriptor_values['materials'], materials))
 				all_star_samples = fact_sheet['all_star_number_of_samples']
 				all_star_donors = fact_sheet['all_star_number_of_donors']
 
@@ -322,27 +345,35 @@ class FactTables(IPlugin):
 					if all_star_donors == 0 or (all_star_donors is None and not fact_sheet['donors_present']):
 						warnings.append(DataCheckWarning(make_check_id(self, "DonorsZero"), "", dir.getCollectionNN(collection['id']), DataCheckWarningLevel.WARNING, collection['id'], DataCheckEntityType.COLLECTION, str(collection['withdrawn']), "fact table information has 0 donors/patients"))
 					else:
-						kAnonymityViolatingList = []
-						kAnonymityLimit = 10
-						for f in collectionFacts:
-							if donor_value_violates_k(f.get('number_of_donors'), kAnonymityLimit):
-								kAnonymityViolatingList.append([f['id'], f"{f['number_of_donors']} donor(s)"])
+						kAnonymityLimit = KAnonymityDonorLimit
+						kAnonymityViolations = kAnonymityScan.get(collection['id'])
+						kAnonymityViolatingIds = set(kAnonymityViolations.donor_fact_ids) if kAnonymityViolations else set()
+						kAnonymityViolatingList = [
+							[f['id'], f"{f['number_of_donors']} donor(s)"]
+							for f in collectionFacts
+							if str(f.get('id')) in kAnonymityViolatingIds
+						]
 						if kAnonymityViolatingList:
-							warnings.append(DataCheckWarning(make_check_id(self, "KAnonViolation"), "", dir.getCollectionNN(collection['id']), DataCheckWarningLevel.WARNING, collection['id'], DataCheckEntityType.COLLECTION, str(collection['withdrawn']), f"the {len(kAnonymityViolatingList)} records of fact table violates {kAnonymityLimit}-anonymity: {kAnonymityViolatingList}", f"For publicly exposed highly aggregated Directory data, the recommended donor k-anonymity baseline is k={kAnonymityLimit}. Drop violating fact rows unless this collection is already pre-anonymized under a documented exception policy.", fix_proposals=build_fact_k_anonymity_drop_fixes(collection, collectionFacts, k_limit=kAnonymityLimit)))
+							warnings.append(DataCheckWarning(make_check_id(self, "KAnonViolation"), "", dir.getCollectionNN(collection['id']), DataCheckWarningLevel.WARNING, collection['id'], DataCheckEntityType.COLLECTION, str(collection['withdrawn']), f"the {len(kAnonymityViolatingList)} records of fact table violates {kAnonymityLimit}-anonymity: {kAnonymityViolatingList}", f"For publicly exposed highly aggregated Directory data, the recommended donor k-anonymity baseline is k={kAnonymityLimit}. Drop violating fact rows unless this collection is already pre-anonymized under a documented exception policy.", fix_proposals=build_fact_k_anonymity_drop_fixes(collection, collectionFacts, k_limit=kAnonymityLimit, violating_ids=sorted(kAnonymityViolatingIds))))
+						complementaryDimensions = {disclosure.dimension for disclosure in (kAnonymityViolations.complementary if kAnonymityViolations else []) if disclosure.count_field == 'number_of_donors'}
+						for derived in find_differencing_disclosures(fact_sheet_frame.get_cube(collection['id']), fact_sheet, count_field='number_of_donors', k_limit=kAnonymityLimit):
+							if all(value == '*' for value in derived.parent_cell.values()) and derived.dimension in complementaryDimensions:
+								continue
+							warnings.append(DataCheckWarning(make_check_id(self, "KAnonDifferencing"), "", dir.getCollectionNN(collection['id']), DataCheckWarningLevel.WARNING, collection['id'], DataCheckEntityType.COLLECTION, str(collection['withdrawn']), f"fact-sheet cell {derived.describe_cell()} ({derived.value} donor(s), below k={derived.k_limit}) can be derived by differencing published rows {derived.published_fact_ids}", f"Suppressing small rows alone is not enough when they can be reconstructed from published totals and margins. Also suppress or aggregate at least one of the published rows {derived.published_fact_ids} for {derived.dimension}."))
+						for disclosure in (kAnonymityViolations.complementary if kAnonymityViolations else []):
+							warnings.append(DataCheckWarning(make_check_id(self, "KAnonComplementary"), "", dir.getCollectionNN(collection['id']), DataCheckWarningLevel.WARNING, collection['id'], DataCheckEntityType.COLLECTION, str(collection['withdrawn']), f"all-star {disclosure.count_field} ({disclosure.all_star_total}) minus the published all-but-one-star rows for {disclosure.dimension} ({disclosure.published_margin_total}) reveals a residual of {disclosure.residual}, below k={disclosure.k_limit}", f"Small cells can be recovered by subtracting the published margins from the all-star total. Also drop the smallest {disclosure.dimension} margin rows {disclosure.suppress_fact_ids} (secondary suppression) or aggregate the small categories.", fix_proposals=build_fact_complementary_suppression_fixes(collection, disclosure)))
 
 					compareFactsColl(self, dir, fact_descriptor_values['diagnosis_available'], diags, collection, "Diagnoses of collection and facts table do not match", "Check diagnosis entries of the collection description with diagnoses from the facts table and correct as necessary", warnings)
 
 					if 'age_unit' in collection.keys():
-						compareAge(self, dir, collectionFacts, collection, warnings)
+						compareAge(self, dir, factAgeUpdates.get(collection['id'], {'age_low': None, 'age_high': None, 'age_unit': None, 'notes': []}), collection, warnings)
 
 					compareFactsColl(self, dir, fact_descriptor_values['sex'], collSex, collection, "Sex of collection and facts table do not match", "Check sex information of the collection description with sex information from the facts table and correct as necessary", warnings)
 					compareFactsColl(self, dir, fact_descriptor_values['materials'], materials, collection, "Material types of collection and facts table do not match", "Check material types of the collection description with material types from the facts table and correct as necessary", warnings)
 
-					fact_values = get_dimension_values(collectionFacts)
-					aggregates = dict(py_collections.Counter(
-						[count_star_dimensions(f, FACT_DIMENSION_KEYS) for f in collectionFacts]
-					))
-					aggregates = {k: 0 if k not in aggregates else aggregates[k] for k in range(0, len(FACT_DIMENSION_KEYS) + 1)}
+					fact_values = fact_sheet_frame.get_dimension_values(collection['id'])
+					fact_cube = fact_sheet_frame.get_cube(collection['id'])
+					aggregates = fact_sheet_frame.get_star_count_histogram(collection['id'])
 					if fact_sheet['all_star_rows'] != 1:
 						warnings.append(DataCheckWarning(make_check_id(self, "AllStarMissing"), "", dir.getCollectionNN(collection['id']), DataCheckWarningLevel.WARNING, collection['id'], DataCheckEntityType.COLLECTION, str(collection['withdrawn']), f"Expected exactly one all-star aggregate row, found {fact_sheet['all_star_rows']}."))
 					if aggregates[3] < 1:
@@ -350,12 +381,16 @@ class FactTables(IPlugin):
 					else:
 						for fk in fact_values:
 							for value in fact_values[fk]:
-								rows = get_matching_one_star_rows(collectionFacts, fk, value)
+								rows = fact_cube.get_one_star_rows(fk, value)
 								if rows:
 									log.info(f'3-star rows found for {fk} value {value}: {rows}')
 								else:
 									warnings.append(DataCheckWarning(make_check_id(self, "OneStarValue"), "", dir.getCollectionNN(collection['id']), DataCheckWarningLevel.INFO, collection['id'], DataCheckEntityType.COLLECTION, str(collection['withdrawn']), f"missing all-but-one-star aggregate for {fk} value {value}: {aggregates[3]}"))
 
+					for count_field, margin_dimensions in ADDITIVE_MARGIN_DIMENSIONS.items():
+						for margin in fact_cube.check_margin_additivity(count_field, margin_dimensions):
+							warnings.append(DataCheckWarning(make_check_id(self, "MarginSumExceedsTotal"), "", dir.getCollectionNN(collection['id']), DataCheckWarningLevel.INFO, collection['id'], DataCheckEntityType.COLLECTION, str(collection['withdrawn']), f"all-but-one-star rows for {margin['dimension']} sum to {margin['margin_total']} {count_field}, more than the all-star aggregate ({margin['all_star_total']}): {margin['values']}", "Check the all-but-one-star rows of this dimension against the all-star row; values of this dimension are mutually exclusive, so their margins should not exceed the total."))
+
 					for fact_warning in fact_sheet['warnings']:
 						if fact_warning['code'] == 'all_star_samples_mismatch':
 							warnings.append(DataCheckWarning(make_check_id(self, "AllStarSizeGap"), "", dir.getCollectionNN(collection['id']), DataCheckWarningLevel.WARNING, collection['id'], DataCheckEntityType.COLLECTION, str(collection['withdrawn']), fact_warning['message'], "Check the all-star aggregate row and collection size."))
@@ -1,13 +1,20 @@
 #!/usr/bin/python3
 # vim:ts=4:sw=4:tw=0:sts=4:et
 
-"""Propose and optionally apply collection descriptor updates from fact sheets."""
+"""Propose and optionally apply collection descriptor updates from fact sheets.
+
+One collection or a batch of them (``-c`` repeated, ``--collections-file``,
+``-R`` regex) is analyzed against a single ERIC snapshot; the affected
+staging-area rows are fetched once, all proposals are reviewed together and
+the changed rows are written in one chunked save.
+"""
 
 from __future__ import annotations
 
 import argparse
 import logging
 import os
+import re
 import sys
 from pathlib import Path
 from pprint import PrettyPrinter
@@ -18,9 +25,18 @@ from dotenv import load_dotenv
 from cli_interrupts import log_keyboard_interrupt
 from directory import Directory
 from directory_session_compat import DirectorySession
+from directory_table_fetch import fetch_rows_by_ids, index_rows_by_id
+from directory_write_engine import (
+    SAVE_ACTION,
+    WriteEngineError,
+    WriteOperation,
+    add_write_engine_arguments,
+    write_engine_from_args,
+    write_job_key,
+)
 from fact_descriptor_sync import (
     apply_descriptor_proposal_to_dataframe_row,
-    build_collection_descriptor_proposal,
+    build_collection_descriptor_proposals,
 )
 from nncontacts import NNContacts
 from validation_helpers import format_validation_error
@@ -51,8 +67,8 @@ class OperationAborted(Exception):
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description=(
-            "Analyze one collection in the ERIC schema of the configured Directory target, "
-            "derive descriptor updates from its fact sheet, and optionally apply the changes "
+            "Analyze one or more collections in the ERIC schema of the configured Directory target, "
+            "derive descriptor updates from their fact sheets, and optionally apply the changes "
             "to the corresponding staging-area Collections table."
         )
     )
@@ -101,7 +117,34 @@ def build_parser() -> argparse.ArgumentParser:
         default=DEFAULT_PASSWORD,
         help="Directory password (overrides DIRECTORYPASSWORD env var).",
     )
-    parser.add_argument("-c", "--collection-id", required=True, help="Collection ID to analyze.")
+    parser.add_argument(
+        "-c",
+        "--collection-id",
+        action="append",
+        default=None,
+        help="Collection ID to analyze (repeat or comma-separate for a batch).",
+    )
+    parser.add_argument(
+        "--collections-file",
+        default=None,
+        help="File with collection IDs to analyze, one per line ('#' starts a comment).",
+    )
+    parser.add_argument(
+        "-R",
+        "--id-regex",
+        default=None,
+        help=(
+            "Analyze every ERIC collection of the target schema's staging area whose ID matches "
+            "this regular expression (for example '.' for the whole node)."
+        ),
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes computing proposals in batch mode; 0 means all available CPU cores. Default: 1.",
+    )
     parser.add_argument(
         "-s",
         "--schema",
@@ -130,6 +173,7 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="reserved for suppressing non-fatal local validation warnings",
     )
+    add_write_engine_arguments(parser)
     return parser
 
 
@@ -154,12 +198,41 @@ def configure_logging(args: argparse.Namespace) -> None:
     logging.getLogger("urllib3").setLevel(logging.WARNING)
 
 
+def parse_collection_ids(values) -> list[str]:
+    if not values:
+        return []
+    if isinstance(values, str):
+        values = [values]
+    parsed = (part.strip() for value in values for part in value.split(","))
+    return list(dict.fromkeys(part for part in parsed if part))
+
+
+def read_collections_file(path: str) -> list[str]:
+    try:
+        lines = Path(path).read_text(encoding="utf-8").splitlines()
+    except OSError as exc:
+        raise InputError(f"Unable to read collections file {path}: {exc}") from exc
+    parsed = (line.split("#", 1)[0].strip() for line in lines)
+    return list(dict.fromkeys(line for line in parsed if line))
+
+
+def requested_collection_ids(args: argparse.Namespace) -> list[str]:
+    collection_ids = parse_collection_ids(args.collection_id)
+    collections_file = getattr(args, "collections_file", None)
+    if collections_file:
+        collection_ids = list(dict.fromkeys(collection_ids + read_collections_file(collections_file)))
+    return collection_ids
+
+
 def validate_args(args: argparse.Namespace) -> None:
+    if getattr(args, "jobs", 1) < 0:
+        raise InputError("-j/--jobs must be zero (all CPU cores) or a positive number.")
     try:
         FactsheetUpdaterSettingsModel.parse_obj(
             {
                 "schema": args.schema,
-                "collection_id": args.collection_id,
+                "collection_ids": requested_collection_ids(args),
+                "id_regex": getattr(args, "id_regex", None),
                 "directory_target": args.directory_target,
                 "directory_username": args.directory_username,
                 "directory_password": args.directory_password,
@@ -175,19 +248,58 @@ def validate_args(args: argparse.Namespace) -> None:
         ) from exc
 
 
-def fetch_target_collection_row(
+def fetch_target_collection_rows(
     session: DirectorySession,
     *,
     schema: str,
-    collection_id: str,
-) -> tuple[pd.DataFrame, pd.Series]:
-    table_df = session.get(table="Collections", schema=schema, as_df=True)
-    row_df = table_df[table_df["id"].astype(str) == collection_id]
-    if row_df.empty:
-        raise InputError(
-            f"Collection {collection_id!r} does not exist in schema {schema!r}; no update was applied."
-        )
-    return table_df, row_df.iloc[0]
+    collection_ids: list[str],
+) -> tuple[pd.DataFrame, dict[str, dict]]:
+    """Fetch the staging-area ``Collections`` rows of ``collection_ids`` in one pass.
+
+    Returns the fetched frame (for its column order) and ``{id: row}`` for the
+    collections present in ``schema``.
+    """
+    table_df = fetch_rows_by_ids(session, table="Collections", schema=schema, ids=collection_ids)
+    return table_df, index_rows_by_id(table_df, collection_ids)
+
+
+def select_collections(args: argparse.Namespace, eric_directory: Directory) -> tuple[list[str], bool]:
+    """Return the selected ERIC collection ids and whether this is a batch run.
+
+    A single explicit collection missing from ERIC is an input error; in a
+    batch run missing ids are logged and skipped.
+    """
+    collection_ids = requested_collection_ids(args)
+    id_regex = getattr(args, "id_regex", None)
+    batch = bool(id_regex) or len(collection_ids) > 1
+    try:
+        missing = [
+            collection_id
+            for collection_id in collection_ids
+            if eric_directory.getCollectionById(collection_id, raise_on_missing=not batch) is None
+        ]
+    except KeyError:
+        missing = collection_ids
+    if missing and not batch:
+        raise InputError(f"Collection(s) not found in ERIC: {', '.join(missing)}")
+    if missing:
+        logging.warning("Skipping %d collection(s) not found in ERIC: %s", len(missing), ", ".join(missing))
+        collection_ids = [collection_id for collection_id in collection_ids if collection_id not in missing]
+    if id_regex:
+        pattern = re.compile(id_regex)
+        selected = set(collection_ids)
+        matched = 0
+        for collection in eric_directory.getCollections():
+            collection_id = str(collection["id"])
+            if not pattern.search(collection_id) or collection_id in selected:
+                continue
+            if not NNContacts.schema_matches_staging_area(args.schema, NNContacts.extract_staging_area(collection_id)):
+                continue
+            selected.add(collection_id)
+            collection_ids.append(collection_id)
+            matched += 1
+        logging.info("Selected %d collection(s) of schema %s matching %r.", matched, args.schema, id_regex)
+    return collection_ids, batch
 
 
 def render_change_value(value) -> str:
@@ -223,14 +335,43 @@ def log_proposal(
             logging.info("Note: %s", note)
 
 
-def build_target_collection_for_proposal(target_row: pd.Series) -> dict:
-    return target_row.to_dict()
+def build_target_collection_for_proposal(target_row: dict) -> dict:
+    return dict(target_row)
+
+
+def confirm_schema_mismatches(collection_ids: list[str], args: argparse.Namespace) -> None:
+    mismatches = {}
+    for collection_id in collection_ids:
+        staging_area = NNContacts.extract_staging_area(collection_id)
+        expected_schema = NNContacts.expected_schema_name(staging_area)
+        if expected_schema and not NNContacts.schema_matches_staging_area(args.schema, staging_area):
+            mismatches[collection_id] = (staging_area, expected_schema)
+    for collection_id, (staging_area, expected_schema) in mismatches.items():
+        logging.warning(
+            "Collection %s uses staging prefix %s, so the expected schema is %s; requested schema is %s.",
+            collection_id,
+            staging_area,
+            expected_schema,
+            args.schema,
+        )
+    if len(mismatches) == 1:
+        collection_id, (_, expected_schema) = next(iter(mismatches.items()))
+        confirm_action(
+            f"Proceed with schema {args.schema} even though {collection_id} suggests {expected_schema}?",
+            force=args.force,
+        )
+    elif mismatches:
+        expected = ", ".join(sorted({expected_schema for _, expected_schema in mismatches.values()}))
+        confirm_action(
+            f"Proceed with schema {args.schema} even though {len(mismatches)} collection(s) suggest {expected}?",
+            force=args.force,
+        )
 
 
 def update_collection_from_facts(args: argparse.Namespace) -> int:
     pp = PrettyPrinter(indent=2)
     if args.debug:
-        logging.debug("Preparing live ERIC analysis snapshot for %s.", args.collection_id)
+        logging.debug("Preparing live ERIC analysis snapshot.")
     directory_kwargs = dict(
         schema="ERIC",
         purgeCaches=["directory"],
@@ -243,25 +384,25 @@ def update_collection_from_facts(args: argparse.Namespace) -> int:
     if directory_token:
         directory_kwargs["token"] = directory_token
     eric_directory = Directory(**directory_kwargs)
-    eric_directory.getCollectionById(args.collection_id, raise_on_missing=True)
-    facts = eric_directory.getCollectionFacts(args.collection_id)
-    if not facts:
-        raise InputError(f"Collection {args.collection_id!r} has no fact-sheet rows in ERIC.")
-
-    staging_area = NNContacts.extract_staging_area(args.collection_id)
-    expected_schema = NNContacts.expected_schema_name(staging_area)
-    if expected_schema and not NNContacts.schema_matches_staging_area(args.schema, staging_area):
-        logging.warning(
-            "Collection %s uses staging prefix %s, so the expected schema is %s; requested schema is %s.",
-            args.collection_id,
-            staging_area,
-            expected_schema,
-            args.schema,
-        )
-        confirm_action(
-            f"Proceed with schema {args.schema} even though {args.collection_id} suggests {expected_schema}?",
-            force=args.force,
-        )
+    collection_ids, batch = select_collections(args, eric_directory)
+    if not collection_ids:
+        logging.info("No collections matched the selection. Nothing to update.")
+        return EXIT_OK
+
+    facts_by_id = {collection_id: eric_directory.getCollectionFacts(collection_id) for collection_id in collection_ids}
+    without_facts = [collection_id for collection_id, facts in facts_by_id.items() if not facts]
+    if without_facts and not batch:
+        raise InputError(f"Collection {without_facts[0]!r} has no fact-sheet rows in ERIC.")
+    if without_facts:
+        logging.info("Skipping %d collection(s) without fact-sheet rows in ERIC.", len(without_facts))
+        if args.verbose:
+            logging.info("Collections without facts: %s", without_facts)
+        collection_ids = [collection_id for collection_id in collection_ids if facts_by_id[collection_id]]
+        if not collection_ids:
+            logging.info("None of the selected collections has fact-sheet rows. Nothing to update.")
+            return EXIT_OK
+
+    confirm_schema_mismatches(collection_ids, args)
 
     if args.debug:
         logging.debug("Connecting to Directory target %s.", args.directory_target)
@@ -276,44 +417,96 @@ def update_collection_from_facts(args: argparse.Namespace) -> int:
             if args.debug:
                 logging.debug("Signing in to Directory as %s.", args.directory_username)
             session.signin(args.directory_username, args.directory_password)
-        _, target_row = fetch_target_collection_row(
+        target_df, target_rows = fetch_target_collection_rows(
             session,
             schema=args.schema,
-            collection_id=args.collection_id,
+            collection_ids=collection_ids,
         )
-        proposal = build_collection_descriptor_proposal(
-            build_target_collection_for_proposal(target_row),
-            facts,
+        absent = [collection_id for collection_id in collection_ids if collection_id not in target_rows]
+        if absent and not batch:
+            raise InputError(
+                f"Collection {absent[0]!r} does not exist in schema {args.schema!r}; no update was applied."
+            )
+        if absent:
+            logging.warning(
+                "Skipping %d collection(s) that do not exist in schema %s: %s",
+                len(absent),
+                args.schema,
+                absent,
+            )
+
+        proposals = build_collection_descriptor_proposals(
+            (
+                (collection_id, build_target_collection_for_proposal(target_rows[collection_id]), facts_by_id[collection_id])
+                for collection_id in collection_ids
+                if collection_id in target_rows
+            ),
             replace_existing=args.replace_existing,
+            jobs=getattr(args, "jobs", 1),
         )
-
-        if not proposal["changes"]:
-            logging.info("No descriptor changes are needed for %s.", args.collection_id)
+        changed = {collection_id: proposal for collection_id, proposal in proposals.items() if proposal["changes"]}
+        if not changed:
+            if batch:
+                logging.info("No descriptor changes are needed for %d analyzed collection(s).", len(proposals))
+            else:
+                logging.info("No descriptor changes are needed for %s.", collection_ids[0])
             return EXIT_OK
 
-        log_proposal(
-            args.collection_id,
-            args.schema,
-            proposal,
-            verbose=args.verbose or args.debug,
-        )
+        for collection_id, proposal in changed.items():
+            log_proposal(
+                collection_id,
+                args.schema,
+                proposal,
+                verbose=args.verbose or args.debug,
+            )
+        change_count = sum(len(proposal["changes"]) for proposal in changed.values())
+        if batch:
+            logging.info(
+                "Descriptor updates proposed for %d of %d analyzed collection(s): %d field change(s).",
+                len(changed),
+                len(proposals),
+                change_count,
+            )
 
         if args.dry_run:
             logging.info("Dry run enabled. No data was written.")
             return EXIT_OK
 
-        confirm_action(
-            f"Apply {len(proposal['changes'])} descriptor update(s) to {args.collection_id} in schema {args.schema}?",
-            force=args.force,
-        )
+        if batch:
+            confirm_action(
+                f"Apply {change_count} descriptor update(s) to {len(changed)} collection(s) in schema {args.schema}?",
+                force=args.force,
+            )
+        else:
+            collection_id, proposal = next(iter(changed.items()))
+            confirm_action(
+                f"Apply {len(proposal['changes'])} descriptor update(s) to {collection_id} in schema {args.schema}?",
+                force=args.force,
+            )
 
-        updated_row = apply_descriptor_proposal_to_dataframe_row(target_row.to_dict(), proposal)
-        session.save_table(
-            table="Collections",
-            schema=args.schema,
-            data=pd.DataFrame([updated_row]),
+        updated_rows = pd.DataFrame(
+            [
+                apply_descriptor_proposal_to_dataframe_row(target_rows[collection_id], proposal)
+                for collection_id, proposal in changed.items()
+            ],
+            columns=target_df.columns,
+        )
+        write_engine = write_engine_from_args(
+            session,
+            args.schema,
+            args,
+            job_key=write_job_key(
+                "collection-factsheet-descriptor-updater",
+                args.schema,
+                args.replace_existing,
+                *sorted(changed),
+            ),
         )
-        logging.info("Updated %s in schema %s.", args.collection_id, args.schema)
+        write_engine.run([WriteOperation(SAVE_ACTION, "Collections", updated_rows)])
+        if batch:
+            logging.info("Updated %d collection(s) in schema %s.", len(changed), args.schema)
+        else:
+            logging.info("Updated %s in schema %s.", next(iter(changed)), args.schema)
     return EXIT_OK
 
 
@@ -335,6 +528,9 @@ def main() -> int:
     except InputError as exc:
         logging.error("%s", exc)
         return EXIT_INPUT_ERROR
+    except WriteEngineError as exc:
+        logging.error("%s", exc)
+        return EXIT_RUNTIME_ERROR
 
 
 if __name__ == "__main__":
@@ -96,19 +96,151 @@ def get_contact_address_key(contact: dict) -> str:
     return f"{address}|{locality}|{country}"
 
 
-def build_collection_contact_usage(dir) -> tuple[dict[str, list[str]], dict[str, Counter]]:
-    """Return contact -> collections and contact -> collection-counts-by-biobank maps."""
-    contact_to_collections: dict[str, list[str]] = defaultdict(list)
-    contact_to_biobank_counts: dict[str, Counter] = defaultdict(Counter)
+def normalize_email(email: str) -> str:
+    """Return a normalized lowercase email address or empty string."""
+    if not isinstance(email, str):
+        return ""
+    return email.strip().lower()
+
+
+class ContactIndex:
+    """Inverted index over contacts and their biobank/collection assignments.
+
+    The index walks contacts, collections and biobanks of the Directory
+    snapshot exactly once and exposes the lookups shared by the contact
+    checks: contacts by normalized email, email domain and address key;
+    collection usage per contact; and the biobank main-contact ownership
+    signals used to decide whether two biobanks belong to one institution.
+    Obtain it via ``get_contact_index(dir)`` so all checks of one run share
+    the same instance.
+
+    Attributes:
+        contacts_by_id: contact id -> contact record
+        contact_domains: contact id -> normalized email domain
+        contact_address_keys: contact id -> normalized address key
+        email_to_contacts: normalized email -> contact ids
+        domain_to_contacts: normalized email domain -> contact ids
+        address_to_contacts: normalized address key -> contact ids
+        collection_to_contacts: collection id -> contact ids
+        contact_to_collections: contact id -> collection ids
+        contact_to_biobank_counts: contact id -> collection counts by biobank
+        biobank_to_contact: biobank id -> main contact id
+        main_contact_to_biobanks: contact id -> biobanks where it is the main contact
+        domain_to_biobanks: institution-specific main-contact domain -> biobank ids
+        address_to_biobanks: main-contact address key -> biobank ids
+        biobank_signatures: biobank id -> {"domain": ..., "address_key": ...}
+    """
 
-    for collection in dir.getCollections():
-        biobank_id = collection.get("biobank", {}).get("id")
-        for contact_id in get_contact_ids(collection.get("contact")):
-            contact_to_collections[contact_id].append(collection["id"])
-            if biobank_id:
-                contact_to_biobank_counts[contact_id][biobank_id] += 1
+    def __init__(self, dir):
+        self.contacts_by_id: dict[str, dict] = {}
+        self.contact_domains: dict[str, str] = {}
+        self.contact_address_keys: dict[str, str] = {}
+        self.email_to_contacts: dict[str, set[str]] = defaultdict(set)
+        self.domain_to_contacts: dict[str, set[str]] = defaultdict(set)
+        self.address_to_contacts: dict[str, set[str]] = defaultdict(set)
+        self.collection_to_contacts: dict[str, list[str]] = {}
+        self.contact_to_collections: dict[str, list[str]] = defaultdict(list)
+        self.contact_to_biobank_counts: dict[str, Counter] = defaultdict(Counter)
+        self.biobank_to_contact: dict[str, str] = {}
+        self.main_contact_to_biobanks: dict[str, set[str]] = defaultdict(set)
+        self.domain_to_biobanks: dict[str, set[str]] = defaultdict(set)
+        self.address_to_biobanks: dict[str, set[str]] = defaultdict(set)
+        self.biobank_signatures: dict[str, dict[str, str]] = {}
+
+        for contact in dir.getContacts():
+            contact_id = contact.get("id")
+            if not contact_id:
+                continue
+            self.contacts_by_id[contact_id] = contact
+            email = normalize_email(contact.get("email", ""))
+            domain = get_email_domain(email)
+            address_key = get_contact_address_key(contact)
+            self.contact_domains[contact_id] = domain
+            self.contact_address_keys[contact_id] = address_key
+            if email:
+                self.email_to_contacts[email].add(contact_id)
+            if domain:
+                self.domain_to_contacts[domain].add(contact_id)
+            if address_key:
+                self.address_to_contacts[address_key].add(contact_id)
+
+        for collection in dir.getCollections():
+            biobank_id = collection.get("biobank", {}).get("id")
+            contact_ids = get_contact_ids(collection.get("contact"))
+            self.collection_to_contacts[collection["id"]] = contact_ids
+            for contact_id in contact_ids:
+                self.contact_to_collections[contact_id].append(collection["id"])
+                if biobank_id:
+                    self.contact_to_biobank_counts[contact_id][biobank_id] += 1
+
+        for biobank in dir.getBiobanks():
+            biobank_id = biobank.get("id")
+            if not biobank_id or ":networkID:" in biobank_id:
+                continue
+            contact_ids = get_contact_ids(biobank.get("contact"))
+            if len(contact_ids) != 1:
+                continue
+            contact_id = contact_ids[0]
+            self.biobank_to_contact[biobank_id] = contact_id
+            self.main_contact_to_biobanks[contact_id].add(biobank_id)
+            if contact_id not in self.contacts_by_id:
+                continue
+            domain = self.contact_domains[contact_id]
+            if is_institution_specific_domain(domain):
+                self.domain_to_biobanks[domain].add(biobank_id)
+            address_key = self.contact_address_keys[contact_id]
+            if address_key:
+                self.address_to_biobanks[address_key].add(biobank_id)
+            self.biobank_signatures[biobank_id] = {
+                "domain": domain if is_institution_specific_domain(domain) else "",
+                "address_key": address_key,
+            }
+
+    def get_contact(self, contact_id: str) -> dict | None:
+        """Return the contact record for an id, or None when unknown."""
+        return self.contacts_by_id.get(contact_id)
+
+    def get_contact_domain(self, contact_id: str) -> str:
+        """Return the normalized email domain of a contact or empty string."""
+        return self.contact_domains.get(contact_id, "")
+
+    def get_contact_address_key(self, contact_id: str) -> str:
+        """Return the normalized address key of a contact or empty string."""
+        return self.contact_address_keys.get(contact_id, "")
+
+    def get_contacts_by_email(self, email: str) -> set[str]:
+        """Return ids of contacts registered with the given email address."""
+        return set(self.email_to_contacts.get(normalize_email(email), set()))
+
+    def get_contacts_by_domain(self, domain: str) -> set[str]:
+        """Return ids of contacts whose email uses the given domain."""
+        return set(self.domain_to_contacts.get(domain.strip().lower(), set()))
+
+    def get_contacts_by_address_key(self, address_key: str) -> set[str]:
+        """Return ids of contacts sharing a normalized address key."""
+        return set(self.address_to_contacts.get(address_key, set()))
+
+    def get_domain_owner(self, contact_id: str) -> str | None:
+        """Return the unique biobank owning the contact's main-contact domain, if any."""
+        return get_single_biobank_domain_owner(self.get_contact_domain(contact_id), self.domain_to_biobanks)
+
+    def get_address_owners(self, contact_id: str) -> list[str]:
+        """Return sorted biobanks whose main contact shares the contact's address key."""
+        address_key = self.get_contact_address_key(contact_id)
+        if not address_key:
+            return []
+        return sorted(self.address_to_biobanks.get(address_key, set()))
+
+
+def get_contact_index(dir) -> ContactIndex:
+    """Return the contact index shared by all contact checks of one Directory run."""
+    return dir.getContactIndex()
 
-    return contact_to_collections, contact_to_biobank_counts
+
+def build_collection_contact_usage(dir) -> tuple[dict[str, list[str]], dict[str, Counter]]:
+    """Return contact -> collections and contact -> collection-counts-by-biobank maps."""
+    index = get_contact_index(dir)
+    return index.contact_to_collections, index.contact_to_biobank_counts
 
 
 def build_biobank_contact_maps(dir) -> tuple[
@@ -127,38 +259,14 @@ def build_biobank_contact_maps(dir) -> tuple[
         - normalized main-contact address key -> biobank ids
         - biobank_id -> {"domain": ..., "address_key": ...}
     """
-    biobank_to_contact: dict[str, str] = {}
-    contact_to_biobanks: dict[str, set[str]] = defaultdict(set)
-    domain_to_biobanks: dict[str, set[str]] = defaultdict(set)
-    address_to_biobanks: dict[str, set[str]] = defaultdict(set)
-    biobank_signatures: dict[str, dict[str, str]] = {}
-
-    for biobank in dir.getBiobanks():
-        biobank_id = biobank.get("id")
-        if not biobank_id or ":networkID:" in biobank_id:
-            continue
-        contact_ids = get_contact_ids(biobank.get("contact"))
-        if len(contact_ids) != 1:
-            continue
-        contact_id = contact_ids[0]
-        biobank_to_contact[biobank_id] = contact_id
-        contact_to_biobanks[contact_id].add(biobank_id)
-        try:
-            contact = dir.getContact(contact_id)
-        except Exception:
-            continue
-        domain = get_email_domain(contact.get("email", ""))
-        if is_institution_specific_domain(domain):
-            domain_to_biobanks[domain].add(biobank_id)
-        address_key = get_contact_address_key(contact)
-        if address_key:
-            address_to_biobanks[address_key].add(biobank_id)
-        biobank_signatures[biobank_id] = {
-            "domain": domain if is_institution_specific_domain(domain) else "",
-            "address_key": address_key,
-        }
-
-    return biobank_to_contact, contact_to_biobanks, domain_to_biobanks, address_to_biobanks, biobank_signatures
+    index = get_contact_index(dir)
+    return (
+        index.biobank_to_contact,
+        index.main_contact_to_biobanks,
+        index.domain_to_biobanks,
+        index.address_to_biobanks,
+        index.biobank_signatures,
+    )
 
 
 def get_single_biobank_domain_owner(domain: str, domain_to_biobanks: dict[str, set[str]]) -> str | None:
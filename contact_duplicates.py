@@ -0,0 +1,253 @@
+# vim:ts=4:sw=4:tw=0:sts=4:et
+
+"""Near-duplicate contact detection with MinHash signatures and LSH banding."""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional
+
+import numpy as np
+
+
+# Mersenne prime of the universal hash family; 32-bit shingle hashes times
+# the 29-bit coefficients below stay inside uint64 without overflow.
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 16
+DEFAULT_THRESHOLD = 0.6
+DEFAULT_NAME_THRESHOLD = 0.5
+# LSH buckets larger than this are typically generic values (for example a
+# shared institutional address); they are skipped to keep candidate
+# generation linear instead of quadratic inside the bucket.
+DEFAULT_MAX_BUCKET_SIZE = 50
+_SIGNATURE_CHUNK_SIZE = 4096
+
+
+@dataclass
+class NearDuplicateContactPair:
+    """Candidate duplicate contact pair with similarity evidence."""
+
+    contact_id: str
+    other_contact_id: str
+    similarity: float
+    name_similarity: float
+    shared_signals: list[str]
+
+
+def _fold_text(value: Any) -> str:
+    """Return lowercase ASCII-folded text with punctuation collapsed to spaces."""
+    if not isinstance(value, str):
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value)
+    ascii_text = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", ascii_text.lower()).split())
+
+
+def _char_shingles(prefix: str, text: str, size: int = 3) -> set[str]:
+    """Return padded character shingles of text tagged with a feature prefix."""
+    if not text:
+        return set()
+    padded = f" {text} "
+    if len(padded) <= size:
+        return {prefix + padded}
+    return {prefix + padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+
+def get_contact_name_key(contact: dict[str, Any]) -> str:
+    """Return the normalized first/last name of a contact without titles."""
+    return _fold_text(" ".join(filter(None, [contact.get("first_name"), contact.get("last_name")])))
+
+
+def get_email_local_part(contact: dict[str, Any]) -> str:
+    """Return the normalized local part of the contact email."""
+    email = contact.get("email")
+    if not isinstance(email, str) or "@" not in email:
+        return ""
+    return _fold_text(email.rsplit("@", 1)[0]).replace(" ", "")
+
+
+def get_phone_key(contact: dict[str, Any]) -> str:
+    """Return the last nine digits of the contact phone number."""
+    phone = contact.get("phone")
+    if not isinstance(phone, str):
+        return ""
+    digits = re.sub(r"\D", "", phone)
+    if len(digits) < 6:
+        return ""
+    return digits[-9:]
+
+
+def get_address_tokens(contact: dict[str, Any]) -> set[str]:
+    """Return normalized address/city/zip tokens of a contact."""
+    text = _fold_text(" ".join(str(contact.get(key) or "") for key in ("address", "zip", "city")))
+    return set(text.split())
+
+
+def build_contact_shingles(contact: dict[str, Any]) -> tuple[set[str], set[str]]:
+    """Return (all feature shingles, name-only shingles) for one contact.
+
+    Names and email local parts contribute character trigrams so small
+    spelling differences keep most shingles; phone is a single exact token
+    and address contributes word tokens.
+    """
+    name_shingles = _char_shingles("n:", get_contact_name_key(contact))
+    shingles = set(name_shingles)
+    shingles |= _char_shingles("e:", get_email_local_part(contact))
+    phone_key = get_phone_key(contact)
+    if phone_key:
+        shingles.add("p:" + phone_key)
+    shingles |= {"a:" + token for token in get_address_tokens(contact)}
+    return shingles, name_shingles
+
+
+def _hash_shingle(shingle: str) -> int:
+    """Return a stable 32-bit hash of a shingle."""
+    return zlib.crc32(shingle.encode("utf-8"))
+
+
+def _jaccard(left: set[str], right: set[str]) -> float:
+    """Return the Jaccard similarity of two sets (0 for two empty sets)."""
+    if not left and not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+class MinHasher:
+    """Vectorized MinHash signature builder using a universal hash family."""
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, seed: int = 1):
+        if num_perm < 1:
+            raise ValueError(f"num_perm must be positive, got {num_perm}.")
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self._a = rng.randint(1, 1 << 29, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = rng.randint(0, 1 << 29, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+    def signatures(self, shingle_sets: list[set[str]]) -> np.ndarray:
+        """Return a (len(shingle_sets), num_perm) uint64 signature matrix.
+
+        Empty shingle sets get an all-max signature, which never collides
+        with real signatures in practice.
+        """
+        result = np.full((len(shingle_sets), self.num_perm), _MAX_HASH, dtype=np.uint64)
+        for chunk_start in range(0, len(shingle_sets), _SIGNATURE_CHUNK_SIZE):
+            chunk = shingle_sets[chunk_start:chunk_start + _SIGNATURE_CHUNK_SIZE]
+            owners = []
+            hashes = []
+            for offset, shingles in enumerate(chunk):
+                for shingle in shingles:
+                    owners.append(offset)
+                    hashes.append(_hash_shingle(shingle))
+            if not hashes:
+                continue
+            owners_array = np.asarray(owners, dtype=np.int64)
+            hash_array = np.asarray(hashes, dtype=np.uint64)
+            permuted = (hash_array[:, None] * self._a[None, :] + self._b[None, :]) % _MERSENNE_PRIME
+            permuted &= _MAX_HASH
+            # shingles are emitted grouped by owner, so each owner's rows are contiguous
+            starts = np.flatnonzero(np.r_[True, owners_array[1:] != owners_array[:-1]])
+            minima = np.minimum.reduceat(permuted, starts, axis=0)
+            result[chunk_start + owners_array[starts]] = minima
+        return result
+
+
+def find_near_duplicate_contacts(
+    contacts: Iterable[dict[str, Any]],
+    *,
+    threshold: float = DEFAULT_THRESHOLD,
+    name_threshold: float = DEFAULT_NAME_THRESHOLD,
+    num_perm: int = DEFAULT_NUM_PERM,
+    bands: int = DEFAULT_BANDS,
+    max_bucket_size: Optional[int] = DEFAULT_MAX_BUCKET_SIZE,
+) -> list[NearDuplicateContactPair]:
+    """Return likely duplicate contact pairs in roughly linear time.
+
+    Contacts are reduced to MinHash signatures over name/email/phone/address
+    shingles; LSH banding groups contacts whose signatures agree on at least
+    one band, and only those candidate pairs are verified with the exact
+    Jaccard similarity. Pairs must also have similar names so colleagues
+    sharing an institutional address or phone line are not reported.
+
+    Args:
+        contacts: Contact records (Directory ``Persons`` rows).
+        threshold: Minimum Jaccard similarity over all feature shingles.
+        name_threshold: Minimum Jaccard similarity of the name shingles.
+        num_perm: MinHash signature length.
+        bands: Number of LSH bands; must divide ``num_perm``.
+        max_bucket_size: Skip LSH buckets with more members than this
+            (None disables the limit).
+
+    Returns:
+        Pairs sorted by descending similarity, then by contact ids.
+    """
+    if num_perm % bands != 0:
+        raise ValueError(f"LSH bands ({bands}) must divide num_perm ({num_perm}).")
+    if not 0 < threshold <= 1 or not 0 <= name_threshold <= 1:
+        raise ValueError("Similarity thresholds must be within (0, 1].")
+
+    contact_ids = []
+    shingle_sets = []
+    name_shingle_sets = []
+    for contact in contacts:
+        contact_id = contact.get("id")
+        if not contact_id:
+            continue
+        shingles, name_shingles = build_contact_shingles(contact)
+        if not name_shingles:
+            continue
+        contact_ids.append(contact_id)
+        shingle_sets.append(shingles)
+        name_shingle_sets.append(name_shingles)
+    if len(contact_ids) < 2:
+        return []
+
+    signatures = MinHasher(num_perm).signatures(shingle_sets)
+    rows = num_perm // bands
+    candidates: set[tuple[int, int]] = set()
+    for band in range(bands):
+        buckets: dict[bytes, list[int]] = defaultdict(list)
+        band_keys = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        for position in range(len(contact_ids)):
+            buckets[band_keys[position].tobytes()].append(position)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            if max_bucket_size is not None and len(members) > max_bucket_size:
+                continue
+            for i, left in enumerate(members):
+                for right in members[i + 1:]:
+                    candidates.add((left, right))
+
+    pairs = []
+    for left, right in candidates:
+        similarity = _jaccard(shingle_sets[left], shingle_sets[right])
+        if similarity < threshold:
+            continue
+        name_similarity = _jaccard(name_shingle_sets[left], name_shingle_sets[right])
+        if name_similarity < name_threshold:
+            continue
+        shared_signals = sorted(
+            {
+                {"n": "name", "e": "email", "p": "phone", "a": "address"}[shingle[0]]
+                for shingle in shingle_sets[left] & shingle_sets[right]
+            }
+        )
+        first_id, second_id = sorted((contact_ids[left], contact_ids[right]))
+        pairs.append(
+            NearDuplicateContactPair(
+                contact_id=first_id,
+                other_contact_id=second_id,
+                similarity=round(similarity, 3),
+                name_similarity=round(name_similarity, 3),
+                shared_signals=shared_signals,
+            )
+        )
+    pairs.sort(key=lambda pair: (-pair.similarity, pair.contact_id, pair.other_contact_id))
+    return pairs
@@ -72,7 +72,7 @@ for pluginInfo in simplePluginManager.getAllPlugins():
     pluginList.append(os.path.basename(pluginInfo.path))
 
 remoteCheckList = ['emails', 'geocoding', 'URLs']
-cachesList = ['directory', 'emails', 'geocoding', 'URLs']
+cachesList = ['directory', 'emails', 'geocoding', 'orphacodes', 'URLs']
 
 parser = build_parser()
 add_logging_arguments(parser)
@@ -173,7 +173,7 @@ def main() -> int:
 
         orphacodes = None
         if args.orphacodesfile is not None:
-            orphacodes = OrphaCodes(args.orphacodesfile[0])
+            orphacodes = OrphaCodes(args.orphacodesfile[0], purge_cache='orphacodes' in args.purgeCaches)
             dir.setOrphaCodesMapper(orphacodes)
 
         log.info('Total biobanks: ' + str(dir.getBiobanksCount()))
@@ -0,0 +1,260 @@
+# vim:ts=4:sw=4:tw=0:sts=4:et
+
+"""Snapshot-wide diagnosis classification index.
+
+Collections reference a few thousand distinct ``diagnosis_available`` codes,
+but disease-themed exporters used to re-parse them collection by collection.
+``DiagnosisIndex`` parses every distinct code once into a ``DiagnosisCode``
+(normalized ICD-10 range, ORPHA code and a ``DiagnosisCategory`` bitset) and
+ORs the code bitsets into one mask per collection, so thematic selections are
+bitmask filters.
+
+Besides the positive categories, the bitset carries complement flags
+(``NON_COVID``, ``NON_CANCER``) so that OR-aggregation also answers "does the
+collection have any other diagnosis", which the COVID-only and cancer-only
+exporter tallies depend on.
+"""
+
+import logging as log
+import re
+from dataclasses import dataclass
+from enum import IntFlag
+from typing import Any, Iterable, NamedTuple, Optional
+
+import numpy as np
+
+from icd10codeshelper import ICD10CodesHelper
+
+
+ICD10_PREFIX = "urn:miriam:icd:"
+ORPHA_PREFIX = "ORPHA:"
+COVID_DIAGNOSIS_PATTERNS = (
+    # ICD-10
+    re.compile("U07"),
+    # ICD-11
+    re.compile("RA01"),
+    # SNOMED CT
+    re.compile("(840533007|840534001|840535000|840536004|840539006|840544004|840546002)"),
+)
+# ICD-10
+COVID_CONTROL_PATTERN = re.compile("Z03.818")
+ICD10_CODE_PATTERN = re.compile(r"^(?P<block>[A-Z])(?P<code>\d{1,2}[A-Z]?)(\.(?P<subcode>\w+))?$")
+
+
+class DiagnosisCategory(IntFlag):
+    """Category bits of one diagnosis code (or the OR over a collection)."""
+
+    COVID = 1 << 0
+    COVID_CONTROL = 1 << 1
+    # any code that is a range or does not match the COVID patterns
+    NON_COVID = 1 << 2
+    CANCER = 1 << 3
+    # ICD-10 codes/chapters or valid ORPHA codes outside cancer
+    NON_CANCER = 1 << 4
+    OBESITY = 1 << 5
+    RARE_DISEASE = 1 << 6
+    # ICD-10 chapters XVI (perinatal, P00-P96) and XVII (congenital, Q00-Q99)
+    PEDIATRIC = 1 << 7
+    RANGE = 1 << 8
+    # ICD-10 codes that cannot be parsed and ORPHA codes missing from the mapping
+    UNMATCHED = 1 << 9
+
+
+class Icd10Range(NamedTuple):
+    """Inclusive range of normalized ICD-10 codes (e.g. ``C00``-``C14.9``)."""
+
+    start: str
+    end: str
+
+    def overlaps(self, other: "Icd10Range") -> bool:
+        return self.start <= other.end and other.start <= self.end
+
+
+PEDIATRIC_ICD10_RANGES = (Icd10Range("P00", "P96~"), Icd10Range("Q00", "Q99~"))
+
+
+def normalize_icd10_code(code: str) -> Optional[str]:
+    """Return a zero-padded, order-preserving ICD-10 code (``C7.1`` -> ``C07.1``)."""
+    m = ICD10_CODE_PATTERN.match(code)
+    if not m:
+        return None
+    normalized = m.group("block") + m.group("code").zfill(3 if m.group("code")[-1].isalpha() else 2)
+    if m.group("subcode"):
+        normalized += "." + m.group("subcode")
+    return normalized
+
+
+def parse_icd10_range(code: str) -> Optional[Icd10Range]:
+    """Parse an ICD-10 code or ``A-B`` block range into an ``Icd10Range``.
+
+    The range end of a bare block (``C50``) is suffixed with ``~`` so that it
+    covers all of the block's subcodes.
+    """
+    bounds = code.split("-")
+    if len(bounds) not in (1, 2):
+        return None
+    normalized = [normalize_icd10_code(bound) for bound in bounds]
+    if any(bound is None for bound in normalized):
+        return None
+    start, end = normalized[0], normalized[-1]
+    if "." not in end:
+        end += "~"
+    return Icd10Range(start, end)
+
+
+@dataclass(frozen=True)
+class DiagnosisCode:
+    """One distinct ``diagnosis_available`` code parsed once."""
+
+    code: str
+    categories: DiagnosisCategory
+    icd10_range: Optional[Icd10Range] = None
+    orpha_code: Optional[str] = None
+
+
+def _classify_icd10(code: str) -> tuple[DiagnosisCategory, Optional[Icd10Range]]:
+    categories = DiagnosisCategory(0)
+    icd10_range = parse_icd10_range(code)
+    is_cancer = ICD10CodesHelper.isCancerCode(code)
+    if is_cancer is None:
+        is_cancer = ICD10CodesHelper.isCancerChapter(code)
+    if is_cancer is None:
+        log.warning("Cannot match ICD-10 diagnosis %s" % (code))
+        categories |= DiagnosisCategory.UNMATCHED
+    elif is_cancer:
+        categories |= DiagnosisCategory.CANCER
+    else:
+        categories |= DiagnosisCategory.NON_CANCER
+    if ICD10CodesHelper.isObesityCode(code):
+        categories |= DiagnosisCategory.OBESITY
+    if icd10_range is not None and any(icd10_range.overlaps(r) for r in PEDIATRIC_ICD10_RANGES):
+        categories |= DiagnosisCategory.PEDIATRIC
+    return categories, icd10_range
+
+
+def _classify_orpha(code: str, orphacodes) -> DiagnosisCategory:
+    if orphacodes is None:
+        return DiagnosisCategory.RARE_DISEASE
+    if not orphacodes.isValidOrphaCode(code):
+        log.warning("Invalid ORPHA code %s" % (code))
+        return DiagnosisCategory.UNMATCHED
+    categories = DiagnosisCategory.RARE_DISEASE
+    if orphacodes.isCancerOrphaCode(code):
+        categories |= DiagnosisCategory.CANCER
+    else:
+        categories |= DiagnosisCategory.NON_CANCER
+    return categories
+
+
+def classify_diagnosis(code: str, orphacodes=None) -> DiagnosisCode:
+    """Parse and classify a single diagnosis code.
+
+    ``orphacodes`` (an ``OrphaCodes`` instance) enables ORPHA validation and
+    the ORPHA cancer mapping; without it every ``ORPHA:`` code only counts as
+    rare disease.
+    """
+    categories = DiagnosisCategory(0)
+    icd10_range = None
+    orpha_code = None
+
+    covid = any(pattern.search(code) for pattern in COVID_DIAGNOSIS_PATTERNS)
+    if covid:
+        categories |= DiagnosisCategory.COVID
+    if COVID_CONTROL_PATTERN.search(code):
+        categories |= DiagnosisCategory.COVID_CONTROL
+    if "-" in code:
+        categories |= DiagnosisCategory.RANGE
+    if not covid or "-" in code:
+        categories |= DiagnosisCategory.NON_COVID
+
+    if code.startswith(ICD10_PREFIX):
+        icd10_categories, icd10_range = _classify_icd10(code[len(ICD10_PREFIX):])
+        categories |= icd10_categories
+    elif code.startswith(ORPHA_PREFIX):
+        orpha_code = code[len(ORPHA_PREFIX):]
+        categories |= _classify_orpha(orpha_code, orphacodes)
+    return DiagnosisCode(code, categories, icd10_range, orpha_code)
+
+
+def get_collection_diagnosis_codes(collection: dict[str, Any]) -> list[str]:
+    """Return the ``diagnosis_available`` codes (names, falling back to ids)."""
+    codes = []
+    for diagnosis in collection.get("diagnosis_available", []) or []:
+        code = diagnosis.get("name", diagnosis.get("id")) if isinstance(diagnosis, dict) else diagnosis
+        if code not in (None, ""):
+            codes.append(str(code))
+    return codes
+
+
+class DiagnosisIndex:
+    """Distinct diagnosis codes and per-collection category masks of a snapshot."""
+
+    def __init__(self, collections: Iterable[dict[str, Any]], orphacodes=None):
+        self.orphacodes = orphacodes
+        self.codes: dict[str, DiagnosisCode] = {}
+        self.collection_ids: list[str] = []
+        self._positions: dict[str, int] = {}
+        self._code_masks: dict[str, int] = {}
+        masks = []
+        for collection in collections:
+            if collection["id"] in self._positions:
+                continue
+            self._positions[collection["id"]] = len(self.collection_ids)
+            self.collection_ids.append(collection["id"])
+            masks.append(self._mask_of(get_collection_diagnosis_codes(collection)))
+        self.masks = np.asarray(masks, dtype=np.uint32)
+
+    @classmethod
+    def from_directory(cls, directory, orphacodes=None) -> "DiagnosisIndex":
+        """Index all collections of a Directory snapshot (in its withdrawn scope)."""
+        return cls(directory.getCollections(), orphacodes=orphacodes)
+
+    def get_code(self, code: str) -> DiagnosisCode:
+        """Return the parsed code, classifying it on first use."""
+        parsed = self.codes.get(code)
+        if parsed is None:
+            parsed = classify_diagnosis(code, self.orphacodes)
+            self.codes[code] = parsed
+            self._code_masks[code] = int(parsed.categories)
+        return parsed
+
+    def _mask_of(self, codes: Iterable[str]) -> int:
+        # plain ints: IntFlag arithmetic dominates the build time otherwise
+        code_masks = self._code_masks
+        mask = 0
+        for code in codes:
+            code_mask = code_masks.get(code)
+            if code_mask is None:
+                self.get_code(code)
+                code_mask = code_masks[code]
+            mask |= code_mask
+        return mask
+
+    def classify_codes(self, codes: Iterable[str]) -> DiagnosisCategory:
+        """Return the OR of the categories of ``codes``."""
+        return DiagnosisCategory(self._mask_of(codes))
+
+    def get_collection_mask(self, collection: dict[str, Any]) -> DiagnosisCategory:
+        """Return the category mask of a collection (indexed or not)."""
+        position = self._positions.get(collection["id"])
+        if position is None:
+            return self.classify_codes(get_collection_diagnosis_codes(collection))
+        return DiagnosisCategory(int(self.masks[position]))
+
+    def select_collection_ids(
+        self,
+        required: DiagnosisCategory,
+        excluded: DiagnosisCategory = DiagnosisCategory(0),
+    ) -> list[str]:
+        """Return ids of collections having any ``required`` and no ``excluded`` bit."""
+        selected = ((self.masks & int(required)) != 0) & ((self.masks & int(excluded)) == 0)
+        return [self.collection_ids[position] for position in np.flatnonzero(selected)]
+
+    def count_collections(self) -> dict[str, int]:
+        """Return the number of collections per category name."""
+        return {
+            category.name: int(np.count_nonzero(self.masks & int(category)))
+            for category in DiagnosisCategory
+        }
+
+
@@ -4,10 +4,13 @@
 """Export per-biobank sample, donor, collection, service, and fact-sheet statistics."""
 
 import logging as log
+import os
 import pprint
+import time
 from collections import Counter
 
 import pandas as pd
+from diskcache import Cache
 
 from cli_common import (
     add_directory_auth_arguments,
@@ -21,8 +24,14 @@ from cli_common import (
     build_parser,
     configure_logging,
 )
+from cache_paths import repo_cache_dir
 from directory import Directory
-from directory_stats_utils import build_directory_stats, build_stats_summary
+from directory_stats_utils import (
+    build_directory_stats,
+    build_stats_cube_cache_key,
+    build_stats_summary,
+    load_or_build_stats_cube,
+)
 from oomutils import (
     describe_oom_estimate_policy,
     get_oom_upper_bound_coefficient,
@@ -30,7 +39,7 @@ from oomutils import (
 from xlsxutils import write_xlsx_tables
 
 
-CACHES_LIST = ["directory"]
+CACHES_LIST = ["directory", "stats_cube"]
 pp = pprint.PrettyPrinter(indent=4)
 
 
@@ -106,8 +115,29 @@ log.info(
     get_oom_upper_bound_coefficient(),
 )
 
+cache_dir = repo_cache_dir("data-check-cache", "directory-stats-cube")
+if not os.path.exists(cache_dir):
+    os.makedirs(cache_dir)
+stats_cube_cache = Cache(cache_dir)
+if "stats_cube" in args.purgeCaches:
+    stats_cube_cache.clear()
+stats_cube_key = build_stats_cube_cache_key(
+    dir.getSnapshotChecksum(),
+    schema=args.schema,
+    include_withdrawn=args.include_withdrawn,
+    only_withdrawn=args.only_withdrawn,
+)
+start_time = time.perf_counter()
+stats_cube, stats_cube_cache_hit = load_or_build_stats_cube(dir, stats_cube_cache, stats_cube_key)
+log.info(
+    "%s stats cube in %.2fs",
+    "Loaded cached" if stats_cube_cache_hit else "Built and cached",
+    time.perf_counter() - start_time,
+)
+
 stats = build_directory_stats(
     dir,
+    stats_cube=stats_cube,
     country_filters=args.countries,
     staging_area_filters=args.staging_areas,
     collection_type_filters=args.collection_types,
@@ -16,7 +16,22 @@ from dotenv import load_dotenv
 
 from cli_interrupts import log_keyboard_interrupt
 from directory_session_compat import DirectorySession
+from directory_table_diff import diff_tables
+from directory_table_fetch import LiveTableCache
+from directory_write_engine import (
+    DELETE_ACTION,
+    SAVE_ACTION,
+    WriteEngineError,
+    WriteOperation,
+    add_write_engine_arguments,
+    file_checksum,
+    write_engine_from_args,
+    write_job_key,
+)
+from fact_sheet_frame import FactSheetFrame
+from fact_sheet_utils import FACT_DIMENSION_KEYS
 from k_anonymity import positive_below_k_mask
+from table_stream import DEFAULT_IMPORT_CHUNK_ROWS, OverlappedWriter, align_chunks_to_groups, iter_file_chunks, read_file_header
 from validation_helpers import format_validation_error
 from validation_models import TableModifierSettingsModel, ValidationError
 
@@ -69,6 +84,8 @@ parser.add_argument("--tsvQuoteChar", type=str, default="\"", help="Quote charac
 parser.add_argument("--tsvEscapeChar", type=str, default=None, help="Escape character for TSV parsing. Example: \\\\")
 parser.add_argument("--tsvQuoting", type=str, choices=["minimal", "all", "none"], default="minimal", help="TSV quoting mode. Default: minimal")
 parser.add_argument("--tsvNoDoublequote", action="store_true", help="Disable double-quote escaping for TSV parsing.")
+parser.add_argument("--import-chunk-rows", dest="import_chunk_rows", type=int, default=DEFAULT_IMPORT_CHUNK_ROWS, help=f"Rows read, filtered and uploaded per chunk when importing CSV/TSV files. Default: {DEFAULT_IMPORT_CHUNK_ROWS}.")
+add_write_engine_arguments(parser)
 
 args = parser.parse_args()
 
@@ -103,6 +120,7 @@ id_column_override = args.id_column
 collection_column_override = args.collection_column
 k_donors = args.k_donors
 k_samples = args.k_samples
+import_chunk_rows = args.import_chunk_rows
 if args.directory_target:
     target = args.directory_target
 if args.directory_username:
@@ -138,7 +156,7 @@ def is_collection_facts_table(table_name):
     return str(table_name).strip().lower() == COLLECTION_FACTS_TABLE.lower()
 
 
-def read_tsv_as_dataframe(file_path):
+def tsv_read_options():
     if tsvQuoteChar is not None and len(tsvQuoteChar) != 1:
         raise ValueError("tsvQuoteChar must be a single character.")
     if tsvEscapeChar is not None and len(tsvEscapeChar) != 1:
@@ -146,31 +164,35 @@ def read_tsv_as_dataframe(file_path):
     quoting = TSV_QUOTING_MAP[tsvQuoting]
     if quoting == csv.QUOTE_NONE and tsvEscapeChar is None:
         logging.warning("TSV quoting is set to 'none' without an escape character. Tabs and quotes must be literal.")
-    effective_separator = get_effective_separator("tsv")
-    return pd.read_csv(
-        file_path,
-        sep=effective_separator,
-        dtype=str,
-        keep_default_na=False,
-        na_filter=False,
-        quotechar=tsvQuoteChar,
-        escapechar=tsvEscapeChar,
-        doublequote=not tsvNoDoublequote,
-        quoting=quoting,
-        encoding="utf-8-sig",
-    )
+    return {
+        "sep": get_effective_separator("tsv"),
+        "dtype": str,
+        "keep_default_na": False,
+        "na_filter": False,
+        "quotechar": tsvQuoteChar,
+        "escapechar": tsvEscapeChar,
+        "doublequote": not tsvNoDoublequote,
+        "quoting": quoting,
+        "encoding": "utf-8-sig",
+    }
+
+
+def csv_read_options():
+    return {
+        "sep": get_effective_separator("csv"),
+        "dtype": str,
+        "keep_default_na": False,
+        "na_filter": False,
+        "encoding": "utf-8-sig",
+    }
+
+
+def read_tsv_as_dataframe(file_path):
+    return pd.read_csv(file_path, **tsv_read_options())
 
 
 def read_csv_as_dataframe(file_path):
-    effective_separator = get_effective_separator("csv")
-    return pd.read_csv(
-        file_path,
-        sep=effective_separator,
-        dtype=str,
-        keep_default_na=False,
-        na_filter=False,
-        encoding="utf-8-sig",
-    )
+    return pd.read_csv(file_path, **csv_read_options())
 
 
 def is_tsv(file_path):
@@ -266,32 +288,23 @@ def resolve_column_case_insensitive(df, column_name):
     return None
 
 
-def get_table_columns(session, schema, table):
-    schema_metadata = session.get_schema_metadata(schema)
-    table_meta = schema_metadata.get_table(by="name", value=table)
-    return [col.name for col in table_meta.columns]
-
-
-def fetch_existing_ids(session, schema, table, id_column):
+def fetch_existing_ids(live_tables, table, id_column):
     try:
-        table_df = session.get(table=table, schema=schema, as_df=True)
+        existing_ids = live_tables.ids(table, id_column or "id")
     except Exception as exc:
         logging.warning("Failed to retrieve existing records for %s::%s: %s", schema, table, exc)
         return None
-    try:
-        id_column = resolve_id_column(table_df, id_column)
-    except InputError as exc:
-        logging.warning("Unable to identify an ID column in %s::%s: %s", schema, table, exc)
-        return None
-    if id_column is None:
-        logging.warning("Unable to identify an ID column in %s::%s.", schema, table)
-        return None
-    return set(table_df[id_column].astype(str))
+    if existing_ids is None:
+        if id_column:
+            logging.warning("Unable to identify an ID column in %s::%s: ID column %r not found.", schema, table, id_column)
+        else:
+            logging.warning("Unable to identify an ID column in %s::%s.", schema, table)
+    return existing_ids
 
 
-def report_column_mismatches(session, schema, table, df):
+def report_column_mismatches(live_tables, table, df):
     try:
-        columns = get_table_columns(session, schema, table)
+        columns = live_tables.table_columns(table)
     except Exception as exc:
         logging.warning("Failed to retrieve schema metadata for %s::%s: %s", schema, table, exc)
         return
@@ -307,47 +320,6 @@ def report_column_mismatches(session, schema, table, df):
             logging.info("File is missing %s column(s) from %s::%s.", len(missing), schema, table)
 
 
-def summarize_import(session, schema, table, df, id_column):
-    if df is None:
-        return None
-    report_column_mismatches(session, schema, table, df)
-    try:
-        id_column = resolve_id_column(df, id_column)
-    except InputError as exc:
-        raise InputError(f"Import requires an ID column for summary: {exc}") from exc
-    if id_column is None:
-        logging.warning("Import file does not include an ID column; unable to compare with server data.")
-        return {
-            "total": len(df.index),
-            "new": None,
-            "update": None,
-            "has_existing": False,
-        }
-    file_ids = set(df[id_column].astype(str))
-    existing_ids = fetch_existing_ids(session, schema, table, id_column)
-    if existing_ids is None:
-        return {
-            "total": len(df.index),
-            "new": None,
-            "update": None,
-            "has_existing": False,
-        }
-    new_ids = sorted(file_ids - existing_ids)
-    update_ids = sorted(file_ids & existing_ids)
-    logging.info("Import summary for %s::%s: %s new, %s updates.", schema, table, len(new_ids), len(update_ids))
-    if verbose:
-        if new_ids:
-            logging.info("New IDs: %s", new_ids)
-        if update_ids:
-            logging.info("Update IDs: %s", update_ids)
-    return {
-        "total": len(df.index),
-        "new": new_ids,
-        "update": update_ids,
-        "has_existing": True,
-    }
-
-
 def summarize_sync_scope(schema, table, current_scope_df, target_scope_df, id_column, scope_label):
     current_count = len(current_scope_df.index)
     target_count = len(target_scope_df.index)
@@ -357,14 +329,21 @@ def summarize_sync_scope(schema, table, current_scope_df, target_scope_df, id_co
     deleted_ids = []
     new_ids = []
     updated_ids = []
+    unchanged_count = 0
+    diff = None
     if current_id_column and target_id_column:
-        current_ids = set(current_scope_df[current_id_column].astype(str))
-        target_ids = set(target_scope_df[target_id_column].astype(str))
-        deleted_ids = sorted(current_ids - target_ids)
-        new_ids = sorted(target_ids - current_ids)
-        updated_ids = sorted(target_ids & current_ids)
+        diff = diff_tables(
+            current_scope_df,
+            target_scope_df,
+            current_id_column=current_id_column,
+            target_id_column=target_id_column,
+        )
+        deleted_ids = diff.deleted_ids
+        new_ids = diff.new_ids
+        updated_ids = diff.changed_ids
+        unchanged_count = diff.unchanged_count
     logging.info(
-        "Sync summary for %s::%s (%s): current=%s, target=%s, delete=%s, add=%s, update=%s.",
+        "Sync summary for %s::%s (%s): current=%s, target=%s, delete=%s, add=%s, update=%s, unchanged=%s.",
         schema,
         table,
         scope_label,
@@ -373,6 +352,7 @@ def summarize_sync_scope(schema, table, current_scope_df, target_scope_df, id_co
         len(deleted_ids),
         len(new_ids),
         len(updated_ids),
+        unchanged_count,
     )
     if verbose:
         if deleted_ids:
@@ -387,14 +367,16 @@ def summarize_sync_scope(schema, table, current_scope_df, target_scope_df, id_co
         "deleted_ids": deleted_ids,
         "new_ids": new_ids,
         "updated_ids": updated_ids,
+        "unchanged_count": unchanged_count,
         "scope_label": scope_label,
+        "diff": diff,
     }
 
 
-def summarize_delete(session, schema, table, df, id_column):
+def summarize_delete(live_tables, table, df, id_column):
     if df is None:
         return
-    report_column_mismatches(session, schema, table, df)
+    report_column_mismatches(live_tables, table, df)
     try:
         id_column = resolve_id_column(df, id_column)
     except InputError as exc:
@@ -402,7 +384,7 @@ def summarize_delete(session, schema, table, df, id_column):
     if id_column is None:
         raise InputError("Delete file does not include an ID column.")
     file_ids = set(df[id_column].astype(str))
-    existing_ids = fetch_existing_ids(session, schema, table, id_column)
+    existing_ids = fetch_existing_ids(live_tables, table, id_column)
     if existing_ids is None:
         return
     missing_ids = sorted(file_ids - existing_ids)
@@ -471,7 +453,49 @@ def _coerce_numeric_column(df, column_name, context):
     return numeric_values
 
 
-def apply_k_anonymity_filters(df, k_donors_threshold, k_samples_threshold, *, context):
+def find_complementary_disclosures(df, k_donors_threshold, k_samples_threshold):
+    """Log and return small residuals recoverable from all-star totals minus margins.
+
+    Rows are not removed automatically: the suggested secondary suppression is
+    logged so the uploader can drop or aggregate margin rows explicitly.
+    """
+    collection_column = resolve_collection_column(df, collection_column_override)
+    if collection_column is None:
+        return []
+    renamed_columns = {}
+    for column_name in (*FACT_DIMENSION_KEYS, "number_of_donors", "number_of_samples"):
+        resolved = resolve_column_case_insensitive(df, column_name)
+        if resolved is not None:
+            renamed_columns[resolved] = column_name
+    if not any(column_name in renamed_columns.values() for column_name in FACT_DIMENSION_KEYS):
+        return []
+    scan = FactSheetFrame.from_table(
+        df.rename(columns=renamed_columns),
+        collection_column=collection_column,
+        id_column=resolve_id_column(df, id_column_override),
+    ).scan_k_anonymity(k_donors=k_donors_threshold, k_samples=k_samples_threshold)
+    disclosures = [
+        disclosure
+        for violations in scan.values()
+        for disclosure in violations.complementary
+    ]
+    for disclosure in disclosures:
+        logging.warning(
+            "Complementary disclosure in collection %s: all-star %s (%s) minus published %s margins (%s) reveals %s (< k=%s); consider also dropping margin rows %s.",
+            disclosure.collection_id,
+            disclosure.count_field,
+            disclosure.all_star_total,
+            disclosure.dimension,
+            disclosure.published_margin_total,
+            disclosure.residual,
+            disclosure.k_limit,
+            disclosure.suppress_fact_ids,
+        )
+    return disclosures
+
+
+def apply_k_anonymity_filters(df, k_donors_threshold, k_samples_threshold, *, context, report=True, check_complementary=True):
+    """Drop rows with 0 < count < k; ``report=False`` leaves logging to the caller (streamed chunks)."""
     if k_donors_threshold is None and k_samples_threshold is None:
         return df, None
     donors_mask = pd.Series(False, index=df.index)
@@ -495,6 +519,18 @@ def apply_k_anonymity_filters(df, k_donors_threshold, k_samples_threshold, *, co
     combined_mask = donors_mask | samples_mask
     skipped_df = df.loc[combined_mask]
     filtered_df = df.loc[~combined_mask]
+    complementary_disclosures = []
+    if check_complementary:
+        complementary_disclosures = find_complementary_disclosures(
+            df,
+            k_donors_threshold,
+            k_samples_threshold,
+        )
+    skipped_ids = []
+    if verbose and combined_mask.any():
+        skipped_id_column = resolve_id_column(skipped_df, id_column_override)
+        if skipped_id_column is not None:
+            skipped_ids = sorted(skipped_df[skipped_id_column].astype(str))
     stats = {
         "skipped_total": int(combined_mask.sum()),
         "skipped_donors": int(donors_mask.sum()),
@@ -503,7 +539,27 @@ def apply_k_anonymity_filters(df, k_donors_threshold, k_samples_threshold, *, co
         "remaining": int((~combined_mask).sum()),
         "threshold_donors": k_donors_threshold,
         "threshold_samples": k_samples_threshold,
+        "complementary_disclosures": len(complementary_disclosures),
+        "skipped_ids": skipped_ids,
     }
+    if report:
+        log_k_anonymity_stats(stats, context)
+    return filtered_df, stats
+
+
+def merge_k_anonymity_stats(total, stats):
+    """Accumulate per-chunk ``apply_k_anonymity_filters`` stats."""
+    if stats is None:
+        return total
+    if total is None:
+        return {key: (list(value) if key == "skipped_ids" else value) for key, value in stats.items()}
+    for key in ("skipped_total", "skipped_donors", "skipped_samples", "skipped_overlap", "remaining", "complementary_disclosures"):
+        total[key] += stats[key]
+    total["skipped_ids"].extend(stats["skipped_ids"])
+    return total
+
+
+def log_k_anonymity_stats(stats, context):
     logging.info(
         "k-anonymity filter results for %s: skipped total=%s (0<donors<k: %s, 0<samples<k: %s, overlap: %s), remaining=%s.",
         context,
@@ -513,15 +569,12 @@ def apply_k_anonymity_filters(df, k_donors_threshold, k_samples_threshold, *, co
         stats["skipped_overlap"],
         stats["remaining"],
     )
-    if verbose and stats["skipped_total"] > 0:
-        id_column = resolve_id_column(skipped_df, id_column_override)
-        if id_column is not None:
-            logging.info(
-                "k-anonymity skipped row IDs for %s: %s",
-                context,
-                sorted(skipped_df[id_column].astype(str)),
-            )
-    return filtered_df, stats
+    if verbose and stats["skipped_ids"]:
+        logging.info(
+            "k-anonymity skipped row IDs for %s: %s",
+            context,
+            sorted(stats["skipped_ids"]),
+        )
 
 
 def export_table_data(df, output_path, file_format):
@@ -591,22 +644,69 @@ def save_table_with_national_node_fallback(session, schema, table_name, data):
             raise
 
 
-def delete_scope_rows(session, schema, table_name, scope_df, id_column):
+def write_job_key_for(action, input_path=None):
+    """Identify one apply for the write journal (inputs, filters and target)."""
+    parts = [
+        "directory-tables-modifier",
+        schema,
+        table_name,
+        action,
+        id_regex or "",
+        ",".join(parse_collection_ids(collection_ids)),
+        k_donors,
+        k_samples,
+        national_node or "",
+    ]
+    if input_path is not None:
+        parts.append(file_checksum(input_path))
+    return write_job_key(*parts)
+
+
+def build_write_engine(live_tables, *, job_key=None):
+    """Return the chunked write engine for this invocation (journaled when job_key is set)."""
+    session = live_tables.session
+
+    def save_rows(target_table, chunk):
+        try:
+            save_table_with_national_node_fallback(session, schema, target_table, chunk)
+        finally:
+            live_tables.invalidate(target_table)
+
+    def delete_rows(target_table, chunk):
+        try:
+            session.delete_records(target_table, schema, data=chunk)
+        finally:
+            live_tables.invalidate(target_table)
+
+    return write_engine_from_args(session, schema, args, job_key=job_key, save_rows=save_rows, delete_rows=delete_rows)
+
+
+def write_operations(live_tables, operations, *, job_key=None):
+    return build_write_engine(live_tables, job_key=job_key).run(operations)
+
+
+def write_rows(live_tables, action, table, data, *, job_key=None):
+    return write_operations(live_tables, [WriteOperation(action, table, data)], job_key=job_key)
+
+
+def truncate_table(live_tables, table_name):
+    try:
+        live_tables.session.truncate(table_name, schema)
+    finally:
+        live_tables.invalidate(table_name)
+
+
+def delete_scope_rows(live_tables, table_name, scope_df, id_column):
     if scope_df.empty:
         return
     delete_id_column = resolve_id_column(scope_df, id_column)
     if delete_id_column is None:
         raise InputError("Filtered sync requires an ID column named 'id' or --id-column.")
-    session.delete_records(
-        table_name,
-        schema,
-        data=scope_df[[delete_id_column]],
-    )
+    write_rows(live_tables, DELETE_ACTION, table_name, scope_df[[delete_id_column]])
 
 
 def restore_sync_scope_from_backup(
-    session,
-    schema,
+    live_tables,
     table_name,
     backup_path,
     *,
@@ -618,9 +718,9 @@ def restore_sync_scope_from_backup(
 ):
     backup_df = load_internal_sync_backup(backup_path)
     if not scope_is_filtered:
-        session.truncate(table_name, schema)
+        truncate_table(live_tables, table_name)
     else:
-        live_df = session.get(table=table_name, schema=schema, as_df=True)
+        live_df = live_tables.table(table_name)
         live_scope_df = apply_filters(
             live_df,
             id_regex_value,
@@ -629,9 +729,151 @@ def restore_sync_scope_from_backup(
             collection_column,
             "Sync rollback filtering",
         )
-        delete_scope_rows(session, schema, table_name, live_scope_df, id_column)
+        delete_scope_rows(live_tables, table_name, live_scope_df, id_column)
     if not backup_df.empty:
-        session.save_table(table=table_name, schema=schema, data=backup_df)
+        write_rows(live_tables, SAVE_ACTION, table_name, backup_df)
+
+
+def restore_sync_diff_from_backup(live_tables, table_name, backup_path, diff):
+    """Undo a row-level sync: drop inserted ids, re-save deleted and changed rows."""
+    if diff.new_ids:
+        write_rows(live_tables, DELETE_ACTION, table_name, pd.DataFrame({diff.id_column: diff.new_ids}))
+    backup_df = load_internal_sync_backup(backup_path)
+    if not backup_df.empty:
+        write_rows(live_tables, SAVE_ACTION, table_name, backup_df)
+
+
+def stream_import(live_tables, import_path, resolved_format, import_table, collections):
+    """Import a CSV/TSV file chunk by chunk with bounded memory.
+
+    A planning pass streams the file once to apply -N/-R/-C/-k/-K per chunk,
+    count new vs updated ids and report k-anonymity results (including
+    complementary disclosures, with chunks cut at collection boundaries);
+    after confirmation a second pass re-reads the file and uploads every
+    prepared chunk while the next one is being parsed. A file that fits in a
+    single chunk is parsed only once.
+    """
+    read_options = tsv_read_options() if resolved_format == "tsv" else csv_read_options()
+    try:
+        header_df = pd.DataFrame(columns=read_file_header(import_path, **read_options))
+    except Exception as exc:
+        raise InputError(f"Failed to read import file {import_path}: {exc}") from exc
+    add_national_node = False
+    if national_node:
+        column_name = resolve_column_case_insensitive(header_df, "national_node")
+        if column_name is None:
+            header_df["national_node"] = national_node
+            add_national_node = True
+        else:
+            logging.warning("Import file already contains %s column; --national-node will be ignored.", column_name)
+    report_column_mismatches(live_tables, import_table, header_df)
+    try:
+        id_column = resolve_id_column(header_df, id_column_override)
+    except InputError as exc:
+        raise InputError(f"Import requires an ID column for summary: {exc}") from exc
+    k_active = k_donors is not None or k_samples is not None
+    group_column = None
+    if k_active:
+        try:
+            group_column = resolve_collection_column(header_df, collection_column_override)
+        except InputError:
+            group_column = None
+    existing_ids = None
+    if id_column is None:
+        logging.warning("Import file does not include an ID column; unable to compare with server data.")
+    else:
+        existing_ids = fetch_existing_ids(live_tables, import_table, id_column)
+
+    def read_chunks():
+        return align_chunks_to_groups(iter_file_chunks(import_path, import_chunk_rows, **read_options), group_column)
+
+    def prepare(chunk, *, planning):
+        if add_national_node:
+            chunk = chunk.assign(national_node=national_node)
+        if id_regex or collection_ids:
+            chunk = apply_filters(chunk, id_regex, collections, id_column_override, collection_column_override, "Import filtering")
+        filtered_rows = len(chunk.index)
+        k_stats = None
+        if k_active:
+            chunk, k_stats = apply_k_anonymity_filters(
+                chunk,
+                k_donors,
+                k_samples,
+                context="import",
+                report=False,
+                check_complementary=planning,
+            )
+        return chunk, filtered_rows, k_stats
+
+    read_rows = 0
+    filtered_rows = 0
+    selected_rows = 0
+    new_ids = set()
+    update_ids = set()
+    k_stats_total = None
+    prepared_chunks = []
+    for chunk_number, chunk in enumerate(read_chunks()):
+        if verbose:
+            for offset, row in enumerate(chunk.to_dict("records")):
+                logging.info("Planned import record %s: %s", read_rows + offset + 1, row)
+        read_rows += len(chunk.index)
+        prepared, chunk_filtered_rows, k_stats = prepare(chunk, planning=True)
+        filtered_rows += chunk_filtered_rows
+        selected_rows += len(prepared.index)
+        k_stats_total = merge_k_anonymity_stats(k_stats_total, k_stats)
+        if existing_ids is not None:
+            chunk_ids = prepared[id_column].astype(str)
+            existing_mask = chunk_ids.isin(existing_ids)
+            new_ids.update(chunk_ids[~existing_mask])
+            update_ids.update(chunk_ids[existing_mask])
+        # keep the prepared rows only while the whole file fits in one chunk
+        prepared_chunks = [prepared] if chunk_number == 0 else None
+
+    logging.info("Planned import %s record(s) for table %s.", read_rows, import_table)
+    if add_national_node:
+        logging.info("Added national_node=%s to %s imported record(s).", national_node, read_rows)
+    if k_stats_total is not None:
+        log_k_anonymity_stats(k_stats_total, "import")
+    if existing_ids is not None:
+        logging.info("Import summary for %s::%s: %s new, %s updates.", schema, import_table, len(new_ids), len(update_ids))
+        if verbose:
+            if new_ids:
+                logging.info("New IDs: %s", sorted(new_ids))
+            if update_ids:
+                logging.info("Update IDs: %s", sorted(update_ids))
+    if read_rows == 0:
+        logging.info("Import file contains no records. Skipping import for %s.", import_path)
+        return
+    if (id_regex or collection_ids) and filtered_rows == 0:
+        logging.info("Import filters matched no rows. Skipping import for %s.", import_path)
+        return
+    if selected_rows == 0:
+        logging.info("k-anonymity filters removed all import rows. Skipping import for %s.", import_path)
+        return
+    if dry_run:
+        logging.info("Dry run enabled. Skipping import for %s.", import_path)
+        return
+    if existing_ids is not None:
+        confirm_action(
+            f"Proceed with importing {selected_rows} record(s) into {import_table}? "
+            f"({len(new_ids)} new, {len(update_ids)} updates)"
+        )
+    else:
+        confirm_action(f"Proceed with importing data into {import_table}?")
+
+    logging.info("Importing %s data from %s into table %s.", resolved_format.upper(), import_path, import_table)
+    engine = build_write_engine(live_tables, job_key=write_job_key_for("import", import_path))
+    if prepared_chunks is not None:
+        engine.run([WriteOperation(SAVE_ACTION, import_table, prepared_chunks[0])])
+        return
+    with OverlappedWriter(
+        lambda prepared: engine.run([WriteOperation(SAVE_ACTION, import_table, prepared)], complete=False)
+    ) as writer:
+        for chunk in read_chunks():
+            prepared, _, _ = prepare(chunk, planning=False)
+            if not prepared.empty:
+                writer.submit(prepared)
+    engine.complete()
 
 
 # Function
@@ -663,6 +905,8 @@ async def sync_directory():
         if debug:
             logging.debug("Schema set to %s.", schema)
         collections = parse_collection_ids(collection_ids)
+        # live reads (schema metadata, tables, id snapshots) are shared by every step and dropped after writes
+        live_tables = LiveTableCache(session, schema)
 
         #########################################################
         # UPLOAD CSV/TSV. Args: CSV/TSV path, schema, and table name (use -T/--table).
@@ -682,122 +926,30 @@ async def sync_directory():
                     raise InputError("Import format could not be determined. Use --file-format or a .csv/.tsv file.")
             if (k_donors is not None or k_samples is not None) and resolved_format not in {"csv", "tsv"}:
                 raise InputError("--k-donors/--k-samples require CSV or TSV import input.")
-            import_table = table_name
-            data = None
-            skip_import = False
-            import_data_modified = False
-            if resolved_format in {"csv", "tsv"}:
-                try:
-                    data = load_dataframe_for_file(import_path, resolved_format)
-                except Exception as exc:
-                    logging.warning("Failed to read import file %s for record details: %s", csvImportData, exc)
-            added_national_node = False
-            if national_node and resolved_format in {"csv", "tsv"}:
-                if data is None:
-                    raise InputError("national_node was provided but the import file could not be parsed.")
-                column_name = resolve_column_case_insensitive(data, "national_node")
-                if column_name is None:
-                    data["national_node"] = national_node
-                    logging.info("Added national_node=%s to %s imported record(s).", national_node, len(data.index))
-                    added_national_node = True
-                    import_data_modified = True
-                else:
-                    logging.warning("Import file already contains %s column; --national-node will be ignored.", column_name)
             if (id_regex or collection_ids) and resolved_format not in {"csv", "tsv"}:
                 raise InputError("Filtering with -R/-C is only supported for CSV/TSV imports.")
-            if data is None and resolved_format in {"csv", "tsv"}:
-                logging.info("Planned import from file %s (record details unavailable).", csvImportData)
+            import_table = table_name
+            server_side_upload = resolved_format not in {"csv", "tsv"} or (
+                # multi-table molgenis*.csv bundles go through the server-side CSV importer
+                resolved_format == "csv"
+                and import_path.name.startswith("molgenis")
+                and not (national_node or id_regex or collection_ids or separator)
+                and k_donors is None
+                and k_samples is None
+            )
+            if not server_side_upload:
+                stream_import(live_tables, import_path, resolved_format, import_table, collections)
             else:
-                log_records("Planned import", import_table, data)
-            if data is not None and (id_regex or collection_ids):
-                data = apply_filters(
-                    data,
-                    id_regex,
-                    collections,
-                    id_column_override,
-                    collection_column_override,
-                    "Import filtering",
-                )
-                import_data_modified = True
-                if data.empty:
-                    logging.info("Import filters matched no rows. Skipping import for %s.", csvImportData)
-                    skip_import = True
-            if data is not None and (k_donors is not None or k_samples is not None):
-                data, _ = apply_k_anonymity_filters(
-                    data,
-                    k_donors,
-                    k_samples,
-                    context="import",
-                )
-                import_data_modified = True
-                if data.empty:
-                    logging.info("k-anonymity filters removed all import rows. Skipping import for %s.", csvImportData)
-                    skip_import = True
-            import_summary = None
-            if data is not None:
-                import_summary = summarize_import(session, schema, import_table, data, id_column_override)
-            if data is not None and data.empty:
-                logging.info("Import file contains no records. Skipping import for %s.", csvImportData)
-                skip_import = True
-            if not dry_run and not skip_import:
-                needs_confirmation = False
-                if resolved_format in {"csv", "tsv"}:
-                    if data is None:
-                        needs_confirmation = True
-                    else:
-                        if import_summary is None:
-                            needs_confirmation = True
-                        elif import_summary["new"] is None or import_summary["update"] is None:
-                            needs_confirmation = True
-                        elif (len(import_summary["new"]) + len(import_summary["update"])) > 0:
-                            needs_confirmation = True
+                logging.info("Planned import from file %s (record details unavailable).", csvImportData)
+                if dry_run:
+                    logging.info("Dry run enabled. Skipping import for %s.", csvImportData)
                 else:
-                    needs_confirmation = True
-                if needs_confirmation:
-                    if import_summary and import_summary["new"] is not None and import_summary["update"] is not None:
-                        confirm_action(
-                            f"Proceed with importing {import_summary['total']} record(s) into {import_table}? "
-                            f"({len(import_summary['new'])} new, {len(import_summary['update'])} updates)"
-                        )
-                    else:
-                        confirm_action(f"Proceed with importing data into {import_table}?")
-            if skip_import:
-                pass
-            elif dry_run:
-                logging.info("Dry run enabled. Skipping import for %s.", csvImportData)
-            elif resolved_format == "tsv":
-                logging.info("Importing TSV data from %s into table %s", csvImportData, import_table)
-                if data is None:
-                    data = read_tsv_as_dataframe(import_path)
-                save_table_with_national_node_fallback(session, schema, import_table, data)
-            elif resolved_format == "csv":
-                logging.info("Importing data from %s", csvImportData)
-                if (
-                    import_path.suffix.lower() == ".csv"
-                    and not added_national_node
-                    and not import_data_modified
-                    and not separator
-                ):
+                    confirm_action(f"Proceed with importing data into {import_table}?")
+                    logging.info("Importing data from %s", csvImportData)
                     try:
                         await session.upload_file(csvImportData, schema)
-                    except Exception as exc:
-                        if (not national_node) and "national_node" in str(exc).lower():
-                            logging.warning(
-                                "Import failed due to missing national_node. Using schema %s as fallback for all rows.",
-                                schema,
-                            )
-                            if data is None:
-                                data = read_csv_as_dataframe(import_path)
-                            save_table_with_national_node_fallback(session, schema, import_table, data)
-                        else:
-                            raise
-                else:
-                    if data is None:
-                        data = read_csv_as_dataframe(import_path)
-                    save_table_with_national_node_fallback(session, schema, import_table, data)
-            else:
-                logging.info("Importing data from %s", csvImportData)
-                await session.upload_file(csvImportData, schema)
+                    finally:
+                        live_tables.invalidate()
 
         if sync_action:
             sync_path = Path(syncData)
@@ -820,7 +972,7 @@ async def sync_directory():
                     logging.info("Added national_node=%s to %s synced record(s).", national_node, len(sync_df.index))
                 else:
                     logging.warning("Sync file already contains %s column; --national-node will be ignored.", column_name)
-            report_column_mismatches(session, schema, table_name, sync_df)
+            report_column_mismatches(live_tables, table_name, sync_df)
             sync_target_df, sync_nonmatching_df = partition_sync_input_rows(
                 sync_df,
                 id_regex,
@@ -847,7 +999,7 @@ async def sync_directory():
                             "Ignored sync input row IDs: %s",
                             sorted(sync_nonmatching_df[nonmatching_id_col].astype(str)),
                         )
-            current_df = session.get(table=table_name, schema=schema, as_df=True)
+            current_df = live_tables.table(table_name)
             current_scope_df = apply_filters(
                 current_df,
                 id_regex,
@@ -879,14 +1031,67 @@ async def sync_directory():
                 export_table_data(current_scope_df, backup_path, backup_format)
                 logging.info("Exported %s pre-sync record(s) to %s.", len(current_scope_df.index), backup_path)
 
-            confirm_action(
-                f"Proceed with syncing {schema}::{table_name}? "
-                f"This replaces {sync_summary['current_count']} existing record(s) in {sync_summary['scope_label']} "
-                f"with {sync_summary['target_count']} record(s)."
-            )
-            if dry_run:
+            sync_diff = sync_summary["diff"]
+            if sync_diff is not None and sync_diff.is_empty:
+                logging.info("%s::%s is already in sync with %s. Nothing to write.", schema, table_name, syncData)
+            elif sync_diff is not None:
+                confirm_action(
+                    f"Proceed with syncing {schema}::{table_name}? "
+                    f"This deletes {len(sync_diff.deleted_ids)}, adds {len(sync_diff.new_ids)} and updates "
+                    f"{len(sync_diff.changed_ids)} record(s) in {sync_summary['scope_label']} "
+                    f"({sync_diff.unchanged_count} unchanged)."
+                )
+            else:
+                confirm_action(
+                    f"Proceed with syncing {schema}::{table_name}? "
+                    f"This replaces {sync_summary['current_count']} existing record(s) in {sync_summary['scope_label']} "
+                    f"with {sync_summary['target_count']} record(s)."
+                )
+            if sync_diff is not None and sync_diff.is_empty:
+                pass
+            elif dry_run:
                 logging.info("Dry run enabled. Skipping sync for %s.", syncData)
+            elif sync_diff is not None:
+                current_scope_id_column = resolve_id_column(current_scope_df, id_column_override)
+                touched_ids = set(sync_diff.deleted_ids) | set(sync_diff.changed_ids)
+                backup_file_path = export_internal_sync_backup(
+                    current_scope_df[current_scope_df[current_scope_id_column].astype(str).isin(touched_ids)]
+                )
+                keep_backup_on_disk = False
+                logging.info("Created temporary pre-sync backup of %s affected record(s) at %s.", len(touched_ids), backup_file_path)
+                try:
+                    logging.info("Syncing %s::%s %s via row-level diff (non-atomic operation).", schema, table_name, scope_label)
+                    # no journal: a rerun recomputes the diff against the live table and only sends what is still different
+                    write_operations(
+                        live_tables,
+                        [
+                            WriteOperation(DELETE_ACTION, table_name, sync_diff.deletes),
+                            WriteOperation(SAVE_ACTION, table_name, sync_diff.upserts),
+                        ],
+                    )
+                    logging.info("Sync completed for %s::%s.", schema, table_name)
+                except Exception as import_exc:
+                    logging.error("Sync failed for %s::%s: %s", schema, table_name, import_exc)
+                    logging.warning("Attempting rollback from temporary backup %s.", backup_file_path)
+                    try:
+                        restore_sync_diff_from_backup(live_tables, table_name, backup_file_path, sync_diff)
+                        logging.warning("Rollback completed for %s::%s using backup %s.", schema, table_name, backup_file_path)
+                    except Exception as rollback_exc:
+                        keep_backup_on_disk = True
+                        raise RuntimeError(
+                            f"Sync failed and rollback failed for {schema}::{table_name}. "
+                            f"Backup file kept at {backup_file_path}. "
+                            f"Sync error: {import_exc}; rollback error: {rollback_exc}"
+                        ) from rollback_exc
+                    raise
+                finally:
+                    if not keep_backup_on_disk:
+                        try:
+                            backup_file_path.unlink(missing_ok=True)
+                        except Exception as exc:
+                            logging.warning("Unable to remove temporary sync backup %s: %s", backup_file_path, exc)
             else:
+                # without id columns rows cannot be matched: replace the whole scope
                 scope_is_filtered = bool(id_regex or collection_ids)
                 backup_file_path = export_internal_sync_backup(current_scope_df)
                 keep_backup_on_disk = False
@@ -897,20 +1102,20 @@ async def sync_directory():
                 try:
                     if not scope_is_filtered:
                         logging.info("Syncing %s::%s via truncate + import (non-atomic operation).", schema, table_name)
-                        session.truncate(table_name, schema)
+                        truncate_table(live_tables, table_name)
                     else:
                         logging.info("Syncing %s::%s filtered scope via delete + import (non-atomic operation).", schema, table_name)
-                        delete_scope_rows(session, schema, table_name, current_scope_df, id_column_override)
+                        delete_scope_rows(live_tables, table_name, current_scope_df, id_column_override)
                     if not sync_target_df.empty:
-                        save_table_with_national_node_fallback(session, schema, table_name, sync_target_df)
+                        # no journal: a resumed truncate/delete + import would drop the rows written before
+                        write_rows(live_tables, SAVE_ACTION, table_name, sync_target_df)
                     logging.info("Sync completed for %s::%s.", schema, table_name)
                 except Exception as import_exc:
                     logging.error("Sync import failed for %s::%s: %s", schema, table_name, import_exc)
                     logging.warning("Attempting rollback from temporary backup %s.", backup_file_path)
                     try:
                         restore_sync_scope_from_backup(
-                            session,
-                            schema,
+                            live_tables,
                             table_name,
                             backup_file_path,
                             scope_is_filtered=scope_is_filtered,
@@ -981,7 +1186,7 @@ async def sync_directory():
                             raise InputError("Export-on-delete format could not be determined. Use --file-format or a .csv/.tsv filename.")
                         export_table_data(delete_data, backup_path, backup_format)
                         logging.info("Exported %s record(s) slated for deletion to %s.", len(delete_data.index), backup_path)
-                    summarize_delete(session, schema, table_name, delete_data, id_column_override)
+                    summarize_delete(live_tables, table_name, delete_data, id_column_override)
                     if delete_data.empty:
                         logging.info("Delete file contains no records. Skipping delete for %s.", csvDeleteData)
                     else:
@@ -989,9 +1194,15 @@ async def sync_directory():
                         if dry_run:
                             logging.info("Dry run enabled. Skipping delete for %s.", csvDeleteData)
                         else:
-                            session.delete_records(table_name, schema, data=delete_data)
+                            write_rows(
+                                live_tables,
+                                DELETE_ACTION,
+                                table_name,
+                                delete_data,
+                                job_key=write_job_key_for("delete", delete_path),
+                            )
             else:
-                table_df = session.get(table=table_name, schema=schema, as_df=True)
+                table_df = live_tables.table(table_name)
                 filtered = apply_filters(
                     table_df,
                     id_regex,
@@ -1019,14 +1230,14 @@ async def sync_directory():
                     if dry_run:
                         logging.info("Dry run enabled. Skipping delete for filtered records.")
                     else:
-                        session.delete_records(table_name, schema, data=delete_ids)
+                        write_rows(live_tables, DELETE_ACTION, table_name, delete_ids, job_key=write_job_key_for("delete"))
 
         if export_action:
             output_path = Path(exportData)
             resolved_export_format = detect_format(output_path, file_format)
             if resolved_export_format is None:
                 raise InputError("Export format could not be determined. Use --file-format or a .csv/.tsv file.")
-            export_df = session.get(table=table_name, schema=schema, as_df=True)
+            export_df = live_tables.table(table_name)
             if id_regex or collection_ids:
                 export_df = apply_filters(
                     export_df,
@@ -1075,6 +1286,8 @@ def validate_inputs():
         ) from exc
     if not table_name:
         raise InputError("Table name is required. Use -T/--table.")
+    if import_chunk_rows < 1:
+        raise InputError("--import-chunk-rows must be a positive integer.")
     if separator:
         logging.info("Using custom field separator override: %r", separator)
     if k_donors is not None and k_donors <= 0:
@@ -1155,6 +1368,9 @@ def main():
     except ValueError as exc:
         logging.error("%s", exc)
         sys.exit(EXIT_INPUT_ERROR)
+    except WriteEngineError as exc:
+        logging.error("%s", exc)
+        sys.exit(EXIT_RUNTIME_ERROR)
     except Exception as exc:
         logging.error("Unexpected error: %s", exc)
         sys.exit(EXIT_RUNTIME_ERROR)
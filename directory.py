@@ -1,5 +1,7 @@
 # vim:ts=4:sw=4:tw=0:sts=4:et
 import copy
+import hashlib
+import json
 import logging
 import os
 import os.path
@@ -12,6 +14,10 @@ import pandas as pd
 from diskcache import Cache
 from molgenis_emx2_pyclient import Client
 from molgenis_emx2_pyclient.exceptions import NoSuchTableException
+from cache_paths import repo_cache_dir
+from contact_assignment_utils import ContactIndex
+from diagnosis_index import DiagnosisIndex
+from fact_sheet_frame import FactSheetFrame
 from nncontacts import NNContacts
 
 #logging.basicConfig(level=logging.DEBUG)
@@ -19,19 +25,6 @@ log = logging.getLogger("BBMRI Directory")
 REPO_ROOT = Path(__file__).resolve().parent
 
 
-def _cache_root() -> Path:
-    """Return the base directory for persistent caches."""
-    cache_root = os.environ.get("DIRECTORY_CACHE_ROOT")
-    if cache_root:
-        return Path(cache_root)
-    return Path.cwd()
-
-
-def _repo_cache_dir(*parts: str) -> str:
-    """Return a cache path anchored to the configured cache root."""
-    return str(_cache_root().joinpath(*parts))
-
-
 def get_directory_ontology_table(
     table_name: str,
     *,
@@ -45,7 +38,7 @@ def get_directory_ontology_table(
     the default public service.
     """
     base_url = directory_url or "https://directory.bbmri-eric.eu"
-    cache_dir = _repo_cache_dir("data-check-cache", "directory-DirectoryOntologies")
+    cache_dir = repo_cache_dir("data-check-cache", "directory-DirectoryOntologies")
     if not os.path.exists(cache_dir):
         os.makedirs(cache_dir)
     cache = Cache(cache_dir)
@@ -129,7 +122,7 @@ class Directory:
         log.debug('Checking data in schema: ' + schema)
 
         schema_cache_suffix = "".join(ch if ch.isalnum() or ch in {"-", "_"} else "_" for ch in str(schema))
-        cache_dir = _repo_cache_dir("data-check-cache", f'directory-{schema_cache_suffix}')
+        cache_dir = repo_cache_dir("data-check-cache", f'directory-{schema_cache_suffix}')
         if not os.path.exists(cache_dir):
             os.makedirs(cache_dir)
         cache = Cache(cache_dir)
@@ -410,6 +403,10 @@ class Directory:
         log.info('Directory structure initialized')
         self.__orphacodesmapper = None
         self._collection_withdrawn_cache = {}
+        self._contact_index = None
+        self._fact_sheet_frame = None
+        self._diagnosis_index = None
+        self._snapshot_checksum = None
 
     @staticmethod
     def _edge_label(source: Any, target: Any) -> str:
@@ -1306,6 +1303,17 @@ class Directory:
         """Return a contact by id."""
         return self.contactHashmap[contactID]
 
+    def getContactIndex(self) -> ContactIndex:
+        """Return the shared contact index for this snapshot, building it on first use.
+
+        The index covers contacts plus the collections and biobanks in the
+        configured withdrawn scope; all contact-related checks of one run
+        share the same instance.
+        """
+        if self._contact_index is None:
+            self._contact_index = ContactIndex(self)
+        return self._contact_index
+
     def getContactNN(self, contactID: str):
         """Return the node/staging-area code for a contact id."""
         staging_area = NNContacts.extract_staging_area(contactID)
@@ -1330,6 +1338,44 @@ class Directory:
         """Return facts for a specific collection id."""
         return self.collectionFactMap.get(collectionID, [])
 
+    def getFactSheetFrame(self) -> FactSheetFrame:
+        """Return the shared columnar fact-sheet frame, building it on first use.
+
+        All loaded facts are normalized once into categorical dimension codes
+        and star-mask bitfields; fact-table checks, summaries and statistics
+        of one run share the same instance.
+        """
+        if self._fact_sheet_frame is None:
+            self._fact_sheet_frame = FactSheetFrame.from_collection_facts(self.collectionFactMap)
+        return self._fact_sheet_frame
+
+    def getDiagnosisIndex(self, orphacodes=None) -> DiagnosisIndex:
+        """Return the shared diagnosis classification index, building it on first use.
+
+        Every distinct ``diagnosis_available`` code is parsed once and each
+        collection gets a ``DiagnosisCategory`` mask; the index is rebuilt
+        only when a different ``OrphaCodes`` mapping is requested.
+        """
+        if self._diagnosis_index is None or self._diagnosis_index.orphacodes is not orphacodes:
+            self._diagnosis_index = DiagnosisIndex.from_directory(self, orphacodes=orphacodes)
+        return self._diagnosis_index
+
+    def getSnapshotChecksum(self) -> str:
+        """Return a SHA-256 checksum of the loaded biobank/collection/service/fact tables.
+
+        Derived per-snapshot artefacts persisted across runs (for example the
+        statistics cube of directory-stats.py) are keyed by it.
+        """
+        if self._snapshot_checksum is None:
+            digest = hashlib.sha256()
+            for table in (self.biobanks, self.collections, self.services, self.facts):
+                digest.update(
+                    json.dumps(table, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+                )
+                digest.update(b"\0")
+            self._snapshot_checksum = digest.hexdigest()
+        return self._snapshot_checksum
+
     def getServices(self):
         """Return all loaded services."""
         return [
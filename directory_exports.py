@@ -0,0 +1,500 @@
+# vim:ts=4:sw=4:tw=0:sts=4:et
+
+"""Thematic exports registered with the single-pass export pipeline.
+
+Each class reproduces one ``exporter-*.py`` script as a predicate plus
+accumulators over ``export_pipeline.CollectionContext``; the standalone
+scripts and ``exporter-suite.py`` share these definitions.
+"""
+
+import logging as log
+import re
+from typing import Any
+
+import pandas as pd
+
+import pddfutils
+from diagnosis_index import DiagnosisCategory
+from export_pipeline import CollectionContext, CollectionTally, DirectoryExport
+from fact_sheet_summary import build_fact_sheet_xlsx_tables, print_fact_sheet_summary
+
+
+COVID19_NETWORK_ID = "bbmri-eric:networkID:EU_BBMRI-ERIC:networks:COVID19"
+OBESITY_TEXT_PATTERN = re.compile(r"(obesity|obese)", re.IGNORECASE)
+
+
+def print_collection_list(directory, collections: list[dict[str, Any]], header: str) -> None:
+    """Print a header plus one line per collection with its parent biobank."""
+    print(header + " - " + str(len(collections)) + " collections")
+    for collection in collections:
+        biobank_id = directory.getCollectionBiobankId(collection["id"])
+        biobank = directory.getBiobankById(biobank_id)
+        print(
+            "   Collection: " + collection["id"] + " - " + collection["name"]
+            + ". Parent biobank: " + biobank_id + " - " + biobank["name"]
+        )
+
+
+def _tidy_collection_frame(collections: list[dict[str, Any]], columns=None) -> pd.DataFrame:
+    df = pd.DataFrame(collections, columns=columns)
+    pddfutils.tidyCollectionDf(df)
+    return df
+
+
+def classify_pediatric(collection: dict[str, Any], diagnoses: list[str]) -> tuple[bool, bool]:
+    """Return ``(pediatric, pediatric_only)`` from the collection age range.
+
+    The age limit is 18 years converted to the collection's ``age_unit``;
+    prenatal collections (``age_low < 0``, ``age_high == 0``) are
+    pediatric-only. Inconsistent age ranges are logged and not classified.
+    """
+    pediatric = False
+    pediatric_only = False
+
+    age_unit = None
+    if "age_unit" in collection:
+        age_units = collection["age_unit"]
+        if len(age_units) > 1:
+            log.warning("Ambiguous age units provided for %s: %s" % (collection["id"], age_units))
+        if len(age_units) < 1:
+            log.warning("Age units missing for %s" % (collection["id"]))
+        else:
+            age_unit = age_units[0]
+
+    age_max = 18
+    if age_unit == "MONTH":
+        age_max = age_max * 12
+    elif age_unit == "WEEK":
+        age_max = age_max * 52.1775
+    elif age_unit == "DAY":
+        age_max = age_max * 365.25
+
+    age_range = "%s-%s" % (collection.get("age_low"), collection.get("age_high"))
+    if "age_high" in collection and collection["age_high"] == 0:
+        if "age_low" in collection and collection["age_low"] < 0:
+            pediatric = True
+            pediatric_only = True
+            log.debug(
+                "Prenatal collection detected: %s (%s), age range: %s, diags: %s"
+                % (collection["id"], collection["name"], age_range, diagnoses)
+            )
+        else:
+            log.warning(
+                "Age range mismatch detected for collection: %s (%s), age range: %s"
+                % (collection["id"], collection["name"], age_range)
+            )
+    elif "age_high" in collection and collection["age_high"] < 0:
+        log.warning(
+            "Age range mismatch detected for collection: %s (%s), age range: %s"
+            % (collection["id"], collection["name"], age_range)
+        )
+    elif "age_low" in collection and "age_high" in collection and collection["age_low"] > collection["age_high"]:
+        log.warning(
+            "Age range mismatch detected for collection: %s (%s), age range: %s"
+            % (collection["id"], collection["name"], age_range)
+        )
+    else:
+        if ("age_low" in collection and collection["age_low"] < age_max) or (
+            "age_high" in collection and collection["age_high"] < age_max
+        ):
+            pediatric = True
+        if "age_high" in collection and collection["age_high"] < age_max:
+            pediatric_only = True
+            log.debug(
+                "Pediatric-only collection detected: %s, age range: %s, diags: %s"
+                % (collection["id"], age_range, diagnoses)
+            )
+    return pediatric, pediatric_only
+
+
+class CovidExport(DirectoryExport):
+    """COVID-19 diagnosed, control, prospective and other network collections."""
+
+    name = "covid"
+    title = "COVID-19 collections"
+
+    def __init__(self):
+        self.diagnosed = CollectionTally()
+        self.only_diagnosed = CollectionTally()
+        self.controls = CollectionTally()
+        self.prospective = CollectionTally()
+        self.other = CollectionTally()
+        self.biobank_ids: set[str] = set()
+
+    def add_collection(self, context: CollectionContext) -> None:
+        collection = context.collection
+        diagnoses = context.all_diagnoses
+        types = context.types
+        covid_diag = context.has_diagnosis(DiagnosisCategory.COVID)
+        covid_control = context.has_diagnosis(DiagnosisCategory.COVID_CONTROL)
+        covid_prospective = False
+        # pessimistic estimate: any diagnosis range or non-COVID code
+        non_covid = context.has_diagnosis(DiagnosisCategory.NON_COVID)
+
+        if types:
+            if "PROSPECTIVE_STUDY" in types and (covid_diag or covid_control):
+                covid_prospective = True
+
+        if re.search("COVID19PROSPECTIVE", collection["id"]):
+            if types and "PROSPECTIVE_STUDY" not in types:
+                log.warning("Prospective study by ID but not by collection type for collectionID " + collection["id"])
+            covid_prospective = True
+
+        if re.search("^Ability to collect", collection["name"]):
+            if types and "PROSPECTIVE_STUDY" not in types:
+                log.warning("Prospective study by name but not by collection type for collectionID " + collection["id"])
+            if not re.search("COVID19PROSPECTIVE", collection["id"]):
+                log.warning(
+                    "Prospective study by name but missing correct collection ID for collectionID " + collection["id"]
+                )
+            covid_prospective = True
+
+        if re.search("COVID19", collection["id"]) and not (covid_diag or covid_control or covid_prospective):
+            log.warning("Incorrectly types COVID collectionID - missing diagnosis " + collection["id"])
+            covid_diag = True
+        if covid_diag and not covid_prospective:
+            log.info("Collection " + collection["id"] + " has COVID-positive cases")
+            self.diagnosed.add(context)
+            if not non_covid:
+                self.only_diagnosed.add(context)
+
+        if covid_diag and non_covid:
+            log.info(
+                "Collection " + collection["id"] + " has a mixture of COVID and non-COVID diagnoses: %s" % (diagnoses)
+            )
+        if covid_control and not covid_prospective:
+            log.info("Collection " + collection["id"] + " has control cases for COVID")
+            self.controls.add(context)
+        if covid_prospective:
+            log.info("Collection " + collection["id"] + " is a prospective COVID collection")
+            self.prospective.add(context)
+
+        in_covid_network = COVID19_NETWORK_ID in context.collection_networks
+        if in_covid_network and not covid_diag and not covid_control and not covid_prospective:
+            self.other.add(context)
+
+        if covid_diag or covid_control or covid_prospective or in_covid_network:
+            self.biobank_ids.add(context.biobank_id)
+
+    def _all_collections(self) -> list[dict[str, Any]]:
+        return (
+            self.diagnosed.collections
+            + self.controls.collections
+            + self.prospective.collections
+            + self.other.collections
+        )
+
+    def print_summary(self, directory) -> None:
+        print_collection_list(directory, self.diagnosed.collections, "COVID Diagnosed")
+        print("\n\n")
+        print_collection_list(directory, self.controls.collections, "COVID Controls")
+        print("\n\n")
+        print_collection_list(directory, self.prospective.collections, "COVID Prospective")
+        print("\n\n")
+        print("Totals:")
+        print("- total number of COVID-relevant biobanks: %d" % (len(self.biobank_ids)))
+        print("- total number of COVID-relevant collections with existing samples: %d in %d biobanks" % (len(self.diagnosed), len(self.diagnosed.biobank_ids)))
+        print("- total number of COVID-only collections with existing samples: %d in %d biobanks" % (len(self.only_diagnosed), len(self.only_diagnosed.biobank_ids)))
+        print("- total number of COVID-relevant collections with control samples: %d in %d biobanks" % (len(self.controls), len(self.controls.biobank_ids)))
+        print("- total number of COVID-relevant prospective collections: %d in %d biobanks" % (len(self.prospective), len(self.prospective.biobank_ids)))
+        print("- total number of other COVID-relevant collections: %d in %d biobanks" % (len(self.other), len(self.other.biobank_ids)))
+        print("Estimated totals:")
+        print("- total number of samples advertised explicitly in COVID-only collections: %d" % (self.only_diagnosed.samples_explicit))
+        print("- total number of samples advertised explicitly in COVID-relevant collections: %d" % (self.diagnosed.samples_explicit))
+        print("- total number of donors advertised explicitly in COVID-only collections: %d" % (self.only_diagnosed.donors_explicit))
+        print("- total number of donors advertised explicitly in COVID-relevant collections: %d" % (self.diagnosed.donors_explicit))
+        print("- total number of samples advertised in COVID-only collections including OoM estimates: %d" % (self.only_diagnosed.samples_inc_oom))
+        print("- total number of samples advertised in COVID-relevant collections including OoM estimates: %d" % (self.diagnosed.samples_inc_oom))
+        print_fact_sheet_summary(self._all_collections(), directory)
+
+    def xlsx_tables(self, directory) -> list:
+        diagnosed_df = _tidy_collection_frame(self.diagnosed.collections)
+        if not diagnosed_df.empty:
+            only_ids = {collection["id"] for collection in self.only_diagnosed.collections}
+            diagnosed_df["COVID_only"] = diagnosed_df["id"].map(lambda x: x in only_ids)
+        return [
+            (diagnosed_df, "COVID Diagnosed"),
+            (_tidy_collection_frame(self.controls.collections), "COVID Controls"),
+            (_tidy_collection_frame(self.prospective.collections), "COVID Prospective"),
+            (_tidy_collection_frame(self.other.collections), "COVID Other"),
+            *build_fact_sheet_xlsx_tables(self._all_collections(), directory),
+        ]
+
+
+class ObesityExport(DirectoryExport):
+    """Obesity collections split into pediatric-only, pediatric and other."""
+
+    name = "obesity"
+    title = "Obesity collections"
+
+    def __init__(self):
+        self.pediatric_only = CollectionTally(log_oom_estimates=True)
+        self.pediatric = CollectionTally(log_oom_estimates=True)
+        self.obesity = CollectionTally(log_oom_estimates=True)
+
+    @staticmethod
+    def is_obesity_collection(context: CollectionContext) -> bool:
+        """Return whether diagnoses, name or description indicate obesity."""
+        collection = context.collection
+        obesity = False
+        if context.has_diagnosis(DiagnosisCategory.OBESITY):
+            log.debug("Collection %s identified as obesity collection due to its ICD-10 codes" % (collection["id"]))
+            obesity = True
+        if "name" in collection and OBESITY_TEXT_PATTERN.search(collection["name"]):
+            log.debug(
+                "Collection %s identified as obesity collection due to its name %s" % (collection["id"], collection["name"])
+            )
+            obesity = True
+        if "description" in collection and OBESITY_TEXT_PATTERN.search(collection["description"]):
+            log.debug("Collection %s identified as obesity collection due to its description" % (collection["id"]))
+            obesity = True
+        return obesity
+
+    def accepts_collection(self, context: CollectionContext) -> bool:
+        return self.is_obesity_collection(context)
+
+    def add_collection(self, context: CollectionContext) -> None:
+        source = context.collection
+        collection = dict(source)
+        if "contact" in source:
+            collection["contact"] = context.directory.getContact(source["contact"]["id"])
+        diagnoses = context.all_diagnoses
+        pediatric, pediatric_only = classify_pediatric(source, diagnoses)
+        age_range = "%s-%s" % (source.get("age_low"), source.get("age_high"))
+        if pediatric_only:
+            log.info(f"Pediatric-only collection detected: {source['id']}, age range: {age_range}, diags: {diagnoses}")
+            self.pediatric_only.add(context, collection)
+        elif pediatric:
+            log.info(f"Pediatric collection detected: {source['id']}, age range: {age_range}, diags: {diagnoses}")
+            self.pediatric.add(context, collection)
+        else:
+            log.info(f"Obesity collection detected: {source['id']}, age range: {age_range}, diags: {diagnoses}")
+            self.obesity.add(context, collection)
+
+    def _all_collections(self) -> list[dict[str, Any]]:
+        return self.pediatric_only.collections + self.pediatric.collections + self.obesity.collections
+
+    def print_summary(self, directory) -> None:
+        print("Biobanks/collections totals:")
+        for label, tally in (
+            ("pediatric-only obesity", self.pediatric_only),
+            ("pediatric obesity", self.pediatric),
+            ("obesity", self.obesity),
+        ):
+            print("- total of %s collections with existing samples: %d in %d biobanks" % (label, len(tally), len(tally.biobank_ids)))
+            print("- total of %s samples: %d explicit, %d with OoM; donors: %d explicit" % (label, tally.samples_explicit, tally.samples_inc_oom, tally.donors_explicit))
+        print_fact_sheet_summary(self._all_collections(), directory)
+
+    def xlsx_tables(self, directory) -> list:
+        return [
+            (_tidy_collection_frame(self.pediatric_only.collections), "Pediatric-only obesity"),
+            (_tidy_collection_frame(self.pediatric.collections), "Pediatric obesity"),
+            (_tidy_collection_frame(self.obesity.collections), "Obesity"),
+            *build_fact_sheet_xlsx_tables(self._all_collections(), directory),
+        ]
+
+
+class PediatricExport(DirectoryExport):
+    """Pediatric and pediatric-only collections by declared age range."""
+
+    name = "pediatric"
+    title = "Pediatric collections"
+
+    def __init__(self):
+        self.pediatric = CollectionTally()
+        self.pediatric_only = CollectionTally()
+
+    def add_collection(self, context: CollectionContext) -> None:
+        collection = context.collection
+        diagnoses = context.all_diagnoses
+        pediatric, pediatric_only = classify_pediatric(collection, diagnoses)
+        age_range = "%s-%s" % (collection.get("age_low"), collection.get("age_high"))
+        if pediatric:
+            log.info(f"Pediatric collection detected: {collection['id']}, age range: {age_range}, diags: {diagnoses}")
+            self.pediatric.add(context)
+        if pediatric_only:
+            log.info(f"Pediatric-only collection detected: {collection['id']}, age range: {age_range}, diags: {diagnoses}")
+            self.pediatric_only.add(context)
+
+    def print_summary(self, directory) -> None:
+        print("Biobanks/collections totals:")
+        print("- total of pediatric biobanks: %d" % (len(self.pediatric.biobank_ids)))
+        print("- total of pediatric collections with existing samples: %d in %d biobanks" % (len(self.pediatric), len(self.pediatric.biobank_ids)))
+        print("- total of pediatric-only biobanks: %d" % (len(self.pediatric_only.biobank_ids)))
+        print("- total of pediatric-only collections with existing samples: %d in %d biobanks" % (len(self.pediatric_only), len(self.pediatric_only.biobank_ids)))
+        print("\n")
+        print("Estimated sample totals:")
+        print("- total of samples/donors advertised explicitly in pediatric collections: %d / %d" % (self.pediatric.samples_explicit, self.pediatric.donors_explicit))
+        print("- total of samples advertised in pediatric collections including OoM estimates: %d" % (self.pediatric.samples_inc_oom))
+        print("- total of samples/donors advertised explicitly in pediatric-only collections: %d / %d" % (self.pediatric_only.samples_explicit, self.pediatric_only.donors_explicit))
+        print("- total of samples advertised in pediatric-only collections including OoM estimates: %d" % (self.pediatric_only.samples_inc_oom))
+        print_fact_sheet_summary(self.pediatric.collections + self.pediatric_only.collections, directory)
+
+    def xlsx_tables(self, directory) -> list:
+        return [
+            (_tidy_collection_frame(self.pediatric.collections), "Pediatric"),
+            (_tidy_collection_frame(self.pediatric_only.collections), "Pediatric-only"),
+            *build_fact_sheet_xlsx_tables(self.pediatric.collections + self.pediatric_only.collections, directory),
+        ]
+
+
+class EcraidExport(DirectoryExport):
+    """ECRAID-relevant collections: biobanks with BSL-2/3 labs and pathogen material."""
+
+    name = "ecraid"
+    title = "ECRAID-relevant collections"
+
+    def __init__(self):
+        self.bsl_collections: list[dict[str, Any]] = []
+        self.pathogen_collections: list[dict[str, Any]] = []
+        self.biobank_ids: dict[str, None] = {}
+
+    def add_collection(self, context: CollectionContext) -> None:
+        if "BSL2" in context.biobank_covid or "BSL3" in context.biobank_covid:
+            self.bsl_collections.append(context.collection)
+            self.biobank_ids[context.biobank_id] = None
+        if "PATHOGEN" in context.materials:
+            self.pathogen_collections.append(context.collection)
+            self.biobank_ids[context.biobank_id] = None
+
+    def print_summary(self, directory) -> None:
+        print_collection_list(directory, self.bsl_collections, "ECRAID-relevant collections with BSL-2/BSL-3 labs")
+        print("\n\n")
+        print_collection_list(directory, self.pathogen_collections, "ECRAID-relevant pathogen collections")
+        print("\n\n")
+        print("Totals:")
+        print("- total number of ECRAID-relevant biobanks: %d" % (len(self.biobank_ids)))
+        print("- total number of ECRAID-relevant collections with BSL-2/BSL-3 labs: %d" % (len(self.bsl_collections)))
+        print("- total number of ECRAID-relevant pathogen collections: %d" % (len(self.pathogen_collections)))
+        print_fact_sheet_summary(self.bsl_collections + self.pathogen_collections, directory)
+
+    def xlsx_tables(self, directory) -> list:
+        collections = directory.getCollections()
+        biobanks = directory.getBiobanks()
+        collection_columns = list(collections[0].keys()) if collections else []
+        biobank_columns = list(biobanks[0].keys()) if biobanks else []
+        biobank_df = pd.DataFrame(
+            [directory.getBiobankById(biobank_id) for biobank_id in self.biobank_ids],
+            columns=biobank_columns,
+        )
+        pddfutils.tidyBiobankDf(biobank_df)
+        return [
+            (_tidy_collection_frame(self.bsl_collections, collection_columns), "Collections with BSL labs", False),
+            (_tidy_collection_frame(self.pathogen_collections, collection_columns), "Pathogen collections", False),
+            (biobank_df, "Institutions", False),
+            *build_fact_sheet_xlsx_tables(self.bsl_collections + self.pathogen_collections, directory),
+        ]
+
+
+class CountryExport(DirectoryExport):
+    """Per-country counts of biobanks, biobanks with collections and collections."""
+
+    name = "country"
+    title = "Country summary"
+    uses_biobanks = True
+
+    def __init__(self):
+        self.collections: list[dict[str, Any]] = []
+        self.country_biobanks: dict[Any, set[str]] = {}
+        self.country_biobanks_with_collections: dict[Any, set[str]] = {}
+        self.country_collections: dict[Any, set[str]] = {}
+
+    def add_collection(self, context: CollectionContext) -> None:
+        country_code = context.directory.getBiobankCountry(context.biobank_id)
+        self.collections.append(context.collection)
+        self.country_biobanks.setdefault(country_code, set()).add(context.biobank_id)
+        self.country_biobanks_with_collections.setdefault(country_code, set()).add(context.biobank_id)
+        self.country_collections.setdefault(country_code, set()).add(context.collection["id"])
+
+    def add_biobank(self, biobank: dict[str, Any], directory) -> None:
+        biobank_id = biobank["id"]
+        biobanks = self.country_biobanks.setdefault(directory.getBiobankCountry(biobank_id), set())
+        if biobank_id not in biobanks:
+            log.info(f"Biobank {biobank_id} without having collections")
+            biobanks.add(biobank_id)
+
+    def rows(self) -> list[dict[str, Any]]:
+        """Return one summary row per country."""
+        return [
+            {
+                "Country": country_code,
+                "Biobanks total": len(self.country_biobanks[country_code]),
+                "Biobanks with collections": len(self.country_biobanks_with_collections.get(country_code, set())),
+                "Collections": len(self.country_collections.get(country_code, set())),
+            }
+            for country_code in sorted(self.country_biobanks)
+        ]
+
+    def print_summary(self, directory) -> None:
+        for row in self.rows():
+            print(
+                f"{row['Country']}: biobanks total = {row['Biobanks total']}, "
+                f"biobanks with collections = {row['Biobanks with collections']}, "
+                f"collections = {row['Collections']}"
+            )
+        print_fact_sheet_summary(self.collections, directory)
+
+    def xlsx_tables(self, directory) -> list:
+        return [
+            (pd.DataFrame(self.rows()), "Country summary", False),
+            *build_fact_sheet_xlsx_tables(self.collections, directory),
+        ]
+
+
+class InstitutionsExport(DirectoryExport):
+    """Juridical persons (institutions) of biobanks per country."""
+
+    name = "institutions"
+    title = "Institutions"
+    uses_collections = False
+    uses_biobanks = True
+
+    def __init__(self):
+        self.country_institutions: dict[Any, set[str]] = {}
+
+    def add_biobank(self, biobank: dict[str, Any], directory) -> None:
+        biobank_id = biobank["id"]
+        try:
+            juridical_person = biobank["juridical_person"]
+            country = biobank["country"]
+            log.debug(f"Biobank {biobank_id} from institution {juridical_person} added to country {country}")
+            self.country_institutions.setdefault(country, set()).add(juridical_person)
+        except KeyError:
+            log.error("Biobank " + biobank_id + " has no juridical person set!")
+
+    def print_country_totals(self) -> None:
+        """Print the number of institutions per country."""
+        for country in sorted(self.country_institutions):
+            print(f"{country}: institutions total = {len(self.country_institutions[country])}")
+
+    def print_summary(self, directory) -> None:
+        for country in sorted(self.country_institutions):
+            for institution in sorted(self.country_institutions[country]):
+                print(f"{country}\t{institution}")
+
+    def xlsx_tables(self, directory) -> list:
+        return [
+            (
+                pd.DataFrame(
+                    [
+                        {"Country": country, "Institution": institution}
+                        for country in sorted(self.country_institutions)
+                        for institution in sorted(self.country_institutions[country])
+                    ]
+                ),
+                "Institutions",
+            )
+        ]
+
+
+EXPORTS = {
+    export.name: export
+    for export in (
+        CovidExport,
+        ObesityExport,
+        PediatricExport,
+        EcraidExport,
+        CountryExport,
+        InstitutionsExport,
+    )
+}
@@ -6,9 +6,12 @@ import logging as log
 from collections import Counter
 from typing import Any
 
-from fact_sheet_utils import analyze_collection_fact_sheet, has_fact_sheet
+import numpy as np
+import pandas as pd
+
+from fact_sheet_utils import has_fact_sheet
 from nncontacts import NNContacts
-from oomutils import estimate_count_from_oom_or_none
+from oomutils import estimate_count_from_oom_or_none, get_oom_upper_bound_coefficient
 
 
 def _normalize_scalar(value: Any) -> Any:
@@ -117,239 +120,430 @@ def _build_breakdown_summary_rows(
     ]
 
 
-def build_directory_stats(
-    directory,
+BIOBANK_COLUMNS = ["id", "name", "country", "staging_area", "country_key", "staging_area_key", "withdrawn"]
+CUBE_MEASURES = [
+    "collection_records",
+    "samples_explicit",
+    "samples_oom",
+    "donors_explicit",
+    "donors_oom",
+    "collections_with_facts",
+    "collections_with_all_star",
+    "collections_missing_valid_all_star",
+    "collections_all_star_inconsistent_samples",
+    "collections_all_star_inconsistent_donors",
+]
+CUBE_COLUMNS = ["biobank_id", "type_signature", "is_top_level"] + CUBE_MEASURES
+BIOBANK_COUNT_COLUMNS = [
+    "collection_records_total",
+    "top_level_collections",
+    "subcollections",
+    "samples_explicit",
+    "samples_oom",
+    "donors_explicit",
+    "donors_oom",
+    "collections_with_facts",
+    "collections_with_all_star",
+    "collections_missing_valid_all_star",
+    "collections_all_star_inconsistent_samples",
+    "collections_all_star_inconsistent_donors",
+]
+STATS_CUBE_CACHE_VERSION = 1
+
+
+def build_stats_cube_cache_key(
+    snapshot_checksum: str,
     *,
-    country_filters: list[str] | None = None,
-    staging_area_filters: list[str] | None = None,
-    collection_type_filters: list[str] | None = None,
-) -> dict[str, list[dict[str, Any]]]:
-    """Build multi-table Directory statistics for all loaded biobanks."""
-    normalized_country_filters = _normalize_filter_values(country_filters)
-    normalized_staging_area_filters = _normalize_filter_values(staging_area_filters)
-    normalized_collection_type_filters = _normalize_filter_values(
-        collection_type_filters
+    schema: str = "",
+    include_withdrawn: bool = False,
+    only_withdrawn: bool = False,
+) -> str:
+    """Return the cache key of a stats cube for one snapshot and withdrawn scope.
+
+    The OoM estimate coefficient is part of the key because OoM-estimated
+    measures are materialized in the cube.
+    """
+    if only_withdrawn:
+        scope = "only-withdrawn"
+    elif include_withdrawn:
+        scope = "include-withdrawn"
+    else:
+        scope = "active"
+    return (
+        f"stats-cube:v{STATS_CUBE_CACHE_VERSION}:{schema}:{scope}:"
+        f"oom={get_oom_upper_bound_coefficient()}:{snapshot_checksum}"
     )
 
-    selected_biobanks: dict[str, dict[str, Any]] = {}
-    for biobank in directory.getBiobanks():
-        country = _normalize_country(biobank.get("country")).upper()
-        staging_area = extract_staging_area_from_id(biobank.get("id", "")).upper()
-        if normalized_country_filters and country not in normalized_country_filters:
-            continue
-        if (
-            normalized_staging_area_filters
-            and staging_area not in normalized_staging_area_filters
-        ):
-            continue
-        selected_biobanks[biobank["id"]] = biobank
 
-    collections_by_biobank: dict[str, list[dict[str, Any]]] = {}
-    for collection in directory.getCollections():
-        biobank_id = directory.getCollectionBiobankId(collection["id"])
-        biobank = selected_biobanks.get(biobank_id)
-        if biobank is None:
-            continue
-        collection_types = {
-            collection_type.upper()
-            for collection_type in _normalize_multi_value_list(collection.get("type"))
-        }
-        if (
-            normalized_collection_type_filters
-            and not collection_types.intersection(normalized_collection_type_filters)
-        ):
-            continue
-        collections_by_biobank.setdefault(biobank_id, []).append(collection)
-
-    services_by_biobank: dict[str, list[dict[str, Any]]] = {}
-    for service in directory.getServices():
-        biobank = service.get("biobank")
-        if biobank and "id" in biobank:
-            biobank_record = selected_biobanks.get(biobank["id"])
-            if biobank_record is None:
-                continue
-            services_by_biobank.setdefault(biobank["id"], []).append(service)
-
-    biobank_rows: list[dict[str, Any]] = []
-    collection_type_rows: list[dict[str, Any]] = []
-    service_type_rows: list[dict[str, Any]] = []
-    fact_sheet_warning_rows: list[dict[str, Any]] = []
-
-    top_level_collection_type_total_counter: Counter = Counter()
-    subcollection_type_total_counter: Counter = Counter()
-
-    for biobank_id in sorted(selected_biobanks):
-        biobank = selected_biobanks[biobank_id]
-        biobank_id = biobank["id"]
-        biobank_name = biobank.get("name", "")
-        biobank_collections = collections_by_biobank.get(biobank_id, [])
-        biobank_services = services_by_biobank.get(biobank_id, [])
-
-        samples_explicit = 0
-        donors_explicit = 0
-        samples_oom = 0
-        donors_oom = 0
-        top_level_collections = 0
-        subcollections = 0
-        collections_with_facts = 0
-        collections_with_all_star = 0
-        collections_missing_valid_all_star = 0
-        collections_all_star_inconsistent_samples = 0
-        collections_all_star_inconsistent_donors = 0
-        collection_type_counter: Counter = Counter()
-        top_level_collection_type_counter: Counter = Counter()
-        subcollection_type_counter: Counter = Counter()
-        service_type_counter: Counter = Counter()
-
-        for collection in biobank_collections:
+def _counters_by_biobank(frame: pd.DataFrame, label: str, weight: str) -> dict[str, Counter]:
+    """Return ``biobank_id -> Counter(label)`` summing ``weight`` from a long frame."""
+    counters: dict[str, Counter] = {}
+    if frame.empty:
+        return counters
+    counts = frame.groupby(["biobank_id", label], sort=True)[weight].sum()
+    for (biobank_id, key), value in counts.items():
+        if value:
+            counters.setdefault(biobank_id, Counter())[key] = int(value)
+    return counters
+
+
+def _summary_rows(frame: pd.DataFrame, label: str, weight: str) -> list[dict[str, Any]]:
+    """Return sorted ``{label, count}`` totals from a long frame."""
+    if frame.empty:
+        return []
+    totals = frame.groupby(label, sort=True)[weight].sum()
+    return [{label: key, "count": int(value)} for key, value in totals.items() if value]
+
+
+class DirectoryStatsCube:
+    """Materialized statistics cube of one Directory snapshot.
+
+    Collections are visited once (biobank assignment, top-level flag,
+    countable sizes, OoM estimates, fact-sheet flags) and aggregated into
+    cells keyed by biobank x collection-type signature x top-level flag;
+    country and staging area are attributes of the biobank dimension. Any
+    country / staging-area / collection-type filter combination is then a
+    slice plus groupby over the cells, and the whole cube can be persisted
+    and reused for later runs on the same snapshot.
+    """
+
+    def __init__(
+        self,
+        biobanks: pd.DataFrame,
+        cells: pd.DataFrame,
+        type_signatures: list[tuple[str, ...]],
+        services: pd.DataFrame,
+        fact_sheet_warnings: list[tuple[str, int, dict[str, Any]]],
+    ):
+        self.biobanks = biobanks
+        self.cells = cells
+        self.type_signatures = type_signatures
+        self.signature_types = pd.DataFrame.from_records(
+            [
+                (signature_code, collection_type)
+                for signature_code, signature in enumerate(type_signatures)
+                for collection_type in signature
+            ],
+            columns=["type_signature", "collection_type"],
+        )
+        self.services = services
+        self.fact_sheet_warnings = fact_sheet_warnings
+
+    @classmethod
+    def from_directory(cls, directory) -> "DirectoryStatsCube":
+        """Build the cube from a Directory(-like) object."""
+        biobank_records = []
+        for biobank in directory.getBiobanks():
+            country = _normalize_country(biobank.get("country"))
+            staging_area = extract_staging_area_from_id(biobank.get("id", ""))
+            biobank_records.append(
+                (
+                    biobank["id"],
+                    biobank.get("name", ""),
+                    country,
+                    staging_area,
+                    country.upper(),
+                    staging_area.upper(),
+                    _is_withdrawn(biobank),
+                )
+            )
+        biobanks = pd.DataFrame.from_records(biobank_records, columns=BIOBANK_COLUMNS)
+        biobank_names = dict(zip(biobanks["id"], biobanks["name"]))
+
+        collections = list(directory.getCollections())
+        fact_sheet_frame = directory.getFactSheetFrame()
+        signature_codes: dict[tuple[str, ...], int] = {}
+        collection_records = []
+        warning_records = []
+        for collection in collections:
             collection_id = collection["id"]
-            is_top_level = directory.isTopLevelCollection(collection_id)
-            if is_top_level:
-                top_level_collections += 1
-            else:
-                subcollections += 1
-
-            for collection_type in set(_normalize_multi_value_list(collection.get("type"))):
-                collection_type_counter[collection_type] += 1
-                if is_top_level:
-                    top_level_collection_type_counter[collection_type] += 1
-                    top_level_collection_type_total_counter[collection_type] += 1
-                else:
-                    subcollection_type_counter[collection_type] += 1
-                    subcollection_type_total_counter[collection_type] += 1
+            biobank_id = directory.getCollectionBiobankId(collection_id)
+            is_top_level = bool(directory.isTopLevelCollection(collection_id))
+            signature = tuple(sorted(set(_normalize_multi_value_list(collection.get("type")))))
+            signature_code = signature_codes.setdefault(signature, len(signature_codes))
 
+            samples_explicit = samples_oom = donors_explicit = donors_oom = 0
             if directory.isCountableCollection(collection_id, "size"):
-                samples_explicit += collection["size"]
+                samples_explicit = collection["size"]
             elif is_top_level:
-                size_estimate = estimate_count_from_oom_or_none(
+                samples_oom = estimate_count_from_oom_or_none(
                     collection.get("order_of_magnitude"),
                     collection_id=collection_id,
                     field_name="order_of_magnitude",
-                )
-                if size_estimate is not None:
-                    samples_oom += size_estimate
-
+                ) or 0
             if directory.isCountableCollection(collection_id, "number_of_donors"):
-                donors_explicit += collection["number_of_donors"]
+                donors_explicit = collection["number_of_donors"]
             elif is_top_level:
-                donor_estimate = estimate_count_from_oom_or_none(
+                donors_oom = estimate_count_from_oom_or_none(
                     collection.get("order_of_magnitude_donors"),
                     collection_id=collection_id,
                     field_name="order_of_magnitude_donors",
-                )
-                if donor_estimate is not None:
-                    donors_oom += donor_estimate
-
-            if has_fact_sheet(collection):
-                collections_with_facts += 1
-                fact_sheet = analyze_collection_fact_sheet(
-                    collection,
-                    directory.getCollectionFacts(collection_id),
-                )
-                if fact_sheet["all_star_rows"] == 1:
-                    collections_with_all_star += 1
-                else:
-                    collections_missing_valid_all_star += 1
-
+                ) or 0
+
+            has_facts = has_fact_sheet(collection)
+            has_valid_all_star = False
+            warning_codes = set()
+            if has_facts:
+                fact_sheet = fact_sheet_frame.analyze_collection(collection)
+                has_valid_all_star = fact_sheet["all_star_rows"] == 1
                 for warning in fact_sheet["warnings"]:
-                    if warning["code"] == "all_star_samples_mismatch":
-                        collections_all_star_inconsistent_samples += 1
-                    elif warning["code"] == "all_star_donors_mismatch":
-                        collections_all_star_inconsistent_donors += 1
-                    fact_sheet_warning_rows.append(
-                        {
-                            "biobank_id": biobank_id,
-                            "biobank_name": biobank_name,
-                            "collection_id": collection_id,
-                            "collection_name": collection.get("name", ""),
-                            "code": warning["code"],
-                            "message": warning["message"],
-                            "expected": warning.get("expected"),
-                            "actual": warning.get("actual"),
-                        }
+                    warning_codes.add(warning["code"])
+                    warning_records.append(
+                        (
+                            biobank_id,
+                            signature_code,
+                            {
+                                "biobank_id": biobank_id,
+                                "biobank_name": biobank_names.get(biobank_id, ""),
+                                "collection_id": collection_id,
+                                "collection_name": collection.get("name", ""),
+                                "code": warning["code"],
+                                "message": warning["message"],
+                                "expected": warning.get("expected"),
+                                "actual": warning.get("actual"),
+                            },
+                        )
                     )
 
-        for service in biobank_services:
-            for service_type in set(
-                _normalize_multi_value_list(
-                    service.get("serviceTypes", service.get("service_types"))
+            collection_records.append(
+                (
+                    biobank_id,
+                    signature_code,
+                    is_top_level,
+                    1,
+                    samples_explicit,
+                    samples_oom,
+                    donors_explicit,
+                    donors_oom,
+                    int(has_facts),
+                    int(has_facts and has_valid_all_star),
+                    int(has_facts and not has_valid_all_star),
+                    int("all_star_samples_mismatch" in warning_codes),
+                    int("all_star_donors_mismatch" in warning_codes),
                 )
+            )
+
+        collection_frame = pd.DataFrame.from_records(collection_records, columns=CUBE_COLUMNS)
+        cells = (
+            collection_frame.groupby(["biobank_id", "type_signature", "is_top_level"], sort=False)[CUBE_MEASURES]
+            .sum()
+            .reset_index()
+            .astype({measure: "int64" for measure in CUBE_MEASURES})
+        )
+
+        service_records = []
+        for service in directory.getServices():
+            biobank = service.get("biobank")
+            if not biobank or "id" not in biobank:
+                continue
+            service_records.append((biobank["id"], None, 1))
+            for service_type in set(
+                _normalize_multi_value_list(service.get("serviceTypes", service.get("service_types")))
             ):
-                service_type_counter[service_type] += 1
-
-        biobank_rows.append(
-            {
-                "id": biobank_id,
-                "name": biobank_name,
-                "country": _normalize_country(biobank.get("country")),
-                "staging_area": extract_staging_area_from_id(biobank_id),
-                "withdrawn": _is_withdrawn(biobank),
-                "collection_records_total": len(biobank_collections),
-                "top_level_collections": top_level_collections,
-                "subcollections": subcollections,
-                "collection_type_breakdown": _format_counter(collection_type_counter),
-                "top_level_collection_type_breakdown": _format_counter(
-                    top_level_collection_type_counter
-                ),
-                "subcollection_type_breakdown": _format_counter(
-                    subcollection_type_counter
-                ),
-                "samples_explicit": samples_explicit,
-                "samples_oom": samples_oom,
-                "samples_total": samples_explicit + samples_oom,
-                "donors_explicit": donors_explicit,
-                "donors_oom": donors_oom,
-                "donors_total": donors_explicit + donors_oom,
-                "services_total": len(biobank_services),
-                "service_type_breakdown": _format_counter(service_type_counter),
-                "collections_with_facts": collections_with_facts,
-                "collections_with_all_star": collections_with_all_star,
-                "collections_missing_valid_all_star": collections_missing_valid_all_star,
-                "collections_all_star_inconsistent_samples": collections_all_star_inconsistent_samples,
-                "collections_all_star_inconsistent_donors": collections_all_star_inconsistent_donors,
-            }
+                service_records.append((biobank["id"], service_type, 0))
+        services = pd.DataFrame.from_records(service_records, columns=["biobank_id", "service_type", "services"])
+        services["type_count"] = (services["services"] == 0).astype("int64")
+        services = (
+            services.groupby(["biobank_id", "service_type"], sort=False, dropna=False)[["services", "type_count"]]
+            .sum()
+            .reset_index()
         )
-        collection_type_rows.extend(
-            _build_breakdown_rows(
-                biobank_id,
-                biobank_name,
-                "collection_type",
-                collection_type_counter,
-            )
+
+        return cls(
+            biobanks,
+            cells,
+            [signature for signature, _ in sorted(signature_codes.items(), key=lambda item: item[1])],
+            services,
+            warning_records,
         )
-        service_type_rows.extend(
-            _build_breakdown_rows(
-                biobank_id,
-                biobank_name,
-                "service_type",
-                service_type_counter,
+
+    def _select_biobanks(
+        self,
+        country_filters: set[str],
+        staging_area_filters: set[str],
+    ) -> pd.DataFrame:
+        mask = np.ones(len(self.biobanks), dtype=bool)
+        if country_filters:
+            mask &= self.biobanks["country_key"].isin(country_filters).to_numpy()
+        if staging_area_filters:
+            mask &= self.biobanks["staging_area_key"].isin(staging_area_filters).to_numpy()
+        return self.biobanks.loc[mask].sort_values("id", kind="stable")
+
+    def _matching_signatures(self, collection_type_filters: set[str]) -> set[int]:
+        return {
+            signature_code
+            for signature_code, signature in enumerate(self.type_signatures)
+            if any(collection_type.upper() in collection_type_filters for collection_type in signature)
+        }
+
+    def build_stats(
+        self,
+        *,
+        country_filters: list[str] | None = None,
+        staging_area_filters: list[str] | None = None,
+        collection_type_filters: list[str] | None = None,
+    ) -> dict[str, list[dict[str, Any]]]:
+        """Return the ``build_directory_stats`` tables for one filter combination."""
+        biobanks = self._select_biobanks(
+            _normalize_filter_values(country_filters),
+            _normalize_filter_values(staging_area_filters),
+        )
+        selected_biobank_ids = set(biobanks["id"])
+        normalized_collection_type_filters = _normalize_filter_values(collection_type_filters)
+
+        cell_mask = self.cells["biobank_id"].isin(selected_biobank_ids)
+        matching_signatures = None
+        if normalized_collection_type_filters:
+            matching_signatures = self._matching_signatures(normalized_collection_type_filters)
+            cell_mask &= self.cells["type_signature"].isin(matching_signatures)
+        cells = self.cells.loc[cell_mask]
+        services = self.services.loc[self.services["biobank_id"].isin(selected_biobank_ids)]
+
+        per_biobank = cells.groupby("biobank_id", sort=False)[CUBE_MEASURES].sum()
+        per_biobank["top_level_collections"] = (
+            cells.loc[cells["is_top_level"]].groupby("biobank_id", sort=False)["collection_records"].sum()
+        )
+        per_biobank = per_biobank.rename(columns={"collection_records": "collection_records_total"}).fillna(0)
+        per_biobank["subcollections"] = per_biobank["collection_records_total"] - per_biobank["top_level_collections"]
+        per_biobank = per_biobank.reindex(biobanks["id"], fill_value=0)[BIOBANK_COUNT_COLUMNS].astype("int64")
+        services_total = services.groupby("biobank_id", sort=False)["services"].sum()
+
+        type_cells = cells[["biobank_id", "type_signature", "is_top_level", "collection_records"]].merge(
+            self.signature_types,
+            on="type_signature",
+        )
+        top_level_type_cells = type_cells.loc[type_cells["is_top_level"]]
+        subcollection_type_cells = type_cells.loc[~type_cells["is_top_level"]]
+        service_types = services.loc[services["service_type"].notna()]
+        collection_type_counters = _counters_by_biobank(type_cells, "collection_type", "collection_records")
+        top_level_type_counters = _counters_by_biobank(top_level_type_cells, "collection_type", "collection_records")
+        subcollection_type_counters = _counters_by_biobank(
+            subcollection_type_cells, "collection_type", "collection_records"
+        )
+        service_type_counters = _counters_by_biobank(service_types, "service_type", "type_count")
+
+        biobank_rows: list[dict[str, Any]] = []
+        collection_type_rows: list[dict[str, Any]] = []
+        service_type_rows: list[dict[str, Any]] = []
+        for biobank, counts in zip(
+            biobanks.itertuples(index=False),
+            per_biobank.itertuples(index=False),
+        ):
+            counts = {key: int(value) for key, value in counts._asdict().items()}
+            collection_type_counter = collection_type_counters.get(biobank.id, Counter())
+            service_type_counter = service_type_counters.get(biobank.id, Counter())
+            biobank_rows.append(
+                {
+                    "id": biobank.id,
+                    "name": biobank.name,
+                    "country": biobank.country,
+                    "staging_area": biobank.staging_area,
+                    "withdrawn": bool(biobank.withdrawn),
+                    "collection_records_total": counts["collection_records_total"],
+                    "top_level_collections": counts["top_level_collections"],
+                    "subcollections": counts["subcollections"],
+                    "collection_type_breakdown": _format_counter(collection_type_counter),
+                    "top_level_collection_type_breakdown": _format_counter(
+                        top_level_type_counters.get(biobank.id, Counter())
+                    ),
+                    "subcollection_type_breakdown": _format_counter(
+                        subcollection_type_counters.get(biobank.id, Counter())
+                    ),
+                    "samples_explicit": counts["samples_explicit"],
+                    "samples_oom": counts["samples_oom"],
+                    "samples_total": counts["samples_explicit"] + counts["samples_oom"],
+                    "donors_explicit": counts["donors_explicit"],
+                    "donors_oom": counts["donors_oom"],
+                    "donors_total": counts["donors_explicit"] + counts["donors_oom"],
+                    "services_total": int(services_total.get(biobank.id, 0)),
+                    "service_type_breakdown": _format_counter(service_type_counter),
+                    "collections_with_facts": counts["collections_with_facts"],
+                    "collections_with_all_star": counts["collections_with_all_star"],
+                    "collections_missing_valid_all_star": counts["collections_missing_valid_all_star"],
+                    "collections_all_star_inconsistent_samples": counts["collections_all_star_inconsistent_samples"],
+                    "collections_all_star_inconsistent_donors": counts["collections_all_star_inconsistent_donors"],
+                }
             )
+            collection_type_rows.extend(
+                _build_breakdown_rows(biobank.id, biobank.name, "collection_type", collection_type_counter)
+            )
+            service_type_rows.extend(
+                _build_breakdown_rows(biobank.id, biobank.name, "service_type", service_type_counter)
+            )
+
+        _sort_biobank_rows(biobank_rows)
+
+        fact_sheet_warning_rows = sorted(
+            (
+                dict(row)
+                for biobank_id, signature_code, row in self.fact_sheet_warnings
+                if biobank_id in selected_biobank_ids
+                and (matching_signatures is None or signature_code in matching_signatures)
+            ),
+            key=lambda row: row["biobank_id"],
         )
 
-    _sort_biobank_rows(biobank_rows)
+        return {
+            "biobank_rows": biobank_rows,
+            "collection_type_rows": collection_type_rows,
+            "collection_type_summary_rows": _build_breakdown_summary_rows(
+                collection_type_rows,
+                "collection_type",
+            ),
+            "service_type_rows": service_type_rows,
+            "service_type_summary_rows": _build_breakdown_summary_rows(
+                service_type_rows,
+                "service_type",
+            ),
+            "top_level_collection_type_summary_rows": _summary_rows(
+                top_level_type_cells, "collection_type", "collection_records"
+            ),
+            "subcollection_type_summary_rows": _summary_rows(
+                subcollection_type_cells, "collection_type", "collection_records"
+            ),
+            "fact_sheet_warning_rows": fact_sheet_warning_rows,
+        }
 
-    return {
-        "biobank_rows": biobank_rows,
-        "collection_type_rows": collection_type_rows,
-        "collection_type_summary_rows": _build_breakdown_summary_rows(
-            collection_type_rows,
-            "collection_type",
-        ),
-        "service_type_rows": service_type_rows,
-        "service_type_summary_rows": _build_breakdown_summary_rows(
-            service_type_rows,
-            "service_type",
-        ),
-        "top_level_collection_type_summary_rows": [
-            {"collection_type": key, "count": top_level_collection_type_total_counter[key]}
-            for key in sorted(top_level_collection_type_total_counter)
-        ],
-        "subcollection_type_summary_rows": [
-            {"collection_type": key, "count": subcollection_type_total_counter[key]}
-            for key in sorted(subcollection_type_total_counter)
-        ],
-        "fact_sheet_warning_rows": fact_sheet_warning_rows,
-    }
+
+def load_or_build_stats_cube(directory, cache, cache_key: str) -> tuple[DirectoryStatsCube, bool]:
+    """Return the stats cube stored under ``cache_key`` or build and store it.
+
+    Args:
+        directory: Directory(-like) object used when the cube is not cached.
+        cache: Mapping-like persistent store (for example ``diskcache.Cache``).
+        cache_key: Key from ``build_stats_cube_cache_key(...)``.
+
+    Returns:
+        ``(cube, cache_hit)``.
+    """
+    cached = cache.get(cache_key)
+    if isinstance(cached, DirectoryStatsCube):
+        return cached, True
+    cube = DirectoryStatsCube.from_directory(directory)
+    cache[cache_key] = cube
+    return cube, False
+
+
+def build_directory_stats(
+    directory,
+    *,
+    country_filters: list[str] | None = None,
+    staging_area_filters: list[str] | None = None,
+    collection_type_filters: list[str] | None = None,
+    stats_cube: DirectoryStatsCube | None = None,
+) -> dict[str, list[dict[str, Any]]]:
+    """Build multi-table Directory statistics for all loaded biobanks.
+
+    Pass a prebuilt (or cached) ``stats_cube`` to answer several filter
+    combinations without walking the snapshot again.
+    """
+    if stats_cube is None:
+        stats_cube = DirectoryStatsCube.from_directory(directory)
+    return stats_cube.build_stats(
+        country_filters=country_filters,
+        staging_area_filters=staging_area_filters,
+        collection_type_filters=collection_type_filters,
+    )
 
 
 def build_biobank_stats(
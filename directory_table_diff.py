@@ -0,0 +1,155 @@
+#!/usr/bin/python3
+# vim:ts=4:sw=4:tw=0:sts=4:et
+
+"""Row-level diff between a live Directory table scope and a sync file.
+
+Live frames come back from the EMX2 CSV API with typed columns (booleans,
+integers, dates, NaN for empty cells) while sync files are read as plain
+strings, so both sides are first normalized to canonical strings and every
+row is reduced to a 64-bit hash of the compared columns. Ids present on one
+side only are deletions or insertions; shared ids are updates only when the
+hashes differ, so unchanged rows are never rewritten.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+import pandas as pd
+
+
+def normalize_cell(value) -> str:
+    """Return the canonical string form of one cell for comparison."""
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple, set)):
+        return ",".join(normalize_cell(item) for item in value)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        if math.isnan(value):
+            return ""
+        if value.is_integer():
+            return str(int(value))
+        return repr(value)
+    if isinstance(value, (pd.Timestamp, datetime)):
+        if pd.isna(value):
+            return ""
+        if (value.hour, value.minute, value.second, value.microsecond) == (0, 0, 0, 0):
+            return value.date().isoformat()
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if value is pd.NA or value is pd.NaT:
+        return ""
+    text = str(value).strip()
+    if text.lower() in ("true", "false"):
+        return text.lower()
+    return text
+
+
+def normalize_frame(df: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
+    """Return ``df[columns]`` as canonical strings ("" for missing columns)."""
+    normalized = {}
+    for column in columns:
+        if column not in df.columns:
+            normalized[column] = pd.Series("", index=df.index)
+            continue
+        series = df[column]
+        if pd.api.types.is_string_dtype(series) and not series.isna().any():
+            # vectorized path for all-string columns (every sync file column)
+            stripped = series.astype(str).str.strip()
+            lowered = stripped.str.lower()
+            normalized[column] = stripped.where(~lowered.isin(("true", "false")), lowered)
+        else:
+            normalized[column] = series.map(normalize_cell)
+    return pd.DataFrame(normalized, index=df.index, columns=columns)
+
+
+def row_hashes(df: pd.DataFrame, columns: list[str]) -> pd.Series:
+    """Return one uint64 hash per row over the normalized ``columns``."""
+    return pd.util.hash_pandas_object(normalize_frame(df, columns), index=False)
+
+
+@dataclass
+class TableDiff:
+    """Row-level changes turning the current scope into the target scope."""
+
+    id_column: str
+    compared_columns: list[str]
+    deleted_ids: list[str] = field(default_factory=list)
+    new_ids: list[str] = field(default_factory=list)
+    changed_ids: list[str] = field(default_factory=list)
+    unchanged_count: int = 0
+    deletes: pd.DataFrame = field(default_factory=pd.DataFrame)
+    upserts: pd.DataFrame = field(default_factory=pd.DataFrame)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.deleted_ids or self.new_ids or self.changed_ids)
+
+
+def _last_row_per_id(df: pd.DataFrame, id_column: str) -> pd.DataFrame:
+    ids = df[id_column].astype(str)
+    # a repeated id is imported last-one-wins, as the CSV import does
+    return df[~ids.duplicated(keep="last")]
+
+
+def diff_tables(
+    current_df: pd.DataFrame,
+    target_df: pd.DataFrame,
+    *,
+    current_id_column: str,
+    target_id_column: str,
+) -> TableDiff:
+    """Diff two frames of one table scope keyed by their id columns.
+
+    Only the columns of the target frame are compared (and written): columns
+    a sync file does not provide are left as they are on the server.
+    """
+    compared_columns = [column for column in target_df.columns if column != target_id_column]
+    target = _last_row_per_id(target_df, target_id_column)
+    target_ids = target[target_id_column].astype(str)
+    target_hashes = pd.Series(row_hashes(target, compared_columns).to_numpy(), index=target_ids.to_numpy())
+
+    if current_df.empty:
+        current_ids = pd.Series([], dtype=str)
+        current_hashes = pd.Series([], dtype="uint64")
+    else:
+        current = _last_row_per_id(current_df, current_id_column)
+        current_ids = current[current_id_column].astype(str)
+        # live frames may spell columns differently (e.g. case); align to the target names
+        live_columns = {str(column).lower(): column for column in current.columns}
+        aligned = pd.DataFrame(
+            {
+                column: current[live_columns[column.lower()]] if column.lower() in live_columns else ""
+                for column in compared_columns
+            },
+            index=current.index,
+            columns=compared_columns,
+        )
+        current_hashes = pd.Series(row_hashes(aligned, compared_columns).to_numpy(), index=current_ids.to_numpy())
+
+    target_id_set = set(target_hashes.index)
+    current_id_set = set(current_hashes.index)
+    shared = target_hashes.index[target_hashes.index.isin(current_id_set)]
+    changed_mask = target_hashes.loc[shared].to_numpy() != current_hashes.loc[shared].to_numpy()
+    changed_ids = sorted(shared[changed_mask])
+    new_ids = sorted(target_id_set - current_id_set)
+    deleted_ids = sorted(current_id_set - target_id_set)
+
+    write_ids = set(new_ids) | set(changed_ids)
+    upserts = target[target_ids.isin(write_ids).to_numpy()]
+    deletes = pd.DataFrame({current_id_column: deleted_ids})
+    return TableDiff(
+        id_column=target_id_column,
+        compared_columns=compared_columns,
+        deleted_ids=deleted_ids,
+        new_ids=new_ids,
+        changed_ids=changed_ids,
+        unchanged_count=len(shared) - len(changed_ids),
+        deletes=deletes,
+        upserts=upserts,
+    )
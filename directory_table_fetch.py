@@ -0,0 +1,195 @@
+#!/usr/bin/python3
+# vim:ts=4:sw=4:tw=0:sts=4:et
+
+"""Targeted row fetches from live Directory tables.
+
+Maintenance CLIs usually touch a handful of rows, so instead of downloading a
+whole table with ``session.get(table=..., as_df=True)`` they ask the EMX2 API
+for the affected ids only: the ids are split into chunks and each chunk is
+sent as an ``equals`` filter (``id == [...]`` or ``collection.id == [...]``
+for reference columns), which the client turns into a GraphQL filter of the
+CSV download. Local lookups then go through a set-indexed join over the
+returned frame instead of one boolean scan per id.
+
+CLIs that do need whole tables share one ``LiveTableCache`` per invocation,
+so schema metadata and each table are downloaded at most once between
+writes.
+"""
+
+from __future__ import annotations
+
+import json
+import logging as log
+from typing import Iterable, Iterator, Optional
+
+import pandas as pd
+
+
+DEFAULT_ID_CHUNK_SIZE = 50
+
+
+def chunk_ids(ids: Iterable[str], chunk_size: int = DEFAULT_ID_CHUNK_SIZE) -> Iterator[list[str]]:
+    """Yield distinct ids (in first-seen order) in chunks of ``chunk_size``."""
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+    chunk: list[str] = []
+    seen = set()
+    for entity_id in ids:
+        entity_id = str(entity_id)
+        if entity_id in seen:
+            continue
+        seen.add(entity_id)
+        chunk.append(entity_id)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def build_id_filter(column: str, ids: list[str]) -> str:
+    """Return a ``query_filter`` expression matching any of ``ids`` in ``column``.
+
+    Nested columns (``collection.id``) filter on a field of a referenced row.
+    """
+    return f"{column} == {json.dumps(list(ids))}"
+
+
+def fetch_rows_by_ids(
+    session,
+    *,
+    table: str,
+    schema: str,
+    ids: Iterable[str],
+    filter_column: str = "id",
+    chunk_size: int = DEFAULT_ID_CHUNK_SIZE,
+) -> pd.DataFrame:
+    """Fetch only the rows of ``table`` whose ``filter_column`` is in ``ids``.
+
+    Returns the concatenated frame of all chunks (an empty frame when ``ids``
+    is empty, without contacting the server).
+    """
+    frames = []
+    for chunk in chunk_ids(ids, chunk_size):
+        frame = session.get(
+            table=table,
+            schema=schema,
+            query_filter=build_id_filter(filter_column, chunk),
+            as_df=True,
+        )
+        log.debug("Fetched %d row(s) of %s for %d id(s).", len(frame), table, len(chunk))
+        frames.append(frame)
+    frames = [frame for frame in frames if len(frame.columns)]
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+    return pd.concat(frames, ignore_index=True)
+
+
+def resolve_column(df: pd.DataFrame, column_name: str) -> str | None:
+    """Return the frame column matching ``column_name`` case-insensitively."""
+    if column_name in df.columns:
+        return column_name
+    lower_name = column_name.lower()
+    for column in df.columns:
+        if str(column).lower() == lower_name:
+            return column
+    return None
+
+
+def index_rows_by_id(df: pd.DataFrame, ids: Iterable[str], *, id_column: str = "id") -> dict[str, dict]:
+    """Return ``{id: row}`` for the requested ids present in ``df``.
+
+    The first row wins when an id occurs more than once, as with the former
+    per-id ``df[df.id == entity_id].iloc[0]`` lookups.
+    """
+    wanted = {str(entity_id) for entity_id in ids}
+    if df.empty or not wanted:
+        return {}
+    keys = df[id_column].astype(str)
+    subset = df[keys.isin(wanted)]
+    rows: dict[str, dict] = {}
+    for key, row in zip(keys[subset.index], subset.to_dict("records")):
+        rows.setdefault(key, row)
+    return rows
+
+
+def group_ids_by(
+    df: pd.DataFrame,
+    keys: Iterable[str],
+    *,
+    key_column: str,
+    value_column: str,
+) -> dict[str, list[str]]:
+    """Return sorted ``value_column`` values per requested ``key_column`` value."""
+    grouped: dict[str, list[str]] = {str(key): [] for key in keys}
+    if df.empty or not grouped:
+        return grouped
+    key_values = df[key_column].astype(str)
+    subset = df[key_values.isin(grouped.keys())]
+    for key, value in zip(key_values[subset.index], subset[value_column].astype(str)):
+        grouped[key].append(value)
+    for values in grouped.values():
+        values.sort()
+    return grouped
+
+
+class LiveTableCache:
+    """Per-invocation memo of live reads from one schema.
+
+    Holds the schema metadata, full table frames requested with ``table(...)``
+    and id snapshots from ``ids(...)`` (taken from a cached frame when there
+    is one, otherwise fetched and kept as a set only). Callers must call
+    ``invalidate(...)`` after writing to a table; cached frames are shared and
+    must not be modified in place.
+    """
+
+    def __init__(self, session, schema: str):
+        self.session = session
+        self.schema = schema
+        self._schema_metadata = None
+        self._frames: dict[str, pd.DataFrame] = {}
+        self._ids: dict[tuple[str, str], Optional[set[str]]] = {}
+
+    def schema_metadata(self):
+        if self._schema_metadata is None:
+            self._schema_metadata = self.session.get_schema_metadata(self.schema)
+        return self._schema_metadata
+
+    def table_columns(self, table: str) -> list[str]:
+        table_meta = self.schema_metadata().get_table(by="name", value=table)
+        return [column.name for column in table_meta.columns]
+
+    def table(self, table: str) -> pd.DataFrame:
+        """Return the full live ``table``, downloading it on first use."""
+        if table not in self._frames:
+            self._frames[table] = self._fetch(table)
+        return self._frames[table]
+
+    def ids(self, table: str, id_column: str) -> Optional[set[str]]:
+        """Return the set of ``id_column`` values of ``table`` (None without such a column)."""
+        key = (table, id_column.lower())
+        if key not in self._ids:
+            frame = self._frames.get(table)
+            if frame is None:
+                frame = self._fetch(table)
+            column = resolve_column(frame, id_column)
+            self._ids[key] = None if column is None else set(frame[column].astype(str))
+        return self._ids[key]
+
+    def invalidate(self, table: Optional[str] = None) -> None:
+        """Forget cached rows of ``table`` (everything, metadata included, when omitted)."""
+        if table is None:
+            self._schema_metadata = None
+            self._frames.clear()
+            self._ids.clear()
+            return
+        self._frames.pop(table, None)
+        for key in [key for key in self._ids if key[0] == table]:
+            del self._ids[key]
+
+    def _fetch(self, table: str) -> pd.DataFrame:
+        frame = self.session.get(table=table, schema=self.schema, as_df=True)
+        log.debug("Fetched %d row(s) of %s::%s.", len(frame), self.schema, table)
+        return frame
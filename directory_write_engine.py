@@ -0,0 +1,477 @@
+#!/usr/bin/python3
+# vim:ts=4:sw=4:tw=0:sts=4:et
+
+"""Chunked, retrying and resumable writes to live Directory tables.
+
+Maintenance CLIs (``qcheck-updater.py``, ``directory-tables-modifier.py``)
+describe their writes as an ordered list of ``WriteOperation`` objects (save
+or delete rows of one table). ``DirectoryWriteEngine`` splits every operation
+into chunks of ``chunk_size`` rows, sends the chunks of one operation with up
+to ``concurrency`` parallel requests and retries transient failures with
+exponential backoff; operations themselves run strictly in order. Tables
+with a reference to themselves (``Collections.parent_collection``) are
+written one chunk at a time with parents saved before (and deleted after)
+their children, so a chunk never references a row that is not there yet.
+
+Each acknowledged chunk is appended to a ``WriteJournal`` (JSON lines under
+``data-check-cache/write-journal``) keyed by the job and the chunk content.
+When an apply is interrupted, re-running the same job skips the chunks that
+the journal already lists; the journal is removed once the job completes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging as log
+import os
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+import pandas as pd
+import requests
+from molgenis_emx2_pyclient.exceptions import PyclientException, ServiceUnavailableError
+
+from cache_paths import repo_cache_dir
+
+
+DEFAULT_WRITE_CHUNK_SIZE = 500
+DEFAULT_WRITE_CONCURRENCY = 2
+DEFAULT_WRITE_RETRIES = 3
+DEFAULT_RETRY_BACKOFF = 2.0
+
+SAVE_ACTION = "save"
+DELETE_ACTION = "delete"
+
+REFERENCE_COLUMN_TYPES = ("REF", "REF_ARRAY")
+
+# status of the last HTTP response received by the current thread (see track_response_status)
+_last_response = threading.local()
+
+
+class WriteEngineError(Exception):
+    """Raised when a chunk still fails after all retries."""
+
+
+@dataclass(frozen=True)
+class WriteOperation:
+    """Rows to save into (or delete from) one table."""
+
+    action: str
+    table: str
+    data: pd.DataFrame
+
+
+@dataclass(frozen=True)
+class WriteChunk:
+    """One request worth of rows of a ``WriteOperation``."""
+
+    key: str
+    action: str
+    table: str
+    data: pd.DataFrame
+
+
+@dataclass
+class WriteSummary:
+    chunks_sent: int = 0
+    chunks_skipped: int = 0
+    rows_sent: int = 0
+
+
+def write_job_key(*parts) -> str:
+    """Return a stable job key from the parts identifying one apply."""
+    return hashlib.sha256("\0".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+def file_checksum(path) -> str:
+    """Return the SHA-256 of an input file (part of a job key)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_transient_write_error(exc: BaseException, status_code: Optional[int] = None) -> bool:
+    """Return whether a failed write is worth retrying.
+
+    ``molgenis_emx2_pyclient`` only raises ``ServiceUnavailableError`` for a
+    503; other server errors surface as ``PyclientException`` or as the
+    ``JSONDecodeError`` of parsing an HTML error page. Those are transient
+    when ``status_code`` (the status of the failed response, see
+    ``track_response_status``) is a 5xx.
+    """
+    if isinstance(exc, (ServiceUnavailableError, requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code >= 500
+    if status_code is not None and isinstance(exc, (PyclientException, ValueError)):
+        return status_code >= 500
+    return False
+
+
+def _record_response_status(response, *args, **kwargs):
+    _last_response.status_code = response.status_code
+
+
+def track_response_status(session) -> None:
+    """Record the status of every response of the session's HTTP client per thread.
+
+    ``session`` is a ``molgenis_emx2_pyclient.Client`` (its ``requests``
+    session is ``session.session``); other sessions are left alone.
+    """
+    http = getattr(session, "session", None)
+    if isinstance(http, requests.Session) and _record_response_status not in http.hooks["response"]:
+        http.hooks["response"].append(_record_response_status)
+
+
+def self_reference_columns(schema_metadata, schema: str) -> dict[str, list[str]]:
+    """Return ``{table: [columns referencing the table itself]}`` from EMX2 schema metadata."""
+    references = {}
+    for table in getattr(schema_metadata, "tables", None) or []:
+        columns = [
+            column.name
+            for column in getattr(table, "columns", None) or []
+            if column.get("columnType") in REFERENCE_COLUMN_TYPES
+            and column.get("refTableName") == table.name
+            and column.get("refSchemaName") in (None, schema)
+        ]
+        if columns:
+            references[table.name] = columns
+    return references
+
+
+def _reference_ids(value) -> list[str]:
+    if value is None or (not isinstance(value, (list, tuple)) and pd.isna(value)):
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value]
+    return [item.strip() for item in str(value).split(",") if item.strip()]
+
+
+def order_parents_first(data: pd.DataFrame, reference_columns: list[str], *, id_column: str = "id") -> pd.DataFrame:
+    """Return ``data`` stably sorted so rows come after the rows they reference.
+
+    Only references to rows of ``data`` count; a reference cycle is broken at
+    the row of the cycle that comes first in ``data``.
+    """
+    columns = [column for column in reference_columns if column in data.columns]
+    if id_column not in data.columns or not columns or len(data.index) < 2:
+        return data
+    ids = data[id_column].astype(str).tolist()
+    present = set(ids)
+    parents = {}
+    for position, row_id in enumerate(ids):
+        parents[row_id] = [
+            parent
+            for column in columns
+            for parent in _reference_ids(data[column].iloc[position])
+            if parent in present and parent != row_id
+        ]
+    depths: dict[str, int] = {}
+    for row_id in ids:
+        visiting = set()
+        stack = [(row_id, False)]
+        while stack:
+            current, expanded = stack.pop()
+            if current in depths:
+                continue
+            if expanded:
+                visiting.discard(current)
+                depths[current] = 1 + max((depths[parent] for parent in parents[current] if parent in depths), default=-1)
+            elif current not in visiting:
+                visiting.add(current)
+                stack.append((current, True))
+                stack.extend((parent, False) for parent in parents[current] if parent not in depths)
+    order = sorted(range(len(ids)), key=lambda position: depths[ids[position]])
+    return data.iloc[order]
+
+
+class WriteJournal:
+    """Append-only JSON-lines record of acknowledged chunks of one job."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_job(cls, job_key: str, directory: Optional[Path] = None) -> "WriteJournal":
+        directory = Path(directory) if directory is not None else Path(repo_cache_dir("data-check-cache", "write-journal"))
+        return cls(directory / f"{job_key}.jsonl")
+
+    def acknowledged(self) -> set[str]:
+        """Return the keys of chunks acknowledged by earlier runs."""
+        if not self.path.exists():
+            return set()
+        keys = set()
+        with self.path.open(encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    keys.add(json.loads(line)["chunk"])
+                except (ValueError, KeyError):
+                    # a torn last line of an interrupted run
+                    continue
+        return keys
+
+    def record(self, chunk: WriteChunk) -> None:
+        entry = {
+            "chunk": chunk.key,
+            "action": chunk.action,
+            "table": chunk.table,
+            "rows": len(chunk.data.index),
+            "acknowledged_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as handle:
+                handle.write(json.dumps(entry) + "\n")
+                handle.flush()
+                os.fsync(handle.fileno())
+
+    def discard(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+def _chunk_key(action: str, table: str, data: pd.DataFrame) -> str:
+    digest = hashlib.sha256(f"{action}\0{table}\0".encode("utf-8"))
+    digest.update(data.to_csv(index=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def split_operation(operation: WriteOperation, chunk_size: int) -> list[WriteChunk]:
+    """Split an operation into row chunks keyed by their content."""
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+    chunks = []
+    for start in range(0, len(operation.data.index), chunk_size):
+        data = operation.data.iloc[start:start + chunk_size]
+        chunks.append(WriteChunk(_chunk_key(operation.action, operation.table, data), operation.action, operation.table, data))
+    return chunks
+
+
+class DirectoryWriteEngine:
+    """Apply ``WriteOperation`` lists to one schema in chunks.
+
+    ``save_rows(table, data)`` / ``delete_rows(table, data)`` default to the
+    session's ``save_table`` / ``delete_records``; callers override them to
+    wrap writes (for example with the national_node fallback).
+
+    Self-referencing tables are looked up once in the session's schema
+    metadata; when it cannot be read every table is written one chunk at a
+    time.
+    """
+
+    def __init__(
+        self,
+        session,
+        schema: str,
+        *,
+        chunk_size: int = DEFAULT_WRITE_CHUNK_SIZE,
+        concurrency: int = DEFAULT_WRITE_CONCURRENCY,
+        retries: int = DEFAULT_WRITE_RETRIES,
+        backoff: float = DEFAULT_RETRY_BACKOFF,
+        journal: Optional[WriteJournal] = None,
+        save_rows: Optional[Callable[[str, pd.DataFrame], object]] = None,
+        delete_rows: Optional[Callable[[str, pd.DataFrame], object]] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if chunk_size < 1 or concurrency < 1 or retries < 0:
+            raise ValueError("chunk_size and concurrency must be positive and retries non-negative")
+        self.session = session
+        self.schema = schema
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.journal = journal
+        self._save_rows = save_rows or (lambda table, data: session.save_table(table=table, schema=schema, data=data))
+        self._delete_rows = delete_rows or (lambda table, data: session.delete_records(table=table, schema=schema, data=data))
+        self._sleep = sleep
+        self._acknowledged: Optional[set[str]] = None
+        self._self_references: Optional[dict[str, list[str]]] = None
+        track_response_status(session)
+
+    def self_references(self) -> Optional[dict[str, list[str]]]:
+        """Return the self-referencing columns per table (None if the schema metadata is unavailable)."""
+        if self._self_references is None:
+            get_metadata = getattr(self.session, "get_schema_metadata", None)
+            if get_metadata is None:
+                return None
+            try:
+                self._self_references = self_reference_columns(get_metadata(self.schema), self.schema)
+            except Exception as exc:
+                log.warning("Could not read the metadata of schema %s (%s); writing chunks sequentially.", self.schema, exc)
+                return None
+        return self._self_references
+
+    def _prepare(self, operation: WriteOperation) -> tuple[WriteOperation, bool]:
+        """Return the operation to split and whether its chunks may be sent concurrently."""
+        references = self.self_references()
+        if references is None:
+            return operation, False
+        columns = references.get(operation.table)
+        if not columns:
+            return operation, True
+        data = order_parents_first(operation.data, columns)
+        if operation.action == DELETE_ACTION:
+            data = data.iloc[::-1]
+        return WriteOperation(operation.action, operation.table, data), False
+
+    def _send(self, chunk: WriteChunk) -> None:
+        writer = self._save_rows if chunk.action == SAVE_ACTION else self._delete_rows
+        attempt = 0
+        while True:
+            _last_response.status_code = None
+            try:
+                writer(chunk.table, chunk.data)
+                break
+            except Exception as exc:
+                status_code = getattr(_last_response, "status_code", None)
+                if attempt >= self.retries or not is_transient_write_error(exc, status_code):
+                    raise
+                delay = self.backoff * (2 ** attempt)
+                attempt += 1
+                log.warning(
+                    "Transient failure writing %d row(s) to %s::%s (%s); retry %d/%d in %.1fs.",
+                    len(chunk.data.index), self.schema, chunk.table, exc, attempt, self.retries, delay,
+                )
+                self._sleep(delay)
+        if self.journal is not None:
+            self.journal.record(chunk)
+            self._acknowledged_chunks().add(chunk.key)
+
+    def _run_chunks(self, chunks: list[WriteChunk], *, concurrent: bool = True) -> None:
+        if not concurrent or self.concurrency == 1 or len(chunks) == 1:
+            for chunk in chunks:
+                self._send(chunk)
+            return
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [executor.submit(self._send, chunk) for chunk in chunks]
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+            failed = [future for future in done if future.exception() is not None]
+            if failed:
+                for future in futures:
+                    future.cancel()
+                raise failed[0].exception()
+
+    def _acknowledged_chunks(self) -> set[str]:
+        if self._acknowledged is None:
+            self._acknowledged = self.journal.acknowledged() if self.journal is not None else set()
+            if self._acknowledged:
+                log.info(
+                    "Resuming from write journal %s (%d chunk(s) already applied).",
+                    self.journal.path,
+                    len(self._acknowledged),
+                )
+        return self._acknowledged
+
+    def run(self, operations: Iterable[WriteOperation], *, complete: bool = True) -> WriteSummary:
+        """Apply the operations in order; raises ``WriteEngineError`` on failure.
+
+        Streaming callers run one batch at a time with ``complete=False`` and
+        call ``complete()`` after the last one, so the journal survives until
+        the whole job is written.
+        """
+        acknowledged = self._acknowledged_chunks()
+        summary = WriteSummary()
+        for operation in operations:
+            if operation.action not in (SAVE_ACTION, DELETE_ACTION):
+                raise ValueError(f"Unsupported write action {operation.action!r}")
+            operation, concurrent = self._prepare(operation)
+            chunks = split_operation(operation, self.chunk_size)
+            pending = [chunk for chunk in chunks if chunk.key not in acknowledged]
+            summary.chunks_skipped += len(chunks) - len(pending)
+            if not pending:
+                continue
+            log.info(
+                "Writing %d row(s) (%s) to %s::%s in %d chunk(s).",
+                sum(len(chunk.data.index) for chunk in pending), operation.action, self.schema, operation.table, len(pending),
+            )
+            try:
+                self._run_chunks(pending, concurrent=concurrent)
+            except Exception as exc:
+                resume_hint = f" Acknowledged chunks are kept in {self.journal.path}; rerun to resume." if self.journal else ""
+                raise WriteEngineError(
+                    f"Writing {operation.action} chunk(s) to {self.schema}::{operation.table} failed: {exc}.{resume_hint}"
+                ) from exc
+            summary.chunks_sent += len(pending)
+            summary.rows_sent += sum(len(chunk.data.index) for chunk in pending)
+        if complete:
+            self.complete()
+        return summary
+
+    def complete(self) -> None:
+        """Mark the job as fully written (drops its journal)."""
+        if self.journal is not None:
+            self.journal.discard()
+        self._acknowledged = None
+
+
+def _positive_int(value: str) -> int:
+    try:
+        parsed = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value!r} is not an integer")
+    if parsed < 1:
+        raise argparse.ArgumentTypeError(f"{value!r} must be a positive integer")
+    return parsed
+
+
+def add_write_engine_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the shared chunking/retry/resume options of write-capable CLIs."""
+    parser.add_argument(
+        "--write-chunk-size",
+        dest="write_chunk_size",
+        type=_positive_int,
+        default=DEFAULT_WRITE_CHUNK_SIZE,
+        help=f"Rows per write request. Default: {DEFAULT_WRITE_CHUNK_SIZE}.",
+    )
+    parser.add_argument(
+        "--write-concurrency",
+        dest="write_concurrency",
+        type=_positive_int,
+        default=DEFAULT_WRITE_CONCURRENCY,
+        help=f"Parallel write requests per table. Default: {DEFAULT_WRITE_CONCURRENCY}.",
+    )
+    parser.add_argument(
+        "--write-retries",
+        dest="write_retries",
+        type=int,
+        default=DEFAULT_WRITE_RETRIES,
+        help=f"Retries (with exponential backoff) of transiently failing write requests. Default: {DEFAULT_WRITE_RETRIES}.",
+    )
+    parser.add_argument(
+        "--no-resume",
+        dest="no_resume",
+        action="store_true",
+        help="Ignore (and replace) the write journal of an interrupted earlier run instead of resuming from it.",
+    )
+
+
+def write_engine_from_args(session, schema: str, args, *, job_key: Optional[str] = None, **kwargs) -> DirectoryWriteEngine:
+    """Build a write engine from ``add_write_engine_arguments`` options.
+
+    Without ``job_key`` no journal is kept (used where resuming is unsafe,
+    such as truncate + import sync).
+    """
+    journal = None
+    if job_key is not None:
+        journal = WriteJournal.for_job(job_key)
+        if getattr(args, "no_resume", False):
+            journal.discard()
+    return DirectoryWriteEngine(
+        session,
+        schema,
+        chunk_size=getattr(args, "write_chunk_size", DEFAULT_WRITE_CHUNK_SIZE),
+        concurrency=getattr(args, "write_concurrency", DEFAULT_WRITE_CONCURRENCY),
+        retries=max(0, getattr(args, "write_retries", DEFAULT_WRITE_RETRIES)),
+        journal=journal,
+        **kwargs,
+    )
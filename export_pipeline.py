@@ -0,0 +1,216 @@
+# vim:ts=4:sw=4:tw=0:sts=4:et
+
+"""Single-pass export pipeline for thematic Directory exporters.
+
+An export subscribes to the pass with a predicate (``accepts_collection``)
+and accumulators (``add_collection`` / ``add_biobank``). The pipeline walks
+the snapshot's collections and biobanks once, derives the per-collection
+attributes exporters commonly need (parent biobank, types, materials,
+networks, diagnoses and their ``DiagnosisCategory`` mask from the shared
+``DiagnosisIndex``) once, and hands them to every subscribed export. Each
+export then prints its own summary and writes its own XLSX workbook, so a
+whole suite of exports costs roughly one scan of the snapshot.
+"""
+
+import logging as log
+import re
+from dataclasses import dataclass
+from functools import cache, cached_property, partial
+from typing import Any, Callable, Iterable, Optional
+
+from diagnosis_index import DiagnosisCategory, DiagnosisIndex, get_collection_diagnosis_codes
+from oomutils import estimate_count_from_oom
+from xlsxutils import write_xlsx_tables
+
+
+def get_attribute_ids(entity: dict[str, Any], key: str) -> list[Any]:
+    """Return ``id``/``name``/scalar values of a list-like entity attribute.
+
+    Mirrors ``Directory.getListOfEntityAttributeIds`` so that exports work
+    with Directory-like test doubles as well.
+    """
+    if key not in entity:
+        return []
+    values = entity[key]
+    if not isinstance(values, list):
+        values = [values]
+    normalized = []
+    for value in values:
+        if isinstance(value, dict):
+            if value.get("id") not in (None, ""):
+                value = value["id"]
+            elif value.get("name") not in (None, ""):
+                value = value["name"]
+            else:
+                continue
+        if value not in (None, ""):
+            normalized.append(value)
+    return normalized
+
+
+@dataclass
+class CollectionContext:
+    """Per-collection attributes derived once and shared by all exports."""
+
+    directory: Any
+    collection: dict[str, Any]
+    biobank_id: str
+    biobank: dict[str, Any]
+    types: list[Any]
+    materials: list[Any]
+    collection_networks: list[Any]
+    biobank_covid: list[Any]
+    diagnoses: list[str]
+    diagnosis_ranges: list[str]
+    diagnosis_index: Callable[[], DiagnosisIndex]
+
+    @classmethod
+    def from_collection(
+        cls,
+        directory,
+        collection: dict[str, Any],
+        diagnosis_index: Optional[Callable[[], DiagnosisIndex]] = None,
+    ) -> "CollectionContext":
+        """Build the context of one collection.
+
+        ``diagnosis_index`` should return the snapshot's shared index and is
+        only called when an export asks for the diagnosis mask; without it
+        the collection's codes are classified on the spot.
+        """
+        biobank_id = directory.getCollectionBiobankId(collection["id"])
+        diagnoses = []
+        diagnosis_ranges = []
+        for name in get_collection_diagnosis_codes(collection):
+            if re.search("-", name):
+                diagnosis_ranges.append(name)
+            else:
+                diagnoses.append(name)
+        if diagnosis_ranges:
+            log.warning(
+                "There are diagnosis ranges provided for collection " + collection["id"] + ": " + str(diagnosis_ranges)
+            )
+        biobank = directory.getBiobankById(biobank_id)
+        return cls(
+            directory=directory,
+            collection=collection,
+            biobank_id=biobank_id,
+            biobank=biobank,
+            types=get_attribute_ids(collection, "type"),
+            materials=get_attribute_ids(collection, "materials"),
+            collection_networks=get_attribute_ids(collection, "network"),
+            biobank_covid=get_attribute_ids(biobank, "covid19biobank") if biobank is not None else [],
+            diagnoses=diagnoses,
+            diagnosis_ranges=diagnosis_ranges,
+            diagnosis_index=diagnosis_index or partial(DiagnosisIndex, ()),
+        )
+
+    @cached_property
+    def diagnosis_mask(self) -> DiagnosisCategory:
+        """Return the ``DiagnosisCategory`` mask of the collection's diagnoses."""
+        return self.diagnosis_index().get_collection_mask(self.collection)
+
+    def has_diagnosis(self, category: DiagnosisCategory) -> bool:
+        """Return whether any diagnosis of the collection is in ``category``."""
+        return bool(self.diagnosis_mask & category)
+
+    @property
+    def all_diagnoses(self) -> list[str]:
+        """Return single diagnoses followed by diagnosis ranges."""
+        return self.diagnoses + self.diagnosis_ranges
+
+
+class CollectionTally:
+    """Collections of one export category with their sample/donor totals.
+
+    Samples count ``size`` when it is an integer and otherwise fall back to
+    the order-of-magnitude estimate (``samples_inc_oom`` only); donors count
+    explicit integer ``number_of_donors``.
+    """
+
+    def __init__(self, *, log_oom_estimates: bool = False):
+        self.collections: list[dict[str, Any]] = []
+        self.biobank_ids: set[str] = set()
+        self.samples_explicit = 0
+        self.samples_inc_oom = 0
+        self.donors_explicit = 0
+        self.log_oom_estimates = log_oom_estimates
+
+    def __len__(self) -> int:
+        return len(self.collections)
+
+    def add(self, context: CollectionContext, collection: dict[str, Any] | None = None) -> None:
+        """Add one collection (``context.collection`` unless given explicitly)."""
+        if collection is None:
+            collection = context.collection
+        self.collections.append(collection)
+        self.biobank_ids.add(context.biobank_id)
+        if "size" in collection and isinstance(collection["size"], int):
+            self.samples_explicit += collection["size"]
+            self.samples_inc_oom += collection["size"]
+        else:
+            estimate = estimate_count_from_oom(collection["order_of_magnitude"])
+            if self.log_oom_estimates:
+                log.info(
+                    "Adding %d for OoM %s on behalf of %s"
+                    % (estimate, collection["order_of_magnitude"], collection["id"])
+                )
+            self.samples_inc_oom += estimate
+        if "number_of_donors" in collection and isinstance(collection["number_of_donors"], int):
+            self.donors_explicit += collection["number_of_donors"]
+
+
+class DirectoryExport:
+    """One export subscribed to the single-pass pipeline.
+
+    Subclasses set ``name`` (registry key and default workbook stem) and
+    override the predicate/accumulator hooks they need.
+    """
+
+    name = ""
+    title = ""
+    uses_collections = True
+    uses_biobanks = False
+
+    def accepts_collection(self, context: CollectionContext) -> bool:
+        """Return whether ``add_collection`` should receive this collection."""
+        return True
+
+    def add_collection(self, context: CollectionContext) -> None:
+        """Accumulate one accepted collection."""
+
+    def add_biobank(self, biobank: dict[str, Any], directory) -> None:
+        """Accumulate one biobank (only called when ``uses_biobanks`` is set)."""
+
+    def print_summary(self, directory) -> None:
+        """Print the export's stdout summary."""
+
+    def xlsx_tables(self, directory) -> list:
+        """Return ``write_xlsx_tables`` sheet specs of the export."""
+        return []
+
+    def write_xlsx(self, filename: str, directory) -> None:
+        """Write the export's workbook."""
+        write_xlsx_tables(filename, self.xlsx_tables(directory))
+
+
+def run_export_pipeline(directory, exports: Iterable[DirectoryExport]) -> list[DirectoryExport]:
+    """Feed every export from one pass over collections and one over biobanks."""
+    exports = list(exports)
+    collection_exports = [export for export in exports if export.uses_collections]
+    biobank_exports = [export for export in exports if export.uses_biobanks]
+
+    if collection_exports:
+        # built on first use, so exports that never look at diagnoses skip it
+        diagnosis_index = cache(directory.getDiagnosisIndex)
+        for collection in directory.getCollections():
+            log.debug("Analyzing collection " + collection["id"])
+            context = CollectionContext.from_collection(directory, collection, diagnosis_index)
+            for export in collection_exports:
+                if export.accepts_collection(context):
+                    export.add_collection(context)
+
+    if biobank_exports:
+        for biobank in directory.getBiobanks():
+            for export in biobank_exports:
+                export.add_biobank(biobank, directory)
+    return exports
@@ -1,16 +1,8 @@
 #!/usr/bin/python3
 # vim:ts=4:sw=4:tw=0:sts=4:et
 
-from typing import List
-
 import pprint
-import re
 import logging as log
-import time
-from typing import List
-import os.path
-
-import pandas as pd
 
 from cli_common import (
     add_directory_schema_argument,
@@ -24,8 +16,8 @@ from cli_common import (
     configure_logging,
 )
 from directory import Directory
-from xlsxutils import write_xlsx_tables
-
+from directory_exports import InstitutionsExport
+from export_pipeline import run_export_pipeline
 
 cachesList = ['directory']
 
@@ -51,29 +43,14 @@ dir = Directory(**build_directory_kwargs(args, pp=pp))
 log.info('Total biobanks: ' + str(dir.getBiobanksCount()))
 log.info('Total collections: ' + str(dir.getCollectionsCount()))
 
-countryInstitutions = {}
-
-for biobank in dir.getBiobanks():
-    biobankId = biobank['id']
-    try:
-        biobankJuridicalPerson = biobank['juridical_person']
-        biobankCountry = biobank['country']
-        if not biobankCountry in countryInstitutions:
-            countryInstitutions[biobankCountry] = set()
-        log.debug(f"Biobank {biobankId} from institution {biobankJuridicalPerson} added to country {biobankCountry}")
-        countryInstitutions[biobankCountry].add(biobankJuridicalPerson)
-    except KeyError:
-        log.error("Biobank " + biobankId + " has no juridical person set!")
+export = InstitutionsExport()
+run_export_pipeline(dir, [export])
 
 if args.verbose:
-    for country in sorted(countryInstitutions):
-        print(f"{country}: institutions total = {len(countryInstitutions[country])}")
+    export.print_country_totals()
 
 if not args.nostdout:
-    for country in sorted(countryInstitutions):
-        for institution in sorted(countryInstitutions[country]):
-            print(f"{country}\t{institution}")
+    export.print_summary(dir)
 
 if args.outputXLSX is not None:
-    pd_countryInstitutions = pd.DataFrame([{'Country' : country, 'Institution' : institution} for country in sorted(countryInstitutions) for institution in sorted(countryInstitutions[country])])
-    write_xlsx_tables(args.outputXLSX[0], [(pd_countryInstitutions, 'Institutions')])
+    export.write_xlsx(args.outputXLSX[0], dir)
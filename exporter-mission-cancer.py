@@ -22,9 +22,9 @@ from cli_common import (
     configure_logging,
 )
 from directory import Directory
+from diagnosis_index import DiagnosisCategory
 from fact_sheet_summary import build_fact_sheet_xlsx_tables, print_fact_sheet_summary
 from orphacodes import OrphaCodes
-from icd10codeshelper import ICD10CodesHelper
 from oomutils import (
     describe_oom_estimate_policy,
     estimate_count_from_oom,
@@ -65,6 +65,7 @@ log.info(
 )
 
 orphacodes = OrphaCodes(args.orphacodesfile[0] if args.orphacodesfile is not None else None)
+diagnosisIndex = dir.getDiagnosisIndex(orphacodes)
 
 cancerExistingDiagnosed = []
 cancerOnlyExistingDiagnosed = []
@@ -162,45 +163,13 @@ for collection in dir.getCollections():
         log.warning("There are diagnosis ranges provided for collection " + collection['id'] + ": " + str(diag_ranges))
 
 
-    for d in diags + diag_ranges:
-        if re.search(r'^urn:miriam:icd:', d):
-            d = re.sub(r'^urn:miriam:icd:', '', d)
-            isCancer = ICD10CodesHelper.isCancerCode(d)
-            if isCancer is not None:
-                if isCancer:
-                    log.debug(
-                        "Collection %s identified as cancer collection due to ICD-10 code %s" % (collection['id'], d))
-                    cancer_diag = True
-                else:
-                    log.debug("Collection %s identified as non-cancer collection due to ICD-10 code %s" % (
-                    collection['id'], d))
-                    non_cancer = True
-            else:
-                isCancerChapter = ICD10CodesHelper.isCancerChapter(d)
-                if isCancerChapter is not None:
-                    if isCancerChapter:
-                        log.debug("Collection %s identified as cancer collection due to ICD-10 chapter %s" % (
-                        collection['id'], d))
-                        cancer_diag = True
-                    else:
-                        log.debug("Collection %s identified as non-cancer collection due to ICD-10 chapter %s" % (
-                        collection['id'], d))
-                        non_cancer = True
-                else:
-                    log.warning("Cannot match ICD-10 diagnosis %s" % (d))
-
-        if re.search(r'^ORPHA:', d):
-            d = re.sub(r'^ORPHA:', '', d)
-            if orphacodes.isValidOrphaCode(d):
-                isCancer = orphacodes.isCancerOrphaCode(d)
-                if isCancer:
-                    log.debug("Collection %s identified as cancer collection due to ORPHA code %s" % (collection['id'], d))
-                    cancer_diag = True
-                else:
-                    log.debug("Collection %s identified as non-cancer collection due to ORPHA code %s" % (collection['id'], d))
-                    non_cancer = True
-            else:
-                log.warn("Collection %s has invalid ORPHA code %s" % (collection['id'], d))
+    diagnosis_mask = diagnosisIndex.get_collection_mask(collection)
+    if diagnosis_mask & DiagnosisCategory.CANCER:
+        log.debug("Collection %s identified as cancer collection due to its diagnoses %s" % (collection['id'], diags + diag_ranges))
+        cancer_diag = True
+    if diagnosis_mask & DiagnosisCategory.NON_CANCER:
+        log.debug("Collection %s has non-cancer diagnoses" % (collection['id']))
+        non_cancer = True
 
     if 'NON_HUMAN' in types:
         log.info("Non-human collection %s skipped" % (collection['id']))
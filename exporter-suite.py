@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+# vim:ts=4:sw=4:tw=0:sts=4:et
+
+import pprint
+import logging as log
+import os
+
+from cli_common import (
+    add_directory_schema_argument,
+    add_logging_arguments,
+    add_no_stdout_argument,
+    add_purge_cache_arguments,
+    add_withdrawn_scope_arguments,
+    build_directory_kwargs,
+    build_parser,
+    configure_logging,
+)
+from directory import Directory
+from directory_exports import EXPORTS
+from export_pipeline import run_export_pipeline
+from oomutils import (
+    describe_oom_estimate_policy,
+    get_oom_upper_bound_coefficient,
+)
+
+cachesList = ['directory']
+
+pp = pprint.PrettyPrinter(indent=4)
+
+parser = build_parser(
+    description='Run several thematic exports over a single pass of the Directory snapshot.'
+)
+add_logging_arguments(parser)
+parser.add_argument('-e', '--export', dest='exports', action='append', choices=sorted(EXPORTS),
+                    help='export to run (repeatable; default: all registered exports)')
+parser.add_argument('-o', '--output-dir', dest='outputDir', default=None,
+                    help='directory to write one <export>.xlsx workbook per export into')
+add_no_stdout_argument(parser)
+add_directory_schema_argument(parser, default="ERIC")
+add_withdrawn_scope_arguments(parser)
+add_purge_cache_arguments(parser, cachesList)
+parser.set_defaults(purgeCaches=[])
+args = parser.parse_args()
+
+configure_logging(args)
+
+
+# Main code
+
+dir = Directory(**build_directory_kwargs(args, pp=pp))
+
+log.info('Total biobanks: ' + str(dir.getBiobanksCount()))
+log.info('Total collections: ' + str(dir.getCollectionsCount()))
+log.info(
+    "OoM estimate policy: %s (coefficient=%s)",
+    describe_oom_estimate_policy(),
+    get_oom_upper_bound_coefficient(),
+)
+
+selectedNames = list(dict.fromkeys(args.exports)) if args.exports else list(EXPORTS)
+exports = run_export_pipeline(dir, [EXPORTS[name]() for name in selectedNames])
+
+for export in exports:
+    if not args.nostdout:
+        print("==== " + export.title + " ====")
+        export.print_summary(dir)
+        print()
+    if args.outputDir is not None:
+        os.makedirs(args.outputDir, exist_ok=True)
+        filename = os.path.join(args.outputDir, export.name + '.xlsx')
+        log.info("Writing %s export to %s", export.name, filename)
+        export.write_xlsx(filename, dir)
@@ -2,11 +2,15 @@
 
 from __future__ import annotations
 
+import os
 import re
-from typing import Any
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterable, Optional
 
+import numpy as np
 import pandas as pd
 
+from fact_sheet_frame import FactSheetFrame
 from fact_sheet_utils import analyze_collection_fact_sheet, normalize_fact_dimension_value
 
 
@@ -26,6 +30,21 @@ AGE_RANGE_LABEL_BOUNDS = {
 }
 AGE_LABEL_LOW_SUPPORT_OUTLIER = 0
 AGE_LABEL_HIGH_SUPPORT_THRESHOLD = 5
+AGE_RANGE_IGNORED_VALUES = {"", "*", "Unknown", "Undefined"}
+FACT_DESCRIPTOR_DIMENSIONS = (
+    ("disease", "diagnosis_available"),
+    ("sex", "sex"),
+    ("sample_type", "materials"),
+)
+LOW_SUPPORT_AGE_NOTE = (
+    "Low-support label-based age rows were ignored: rows with max(number_of_donors, number_of_samples)=0 are treated as non-evidence when at least one other label row has support >=5."
+)
+MIXED_AGE_UNITS_NOTE = (
+    "Fact-sheet age groups use mixed units; age_low/age_high/age_unit cannot be derived conservatively."
+)
+OPEN_AGE_HIGH_NOTE = (
+    "Open-ended fact-sheet age groups are present (for example 'Aged (>80 years)'); these have no finite upper bound, so age_high cannot be derived conservatively."
+)
 
 
 def normalize_descriptor_value(value: Any) -> str:
@@ -137,12 +156,57 @@ def icd10_covers(existing_value: str, candidate_value: str) -> bool:
     return False
 
 
+class Icd10PrefixIndex:
+    """Prefix index answering ICD-10 coverage questions in constant time.
+
+    ``icd10_covers`` only lets a category (``C18``) cover its own subcodes
+    (``C18.0``), so the prefix trie has two levels: the set of indexed code
+    cores and the set of categories of indexed subcodes. Exact string matches
+    are kept separately for non-ICD-10 values.
+    """
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.values: set[str] = set()
+        self.cores: set[str] = set()
+        self.subcode_categories: set[str] = set()
+        for value in values:
+            self.add(value)
+
+    def add(self, value: str) -> None:
+        self.values.add(value)
+        core = icd10_code_core(value)
+        if not core:
+            return
+        self.cores.add(core)
+        category, dot, _ = core.partition(".")
+        if dot:
+            self.subcode_categories.add(category)
+
+    def covers(self, candidate_value: str) -> bool:
+        """Return whether an indexed value equals or covers ``candidate_value``."""
+        if candidate_value in self.values:
+            return True
+        core = icd10_code_core(candidate_value)
+        if not core:
+            return False
+        if core in self.cores:
+            return True
+        category, dot, _ = core.partition(".")
+        return bool(dot) and category in self.cores
+
+    def is_covering(self, value: str) -> bool:
+        """Return whether ``value`` equals or covers at least one indexed value."""
+        if value in self.values:
+            return True
+        core = icd10_code_core(value)
+        if not core:
+            return False
+        return core in self.cores or ("." not in core and core in self.subcode_categories)
+
+
 def diagnosis_is_covered(existing_values: list[str], candidate_value: str) -> bool:
     """Return whether a diagnosis is already represented by existing metadata."""
-    return any(
-        existing_value == candidate_value or icd10_covers(existing_value, candidate_value)
-        for existing_value in existing_values
-    )
+    return Icd10PrefixIndex(existing_values).covers(candidate_value)
 
 
 def merge_diagnosis_values(
@@ -153,19 +217,16 @@ def merge_diagnosis_values(
 ) -> list[str]:
     """Return the diagnosis list after applying append-or-replace semantics."""
     if replace_existing:
-        kept_values = [
-            value
-            for value in current_values
-            if value in fact_values
-            or any(icd10_covers(value, candidate) for candidate in fact_values)
-        ]
-        merged = list(kept_values)
+        fact_index = Icd10PrefixIndex(fact_values)
+        merged = [value for value in current_values if fact_index.is_covering(value)]
     else:
         merged = list(current_values)
 
+    merged_index = Icd10PrefixIndex(merged)
     for candidate in fact_values:
-        if not diagnosis_is_covered(merged, candidate):
+        if not merged_index.covers(candidate):
             merged.append(candidate)
+            merged_index.add(candidate)
     return ordered_unique(merged)
 
 
@@ -190,7 +251,7 @@ def derive_age_range_update(facts: list[dict[str, Any]]) -> dict[str, Any]:
     parsed_rows = []
     for fact in facts:
         age_range = normalize_descriptor_value(fact.get("age_range"))
-        if not age_range or age_range in {"*", "Unknown", "Undefined"}:
+        if age_range in AGE_RANGE_IGNORED_VALUES:
             continue
         age_low, age_high, age_unit = _parse_age_range_bounds(age_range)
         if age_low is None and age_high is None and age_unit is None:
@@ -207,7 +268,7 @@ def derive_age_range_update(facts: list[dict[str, Any]]) -> dict[str, Any]:
         )
 
     if not parsed_rows:
-        return {"age_low": None, "age_high": None, "age_unit": None, "notes": []}
+        return _empty_age_range_update()
 
     has_high_support_label_rows = any(
         row["label_based"]
@@ -240,30 +301,22 @@ def derive_age_range_update(facts: list[dict[str, Any]]) -> dict[str, Any]:
 
     if not bounds:
         if low_support_rows_ignored:
-            notes.append(
-                "Low-support label-based age rows were ignored: rows with max(number_of_donors, number_of_samples)=0 are treated as non-evidence when at least one other label row has support >=5."
-            )
+            notes.append(LOW_SUPPORT_AGE_NOTE)
         return {"age_low": None, "age_high": None, "age_unit": None, "notes": notes}
 
     low_values = [low for low, _ in bounds if low is not None]
     high_values = [high for _, high in bounds if high is not None]
     if low_support_rows_ignored:
-        notes.append(
-            "Low-support label-based age rows were ignored: rows with max(number_of_donors, number_of_samples)=0 are treated as non-evidence when at least one other label row has support >=5."
-        )
+        notes.append(LOW_SUPPORT_AGE_NOTE)
     normalized_units = ordered_unique(units)
     if len(normalized_units) > 1:
-        notes.append(
-            "Fact-sheet age groups use mixed units; age_low/age_high/age_unit cannot be derived conservatively."
-        )
+        notes.append(MIXED_AGE_UNITS_NOTE)
         return {"age_low": None, "age_high": None, "age_unit": None, "notes": notes}
 
     age_low = min(low_values) if low_values else None
     age_high = None if has_open_high else (max(high_values) if high_values else None)
     if has_open_high:
-        notes.append(
-            "Open-ended fact-sheet age groups are present (for example 'Aged (>80 years)'); these have no finite upper bound, so age_high cannot be derived conservatively."
-        )
+        notes.append(OPEN_AGE_HIGH_NOTE)
     derived_unit = normalized_units[0] if normalized_units else None
     return {
         "age_low": age_low,
@@ -280,8 +333,179 @@ def build_collection_descriptor_proposal(
     replace_existing: bool = False,
 ) -> dict[str, Any]:
     """Return proposed collection-descriptor updates derived from fact rows."""
-    fact_values = fact_descriptor_values_for_comparison(facts, collection)
-    fact_sheet = analyze_collection_fact_sheet(collection, facts)
+    return _assemble_descriptor_proposal(
+        collection,
+        collect_fact_descriptor_values(facts),
+        analyze_collection_fact_sheet(collection, facts),
+        derive_age_range_update(facts),
+        replace_existing=replace_existing,
+    )
+
+
+def build_descriptor_proposals_from_frame(
+    collections: Iterable[dict[str, Any]],
+    fact_frame: FactSheetFrame,
+    *,
+    replace_existing: bool = False,
+) -> dict[str, dict[str, Any]]:
+    """Return descriptor proposals for many collections from one fact-sheet frame.
+
+    Produces the same proposals as calling ``build_collection_descriptor_proposal``
+    per collection, but fact descriptor values and age spans are aggregated
+    for all collections at once from the frame's categorical columns, so every
+    distinct dimension value is normalized and parsed a single time.
+    Proposals are keyed by ``collection["id"]`` in input order.
+    """
+    fact_values_by_collection = collect_frame_descriptor_values(fact_frame)
+    age_updates = derive_frame_age_range_updates(fact_frame)
+    proposals = {}
+    for collection in collections:
+        collection_id = collection["id"]
+        raw_fact_values = fact_values_by_collection.get(collection_id)
+        if raw_fact_values is None:
+            raw_fact_values = {field: [] for _, field in FACT_DESCRIPTOR_DIMENSIONS}
+        proposals[collection_id] = _assemble_descriptor_proposal(
+            collection,
+            raw_fact_values,
+            fact_frame.analyze_collection(collection),
+            age_updates.get(collection_id) or _empty_age_range_update(),
+            replace_existing=replace_existing,
+        )
+    return proposals
+
+
+def collect_frame_descriptor_values(fact_frame: FactSheetFrame) -> dict[str, dict[str, list[str]]]:
+    """Return ``collect_fact_descriptor_values`` results for every collection of a frame."""
+    frame = fact_frame.frame
+    collection_codes = frame["collection_id"].cat.codes.to_numpy()
+    collection_categories = frame["collection_id"].cat.categories
+    result: dict[str, dict[str, list[str]]] = {}
+    for dimension_key, field in FACT_DESCRIPTOR_DIMENSIONS:
+        value_codes, values = _normalized_category_codes(frame[dimension_key])
+        # the trailing False is picked up by missing cells (code -1)
+        usable = np.array([value not in ("", "*") for value in values] + [False], dtype=bool)
+        keep = usable[value_codes]
+        pairs = pd.DataFrame({"collection": collection_codes[keep], "value": value_codes[keep]}).drop_duplicates()
+        pair_collections = pairs["collection"].to_numpy()
+        order = np.argsort(pair_collections, kind="stable")
+        pair_collections = pair_collections[order]
+        pair_values = pairs["value"].to_numpy()[order]
+        boundaries = np.flatnonzero(np.diff(pair_collections)) + 1
+        for collection_code, codes in zip(pair_collections[np.r_[0, boundaries]] if len(order) else [], np.split(pair_values, boundaries)):
+            result.setdefault(
+                collection_categories[collection_code],
+                {name: [] for _, name in FACT_DESCRIPTOR_DIMENSIONS},
+            )[field] = [values[code] for code in codes]
+    return result
+
+
+def derive_frame_age_range_updates(fact_frame: FactSheetFrame) -> dict[str, dict[str, Any]]:
+    """Return ``derive_age_range_update`` results for every collection of a frame.
+
+    Collections without parseable age rows are omitted. Each distinct age
+    label is parsed once; the per-collection span, unit and support checks are
+    grouped aggregations over the parsed rows.
+    """
+    frame = fact_frame.frame
+    label_codes, labels = _normalized_category_codes(frame["age_range"])
+    if fact_frame.facts is not None:
+        # raw age cells are normalized name-first here, the frame keeps ids
+        label_index = {label: code for code, label in enumerate(labels)}
+        for position, fact in enumerate(fact_frame.facts):
+            value = fact.get("age_range")
+            if isinstance(value, dict) and "id" in value and "name" in value:
+                label = normalize_descriptor_value(value)
+                if label not in label_index:
+                    label_index[label] = len(labels)
+                    labels.append(label)
+                label_codes[position] = label_index[label]
+    bounds = []
+    for label in labels:
+        if label in AGE_RANGE_IGNORED_VALUES:
+            bounds.append((None, None, None, False))
+            continue
+        low, high, unit = _parse_age_range_bounds(label)
+        bounds.append((low, high, unit, label.strip().upper() in AGE_RANGE_LABEL_BOUNDS))
+    parsed = np.array([unit is not None for _, _, unit, _ in bounds] + [False], dtype=bool)
+    label_codes = np.where(label_codes >= 0, label_codes, len(bounds))
+    rows = np.flatnonzero(parsed[label_codes])
+    if not len(rows):
+        return {}
+
+    row_codes = label_codes[rows]
+    label_based = np.array([flag for _, _, _, flag in bounds], dtype=bool)[row_codes]
+    support = np.full(len(rows), np.nan)
+    label_rows = np.flatnonzero(label_based)
+    support[label_rows] = [
+        np.nan if (row_support := _frame_row_support_count(fact_frame, position)) is None else row_support
+        for position in rows[label_rows]
+    ]
+    lows = np.array([np.nan if low is None else low for low, _, _, _ in bounds], dtype=float)[row_codes]
+    highs = np.array([np.nan if high is None else high for _, high, _, _ in bounds], dtype=float)[row_codes]
+    units = np.array([unit for _, _, unit, _ in bounds], dtype=object)[row_codes]
+    work = pd.DataFrame(
+        {
+            "collection_id": frame["collection_id"].to_numpy()[rows],
+            "label_based": label_based,
+            "high_support": label_based & (support >= AGE_LABEL_HIGH_SUPPORT_THRESHOLD),
+            "no_support": label_based & (support <= AGE_LABEL_LOW_SUPPORT_OUTLIER),
+        }
+    )
+    has_high_support = work.groupby("collection_id", sort=False)["high_support"].transform("any").to_numpy()
+    ignored = work["no_support"].to_numpy() & has_high_support
+    work["ignored"] = ignored
+    work["low"] = np.where(ignored, np.nan, lows)
+    work["high"] = np.where(ignored, np.nan, highs)
+    work["open_high"] = ~ignored & np.isnan(highs)
+    work["unit"] = np.where(ignored, None, units)
+    work["kept"] = ~ignored
+    summary = work.groupby("collection_id", sort=False).agg(
+        ignored=("ignored", "any"),
+        kept=("kept", "any"),
+        units=("unit", "nunique"),
+        open_high=("open_high", "any"),
+        low=("low", "min"),
+        high=("high", "max"),
+        unit=("unit", "first"),
+    )
+
+    updates = {}
+    for collection_id, row in summary.to_dict("index").items():
+        update = _empty_age_range_update()
+        if row["ignored"]:
+            update["notes"].append(LOW_SUPPORT_AGE_NOTE)
+        if not row["kept"]:
+            updates[collection_id] = update
+            continue
+        if row["units"] > 1:
+            update["notes"].append(MIXED_AGE_UNITS_NOTE)
+            updates[collection_id] = update
+            continue
+        update["age_low"] = None if pd.isna(row["low"]) else int(row["low"])
+        if row["open_high"]:
+            update["notes"].append(OPEN_AGE_HIGH_NOTE)
+        elif not pd.isna(row["high"]):
+            update["age_high"] = int(row["high"])
+        if update["age_low"] is not None or update["age_high"] is not None:
+            update["age_unit"] = row["unit"]
+        updates[collection_id] = update
+    return updates
+
+
+def _assemble_descriptor_proposal(
+    collection: dict[str, Any],
+    raw_fact_values: dict[str, list[str]],
+    fact_sheet: dict[str, Any],
+    age_update: dict[str, Any],
+    *,
+    replace_existing: bool,
+) -> dict[str, Any]:
+    """Return the proposal for one collection from its aggregated fact evidence."""
+    fact_values = dict(raw_fact_values)
+    fact_values["materials"] = effective_fact_materials(
+        raw_fact_values["materials"],
+        parse_collection_multi_value_field(collection.get("materials")),
+    )
     current = {
         "diagnosis_available": parse_collection_multi_value_field(collection.get("diagnosis_available")),
         "materials": parse_collection_multi_value_field(collection.get("materials")),
@@ -321,7 +545,6 @@ def build_collection_descriptor_proposal(
         replace_existing=replace_existing,
     )
 
-    age_update = derive_age_range_update(facts)
     notes.extend(age_update["notes"])
     for field in ("age_low", "age_high", "age_unit"):
         field_notes[field].extend(age_update["notes"])
@@ -368,6 +591,51 @@ def build_collection_descriptor_proposal(
     }
 
 
+def _build_descriptor_proposal_shard(
+    item: tuple[list[tuple[str, dict[str, Any], list[dict[str, Any]]]], bool],
+) -> dict[str, dict[str, Any]]:
+    targets, replace_existing = item
+    fact_frame = FactSheetFrame.from_collection_facts(
+        {collection_id: facts for collection_id, _, facts in targets}
+    )
+    return build_descriptor_proposals_from_frame(
+        [collection for _, collection, _ in targets],
+        fact_frame,
+        replace_existing=replace_existing,
+    )
+
+
+def build_collection_descriptor_proposals(
+    targets: Iterable[tuple[str, dict[str, Any], list[dict[str, Any]]]],
+    *,
+    replace_existing: bool = False,
+    jobs: Optional[int] = 1,
+) -> dict[str, dict[str, Any]]:
+    """Return descriptor proposals keyed by collection id, in input order.
+
+    ``targets`` yields ``(collection_id, collection_row, facts)``; the row id
+    must match ``collection_id``. All facts are loaded into one
+    ``FactSheetFrame`` and aggregated with ``build_descriptor_proposals_from_frame``.
+    With ``jobs > 1`` (0 or None means all CPU cores) the targets are split
+    into that many shards, each aggregated in a worker process.
+    """
+    targets = list({collection_id: (collection_id, collection, facts) for collection_id, collection, facts in targets}.values())
+    if jobs is None or jobs == 0:
+        jobs = os.cpu_count() or 1
+    if jobs < 0:
+        raise ValueError(f"Number of proposal jobs must be non-negative, got {jobs}.")
+    jobs = min(jobs, len(targets))
+    if jobs <= 1:
+        return _build_descriptor_proposal_shard((targets, replace_existing))
+    shard_size = -(-len(targets) // jobs)
+    shards = [(targets[start:start + shard_size], replace_existing) for start in range(0, len(targets), shard_size)]
+    proposals: dict[str, dict[str, Any]] = {}
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for shard_proposals in executor.map(_build_descriptor_proposal_shard, shards):
+            proposals.update(shard_proposals)
+    return proposals
+
+
 def apply_descriptor_proposal_to_dataframe_row(
     row: dict[str, Any],
     proposal: dict[str, Any],
@@ -481,6 +749,36 @@ def _infer_age_range_unit(age_range: str) -> str | None:
     return None
 
 
+def _normalized_category_codes(column: pd.Series) -> tuple[np.ndarray, list[str]]:
+    """Return per-row codes into the descriptor-normalized categories of ``column``.
+
+    Categories that only differ before normalization share one code; missing
+    cells get the code ``-1``.
+    """
+    normalized = [normalize_descriptor_value(value) for value in column.cat.categories]
+    category_codes, values = pd.factorize(pd.Series(normalized, dtype=object))
+    codes = column.cat.codes.to_numpy().astype(np.int64)
+    present = codes >= 0
+    codes[present] = category_codes[codes[present]]
+    return codes, list(values)
+
+
+def _empty_age_range_update() -> dict[str, Any]:
+    return {"age_low": None, "age_high": None, "age_unit": None, "notes": []}
+
+
+def _frame_row_support_count(fact_frame: FactSheetFrame, position: int) -> int | None:
+    """Return ``_fact_row_support_count`` for one frame row."""
+    if fact_frame.facts is not None:
+        return _fact_row_support_count(fact_frame.facts[position])
+    counts = [
+        int(fact_frame.frame.at[position, field])
+        for field in ("number_of_donors", "number_of_samples")
+        if not pd.isna(fact_frame.frame.at[position, field])
+    ]
+    return max(counts) if counts else None
+
+
 def _fact_row_support_count(fact: dict[str, Any]) -> int | None:
     """Return the strongest available row support from sample/donor counts."""
     donors = _coerce_optional_int(fact.get("number_of_donors"))
@@ -0,0 +1,159 @@
+# vim:ts=4:sw=4:tw=0:sts=4:et
+
+"""Differencing-attack detection for k-anonymized collection fact sheets.
+
+Fact-sheet rows are linked by linear constraints: a row fixing a set of
+dimensions equals the sum of its children that additionally fix one mutually
+exclusive dimension (for example all-star donors = female + male donors). When
+small cells are suppressed, an attacker can still subtract published rows from
+each other and recover them. This module propagates those constraints per
+collection (peeling: any constraint with exactly one unknown term is solved,
+which can unlock further constraints) and reports every below-k cell that
+becomes derivable.
+
+The value domain of a dimension is taken as the set of values the collection's
+fact sheet itself mentions, i.e. what a reader of the published sheet sees.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from fact_sheet_utils import ADDITIVE_MARGIN_DIMENSIONS, FactSheetCube
+from k_anonymity import parse_count_values
+
+
+@dataclass
+class DerivedSmallCell:
+    """Suppressed or unpublished fact-sheet cell recoverable by differencing."""
+
+    cell: dict[str, Any]
+    count_field: str
+    value: int
+    k_limit: int
+    parent_cell: dict[str, Any]
+    dimension: str
+    published_fact_ids: list[str]
+    suppressed_fact_ids: list[str]
+
+    def describe_cell(self) -> str:
+        """Return a compact ``dimension=value`` label of the derived cell."""
+        fixed = [f"{key}={value}" for key, value in self.cell.items() if value != "*"]
+        return ", ".join(fixed) if fixed else "all-star"
+
+
+def _cell_dict(dimension_keys: tuple[str, ...], cell_key: tuple[Any, ...]) -> dict[str, Any]:
+    return dict(zip(dimension_keys, cell_key))
+
+
+def find_differencing_disclosures(
+    cube: FactSheetCube,
+    fact_sheet: Optional[dict[str, Any]] = None,
+    *,
+    count_field: str = "number_of_donors",
+    k_limit: int = 10,
+    additive_dimensions: Optional[tuple[str, ...]] = None,
+    max_passes: int = 20,
+) -> list[DerivedSmallCell]:
+    """Return below-k cells of one collection derivable from published rows.
+
+    Args:
+        cube: Cube index of the collection's fact rows.
+        fact_sheet: Optional summary from ``analyze_collection_fact_sheet`` /
+            ``FactSheetFrame.analyze_collection``; fact sheets without exactly
+            one all-star row are skipped because their totals are ambiguous.
+        count_field: Count column to analyse.
+        k_limit: Cells with ``0 < value < k_limit`` are treated as suppressed
+            and reported when derivable.
+        additive_dimensions: Dimensions partitioning ``count_field``
+            (defaults to ``ADDITIVE_MARGIN_DIMENSIONS[count_field]``).
+        max_passes: Upper bound on constraint-propagation passes.
+    """
+    if fact_sheet is not None and fact_sheet.get("all_star_rows") != 1:
+        return []
+    if additive_dimensions is None:
+        additive_dimensions = ADDITIVE_MARGIN_DIMENSIONS.get(count_field, ())
+    dimension_keys = cube.dimension_keys
+    additive_positions = [
+        dimension_keys.index(dimension) for dimension in additive_dimensions if dimension in dimension_keys
+    ]
+    if not additive_positions:
+        return []
+
+    published: dict[tuple[Any, ...], int] = {}
+    published_ids: dict[tuple[Any, ...], str] = {}
+    suppressed: dict[tuple[Any, ...], str] = {}
+    domains: dict[int, set[Any]] = {position: set() for position in additive_positions}
+    for cell_key, rows in cube.cells.items():
+        if any(value is None for value in cell_key) or len(rows) != 1:
+            continue
+        value = parse_count_values([rows[0].get(count_field)])[0]
+        if value != value:
+            continue
+        for position in additive_positions:
+            if cell_key[position] != "*":
+                domains[position].add(cell_key[position])
+        if 0 < value < k_limit:
+            suppressed[cell_key] = str(rows[0].get("id", ""))
+        else:
+            published[cell_key] = int(value)
+            published_ids[cell_key] = str(rows[0].get("id", ""))
+
+    # constraints: parent cell with "*" at an additive position, partitioned by
+    # the values of that dimension seen anywhere in the fact sheet
+    constraints: dict[tuple[tuple[Any, ...], int], list[tuple[Any, ...]]] = {}
+    for cell_key in list(published) + list(suppressed):
+        for position in additive_positions:
+            if cell_key[position] == "*":
+                continue
+            parent = cell_key[:position] + ("*",) + cell_key[position + 1:]
+            if (parent, position) in constraints:
+                continue
+            constraints[(parent, position)] = [
+                cell_key[:position] + (value,) + cell_key[position + 1:]
+                for value in sorted(domains[position], key=str)
+            ]
+
+    known = dict(published)
+    derivations: dict[tuple[Any, ...], tuple[tuple[Any, ...], int, list[tuple[Any, ...]]]] = {}
+    for _ in range(max_passes):
+        changed = False
+        for (parent, position), children in constraints.items():
+            unknown_children = [child for child in children if child not in known]
+            if parent in known and len(unknown_children) == 1:
+                value = known[parent] - sum(known[child] for child in children if child in known)
+                if value < 0:
+                    continue
+                target = unknown_children[0]
+                known[target] = value
+                derivations[target] = (parent, position, [parent] + [child for child in children if child != target])
+                changed = True
+            elif parent not in known and not unknown_children:
+                known[parent] = sum(known[child] for child in children)
+                derivations[parent] = (parent, position, list(children))
+                changed = True
+        if not changed:
+            break
+
+    disclosures = []
+    for cell_key, (parent, position, sources) in derivations.items():
+        value = known[cell_key]
+        if not 0 < value < k_limit:
+            continue
+        used_published = sorted({published_ids[source] for source in sources if source in published_ids})
+        used_suppressed = {suppressed[source] for source in sources + [cell_key] if source in suppressed}
+        disclosures.append(
+            DerivedSmallCell(
+                cell=_cell_dict(dimension_keys, cell_key),
+                count_field=count_field,
+                value=value,
+                k_limit=k_limit,
+                parent_cell=_cell_dict(dimension_keys, parent),
+                dimension=dimension_keys[position],
+                published_fact_ids=used_published,
+                suppressed_fact_ids=sorted(used_suppressed),
+            )
+        )
+    disclosures.sort(key=lambda item: (item.describe_cell(), item.value))
+    return disclosures
@@ -0,0 +1,412 @@
+# vim:ts=4:sw=4:tw=0:sts=4:et
+
+"""Columnar fact-sheet engine shared by fact-table checks, summaries and stats.
+
+All collection facts are loaded once into a pandas frame. Dimension cells are
+normalized a single time and stored as categorical codes, and every row gets a
+star-mask bitfield (bit ``i`` set when dimension ``i`` is aggregated as ``*``)
+plus a fixed-mask bitfield (bit ``i`` set when dimension ``i`` carries a real
+value). All-star / all-but-one-star classification, k-anonymity masks and
+per-collection aggregates are then computed with vectorized operations instead
+of re-walking per-collection fact dicts.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Iterable, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from fact_sheet_utils import (
+    FACT_DIMENSION_KEYS,
+    FactSheetCube,
+    build_fact_sheet_analysis,
+    normalize_fact_dimension_value,
+)
+from k_anonymity import (
+    CollectionKAnonymityViolations,
+    parse_count_values,
+    positive_below_k_mask,
+    scan_fact_k_anonymity,
+)
+
+
+COUNT_FIELDS = ("number_of_samples", "number_of_donors")
+
+
+def _categorical_value(value: Any) -> Any:
+    """Return a hashable normalized dimension value (None stays missing)."""
+    value = normalize_fact_dimension_value(value)
+    if isinstance(value, (dict, list)):
+        return repr(value)
+    return value
+
+
+def _numeric_count(value: Any) -> Any:
+    """Return an integer count value or None when it is not numeric."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    return None
+
+
+def _dimension_categorical(values: list[Any]) -> pd.Categorical:
+    """Return categorical codes for normalized values in order of appearance."""
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    codes, categories = pd.factorize(array, use_na_sentinel=True)
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+
+class FactSheetFrame:
+    """Vectorized view over collection fact-sheet rows.
+
+    ``frame`` holds one row per fact with a categorical ``collection_id``
+    column, one categorical column per fact dimension (``*`` is a regular
+    category, missing values are NaN), nullable integer count columns and the
+    derived ``star_mask`` / ``fixed_mask`` / ``star_count`` columns. ``facts``
+    optionally keeps the original fact dicts aligned with frame positions so
+    row-returning helpers can hand back the source records.
+    """
+
+    def __init__(
+        self,
+        frame: pd.DataFrame,
+        facts: Optional[Sequence[dict[str, Any]]] = None,
+        dimension_keys: Sequence[str] = FACT_DIMENSION_KEYS,
+    ):
+        self.dimension_keys = tuple(dimension_keys)
+        self.all_star_mask_value = (1 << len(self.dimension_keys)) - 1
+        self.facts = facts
+        self.frame = frame.reset_index(drop=True)
+        self._add_mask_columns()
+        self._positions_by_collection = {
+            collection_id: positions
+            for collection_id, positions in self.frame.groupby(
+                "collection_id", observed=True, sort=False
+            ).indices.items()
+        }
+        self._collection_summary: Optional[pd.DataFrame] = None
+        self._collection_summary_records: Optional[dict[str, dict[str, Any]]] = None
+        self._dimension_values: Optional[dict[str, dict[str, list[Any]]]] = None
+        self._count_values: dict[str, np.ndarray] = {}
+        self._k_anonymity_scans: dict[tuple[Optional[int], Optional[int]], dict[str, CollectionKAnonymityViolations]] = {}
+        self._cubes: dict[str, FactSheetCube] = {}
+
+    @classmethod
+    def from_collection_facts(
+        cls,
+        collection_facts: Mapping[str, Iterable[dict[str, Any]]] | Iterable[tuple[str, Iterable[dict[str, Any]]]],
+        dimension_keys: Sequence[str] = FACT_DIMENSION_KEYS,
+    ) -> "FactSheetFrame":
+        """Build the frame from fact rows grouped by collection id.
+
+        Each dimension cell is normalized exactly once here.
+        """
+        items = collection_facts.items() if isinstance(collection_facts, Mapping) else collection_facts
+        facts: list[dict[str, Any]] = []
+        collection_ids: list[str] = []
+        for collection_id, rows in items:
+            for fact in rows:
+                facts.append(fact)
+                collection_ids.append(collection_id)
+
+        columns: dict[str, Any] = {
+            "collection_id": pd.Categorical(collection_ids),
+            "fact_id": [fact.get("id", "") for fact in facts],
+        }
+        for key in dimension_keys:
+            columns[key] = _dimension_categorical([_categorical_value(fact.get(key)) for fact in facts])
+        for field in COUNT_FIELDS:
+            columns[field] = pd.array([_numeric_count(fact.get(field)) for fact in facts], dtype="Int64")
+        return cls(pd.DataFrame(columns), facts=facts, dimension_keys=dimension_keys)
+
+    @classmethod
+    def from_table(
+        cls,
+        table: pd.DataFrame,
+        *,
+        collection_column: str,
+        id_column: Optional[str] = None,
+        dimension_keys: Sequence[str] = FACT_DIMENSION_KEYS,
+    ) -> "FactSheetFrame":
+        """Build a columnar frame from a tabular CollectionFacts upload/export.
+
+        Count columns are coerced with ``pd.to_numeric``; missing dimension
+        columns are treated as empty. Source fact dicts are not kept.
+        """
+        columns: dict[str, Any] = {
+            "collection_id": pd.Categorical(table[collection_column].astype(str).to_numpy()),
+            "fact_id": (
+                table[id_column].astype(str).to_numpy()
+                if id_column is not None
+                else np.arange(len(table)).astype(str)
+            ),
+        }
+        for key in dimension_keys:
+            values = table[key].tolist() if key in table.columns else [None] * len(table)
+            columns[key] = _dimension_categorical(
+                [None if pd.isna(value) else _categorical_value(value) for value in values]
+            )
+        for field in COUNT_FIELDS:
+            if field in table.columns:
+                numeric = pd.to_numeric(table[field], errors="coerce").to_numpy(dtype=float)
+                columns[field] = pd.array(
+                    [None if np.isnan(value) else int(value) for value in numeric],
+                    dtype="Int64",
+                )
+            else:
+                columns[field] = pd.array([None] * len(table), dtype="Int64")
+        return cls(pd.DataFrame(columns), dimension_keys=dimension_keys)
+
+    def _add_mask_columns(self) -> None:
+        """Derive star/fixed bitfields and star counts from the dimension codes."""
+        star_mask = np.zeros(len(self.frame), dtype=np.uint8)
+        fixed_mask = np.zeros(len(self.frame), dtype=np.uint8)
+        for bit, key in enumerate(self.dimension_keys):
+            column = self.frame[key]
+            if not isinstance(column.dtype, pd.CategoricalDtype):
+                column = pd.Series(_dimension_categorical(list(column)))
+                self.frame[key] = column
+            codes = column.cat.codes.to_numpy()
+            categories = column.cat.categories
+            star_code = categories.get_loc("*") if "*" in categories else -2
+            is_star = codes == star_code
+            star_mask |= is_star.astype(np.uint8) << bit
+            fixed_mask |= ((codes >= 0) & ~is_star).astype(np.uint8) << bit
+        popcount = np.array([bin(value).count("1") for value in range(1 << len(self.dimension_keys))], dtype=np.int8)
+        self.frame["star_mask"] = star_mask
+        self.frame["fixed_mask"] = fixed_mask
+        self.frame["star_count"] = popcount[star_mask]
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def collection_ids(self) -> list[str]:
+        """Return collection ids present in the frame, in load order."""
+        return list(self._positions_by_collection)
+
+    def positions(self, collection_id: str) -> np.ndarray:
+        """Return frame positions of the fact rows of one collection."""
+        return self._positions_by_collection.get(collection_id, np.empty(0, dtype=np.intp))
+
+    def get_collection_facts(self, collection_id: str) -> list[dict[str, Any]]:
+        """Return the source fact dicts of one collection."""
+        if self.facts is None:
+            return []
+        return [self.facts[position] for position in self.positions(collection_id)]
+
+    def get_cube(self, collection_id: str) -> FactSheetCube:
+        """Return the cached cube index of one collection's fact rows.
+
+        Cube keys reuse the normalized categorical values of the frame, so
+        dimension cells are not normalized again.
+        """
+        if collection_id not in self._cubes:
+            positions = self.positions(collection_id)
+            value_columns = []
+            for key in self.dimension_keys:
+                column = self.frame[key]
+                value_columns.append(
+                    [
+                        None if code < 0 else column.cat.categories[code]
+                        for code in column.cat.codes.to_numpy()[positions]
+                    ]
+                )
+            self._cubes[collection_id] = FactSheetCube(
+                self.get_collection_facts(collection_id),
+                self.dimension_keys,
+                keys=list(zip(*value_columns)),
+            )
+        return self._cubes[collection_id]
+
+    def all_star_mask(self) -> np.ndarray:
+        """Return a boolean mask of rows aggregated as ``*`` on every dimension."""
+        return self.frame["star_mask"].to_numpy() == self.all_star_mask_value
+
+    def all_but_one_star_mask(self, dimension_key: Optional[str] = None) -> np.ndarray:
+        """Return a mask of rows fixing exactly one dimension (optionally a given one)."""
+        star_mask = self.frame["star_mask"].to_numpy()
+        fixed_mask = self.frame["fixed_mask"].to_numpy()
+        keys = self.dimension_keys if dimension_key is None else (dimension_key,)
+        mask = np.zeros(len(self.frame), dtype=bool)
+        for key in keys:
+            bit = 1 << self.dimension_keys.index(key)
+            mask |= (star_mask == (self.all_star_mask_value ^ bit)) & ((fixed_mask & bit) != 0)
+        return mask
+
+    def populated_mask(self) -> np.ndarray:
+        """Return a mask of rows with a numeric sample or donor count."""
+        mask = np.zeros(len(self.frame), dtype=bool)
+        for field in COUNT_FIELDS:
+            mask |= self.frame[field].notna().to_numpy()
+        return mask
+
+    def get_count_values(self, count_field: str) -> np.ndarray:
+        """Return a count column parsed like the k-anonymity helpers (NaN = empty).
+
+        Source fact dicts are parsed with ``k_anonymity.parse_count_values`` so
+        numeric strings count too; columnar frames use their numeric columns.
+        """
+        if count_field not in self._count_values:
+            if self.facts is not None:
+                values = parse_count_values(fact.get(count_field) for fact in self.facts)
+            else:
+                values = self.frame[count_field].to_numpy(dtype=float, na_value=np.nan)
+            self._count_values[count_field] = values
+        return self._count_values[count_field]
+
+    def k_anonymity_violation_mask(self, k_limit: int) -> np.ndarray:
+        """Return a mask of rows whose donor count violates ``k_limit``-anonymity."""
+        return positive_below_k_mask(self.get_count_values("number_of_donors"), k_limit)
+
+    def scan_k_anonymity(
+        self,
+        *,
+        k_donors: Optional[int] = None,
+        k_samples: Optional[int] = None,
+    ) -> dict[str, CollectionKAnonymityViolations]:
+        """Return cached per-collection k-anonymity findings for the whole table.
+
+        See ``k_anonymity.scan_fact_k_anonymity``; small cells and
+        complementary disclosures are computed once per threshold pair.
+        """
+        cache_key = (k_donors, k_samples)
+        if cache_key not in self._k_anonymity_scans:
+            self._k_anonymity_scans[cache_key] = scan_fact_k_anonymity(
+                self,
+                k_donors=k_donors,
+                k_samples=k_samples,
+            )
+        return self._k_anonymity_scans[cache_key]
+
+    def get_k_anonymity_violations(self, collection_id: str, k_limit: int) -> list[dict[str, Any]]:
+        """Return source fact dicts of one collection that violate k-anonymity."""
+        positions = self.positions(collection_id)
+        if self.facts is None or not len(positions):
+            return []
+        violating = self.k_anonymity_violation_mask(k_limit)[positions]
+        return [self.facts[position] for position in positions[violating]]
+
+    def collection_summary(self) -> pd.DataFrame:
+        """Return per-collection aggregates computed with one groupby.
+
+        Columns: ``fact_rows``, ``all_star_rows``, ``all_star_position`` (frame
+        position of the first all-star row, -1 when none), ``donors_present``,
+        ``samples_total`` and ``star_rows_<n>`` for every star count ``n``.
+        """
+        if self._collection_summary is None:
+            frame = self.frame
+            all_star = self.all_star_mask()
+            positions = np.arange(len(frame))
+            work = pd.DataFrame(
+                {
+                    "collection_id": frame["collection_id"],
+                    "fact_rows": 1,
+                    "all_star_rows": all_star.astype(np.int64),
+                    "all_star_position": np.where(all_star, positions, len(frame)),
+                    "donors_present": (frame["number_of_donors"].fillna(0) > 0).to_numpy(),
+                    "samples_total": frame["number_of_samples"].fillna(0).to_numpy(dtype=np.int64),
+                }
+            )
+            for star_count in range(len(self.dimension_keys) + 1):
+                work[f"star_rows_{star_count}"] = (frame["star_count"].to_numpy() == star_count).astype(np.int64)
+            summary = work.groupby("collection_id", observed=True, sort=False).agg(
+                {
+                    "fact_rows": "sum",
+                    "all_star_rows": "sum",
+                    "all_star_position": "min",
+                    "donors_present": "any",
+                    "samples_total": "sum",
+                    **{f"star_rows_{n}": "sum" for n in range(len(self.dimension_keys) + 1)},
+                }
+            )
+            summary.loc[summary["all_star_position"] >= len(frame), "all_star_position"] = -1
+            summary.index = summary.index.astype(object)
+            self._collection_summary = summary
+        return self._collection_summary
+
+    def _collection_summary_row(self, collection_id: str) -> Optional[dict[str, Any]]:
+        if self._collection_summary_records is None:
+            self._collection_summary_records = self.collection_summary().to_dict("index")
+        return self._collection_summary_records.get(collection_id)
+
+    def get_star_count_histogram(self, collection_id: str) -> dict[int, int]:
+        """Return ``{star count: rows}`` for one collection (all counts present)."""
+        row = self._collection_summary_row(collection_id)
+        return {
+            star_count: 0 if row is None else int(row[f"star_rows_{star_count}"])
+            for star_count in range(len(self.dimension_keys) + 1)
+        }
+
+    def get_samples_total(self, collection_id: str) -> int:
+        """Return the sum of numeric number_of_samples over one collection's rows."""
+        row = self._collection_summary_row(collection_id)
+        return 0 if row is None else int(row["samples_total"])
+
+    def _unique_values_by_collection(self, mask: np.ndarray, dimension_key: str) -> dict[str, list[Any]]:
+        """Return distinct dimension values per collection among masked rows."""
+        column = self.frame[dimension_key]
+        value_categories = column.cat.categories
+        collection_codes = self.frame["collection_id"].cat.codes.to_numpy().astype(np.int64)[mask]
+        value_codes = column.cat.codes.to_numpy().astype(np.int64)[mask]
+        pairs = np.sort(pd.unique(collection_codes * len(value_categories) + value_codes))
+        pair_collections = pairs // len(value_categories)
+        pair_values = pairs % len(value_categories)
+        boundaries = np.flatnonzero(np.diff(pair_collections)) + 1
+        collection_categories = self.frame["collection_id"].cat.categories
+        value_list = list(value_categories)
+        result: dict[str, list[Any]] = {}
+        for collection_values, collection_code in zip(
+            np.split(pair_values, boundaries),
+            pair_collections[np.r_[0, boundaries]] if len(pairs) else [],
+        ):
+            result[collection_categories[collection_code]] = [value_list[code] for code in collection_values]
+        return result
+
+    def _build_dimension_values(self) -> dict[str, dict[str, list[Any]]]:
+        fixed_mask = self.frame["fixed_mask"].to_numpy()
+        result: dict[str, dict[str, list[Any]]] = {}
+        for bit, key in enumerate(self.dimension_keys):
+            for collection_id, values in self._unique_values_by_collection((fixed_mask & (1 << bit)) != 0, key).items():
+                result.setdefault(collection_id, {})[key] = sorted(values)
+        return result
+
+    def get_dimension_values(self, collection_id: str) -> dict[str, list[Any]]:
+        """Return sorted non-star values per dimension for one collection.
+
+        Equivalent to ``fact_sheet_utils.get_dimension_values`` over the
+        collection's rows.
+        """
+        if self._dimension_values is None:
+            self._dimension_values = self._build_dimension_values()
+        values = self._dimension_values.get(collection_id, {})
+        return {key: list(values.get(key, [])) for key in self.dimension_keys}
+
+    def analyze_collection(self, collection: dict[str, Any]) -> dict[str, Any]:
+        """Return the same summary as ``fact_sheet_utils.analyze_collection_fact_sheet``."""
+        row = self._collection_summary_row(collection["id"])
+        fact_rows = 0 if row is None else int(row["fact_rows"])
+        all_star_rows = 0 if row is None else int(row["all_star_rows"])
+        all_star_row = None
+        if all_star_rows == 1:
+            position = int(row["all_star_position"])
+            if self.facts is not None:
+                all_star_row = self.facts[position]
+            else:
+                all_star_row = {
+                    "id": self.frame.at[position, "fact_id"],
+                    **{
+                        field: (None if pd.isna(self.frame.at[position, field]) else int(self.frame.at[position, field]))
+                        for field in COUNT_FIELDS
+                    },
+                }
+        return build_fact_sheet_analysis(
+            collection,
+            fact_rows=fact_rows,
+            all_star_rows=all_star_rows,
+            all_star_row=all_star_row,
+            donors_present=False if row is None else bool(row["donors_present"]),
+        )
+
+
@@ -5,9 +5,9 @@
 from collections import defaultdict
 from typing import Any
 
+import numpy as np
 import pandas as pd
 
-from fact_sheet_utils import FACT_DIMENSION_KEYS, normalize_fact_dimension_value
 
 
 COUNT_FIELDS = ("number_of_samples", "number_of_donors")
@@ -264,55 +264,50 @@ def build_fact_sheet_summary(
     all-but-one row per collection and value for per-value marginal totals.
     """
     collections = _unique_collections(collections)
+    fact_sheet_frame = directory.getFactSheetFrame()
+    collection_ids = [collection["id"] for collection in collections]
+    collection_positions = [fact_sheet_frame.positions(collection_id) for collection_id in collection_ids]
+    collections_with_fact_sheets = {
+        collection_id
+        for collection_id, positions in zip(collection_ids, collection_positions)
+        if len(positions)
+    }
+    positions = np.concatenate([np.empty(0, dtype=np.intp), *collection_positions])
+    row_collections = np.repeat(
+        np.arange(len(collections)),
+        [len(positions_for_collection) for positions_for_collection in collection_positions],
+    )
+    populated = fact_sheet_frame.populated_mask()[positions]
+    all_star = fact_sheet_frame.all_star_mask()[positions] & populated
+    all_but_one = fact_sheet_frame.all_but_one_star_mask()[positions] & populated
+    fixed_masks = fact_sheet_frame.frame["fixed_mask"].to_numpy()[positions]
+    fixed_dimension_by_bit = {
+        1 << bit: key for bit, key in enumerate(fact_sheet_frame.dimension_keys)
+    }
+
     all_star_rows = []
     all_but_one_rows = []
-    collections_with_fact_sheets = set()
     collections_with_populated_all_star_rows = set()
     collections_with_populated_all_but_one_star_rows = set()
-
-    for collection in collections:
-        collection_id = collection["id"]
-        facts = directory.getCollectionFacts(collection_id)
-        if not facts:
+    for index in np.flatnonzero(all_star | all_but_one):
+        collection = collections[row_collections[index]]
+        fact = fact_sheet_frame.facts[positions[index]]
+        if all_star[index]:
+            collections_with_populated_all_star_rows.add(collection["id"])
+            all_star_rows.append(_build_all_star_row(collection, fact))
             continue
-        collections_with_fact_sheets.add(collection_id)
-        for fact in facts:
-            normalized_dimensions = {
-                key: normalize_fact_dimension_value(fact.get(key))
-                for key in FACT_DIMENSION_KEYS
-            }
-            if all(value == "*" for value in normalized_dimensions.values()):
-                if _is_populated_fact_row(fact):
-                    collections_with_populated_all_star_rows.add(collection_id)
-                    all_star_rows.append(_build_all_star_row(collection, fact))
-                continue
-
-            fixed_dimensions = [
-                key
-                for key, value in normalized_dimensions.items()
-                if value not in (None, "*")
-            ]
-            if len(fixed_dimensions) != 1:
-                continue
-            fixed_dimension = fixed_dimensions[0]
-            if not all(
-                key == fixed_dimension or normalized_dimensions[key] == "*"
-                for key in FACT_DIMENSION_KEYS
-            ):
-                continue
-            if not _is_populated_fact_row(fact):
-                continue
-            value_id, value_label = _value_id_and_label(fact.get(fixed_dimension))
-            collections_with_populated_all_but_one_star_rows.add(collection_id)
-            all_but_one_rows.append(
-                _build_all_but_one_row(
-                    collection,
-                    fact,
-                    fixed_dimension,
-                    value_id,
-                    value_label,
-                )
+        fixed_dimension = fixed_dimension_by_bit[int(fixed_masks[index])]
+        value_id, value_label = _value_id_and_label(fact.get(fixed_dimension))
+        collections_with_populated_all_but_one_star_rows.add(collection["id"])
+        all_but_one_rows.append(
+            _build_all_but_one_row(
+                collection,
+                fact,
+                fixed_dimension,
+                value_id,
+                value_label,
             )
+        )
 
     (
         margin_collections_with_single_all_star_total,
@@ -2,10 +2,17 @@
 
 """Helpers for analysing collection fact sheets and aggregate rows."""
 
-from typing import Any
+from typing import Any, Optional
 
 
 FACT_DIMENSION_KEYS = ("sex", "age_range", "sample_type", "disease")
+# Dimensions whose values are mutually exclusive per counted unit: a sample has
+# one sex, age range and material type, while a donor may contribute samples
+# at several ages or of several types, and diagnoses may overlap for both.
+ADDITIVE_MARGIN_DIMENSIONS = {
+    "number_of_samples": ("sex", "age_range", "sample_type"),
+    "number_of_donors": ("sex",),
+}
 
 
 def normalize_fact_dimension_value(value: Any) -> Any:
@@ -61,52 +68,146 @@ def get_dimension_values(
     return {key: sorted(values[key]) for key in dimension_keys}
 
 
+class FactSheetCube:
+    """Index of one collection's fact rows keyed by normalized dimension tuples.
+
+    Keys are ``(sex, age_range, sample_type, disease)`` tuples (in
+    ``dimension_keys`` order) of normalized values with ``*`` for aggregated
+    dimensions, so all-star, all-but-one-star and arbitrary partial aggregate
+    lookups are dictionary reads instead of scans over the fact list.
+    """
+
+    def __init__(
+        self,
+        facts: list[dict[str, Any]],
+        dimension_keys=FACT_DIMENSION_KEYS,
+        keys: Optional[list[tuple[Any, ...]]] = None,
+    ):
+        self.dimension_keys = tuple(dimension_keys)
+        if keys is None:
+            keys = [
+                tuple(normalize_fact_dimension_value(fact.get(key)) for key in self.dimension_keys)
+                for fact in facts
+            ]
+        self.cells: dict[tuple[Any, ...], list[dict[str, Any]]] = {}
+        self.margins: dict[str, dict[Any, list[dict[str, Any]]]] = {
+            key: {} for key in self.dimension_keys
+        }
+        for fact, cell_key in zip(facts, keys):
+            self.cells.setdefault(cell_key, []).append(fact)
+            non_star_positions = [index for index, value in enumerate(cell_key) if value != "*"]
+            if len(non_star_positions) == 1:
+                dimension = self.dimension_keys[non_star_positions[0]]
+                self.margins[dimension].setdefault(cell_key[non_star_positions[0]], []).append(fact)
+
+    def cell_key(self, **dimension_values: Any) -> tuple[Any, ...]:
+        """Return the cube key for the given dimension values (others are ``*``)."""
+        unknown = set(dimension_values) - set(self.dimension_keys)
+        if unknown:
+            raise ValueError(f"Unknown fact dimensions: {', '.join(sorted(unknown))}")
+        return tuple(
+            normalize_fact_dimension_value(dimension_values.get(key, "*"))
+            for key in self.dimension_keys
+        )
+
+    def get_rows(self, **dimension_values: Any) -> list[dict[str, Any]]:
+        """Return rows of the partial aggregate fixing only the given dimensions."""
+        return self.cells.get(self.cell_key(**dimension_values), [])
+
+    def get_all_star_rows(self) -> list[dict[str, Any]]:
+        """Return rows aggregated as ``*`` on every dimension."""
+        return self.get_rows()
+
+    def get_one_star_rows(self, dimension_key: str, value: Any) -> list[dict[str, Any]]:
+        """Return all-but-one-star rows fixing ``dimension_key`` to ``value``."""
+        return self.margins[dimension_key].get(normalize_fact_dimension_value(value), [])
+
+    def get_margin_sums(self, dimension_key: str, count_field: str) -> dict[Any, int]:
+        """Return per-value sums of ``count_field`` over all-but-one-star rows."""
+        sums = {}
+        for value, rows in self.margins[dimension_key].items():
+            if value is None:
+                continue
+            counts = [
+                row[count_field]
+                for row in rows
+                if isinstance(row.get(count_field), int) and not isinstance(row.get(count_field), bool)
+            ]
+            if counts:
+                sums[value] = sum(counts)
+        return sums
+
+    def check_margin_additivity(
+        self,
+        count_field: str,
+        dimension_keys,
+    ) -> list[dict[str, Any]]:
+        """Return margins whose summed counts exceed the single all-star total.
+
+        Only meaningful for dimensions whose values are mutually exclusive for
+        ``count_field``; margins summing below the total are not reported
+        because suppressed small cells legitimately leave gaps.
+        """
+        all_star_rows = self.get_all_star_rows()
+        if len(all_star_rows) != 1:
+            return []
+        total = all_star_rows[0].get(count_field)
+        if not isinstance(total, int) or isinstance(total, bool):
+            return []
+        mismatches = []
+        for dimension_key in dimension_keys:
+            margin_sums = self.get_margin_sums(dimension_key, count_field)
+            margin_total = sum(margin_sums.values())
+            if margin_total > total:
+                mismatches.append(
+                    {
+                        "dimension": dimension_key,
+                        "count_field": count_field,
+                        "margin_total": margin_total,
+                        "all_star_total": total,
+                        "values": margin_sums,
+                    }
+                )
+        return mismatches
+
+
 def get_matching_one_star_rows(
     facts: list[dict[str, Any]],
     dimension_key: str,
     expected_value: Any,
     dimension_keys=FACT_DIMENSION_KEYS,
 ) -> list[dict[str, Any]]:
-    """Return all rows aggregated on every dimension except one expected value."""
-    normalized_expected = normalize_fact_dimension_value(expected_value)
-    rows = []
-    for fact in facts:
-        normalized_value = normalize_fact_dimension_value(fact.get(dimension_key))
-        if normalized_value != normalized_expected:
-            continue
-        if count_star_dimensions(fact, dimension_keys) != len(dimension_keys) - 1:
-            continue
-        if all(
-            key == dimension_key
-            or normalize_fact_dimension_value(fact.get(key)) == "*"
-            for key in dimension_keys
-        ):
-            rows.append(fact)
-    return rows
+    """Return all rows aggregated on every dimension except one expected value.
 
+    Callers doing many lookups on the same facts should build one
+    ``FactSheetCube`` and use ``get_one_star_rows`` instead.
+    """
+    return FactSheetCube(facts, dimension_keys).get_one_star_rows(dimension_key, expected_value)
 
-def analyze_collection_fact_sheet(
+
+def build_fact_sheet_analysis(
     collection: dict[str, Any],
-    facts: list[dict[str, Any]],
-    dimension_keys=FACT_DIMENSION_KEYS,
+    *,
+    fact_rows: int,
+    all_star_rows: int,
+    all_star_row: Optional[dict[str, Any]],
+    donors_present: bool,
 ) -> dict[str, Any]:
-    """Summarize aggregate-row consistency for one collection fact sheet."""
-    all_star_rows = get_all_star_rows(facts, dimension_keys)
-    all_star_row = all_star_rows[0] if len(all_star_rows) == 1 else None
+    """Return the aggregate-row consistency summary from precomputed counts."""
     all_star_samples = None if all_star_row is None else all_star_row.get("number_of_samples")
     all_star_donors = None if all_star_row is None else all_star_row.get("number_of_donors")
     collection_size = collection.get("size")
     collection_donors = collection.get("number_of_donors")
 
     warnings = []
-    if facts and len(all_star_rows) != 1:
+    if fact_rows and all_star_rows != 1:
         warnings.append(
             {
                 "code": "missing_all_star" if not all_star_rows else "multiple_all_star",
                 "message": (
-                    f"Expected exactly one all-star aggregate row, found {len(all_star_rows)}."
+                    f"Expected exactly one all-star aggregate row, found {all_star_rows}."
                 ),
-                "actual": len(all_star_rows),
+                "actual": all_star_rows,
                 "expected": 1,
             }
         )
@@ -137,14 +238,9 @@ def analyze_collection_fact_sheet(
                 }
             )
 
-    donors_present = any(
-        isinstance(fact.get("number_of_donors"), int) and fact["number_of_donors"] > 0
-        for fact in facts
-    )
-
     return {
-        "fact_rows": len(facts),
-        "all_star_rows": len(all_star_rows),
+        "fact_rows": fact_rows,
+        "all_star_rows": all_star_rows,
         "all_star_row": all_star_row,
         "all_star_number_of_samples": all_star_samples,
         "all_star_number_of_donors": all_star_donors,
@@ -153,3 +249,28 @@ def analyze_collection_fact_sheet(
         "warnings": warnings,
         "donors_present": donors_present,
     }
+
+
+def analyze_collection_fact_sheet(
+    collection: dict[str, Any],
+    facts: list[dict[str, Any]],
+    dimension_keys=FACT_DIMENSION_KEYS,
+) -> dict[str, Any]:
+    """Summarize aggregate-row consistency for one collection fact sheet.
+
+    Bulk callers should prefer ``FactSheetFrame.analyze_collection`` from
+    ``fact_sheet_frame.py``, which returns the same summary from one
+    vectorized pass over all facts.
+    """
+    all_star_rows = get_all_star_rows(facts, dimension_keys)
+    donors_present = any(
+        isinstance(fact.get("number_of_donors"), int) and fact["number_of_donors"] > 0
+        for fact in facts
+    )
+    return build_fact_sheet_analysis(
+        collection,
+        fact_rows=len(facts),
+        all_star_rows=len(all_star_rows),
+        all_star_row=all_star_rows[0] if len(all_star_rows) == 1 else None,
+        donors_present=donors_present,
+    )
@@ -4,10 +4,11 @@ from __future__ import annotations
 
 import hashlib
 import json
-from dataclasses import asdict, dataclass, field
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field, fields
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Iterable, Iterator, Optional
 
 from customwarnings import DataCheckEntityType, DataCheckWarning
 from nncontacts import NNContacts
@@ -56,7 +57,10 @@ class EntityFixProposal:
         return payload
 
     def finalize_checksum(self) -> None:
-        self.update_checksum = compute_checksum(self.without_checksum())
+        # shallow field map: serializes like without_checksum() without the deep copy
+        self.update_checksum = compute_checksum(
+            {item.name: getattr(self, item.name) for item in fields(self) if item.name != "update_checksum"}
+        )
 
     def to_dict(self) -> dict[str, Any]:
         if not self.update_checksum:
@@ -123,21 +127,20 @@ def attach_warning_context(proposal: EntityFixProposal, warning: DataCheckWarnin
 
 
 def _proposal_merge_key(proposal: EntityFixProposal) -> tuple[Any, ...]:
-    payload = proposal.without_checksum()
     return (
-        payload["update_id"],
-        payload["module"],
-        payload["entity_type"],
-        payload["entity_id"],
-        payload["field"],
-        payload["mode"],
-        payload["confidence"],
-        json.dumps(payload["current_value_at_export"], sort_keys=True, ensure_ascii=True),
-        json.dumps(payload["expected_current_value"], sort_keys=True, ensure_ascii=True),
-        json.dumps(payload["proposed_value"], sort_keys=True, ensure_ascii=True),
-        payload["replace_required"],
-        payload["blocking_reason"],
-        payload["exclusive_group"],
+        proposal.update_id,
+        proposal.module,
+        proposal.entity_type,
+        proposal.entity_id,
+        proposal.field,
+        proposal.mode,
+        proposal.confidence,
+        json.dumps(proposal.current_value_at_export, sort_keys=True, ensure_ascii=True),
+        json.dumps(proposal.expected_current_value, sort_keys=True, ensure_ascii=True),
+        json.dumps(proposal.proposed_value, sort_keys=True, ensure_ascii=True),
+        proposal.replace_required,
+        proposal.blocking_reason,
+        proposal.exclusive_group,
     )
 
 
@@ -153,6 +156,138 @@ def _merge_term_explanations(left: list[dict[str, str]], right: Iterable[dict[st
     return merged
 
 
+def hashable_value(value: Any) -> Any:
+    """Return ``value`` or, for unhashable JSON values, a canonical JSON string of it."""
+    try:
+        hash(value)
+    except TypeError:
+        return json.dumps(value, sort_keys=True, ensure_ascii=True, default=str)
+    return value
+
+
+def unique_in_order(values: Iterable[Any]) -> list[Any]:
+    """Return ``values`` without repeats, keeping the first occurrence of each."""
+    seen = set()
+    unique = []
+    for value in values:
+        key = hashable_value(value)
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(value)
+    return unique
+
+
+def proposal_module_keys(proposal: EntityFixProposal) -> set[str]:
+    """Return the module names a proposal answers to (its module and source check prefixes)."""
+    keys = {proposal.module}
+    for check_id in proposal.source_check_ids:
+        if ":" in check_id:
+            keys.add(check_id.split(":", 1)[0])
+    return keys
+
+
+class FixProposalStore:
+    """Fix proposals indexed for filtering and per-field merging.
+
+    Proposals keep their insertion order. ``groups()`` buckets them by
+    ``(entity_id, field)`` so merges walk each group once, and ``select()``
+    filters by intersecting position indexes over entity id, staging area
+    (upper-cased), module (see ``proposal_module_keys``), confidence, update
+    id and source check id. The grouping and each index are built on first
+    use and kept up to date by ``add()``.
+    """
+
+    def __init__(self, proposals: Iterable[EntityFixProposal] = ()):
+        self.proposals: list[EntityFixProposal] = list(proposals)
+        self._indexes: dict[str, dict[str, list[int]]] = {}
+        self._groups: Optional[dict[tuple[str, str], list[EntityFixProposal]]] = None
+
+    @classmethod
+    def from_plan(cls, payload: dict[str, Any]) -> "FixProposalStore":
+        """Return a store of the ``updates`` of a loaded fix-plan payload."""
+        return cls(EntityFixProposal.from_dict(update) for update in payload.get("updates", []))
+
+    def __len__(self) -> int:
+        return len(self.proposals)
+
+    def __iter__(self) -> Iterator[EntityFixProposal]:
+        return iter(self.proposals)
+
+    def add(self, proposal: EntityFixProposal) -> None:
+        position = len(self.proposals)
+        self.proposals.append(proposal)
+        if self._groups is not None:
+            self._groups.setdefault((proposal.entity_id, proposal.field), []).append(proposal)
+        for name, index in self._indexes.items():
+            for value in self._index_values(name, proposal):
+                index[value].append(position)
+
+    @staticmethod
+    def _index_values(name: str, proposal: EntityFixProposal) -> Iterable[str]:
+        if name == "staging_area":
+            return (proposal.staging_area.upper(),)
+        if name == "module":
+            return proposal_module_keys(proposal)
+        if name == "check_id":
+            return set(proposal.source_check_ids)
+        return (getattr(proposal, name),)
+
+    def _get_index(self, name: str) -> dict[str, list[int]]:
+        # each index is built on its first use, so merge-only stores skip indexing
+        if name not in self._indexes:
+            index: dict[str, list[int]] = defaultdict(list)
+            for position, proposal in enumerate(self.proposals):
+                for value in self._index_values(name, proposal):
+                    index[value].append(position)
+            self._indexes[name] = index
+        return self._indexes[name]
+
+    def select(
+        self,
+        *,
+        entity_ids: Optional[Iterable[str]] = None,
+        staging_areas: Optional[Iterable[str]] = None,
+        modules: Optional[Iterable[str]] = None,
+        confidences: Optional[Iterable[str]] = None,
+        update_ids: Optional[Iterable[str]] = None,
+        check_ids: Optional[Iterable[str]] = None,
+    ) -> "FixProposalStore":
+        """Return a store of the proposals matching every given filter, in order.
+
+        A filter matches when the proposal has any of the given values; ``None``
+        disables it. Staging areas compare case-insensitively.
+        """
+        filters = {
+            "entity_id": entity_ids,
+            "staging_area": None if staging_areas is None else {value.upper() for value in staging_areas},
+            "module": modules,
+            "confidence": confidences,
+            "update_id": update_ids,
+            "check_id": check_ids,
+        }
+        positions: Optional[set[int]] = None
+        for name, values in filters.items():
+            if values is None:
+                continue
+            index = self._get_index(name)
+            matched: set[int] = set()
+            for value in values:
+                matched.update(index.get(value, ()))
+            positions = matched if positions is None else positions & matched
+        if positions is None:
+            return type(self)(self.proposals)
+        return type(self)(self.proposals[position] for position in sorted(positions))
+
+    def groups(self) -> dict[tuple[str, str], list[EntityFixProposal]]:
+        """Return ``{(entity_id, field): proposals}`` in first-seen order."""
+        if self._groups is None:
+            self._groups = {}
+            for proposal in self.proposals:
+                self._groups.setdefault((proposal.entity_id, proposal.field), []).append(proposal)
+        return {key: list(proposals) for key, proposals in self._groups.items()}
+
+
 def _is_entity_suppressed(
     suppressions: dict[str, dict[str, str]] | None,
     check_id: str,
@@ -191,6 +326,7 @@ def collect_fix_proposals(
 ) -> list[EntityFixProposal]:
     """Return deduplicated fix proposals collected from warnings."""
     merged: dict[tuple[Any, ...], EntityFixProposal] = {}
+    seen_sources: dict[tuple[Any, ...], tuple[set, set, set, set]] = {}
     for warning in warnings:
         for raw_proposal in getattr(warning, "fix_proposals", []) or []:
             proposal = raw_proposal if isinstance(raw_proposal, EntityFixProposal) else EntityFixProposal.from_dict(raw_proposal)
@@ -202,23 +338,38 @@ def collect_fix_proposals(
             if existing is None:
                 merged[key] = proposal
                 continue
-            for check_id in proposal.source_check_ids:
-                if check_id not in existing.source_check_ids:
-                    existing.source_check_ids.append(check_id)
-            for message in proposal.source_warning_messages:
-                if message not in existing.source_warning_messages:
-                    existing.source_warning_messages.append(message)
-            for action in proposal.source_warning_actions:
-                if action not in existing.source_warning_actions:
-                    existing.source_warning_actions.append(action)
-            existing.term_explanations = _merge_term_explanations(
-                existing.term_explanations,
-                proposal.term_explanations,
-            )
-            existing.finalize_checksum()
+            seen = seen_sources.get(key)
+            if seen is None:
+                # first duplicate: stop sharing the explanation list with the warning's proposal
+                existing.term_explanations = _merge_term_explanations(existing.term_explanations, [])
+                seen = seen_sources[key] = (
+                    set(existing.source_check_ids),
+                    set(existing.source_warning_messages),
+                    set(existing.source_warning_actions),
+                    {(item.get("term_id"), item.get("label")) for item in existing.term_explanations},
+                )
+            seen_check_ids, seen_messages, seen_actions, seen_terms = seen
+            _extend_unique(existing.source_check_ids, seen_check_ids, proposal.source_check_ids)
+            _extend_unique(existing.source_warning_messages, seen_messages, proposal.source_warning_messages)
+            _extend_unique(existing.source_warning_actions, seen_actions, proposal.source_warning_actions)
+            for item in proposal.term_explanations:
+                term_key = (item.get("term_id"), item.get("label"))
+                if term_key not in seen_terms:
+                    seen_terms.add(term_key)
+                    existing.term_explanations.append(dict(item))
+    # duplicates only extend source lists, so checksums are refreshed once per merged proposal
+    for key in seen_sources:
+        merged[key].finalize_checksum()
     return list(merged.values())
 
 
+def _extend_unique(target: list[str], seen: set[str], values: Iterable[str]) -> None:
+    for value in values:
+        if value not in seen:
+            seen.add(value)
+            target.append(value)
+
+
 def build_fix_plan_payload(
     warnings: Iterable[DataCheckWarning],
     *,
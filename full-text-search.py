@@ -12,12 +12,18 @@ import os
 import os.path
 
 from directory import Directory
+from full_text_search_utils import (
+    FACET_FIELDS,
+    INDEX_ENTITY_TYPES,
+    build_filter_query,
+    build_index,
+    index_schema_matches,
+    parse_fuzzy_query,
+    parse_search_query,
+    search_index,
+)
 
-from whoosh.index import create_in, open_dir
-from whoosh.fields import *
-from whoosh.analysis import *
-from whoosh.query import *
-from whoosh.support.charset import accent_map
+from whoosh.index import open_dir
 from whoosh.util import filelock
 
 from cli_common import (
@@ -31,7 +37,7 @@ from cli_common import (
 )
 
 cachesList = ['directory', 'index']
-typeList = ['COLLECTION', 'BIOBANK', 'CONTACT', 'NETWORK']
+typeList = list(INDEX_ENTITY_TYPES)
 
 pp = pprint.PrettyPrinter(indent=4)
 
@@ -46,8 +52,17 @@ add_withdrawn_scope_arguments(
 parser.add_argument('-i', '--print-ids-only', dest='printIdsOnly', action='store_true', help='print only matching IDs instead of search hits')
 add_purge_cache_arguments(parser, cachesList)
 parser.add_argument('--limit-types', dest='limitTypes', nargs='+', action='extend', choices=typeList, help='return only specific types')
+parser.add_argument('--country', dest='countries', action='append', help='return only entities from the given country code (repeatable or comma-separated)')
+parser.add_argument('--staging-area', dest='stagingAreas', action='append', help='return only entities from the given staging area/national node (repeatable or comma-separated)')
+parser.add_argument('--withdrawn-state', dest='withdrawnState', choices=['active', 'withdrawn'], help='return only active or only withdrawn entities (useful together with -w)')
+parser.add_argument('--page', dest='page', type=int, help='return only the given 1-based page of results instead of all hits')
+parser.add_argument('--page-size', dest='pageSize', type=int, default=20, help='number of hits per page used with --page (default: 20)')
+parser.add_argument('--fuzzy', dest='fuzzy', action='store_true', help='fuzzy name search: rank near-misspelled person/institution names using phonetic and trigram index fields')
+parser.add_argument('--facets', dest='printFacets', action='store_true', help='print per-type/country/staging-area/withdrawn counts of all matching entities')
+parser.add_argument('-j', '--index-jobs', dest='indexJobs', type=int, default=1, help='number of processes used when (re)building the index; 0 means all available CPU cores')
+parser.add_argument('--index-multisegment', dest='indexMultisegment', action='store_true', help='with parallel index builds, keep one index segment per process instead of merging them (faster build, slightly slower search)')
 parser.add_argument('searchQuery', nargs='+', help='search query')
-parser.set_defaults(purgeCaches=[], limitTypes=[])
+parser.set_defaults(purgeCaches=[], limitTypes=[], countries=[], stagingAreas=[])
 args = parser.parse_args()
 
 configure_logging(args)
@@ -107,10 +122,24 @@ def _patch_whoosh_lockf():
     filestore.FileLock = LockfLock
 
 
+def _index_needs_rebuild():
+    if 'index' in args.purgeCaches or not os.path.exists(indexdir):
+        return True
+    try:
+        existing_ix = open_dir(indexdir)
+    except Exception as e:
+        log.info('Unable to open existing index, rebuilding: %s' % e)
+        return True
+    if not index_schema_matches(existing_ix):
+        log.info('Existing index uses an outdated schema, rebuilding')
+        return True
+    return False
+
+
 # purging directory cache means the index cache should be purged as well - data has to be refreshed in the index, too
 if 'directory' in args.purgeCaches and 'index' not in args.purgeCaches:
         args.purgeCaches.append('index')
-if 'index' in args.purgeCaches or not os.path.exists(indexdir):
+if _index_needs_rebuild():
     _patch_whoosh_lockf()
     dir = Directory(**build_directory_kwargs(args, pp=pp))
 
@@ -120,101 +149,37 @@ if 'index' in args.purgeCaches or not os.path.exists(indexdir):
     if not os.path.exists(indexdir):
         os.makedirs(indexdir)
 
-    my_ana = StemmingAnalyzer() | CharsetFilter(accent_map)
-    # this tokenizer allows for searching on full IDs as well as on components between : chars
-    # however, in search there is a problem with searching for : chars - escaping does not work, hence introduced the hack below to replace : with ?
-    # uncommenting LoggingFilter() and running the script with -d allows for debugging the tokenization
-    my_id_ana = RegexTokenizer(expression=re.compile('[^ ]+')) | LowercaseFilter() | TeeFilter(PassFilter(), IntraWordFilter(delims=u':',splitnums=False) | StopFilter(stoplist=frozenset(['bbmri-eric', 'id', 'contactid', 'networkid', 'collection']))) # | LoggingFilter()
-    schema = Schema(id=TEXT(stored=True,analyzer=my_id_ana), type=STORED, name=TEXT(stored=True,analyzer=my_ana), acronym=ID, description=TEXT(analyzer=my_ana), address=TEXT(analyzer=my_ana), phone=TEXT, email=TEXT, juridical_person=TEXT(analyzer=my_ana), bioresource_reference=TEXT, head_id=TEXT(analyzer=my_id_ana), head_name=TEXT(analyzer=my_ana), contact_id=TEXT(analyzer=my_id_ana), contact_name=TEXT(analyzer=my_ana), also_known=TEXT(analyzer=my_ana))
-    ix = create_in(indexdir, schema)
-    writer = ix.writer()
-
-    def getContact(contactId):
-        contact = None
-        try:
-            contact = dir.getContact(contactId)
-        except:
-            pass
-        return contact
-
-
-    def getContactFullName(entity):
-        if entity is None:
-            return ""
-        else:
-            return " ".join(filter(None,[entity.get('title_before_name'), entity.get('first_name'), entity.get('last_name'), entity.get('title_after_name')]))
-
-    def getAlsoKnown(entity):
-        # TODO: this is a temporary hack - also_known needs to be properly handled by the Directory class and made accessible here
-        also_known = []
-        if entity.get('also_known'):
-            for ak in entity.get('also_known'):
-                also_known.append(ak["id"])
-        if also_known:
-            return("\n".join(also_known))
-        else:
-            return("")
-
-    for collection in dir.getCollections():
-        log.debug("Analyzing collection " + collection['id'])
-        biobankId = dir.getCollectionBiobankId(collection['id'])
-        biobank = dir.getBiobankById(biobankId)
-        if biobank is None:
-            log.warning("Biobank %s not found for collection %s, skipping" % (biobankId, collection['id']))
-            continue
-        contactId = None
-        if 'contact' in collection:
-            contactId = collection['contact']['id']
-        elif 'contact' in biobank:
-            contactId = biobank['contact']['id']
-        writer.add_document(id=collection['id'], type=u"COLLECTION", name=collection.get('name'), description=collection.get('description'), acronym=collection.get('acronym'), bioresource_reference=collection.get('bioresource_reference'), contact_id=contactId, contact_name=getContactFullName(getContact(contactId)))
-
-    for biobank in dir.getBiobanks():
-        log.debug("Analyzing biobank " + biobank['id'])
-        contactId = None
-        if 'contact' in biobank:
-            contactId = biobank['contact']['id']
-        headId = None
-        if 'head' in biobank:
-            headId = biobank['head']['id']
-        writer.add_document(id=biobank['id'], type=u"BIOBANK", name=biobank.get('name'), description=biobank.get('description'), acronym=biobank.get('acronym'), juridical_person=biobank.get('juridical_person'), bioresource_reference=biobank.get('bioresource_reference'), head_id=headId, head_name=getContactFullName(getContact(headId)), contact_id=contactId, contact_name=getContactFullName(getContact(contactId)))
-
-    for contact in dir.getContacts():
-        log.debug("Analyzing contact " + contact['id'])
-        writer.add_document(id=contact['id'], type=u"CONTACT", name=getContactFullName(contact), phone=contact.get('phone'), email=contact.get('email'), address=", ".join(filter(None,[contact.get('address'),contact.get('city'),contact.get('zip')])))
-    
-    for network in dir.getNetworks():
-        log.debug("Analyzing network " + network['id'])
-        contactId = None
-        if 'contact' in network:
-            contactId = network['contact']['id']
-        try:
-            writer.add_document(id=network['id'], type=u"NETWORK", name=network.get('name'), description=network.get('description'), acronym=network.get('acronym'), contact_id=contactId, contact_name=getContactFullName(getContact(contactId)), also_known=getAlsoKnown(network))
-        except Exception as e:
-            pp.pprint(network)
-            raise e
-
-    writer.commit()
-
-else:
-    ix = open_dir(indexdir)
-
-matchingCollections = {}
-matchingBiobanks = {}
-matchingContacts = {}
-
-from whoosh.qparser import QueryParser,MultifieldParser
+    timings = build_index(dir, indexdir, procs=args.indexJobs, multisegment=args.indexMultisegment)
+    log.info('Index build times: ' + ", ".join("%s=%0.3fs" % (k, v) for k, v in timings.items()))
+
+ix = open_dir(indexdir)
+
 with ix.searcher() as searcher:
-    searchq = " ".join(args.searchQuery)
-    # XXX: this is a hack workaround around escaping of : character that does not work properly
-    searchq = re.sub(r':', '?', searchq)
-    query = MultifieldParser(["id", "name", "description", "acronym", "phone", "email", "juridical_person", "bioresource_reference", "address", "contact_id", "contact_name", "head_id", "head_name", "also_known"], ix.schema).parse(searchq)
-    results = searcher.search(query, limit=None)
-    for r in results:
-        if args.limitTypes:
-            if r["type"] not in args.limitTypes:
-                continue
+    if args.fuzzy:
+        query = parse_fuzzy_query(ix, " ".join(args.searchQuery))
+    else:
+        query = parse_search_query(ix, " ".join(args.searchQuery))
+    filter_query = build_filter_query(
+        types=args.limitTypes,
+        countries=args.countries,
+        staging_areas=args.stagingAreas,
+        withdrawn=None if args.withdrawnState is None else args.withdrawnState == 'withdrawn',
+    )
+    hits, total, facets = search_index(
+        searcher,
+        query,
+        filter_query=filter_query,
+        page=args.page,
+        page_len=args.pageSize,
+        facet_fields=FACET_FIELDS if args.printFacets else (),
+    )
+    if args.page is not None:
+        log.info("Showing page %d (%d hits per page) of %d matching entities" % (args.page, args.pageSize, total))
+    for hit in hits:
         if args.printIdsOnly:
-            print(r["id"])
+            print(hit["id"])
         else:
-            print(r)
+            print(hit)
+    if args.printFacets:
+        for fieldname in FACET_FIELDS:
+            print("%s: %s" % (fieldname, ", ".join("%s=%d" % (key, count) for key, count in sorted(facets[fieldname].items(), key=lambda item: (-item[1], str(item[0]))))))
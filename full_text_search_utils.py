@@ -0,0 +1,466 @@
+# vim:ts=4:sw=4:tw=0:sts=4:et
+
+"""Helpers for building the Whoosh full-text index over Directory entities."""
+
+import logging as log
+import os
+import re
+import time
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from whoosh.analysis import (
+    CharsetFilter,
+    DoubleMetaphoneFilter,
+    IntraWordFilter,
+    LowercaseFilter,
+    NgramFilter,
+    PassFilter,
+    RegexTokenizer,
+    StemmingAnalyzer,
+    StopFilter,
+    TeeFilter,
+)
+from whoosh import sorting
+from whoosh.fields import BOOLEAN, ID, TEXT, Schema
+from whoosh.index import create_in
+from whoosh.qparser import MultifieldParser, OrGroup
+from whoosh.query import And, Or, Query, Term
+from whoosh.support.charset import accent_map
+
+
+INDEX_ENTITY_TYPES = ("COLLECTION", "BIOBANK", "CONTACT", "NETWORK")
+FACET_FIELDS = ("type", "country", "staging_area", "withdrawn")
+SEARCH_FIELDS = [
+    "id",
+    "name",
+    "description",
+    "acronym",
+    "phone",
+    "email",
+    "juridical_person",
+    "bioresource_reference",
+    "address",
+    "contact_id",
+    "contact_name",
+    "head_id",
+    "head_name",
+    "also_known",
+]
+# person and institution name fields that additionally get phonetic and
+# trigram companion fields (<field>_phonetic, <field>_ngram) for fuzzy search
+FUZZY_SOURCE_FIELDS = ("name", "contact_name", "head_name", "juridical_person")
+FUZZY_FIELD_BOOSTS = {"": 4.0, "_phonetic": 2.0, "_ngram": 1.0}
+
+
+def build_index_schema() -> Schema:
+    """Return the Whoosh schema used for the Directory full-text index."""
+    my_ana = StemmingAnalyzer() | CharsetFilter(accent_map)
+    # this tokenizer allows for searching on full IDs as well as on components between : chars
+    # however, in search there is a problem with searching for : chars - escaping does not work, hence
+    # the search side replaces : with ?
+    # appending LoggingFilter() and running the script with -d allows for debugging the tokenization
+    my_id_ana = (
+        RegexTokenizer(expression=re.compile('[^ ]+'))
+        | LowercaseFilter()
+        | TeeFilter(
+            PassFilter(),
+            IntraWordFilter(delims=u':', splitnums=False)
+            | StopFilter(stoplist=frozenset(['bbmri-eric', 'id', 'contactid', 'networkid', 'collection'])),
+        )
+    )
+    # companion analyzers for fuzzy search: double-metaphone codes catch
+    # phonetic misspellings, character trigrams catch typos in longer words;
+    # query tokens are OR-ed so near-matches are ranked by BM25 in the index
+    phonetic_ana = RegexTokenizer() | LowercaseFilter() | CharsetFilter(accent_map) | DoubleMetaphoneFilter(combine=False)
+    ngram_ana = RegexTokenizer() | LowercaseFilter() | CharsetFilter(accent_map) | NgramFilter(minsize=3, maxsize=3)
+    fuzzy_fields = {}
+    for fieldname in FUZZY_SOURCE_FIELDS:
+        fuzzy_fields[fieldname + "_phonetic"] = TEXT(analyzer=phonetic_ana, phrase=False, multitoken_query="or")
+        fuzzy_fields[fieldname + "_ngram"] = TEXT(analyzer=ngram_ana, phrase=False, multitoken_query="or")
+    return Schema(
+        id=TEXT(stored=True, analyzer=my_id_ana),
+        type=ID(stored=True),
+        country=ID(stored=True),
+        staging_area=ID(stored=True),
+        withdrawn=BOOLEAN(stored=True),
+        name=TEXT(stored=True, analyzer=my_ana),
+        acronym=ID,
+        description=TEXT(analyzer=my_ana),
+        address=TEXT(analyzer=my_ana),
+        phone=TEXT,
+        email=TEXT,
+        juridical_person=TEXT(analyzer=my_ana),
+        bioresource_reference=TEXT,
+        head_id=TEXT(analyzer=my_id_ana),
+        head_name=TEXT(analyzer=my_ana),
+        contact_id=TEXT(analyzer=my_id_ana),
+        contact_name=TEXT(analyzer=my_ana),
+        also_known=TEXT(analyzer=my_ana),
+        **fuzzy_fields,
+    )
+
+
+def index_schema_matches(ix) -> bool:
+    """Return whether an existing index was built with the current schema.
+
+    Indexes built before facet fields were introduced have to be rebuilt
+    because filter queries and facet counts depend on those fields.
+    """
+    expected = build_index_schema()
+    if set(ix.schema.names()) != set(expected.names()):
+        return False
+    return all(type(ix.schema[name]) is type(expected[name]) for name in expected.names())
+
+
+def get_contact_full_name(contact: Optional[dict[str, Any]]) -> str:
+    """Return the display name of a contact including academic titles."""
+    if contact is None:
+        return ""
+    return " ".join(
+        filter(
+            None,
+            [
+                contact.get('title_before_name'),
+                contact.get('first_name'),
+                contact.get('last_name'),
+                contact.get('title_after_name'),
+            ],
+        )
+    )
+
+
+def build_contact_name_map(contacts: Iterable[dict[str, Any]]) -> dict[str, str]:
+    """Return a contact-id to full-name map resolved once for the whole index build."""
+    return {contact['id']: get_contact_full_name(contact) for contact in contacts}
+
+
+def _get_reference_id(entity: dict[str, Any], key: str) -> Optional[str]:
+    """Return the id of an EMX reference attribute when present."""
+    reference = entity.get(key)
+    if isinstance(reference, dict):
+        return reference.get('id')
+    return None
+
+
+def _get_also_known(entity: dict[str, Any]) -> str:
+    """Return newline-joined also-known ids of an entity."""
+    # TODO: this is a temporary hack - also_known needs to be properly handled by the Directory class and made accessible here
+    also_known = [ak["id"] for ak in entity.get('also_known') or []]
+    return "\n".join(also_known)
+
+
+def _get_network_country(directory, network_id: str) -> str:
+    """Return the network country, tolerating references to unknown contacts."""
+    try:
+        return directory.getNetworkCountry(network_id)
+    except KeyError:
+        log.warning("Unable to resolve country of network %s", network_id)
+        return ""
+
+
+def _get_network_nn(directory, network_id: str) -> str:
+    """Return the network staging area, tolerating references to unknown contacts."""
+    try:
+        return directory.getNetworkNN(network_id)
+    except KeyError:
+        log.warning("Unable to resolve staging area of network %s", network_id)
+        return ""
+
+
+def iter_collection_documents(directory, contact_names: dict[str, str]) -> Iterator[dict[str, Any]]:
+    """Yield index documents for collections in the configured withdrawn scope."""
+    for collection in directory.getCollections():
+        log.debug("Analyzing collection " + collection['id'])
+        biobank_id = directory.getCollectionBiobankId(collection['id'])
+        biobank = directory.getBiobankById(biobank_id)
+        if biobank is None:
+            log.warning("Biobank %s not found for collection %s, skipping" % (biobank_id, collection['id']))
+            continue
+        contact_id = _get_reference_id(collection, 'contact') or _get_reference_id(biobank, 'contact')
+        yield dict(
+            id=collection['id'],
+            type=u"COLLECTION",
+            name=collection.get('name'),
+            description=collection.get('description'),
+            acronym=collection.get('acronym'),
+            bioresource_reference=collection.get('bioresource_reference'),
+            contact_id=contact_id,
+            contact_name=contact_names.get(contact_id, ""),
+            country=directory.getCollectionCountry(collection['id']),
+            staging_area=directory.getCollectionNN(collection['id']),
+            withdrawn=directory.isCollectionWithdrawn(collection['id']),
+        )
+
+
+def iter_biobank_documents(directory, contact_names: dict[str, str]) -> Iterator[dict[str, Any]]:
+    """Yield index documents for biobanks in the configured withdrawn scope."""
+    for biobank in directory.getBiobanks():
+        log.debug("Analyzing biobank " + biobank['id'])
+        contact_id = _get_reference_id(biobank, 'contact')
+        head_id = _get_reference_id(biobank, 'head')
+        yield dict(
+            id=biobank['id'],
+            type=u"BIOBANK",
+            name=biobank.get('name'),
+            description=biobank.get('description'),
+            acronym=biobank.get('acronym'),
+            juridical_person=biobank.get('juridical_person'),
+            bioresource_reference=biobank.get('bioresource_reference'),
+            head_id=head_id,
+            head_name=contact_names.get(head_id, ""),
+            contact_id=contact_id,
+            contact_name=contact_names.get(contact_id, ""),
+            country=directory.getBiobankCountry(biobank['id']),
+            staging_area=directory.getBiobankNN(biobank['id']),
+            withdrawn=directory.isBiobankWithdrawn(biobank['id']),
+        )
+
+
+def iter_contact_documents(directory, contact_names: dict[str, str]) -> Iterator[dict[str, Any]]:
+    """Yield index documents for all contacts."""
+    for contact in directory.getContacts():
+        log.debug("Analyzing contact " + contact['id'])
+        yield dict(
+            id=contact['id'],
+            type=u"CONTACT",
+            name=contact_names.get(contact['id'], ""),
+            phone=contact.get('phone'),
+            email=contact.get('email'),
+            address=", ".join(filter(None, [contact.get('address'), contact.get('city'), contact.get('zip')])),
+            country=directory.getContactCountry(contact['id']),
+            staging_area=directory.getContactNN(contact['id']),
+            withdrawn=bool(contact.get('withdrawn')),
+        )
+
+
+def iter_network_documents(directory, contact_names: dict[str, str]) -> Iterator[dict[str, Any]]:
+    """Yield index documents for all networks."""
+    for network in directory.getNetworks():
+        log.debug("Analyzing network " + network['id'])
+        contact_id = _get_reference_id(network, 'contact')
+        yield dict(
+            id=network['id'],
+            type=u"NETWORK",
+            name=network.get('name'),
+            description=network.get('description'),
+            acronym=network.get('acronym'),
+            contact_id=contact_id,
+            contact_name=contact_names.get(contact_id, ""),
+            also_known=_get_also_known(network),
+            country=_get_network_country(directory, network['id']),
+            staging_area=_get_network_nn(directory, network['id']),
+            withdrawn=bool(network.get('withdrawn')),
+        )
+
+
+def add_fuzzy_companion_fields(document: dict[str, Any]) -> dict[str, Any]:
+    """Copy fuzzy-searchable values into their phonetic and trigram companion fields."""
+    for fieldname in FUZZY_SOURCE_FIELDS:
+        value = document.get(fieldname)
+        if value:
+            document[fieldname + "_phonetic"] = value
+            document[fieldname + "_ngram"] = value
+    return document
+
+
+DOCUMENT_BUILDERS: dict[str, Callable[[Any, dict[str, str]], Iterator[dict[str, Any]]]] = {
+    "COLLECTION": iter_collection_documents,
+    "BIOBANK": iter_biobank_documents,
+    "CONTACT": iter_contact_documents,
+    "NETWORK": iter_network_documents,
+}
+
+
+def resolve_index_procs(procs: Optional[int]) -> int:
+    """Return the number of indexing processes, mapping 0/None to all CPU cores."""
+    if procs is None or procs == 0:
+        return os.cpu_count() or 1
+    if procs < 0:
+        raise ValueError(f"Number of indexing processes must be non-negative, got {procs}.")
+    return procs
+
+
+def build_index(
+    directory,
+    indexdir: str,
+    *,
+    procs: int = 1,
+    multisegment: bool = False,
+) -> dict[str, float]:
+    """Create the full-text index for a Directory snapshot.
+
+    Contact full names are resolved once up front into a shared map so the
+    per-entity loops only do dictionary lookups. With ``procs > 1`` Whoosh's
+    multiprocessing writer analyzes document batches in worker processes.
+
+    Args:
+        directory: Loaded Directory instance.
+        indexdir: Target index directory; must already exist.
+        procs: Number of indexing processes (0 means all available cores).
+        multisegment: Keep one segment per worker instead of merging them on
+            commit. Faster to build, slightly slower to search.
+
+    Returns:
+        Elapsed seconds per entity type, plus ``contact_names`` for the
+        up-front name resolution and ``commit`` for the final commit/merge.
+    """
+    procs = resolve_index_procs(procs)
+    timings: dict[str, float] = {}
+
+    start_time = time.perf_counter()
+    contact_names = build_contact_name_map(directory.getContacts())
+    timings["contact_names"] = time.perf_counter() - start_time
+
+    ix = create_in(indexdir, build_index_schema())
+    if procs > 1:
+        log.info("Building full-text index with %d processes%s", procs, " (multisegment)" if multisegment else "")
+        writer = ix.writer(procs=procs, multisegment=multisegment)
+    else:
+        writer = ix.writer()
+    try:
+        for entity_type in INDEX_ENTITY_TYPES:
+            start_time = time.perf_counter()
+            document_count = 0
+            for document in DOCUMENT_BUILDERS[entity_type](directory, contact_names):
+                writer.add_document(**add_fuzzy_companion_fields(document))
+                document_count += 1
+            timings[entity_type] = time.perf_counter() - start_time
+            log.info(
+                "   ... indexed %d %s documents in %0.3fs",
+                document_count,
+                entity_type.lower(),
+                timings[entity_type],
+            )
+        start_time = time.perf_counter()
+        writer.commit()
+        timings["commit"] = time.perf_counter() - start_time
+    except BaseException:
+        writer.cancel()
+        raise
+    log.info("   ... committed full-text index in %0.3fs", timings["commit"])
+    return timings
+
+
+def _normalize_facet_values(values: Optional[Iterable[str]]) -> list[str]:
+    """Return uppercase, de-duplicated facet values split on commas."""
+    normalized = []
+    for value in values or []:
+        for item in str(value).split(","):
+            item = item.strip().upper()
+            if item and item not in normalized:
+                normalized.append(item)
+    return normalized
+
+
+def _normalize_facet_key(fieldname: str, key: Any) -> Any:
+    """Return a facet key in its stored form (Whoosh groups booleans as 't'/'f')."""
+    if fieldname == "withdrawn" and isinstance(key, str):
+        return key == "t"
+    return key
+
+
+def build_filter_query(
+    *,
+    types: Optional[Iterable[str]] = None,
+    countries: Optional[Iterable[str]] = None,
+    staging_areas: Optional[Iterable[str]] = None,
+    withdrawn: Optional[bool] = None,
+) -> Optional[Query]:
+    """Return a Whoosh filter query for the requested facet restrictions.
+
+    Values within one facet combine as OR, different facets combine as AND.
+    Returns None when no restriction is requested.
+    """
+    clauses = []
+    for fieldname, values in (
+        ("type", types),
+        ("country", countries),
+        ("staging_area", staging_areas),
+    ):
+        terms = [Term(fieldname, value) for value in _normalize_facet_values(values)]
+        if len(terms) == 1:
+            clauses.append(terms[0])
+        elif terms:
+            clauses.append(Or(terms))
+    if withdrawn is not None:
+        clauses.append(Term("withdrawn", bool(withdrawn)))
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return And(clauses)
+
+
+def parse_search_query(ix, query_text: str) -> Query:
+    """Parse a user query string against all searchable index fields."""
+    # XXX: this is a hack workaround around escaping of : character that does not work properly
+    query_text = re.sub(r':', '?', query_text)
+    return MultifieldParser(SEARCH_FIELDS, ix.schema).parse(query_text)
+
+
+def parse_fuzzy_query(ix, query_text: str) -> Query:
+    """Parse a name query for fuzzy matching of people and institutions.
+
+    The query runs over the name fields and their phonetic/trigram companion
+    fields; exact token matches get the highest boost, phonetic matches come
+    next and partial trigram overlap ranks the remaining near-misspellings.
+    """
+    fieldboosts = {
+        fieldname + suffix: boost
+        for fieldname in FUZZY_SOURCE_FIELDS
+        for suffix, boost in FUZZY_FIELD_BOOSTS.items()
+    }
+    query_text = re.sub(r':', '?', query_text)
+    parser = MultifieldParser(list(fieldboosts), ix.schema, fieldboosts=fieldboosts, group=OrGroup.factory(0.9))
+    return parser.parse(query_text)
+
+
+def search_index(
+    searcher,
+    query: Query,
+    *,
+    filter_query: Optional[Query] = None,
+    page: Optional[int] = None,
+    page_len: int = 20,
+    facet_fields: Iterable[str] = (),
+) -> tuple[list[dict[str, Any]], int, dict[str, dict[Any, int]]]:
+    """Run a filtered, optionally paginated search with facet counts.
+
+    The filter is applied by the Whoosh collector, so documents outside the
+    filter are never scored and only the requested page of hits is
+    materialized.
+
+    Args:
+        searcher: Open Whoosh searcher.
+        query: Parsed user query.
+        filter_query: Optional query restricting the allowed documents.
+        page: 1-based result page; None returns all hits.
+        page_len: Number of hits per page when ``page`` is set.
+        facet_fields: Facet fields (subset of ``FACET_FIELDS``) to count over
+            all filtered matches.
+
+    Returns:
+        Tuple of (stored fields of the returned hits, total number of
+        filtered matches, facet counts per requested field).
+    """
+    facet_fields = list(facet_fields)
+    unknown_facets = [name for name in facet_fields if name not in FACET_FIELDS]
+    if unknown_facets:
+        raise ValueError(f"Unsupported facet fields: {', '.join(unknown_facets)}")
+    if page is not None and (page < 1 or page_len < 1):
+        raise ValueError("Page number and page length must be positive.")
+    search_kwargs: dict[str, Any] = {"filter": filter_query}
+    if facet_fields:
+        search_kwargs["groupedby"] = {name: sorting.FieldFacet(name) for name in facet_fields}
+        search_kwargs["maptype"] = sorting.Count
+    if page is None:
+        results = searcher.search(query, limit=None, **search_kwargs)
+        hits = [hit.fields() for hit in results]
+    else:
+        results = searcher.search(query, limit=page * page_len, **search_kwargs)
+        hits = [hit.fields() for hit in results[(page - 1) * page_len:page * page_len]]
+    facets = {
+        name: {_normalize_facet_key(name, key): count for key, count in results.groups(name).items()}
+        for name in facet_fields
+    }
+    return hits, len(results), facets
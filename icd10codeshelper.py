@@ -1,70 +1,205 @@
 #!/usr/bin/python3
 # vim:ts=4:sw=4:sts=4:tw=0:et
 
+"""ICD-10 code model and diagnostic category matching.
+
+Codes are parsed once into ordinal keys (block letter and number), category
+ranges such as ``C00-C97`` are kept in an ``Icd10RangeIndex`` and point
+lookups bisect its boundaries, so a query costs O(log n) in the number of
+registered ranges. ``ICD10CategoryMatcher`` memoizes the categories of every
+code it has seen in an LRU cache; exporters can register their own categories
+on the shared ``ICD10_CATEGORIES`` matcher or build a private one.
+"""
+
 from builtins import *
 
 import logging as log
 import re
+from bisect import bisect_right
+from collections import Counter
+from functools import lru_cache
+from typing import Iterable, NamedTuple, Optional
 
 import roman
 
 cancer_diag_ranges = ['C00-D49', 'C00-C97', 'C00-C75', 'C00-C14', 'C15-C26', 'C30-C39', 'C40-C41', 'C43-C44', 'C45-C49',
-                      'C51-C58', 'C60-C63', 'C64-C68', 'C69-C72', 'C73-C75', 'C76-C80', 'C81-C96', 'D00-D09', 
+                      'C51-C58', 'C60-C63', 'C64-C68', 'C69-C72', 'C73-C75', 'C76-C80', 'C81-C96', 'D00-D09',
                       'D37-D48', 'C50-C50', 'C97-C97']
 
 cancer_chapters_roman = list(map(roman.toRoman, range(1, 23)))  # chapter 22 added in 2020
 
 obesity_diag_ranges = ['E65-E68']
 
+# blocks ICD10CodesHelper.isCancerCode() treats as neoplasms (C00-D49 minus the benign D10-D36 and D49)
+cancer_code_ranges = ['C00-C99', 'D00-D09', 'D37-D48']
+cancer_special_codes = frozenset(['C7A', 'C7B', 'D3A'])
+
+_cancer_chapters = frozenset(cancer_chapters_roman)
+
+ICD10_CODE_PATTERN = re.compile(r'^(?P<block>[A-Z])(?P<code>\d{1,2})(\.(?P<subcode>\d+))?$')
+ICD10_RANGE_PATTERN = re.compile(r'^(?P<blockA>[A-Z]\d{1,2}(\.\d+)?)-(?P<blockB>[A-Z]\d{1,2}(\.\d+)?)$')
+
+
+class Icd10Code(NamedTuple):
+    """Parsed ICD-10 code such as ``C50.9`` (block ``C``, number 50, subcode ``9``)."""
+
+    block: str
+    number: int
+    subcode: Optional[str]
+
+    @property
+    def ordinal(self) -> int:
+        """Return the sortable block key shared by all subcodes of the block."""
+        return (ord(self.block) - ord('A')) * 100 + self.number
+
+
+@lru_cache(maxsize=65536)
+def parse_icd10_code(code: str) -> Optional[Icd10Code]:
+    """Parse a single ICD-10 code; returns None for ranges and unparsable input."""
+    m = ICD10_CODE_PATTERN.match(code)
+    if not m:
+        return None
+    return Icd10Code(m.group('block'), int(m.group('code')), m.group('subcode'))
+
+
+@lru_cache(maxsize=65536)
+def parse_icd10_block_range(code: str) -> Optional[tuple[Icd10Code, Icd10Code]]:
+    """Parse an ``A-B`` range of ICD-10 codes into its two endpoints."""
+    m = ICD10_RANGE_PATTERN.match(code)
+    if not m:
+        return None
+    return parse_icd10_code(m.group('blockA')), parse_icd10_code(m.group('blockB'))
+
+
+def _range_ordinals(range_spec: str) -> tuple[int, int]:
+    endpoints = parse_icd10_block_range(range_spec)
+    if endpoints is None:
+        single = parse_icd10_code(range_spec)
+        if single is None:
+            raise ValueError(f"Invalid ICD-10 range {range_spec!r}")
+        endpoints = (single, single)
+    start, end = endpoints[0].ordinal, endpoints[1].ordinal
+    if start > end:
+        raise ValueError(f"Invalid ICD-10 range {range_spec!r}: start after end")
+    return start, end
+
+
+class Icd10RangeIndex:
+    """Static interval index over block ordinals.
+
+    Overlapping ranges are flattened into elementary segments between range
+    boundaries, each carrying the set of labels of the ranges covering it,
+    so a point query is one bisect.
+    """
+
+    def __init__(self, intervals: Iterable[tuple[int, int, str]]):
+        opened: dict[int, list[str]] = {}
+        closed: dict[int, list[str]] = {}
+        for start, end, label in intervals:
+            opened.setdefault(start, []).append(label)
+            closed.setdefault(end + 1, []).append(label)
+        # one sweep over the boundaries, counting the open ranges per label
+        self._boundaries = sorted(opened.keys() | closed.keys())
+        self._labels = []
+        active: Counter = Counter()
+        for boundary in self._boundaries:
+            active.subtract(closed.get(boundary, ()))
+            active.update(opened.get(boundary, ()))
+            self._labels.append(frozenset(label for label, count in active.items() if count > 0))
+
+    def query(self, ordinal: int) -> frozenset:
+        """Return the labels of all ranges containing ``ordinal``."""
+        position = bisect_right(self._boundaries, ordinal) - 1
+        if position < 0:
+            return frozenset()
+        return self._labels[position]
+
+
+class ICD10CategoryMatcher:
+    """Registry of named ICD-10 categories with memoized code lookups.
+
+    A single code belongs to a category when its block lies in one of the
+    category's ranges; a range ``A-B`` belongs to it when either endpoint
+    does, mirroring the historical ``isCancerCode`` semantics.
+    """
+
+    def __init__(self, cache_size: int = 65536):
+        self._ranges: dict[str, list[tuple[int, int]]] = {}
+        self._cached_categories_of = lru_cache(maxsize=cache_size)(self._categories_of)
+        self._index: Optional[Icd10RangeIndex] = None
+
+    def register(self, category: str, ranges: Iterable[str]) -> None:
+        """Add ranges (``C00-C97`` or single blocks such as ``E66``) to a category.
+
+        The range index is rebuilt on the next lookup, so a batch of
+        registrations costs one build.
+        """
+        self._ranges.setdefault(category, []).extend(_range_ordinals(spec) for spec in ranges)
+        self._index = None
+        self._cached_categories_of.cache_clear()
+
+    @property
+    def categories(self) -> list[str]:
+        return list(self._ranges)
+
+    def _range_index(self) -> Icd10RangeIndex:
+        index = self._index
+        if index is None:
+            index = self._index = Icd10RangeIndex(
+                (start, end, category)
+                for category, ranges in self._ranges.items()
+                for start, end in ranges
+            )
+        return index
+
+    def _categories_of(self, code: str) -> Optional[frozenset]:
+        parsed = parse_icd10_code(code)
+        if parsed is not None:
+            categories = self._range_index().query(parsed.ordinal)
+        else:
+            endpoints = parse_icd10_block_range(code)
+            if endpoints is None:
+                return None
+            index = self._range_index()
+            categories = index.query(endpoints[0].ordinal) | index.query(endpoints[1].ordinal)
+        log.debug("ICD-10 code %s belongs to categories %s", code, sorted(categories))
+        return categories
+
+    def categories_of(self, code: str) -> Optional[frozenset]:
+        """Return the categories of a code or range, or None when it cannot be parsed."""
+        return self._cached_categories_of(code)
+
+    def matches(self, code: str, category: str) -> Optional[bool]:
+        """Return whether ``code`` is in ``category`` (None when unparsable)."""
+        categories = self._cached_categories_of(code)
+        if categories is None:
+            return None
+        return category in categories
+
+
+ICD10_CATEGORIES = ICD10CategoryMatcher()
+ICD10_CATEGORIES.register('cancer', cancer_code_ranges)
+ICD10_CATEGORIES.register('obesity', obesity_diag_ranges)
+
 
 class ICD10CodesHelper:
 
-   def isCancerCode(code : str) -> bool:
-      if code in ['C7A', 'C7B', 'D3A']:
-         return True
-      m = re.search(r'^(?P<block>[A-Z])(?P<code>\d{1,2})(\.(?P<subcode>\d+))?$', code)
-      if m:
-         log.debug("ICD-10 block detected: %s, code: %s, subcode %s" % (m.group('block'), m.group('code'), m.group('subcode')))
-         if m.group('block') == 'C' or (m.group('block') == 'D' and (0 <= int(m.group('code')) <= 9 or 37 <= int(m.group('code')) <= 48)):
-            return True
-         else:
-            return False
-
-      # now we deal with ranges
-      m = re.search(r'^(?P<blockA>[A-Z]\d{1,2}(\.\d+)?)-(?P<blockB>[A-Z]\d{1,2}(\.\d+)?)$', code)
-      if m:
-         log.debug("ICD-10 range of blocks detected: from %s to %s" % (m.group('blockA'), m.group('blockB')))
-         if ICD10CodesHelper.isCancerCode(m.group('blockA')) or ICD10CodesHelper.isCancerCode(m.group('blockB')):
-             return True
-         else:
-             return False
-
-      # this is unparsable
-      return None
-
-   def isCancerChapter(code : str) -> bool:
-      if code not in cancer_chapters_roman:
-         return None
-      log.debug("ICD10 chapter detected: %s" % (code))
-      if code == "II":
-         return True
-      else:
-         return False
-
-   def isObesityCode(code : str) -> bool:
-      m = re.search(r'^(?P<block>[A-Z])(?P<code>\d{1,2})(\.(?P<subcode>\d+))?$', code)
-      if m:
-         log.debug("ICD-10 block detected: %s, code: %s, subcode %s" % (m.group('block'), m.group('code'), m.group('subcode')))
-         if m.group('block') == 'E' and (65 <= int(m.group('code')) <= 68):
+    @staticmethod
+    def isCancerCode(code : str) -> bool:
+        if code in cancer_special_codes:
             return True
-         else:
-            return False
+        # None for unparsable codes
+        return ICD10_CATEGORIES.matches(code, 'cancer')
 
-      # now we deal with ranges
-      if code in obesity_diag_ranges:
-             return True
-      else:
-             return False
+    @staticmethod
+    def isCancerChapter(code : str) -> bool:
+        if code not in _cancer_chapters:
+            return None
+        return code == "II"
 
-      # this is unparsable
-      return None
+    @staticmethod
+    def isObesityCode(code : str) -> bool:
+        if parse_icd10_code(code) is None:
+            # ranges count only when listed verbatim, not by their endpoints
+            return code in obesity_diag_ranges
+        return ICD10_CATEGORIES.matches(code, 'obesity')
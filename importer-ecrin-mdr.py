@@ -37,10 +37,16 @@ import logging
 import os
 import sys
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
+from diskcache import Cache
 from molgenis_emx2_pyclient import client
 from molgenis_emx2_pyclient.exceptions import PyclientException
+from requests.adapters import HTTPAdapter
+
+from cache_paths import repo_cache_dir
+from directory_table_fetch import build_id_filter, chunk_ids
 
 #
 logger = logging.getLogger("ecrin_mdr_importer")
@@ -57,6 +63,8 @@ ECRIN_URL = "https://newmdr.ecrin.org"
 ECRIN_STUDY_API_ENDPOINT = f"{ECRIN_URL}/api/Study/AllDetails"
 ECRIN_STUDY_ALTERNATIVE_URL = f"{ECRIN_URL}/api/Study"
 ECRIN_STUDY_URL = f"{ECRIN_URL}/Study"
+ECRIN_REQUEST_TIMEOUT = 60
+DEFAULT_FETCH_WORKERS = 8
 
 BBMRI_ALSO_KNOWN_IN = "AlsoKnownIn"
 BBMRI_STUDY = "Studies"
@@ -99,7 +107,7 @@ def get_studies_collections_link(input_file):
         studies_collections = {}
 
         for match in reader:
-            studies_collections[(match["mdr_id"], match["mdr_title"])] = f"bbmri-eric:ID:{match["collection_id"]}"
+            studies_collections[(match["mdr_id"], match["mdr_title"])] = f"bbmri-eric:ID:{match['collection_id']}"
 
         return studies_collections
 
@@ -129,23 +137,51 @@ def get_sex_value(ecrin_gender_eligibility):
     }[ecrin_gender_eligibility]
 
 
-def get_study_details_from_ecrin_mdr(mdr_id):
+def get_ecrin_json(http, url, cache=None):
+    """
+    Gets the json document at :url: of the ECRIN MDR
+
+    Responses carrying an ETag are stored in :cache: under the url (which contains the MDR id); later requests
+    send the ETag back in If-None-Match and reuse the stored document when the MDR answers 304 Not Modified.
+
+    :param http: the requests module or a requests.Session
+    :param cache: a diskcache.Cache, or None to disable the cache
+    :return: the decoded json document, or None if the request failed
+    """
+    entry = cache.get(url) if cache is not None else None
+    headers = {"If-None-Match": entry["etag"]} if entry is not None else {}
+    res = http.get(url, headers=headers, timeout=ECRIN_REQUEST_TIMEOUT)
+    if res.status_code == 304 and entry is not None:
+        logger.debug("Using cached response for %s", url)
+        return entry["data"]
+    if res.status_code != 200:
+        return None
+    data = res.json()
+    etag = res.headers.get("ETag")
+    if cache is not None and etag:
+        cache.set(url, {"etag": etag, "data": data})
+    return data
+
+
+def get_study_details_from_ecrin_mdr(mdr_id, http=requests, cache=None):
     """
     Gets the details of the study with id :mdr_id: from the ECRIN MDR
 
     :param mdr_id: the id of the study
+    :param http: the requests module or a (pooled) requests.Session used for the requests
+    :param cache: a diskcache.Cache with the previous responses (see get_ecrin_json), or None
     :return: a dict with the study details if the study was found, None otherwise
     """
     logger.debug("Getting study details")
-    res = requests.get(f"{ECRIN_STUDY_API_ENDPOINT}/{mdr_id}")
-    if res.status_code == 200:
-        return res.json()["full_study"]
+    res = get_ecrin_json(http, f"{ECRIN_STUDY_API_ENDPOINT}/{mdr_id}", cache)
+    if res is not None:
+        return res["full_study"]
     else:
-        logger.info("Failed getting the study with the MDR ID. ")
-        res = requests.get(f"{ECRIN_STUDY_ALTERNATIVE_URL}/{mdr_id}")
-        if res.status_code == 200:
+        logger.info("Failed getting the study %s with the MDR ID. ", mdr_id)
+        res = get_ecrin_json(http, f"{ECRIN_STUDY_ALTERNATIVE_URL}/{mdr_id}", cache)
+        if res is not None:
             # The structure of the json of the alternative MDR url is different
-            data = json.loads(res.json()[0])
+            data = json.loads(res[0])
             return {
                 "id": data["study_id"],
                 "brief_description": data["description"],
@@ -168,14 +204,14 @@ def create_records(mdr_data, mdr_title, national_node):
     It also updates the collections linked to the study with the reference to the newly created study
     """
 
-    also_known_id = f"{BBMRI_AKI_ID_PREFIX}{national_node}_{mdr_data["id"]}"  # internal bbmri id of the "also_known_entity" corresponding to the study
-    study_id = f"{BBMRI_STUDY_ID_PREFIX}{national_node}_{mdr_data["id"]}"  # internal bbmri id of the study
+    also_known_id = f"{BBMRI_AKI_ID_PREFIX}{national_node}_{mdr_data['id']}"  # internal bbmri id of the "also_known_entity" corresponding to the study
+    study_id = f"{BBMRI_STUDY_ID_PREFIX}{national_node}_{mdr_data['id']}"  # internal bbmri id of the study
     # creates the also known record
     also_known = {
         "id": also_known_id,
         "name_system": "ECRIN MDR",
         "pid": mdr_data["id"],
-        "url": f"{ECRIN_STUDY_URL}/{mdr_data["id"]}",
+        "url": f"{ECRIN_STUDY_URL}/{mdr_data['id']}",
         "national_node": national_node,
         "label": mdr_data["display_title"]
     }
@@ -204,11 +240,53 @@ def create_records(mdr_data, mdr_title, national_node):
     return also_known, study
 
 
-def get_collection_data_from_directory(eric_client, schema, collection_id):
-    try:
-        return eric_client.get(table="Collections", query_filter=f"id=={collection_id}", schema=schema)[0]
-    except IndexError:
-        logger.error(collection_id)
+def fetch_studies_from_ecrin_mdr(mdr_ids, workers=DEFAULT_FETCH_WORKERS, cache=None, http=None):
+    """
+    Gets the details of the studies with ids :mdr_ids: from the ECRIN MDR, with up to :workers: concurrent requests
+
+    The requests share one requests.Session whose connection pool is sized to :workers:. A study whose requests
+    fail with a network error is reported as not found.
+
+    :param http: the session to use; a new pooled session is created (and closed) if None
+    :return: a dict mapping each MDR id to its study details, or to None if the study was not found
+    """
+    mdr_ids = list(dict.fromkeys(mdr_ids))
+    if http is None:
+        with requests.Session() as session:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            return fetch_studies_from_ecrin_mdr(mdr_ids, workers, cache, session)
+
+    def fetch(mdr_id):
+        try:
+            return get_study_details_from_ecrin_mdr(mdr_id, http, cache)
+        except requests.RequestException as ex:
+            logger.error("Error getting study %s from the ECRIN MDR: %s", mdr_id, ex)
+            return None
+
+    logger.info("Getting %d studies from the ECRIN MDR with %d workers", len(mdr_ids), workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(mdr_ids, executor.map(fetch, mdr_ids)))
+
+
+def get_collections_data_from_directory(eric_client, schema, collection_ids):
+    """
+    Gets the collections with ids :collection_ids: from the Directory
+
+    The ids are sent in chunks as "id == [...]" filters instead of one query per collection.
+
+    :return: a dict mapping the id of each collection found to its record
+    """
+    collections = {}
+    for chunk in chunk_ids(collection_ids):
+        for collection in eric_client.get(table=BBMRI_COLLECTION, query_filter=build_id_filter("id", chunk),
+                                          schema=schema):
+            collections.setdefault(collection["id"], collection)
+    for collection_id in dict.fromkeys(collection_ids):
+        if collection_id not in collections:
+            logger.error(collection_id)
+    return collections
 
 
 async def save_and_upload_files_to_directory(emx2_client, entities_by_national_node, schema, upload_data, output_dir):
@@ -235,29 +313,44 @@ async def save_and_upload_files_to_directory(emx2_client, entities_by_national_n
                         sys.exit(-1)
 
 
-async def main(input_file, url, username, password, token, schema, output_dir, upload_data):
+async def main(input_file, url, username, password, token, schema, output_dir, upload_data,
+               workers=DEFAULT_FETCH_WORKERS, use_cache=True, purge_cache=False):
     studies_collections = get_studies_collections_link(input_file)
 
+    cache = Cache(repo_cache_dir("data-check-cache", "ecrin-mdr")) if use_cache else None
+    if cache is not None and purge_cache:
+        logger.info("Purging ECRIN MDR response cache")
+        cache.clear()
+    try:
+        studies_details = fetch_studies_from_ecrin_mdr([mdr_id for mdr_id, _ in studies_collections], workers, cache)
+    finally:
+        if cache is not None:
+            cache.close()
+
     with client.Client(url=url) as emx2_client:
         if token is not None:
             emx2_client.set_token(token)
         elif username is not None and password is not None:
             emx2_client.signin(username, password)
         entities_by_national_node = defaultdict(lambda: defaultdict(list))
+        all_collections = get_collections_data_from_directory(
+            emx2_client, schema,
+            [cid for (mdr_id, _), cid in studies_collections.items() if studies_details[mdr_id] is not None])
         collections = {}
         failed_studies = []
         for (mdr_id, mdr_title), collection_id in studies_collections.items():
             logger.info("Processing study %s" % mdr_id)
-            study_details = get_study_details_from_ecrin_mdr(mdr_id)
+            study_details = studies_details[mdr_id]
             if study_details is None:
                 logger.error("Couldn't find details for study %s" % mdr_id)
                 failed_studies.append(mdr_id)
             else:
                 if collections.get(collection_id) is None:
-                    collections[collection_id] = get_collection_data_from_directory(emx2_client, schema, collection_id)
+                    collections[collection_id] = all_collections.get(collection_id)
                 if collections[collection_id] is None:
                     logger.error("Collection %s not found in directory, skipping study %s" % (collection_id, mdr_id))
                     failed_studies.append(mdr_id)
+                    del collections[collection_id]
                     continue
                 national_node = collections[collection_id]["national_node"]
                 logger.info("Found study details. Creating records")
@@ -290,14 +383,23 @@ if __name__ == "__main__":
     parser.add_argument("--schema", "-s", type=str, required=False, default="ERIC", help="name of the Molgenis schema")
     parser.add_argument("--upload-data", "-d", action="store_true",
                         help="flag to activate or not the upload of the generated data. If false it just creates the csv files")
+    parser.add_argument("--workers", "-w", type=int, default=DEFAULT_FETCH_WORKERS,
+                        help="number of concurrent requests to the ECRIN MDR (default: %(default)s)")
+    parser.add_argument("--no-cache", dest="use_cache", action="store_false",
+                        help="do not read or store ECRIN MDR responses in data-check-cache/ecrin-mdr")
+    parser.add_argument("--purge-cache", action="store_true",
+                        help="clear the ECRIN MDR response cache before fetching the studies")
 
     args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
 
     outdir = create_output_dir(args.output_dir)
 
     try:
-        asyncio.run(main(args.input_file, args.url, args.username, args.password, args.token, args.schema, outdir, args.upload_data))
+        asyncio.run(main(args.input_file, args.url, args.username, args.password, args.token, args.schema, outdir,
+                         args.upload_data, args.workers, args.use_cache, args.purge_cache))
     except KeyboardInterrupt:
         pass
@@ -2,8 +2,13 @@
 
 from __future__ import annotations
 
+from dataclasses import dataclass, field
 from typing import Any
 
+import numpy as np
+
+from fact_sheet_utils import ADDITIVE_MARGIN_DIMENSIONS
+
 
 def positive_below_k_mask(values, threshold: int):
     """Return a boolean mask for values with 0 < value < threshold.
@@ -41,3 +46,184 @@ def donor_value_violates_k(value: Any, k_limit: int) -> bool:
     if donors is None:
         return False
     return 0 < donors < k_limit
+
+
+def parse_count_values(values) -> np.ndarray:
+    """Return counts parsed like ``donor_value_violates_k`` as floats (NaN = empty)."""
+    return np.array(
+        [np.nan if (parsed := _parse_int(value)) is None else parsed for value in values],
+        dtype=float,
+    )
+
+
+def donor_values_violate_k_mask(values, k_limit: int):
+    """Return a boolean NumPy mask applying ``donor_value_violates_k`` to many values.
+
+    Values are parsed once and compared with ``positive_below_k_mask`` so bulk
+    callers (for example the columnar fact-sheet engine) share the exact same
+    rule as the per-row helper.
+    """
+    return positive_below_k_mask(parse_count_values(values), k_limit)
+
+
+@dataclass
+class ComplementaryDisclosure:
+    """Small residual recoverable as all-star total minus published margins."""
+
+    collection_id: str
+    dimension: str
+    count_field: str
+    k_limit: int
+    all_star_fact_id: str
+    all_star_total: int
+    published_margin_total: int
+    residual: int
+    margin_fact_ids: list[str]
+    suppress_fact_ids: list[str]
+
+
+@dataclass
+class CollectionKAnonymityViolations:
+    """k-anonymity findings of one collection fact sheet."""
+
+    collection_id: str
+    donor_fact_ids: list[str] = field(default_factory=list)
+    sample_fact_ids: list[str] = field(default_factory=list)
+    complementary: list[ComplementaryDisclosure] = field(default_factory=list)
+
+    @property
+    def small_cell_fact_ids(self) -> list[str]:
+        """Return fact ids with a small donor or sample count."""
+        return sorted(set(self.donor_fact_ids) | set(self.sample_fact_ids))
+
+    @property
+    def secondary_suppression_fact_ids(self) -> list[str]:
+        """Return extra margin rows to drop so no residual stays below k."""
+        return sorted(
+            {
+                fact_id
+                for disclosure in self.complementary
+                for fact_id in disclosure.suppress_fact_ids
+            }
+        )
+
+    @property
+    def drop_fact_ids(self) -> list[str]:
+        """Return every fact id to drop before publishing the fact sheet."""
+        return sorted(set(self.small_cell_fact_ids) | set(self.secondary_suppression_fact_ids))
+
+
+def scan_fact_k_anonymity(
+    fact_frame,
+    *,
+    k_donors: int | None = None,
+    k_samples: int | None = None,
+    complementary_dimensions: dict[str, tuple[str, ...]] | None = None,
+) -> dict[str, CollectionKAnonymityViolations]:
+    """Scan a whole fact table for k-anonymity violations in one vectorized pass.
+
+    ``fact_frame`` is a ``fact_sheet_frame.FactSheetFrame``. Small cells are
+    rows with ``0 < count < k`` for the donor and/or sample threshold.
+    Complementary disclosure is checked per collection, dimension and count
+    field: once small cells are dropped, the all-star total minus the published
+    all-but-one-star margins of a mutually exclusive dimension
+    (``complementary_dimensions``, default ``ADDITIVE_MARGIN_DIMENSIONS``) must
+    not leave a residual with ``0 < residual < k``. For every such residual the
+    smallest published margins are proposed for secondary suppression until
+    the residual reaches k.
+
+    Returns:
+        Violations keyed by collection id, only for collections with findings.
+    """
+    if complementary_dimensions is None:
+        complementary_dimensions = ADDITIVE_MARGIN_DIMENSIONS
+    thresholds = {
+        count_field: k_limit
+        for count_field, k_limit in (("number_of_donors", k_donors), ("number_of_samples", k_samples))
+        if k_limit is not None
+    }
+    frame = fact_frame.frame
+    collection_column = frame["collection_id"]
+    collection_codes = collection_column.cat.codes.to_numpy().astype(np.int64)
+    collection_ids = list(collection_column.cat.categories)
+    fact_ids = frame["fact_id"].astype(str).to_numpy()
+    collection_count = len(collection_ids)
+    results: dict[str, CollectionKAnonymityViolations] = {}
+
+    def result_for(code: int) -> CollectionKAnonymityViolations:
+        collection_id = collection_ids[code]
+        if collection_id not in results:
+            results[collection_id] = CollectionKAnonymityViolations(collection_id)
+        return results[collection_id]
+
+    counts = {count_field: fact_frame.get_count_values(count_field) for count_field in thresholds}
+    small_masks = {
+        count_field: positive_below_k_mask(counts[count_field], k_limit)
+        for count_field, k_limit in thresholds.items()
+    }
+    dropped = np.zeros(len(frame), dtype=bool)
+    for count_field, mask in small_masks.items():
+        dropped |= mask
+        attribute = "donor_fact_ids" if count_field == "number_of_donors" else "sample_fact_ids"
+        for position in np.flatnonzero(mask):
+            getattr(result_for(collection_codes[position]), attribute).append(fact_ids[position])
+
+    all_star = fact_frame.all_star_mask()
+    all_star_counts = np.bincount(collection_codes[all_star], minlength=collection_count)
+    all_star_positions = np.full(collection_count, -1, dtype=np.int64)
+    single_all_star = all_star & (all_star_counts[collection_codes] == 1)
+    all_star_positions[collection_codes[single_all_star]] = np.flatnonzero(single_all_star)
+
+    for count_field, k_limit in thresholds.items():
+        values = counts[count_field]
+        has_total = all_star_positions >= 0
+        totals = np.full(collection_count, np.nan)
+        totals[has_total] = values[all_star_positions[has_total]]
+        for dimension in complementary_dimensions.get(count_field, ()):
+            published = (
+                fact_frame.all_but_one_star_mask(dimension)
+                & ~dropped
+                & ~np.isnan(values)
+            )
+            margin_rows = np.bincount(collection_codes[published], minlength=collection_count)
+            margin_totals = np.bincount(
+                collection_codes[published],
+                weights=values[published],
+                minlength=collection_count,
+            )
+            residuals = totals - margin_totals
+            disclosed = (margin_rows > 0) & positive_below_k_mask(residuals, k_limit)
+            if not disclosed.any():
+                continue
+            # published positions grouped by collection (in row order within a collection)
+            published_positions = np.flatnonzero(published)
+            published_codes = collection_codes[published_positions]
+            order = np.argsort(published_codes, kind="stable")
+            grouped_positions = published_positions[order]
+            grouped_codes = published_codes[order]
+            for code in np.flatnonzero(disclosed):
+                start, end = np.searchsorted(grouped_codes, [code, code + 1])
+                positions = grouped_positions[start:end]
+                positions = positions[np.argsort(values[positions], kind="stable")]
+                residual = residuals[code]
+                suppress = []
+                for position in positions:
+                    if residual >= k_limit:
+                        break
+                    suppress.append(fact_ids[position])
+                    residual += values[position]
+                result_for(code).complementary.append(
+                    ComplementaryDisclosure(
+                        collection_id=collection_ids[code],
+                        dimension=dimension,
+                        count_field=count_field,
+                        k_limit=k_limit,
+                        all_star_fact_id=fact_ids[all_star_positions[code]],
+                        all_star_total=int(totals[code]),
+                        published_margin_total=int(margin_totals[code]),
+                        residual=int(residuals[code]),
+                        margin_fact_ids=sorted(fact_ids[positions]),
+                        suppress_fact_ids=sorted(suppress),
+                    )
+                )
+    return results
@@ -1,71 +1,129 @@
 # vim:ts=4:sw=4:sts=4:tw=0:et
 
+"""Orphanet nomenclature (``en_product1.xml``) mapping to ICD-10.
+
+The XML is read with ``iterparse`` one disorder at a time (processed
+elements are dropped again), and the resulting sets/dicts are persisted in a
+diskcache store under ``data-check-cache/orphacodes`` keyed by the SHA-256 of
+the XML file, so later runs skip XML parsing entirely.
+"""
+
+import hashlib
 import logging as log
 import re
 import xml.etree.ElementTree as ET
 from builtins import *
 from typing import List, TypedDict
 
+from diskcache import Cache
+
+from cache_paths import repo_cache_dir
 from icd10codeshelper import ICD10CodesHelper
 
+ORPHACODES_CACHE_VERSION = 1
+
 class MappingWithType(TypedDict):
     code : str
     mapping_type : str
 
+
+def orphacodes_cache_key(file) -> str:
+    """Return the cache key of a mapping file: format version plus SHA-256 of its content."""
+    digest = hashlib.sha256()
+    with open(file, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(chunk)
+    return f'orphacodes:v{ORPHACODES_CACHE_VERSION}:{digest.hexdigest()}'
+
+
+def parse_orphacodes_file(file) -> dict:
+    """Stream-parse ``en_product1.xml`` into plain sets/dicts."""
+    orpha_codes = set()
+    orpha_cancer_codes = set()
+    orpha_to_icd10_code_map = {}
+    icd10_to_orpha_code_map = {}
+    orpha_to_name_map = {}
+
+    # only DisorderList/Disorder directly below the root, like findall('DisorderList/Disorder')
+    path = []
+    for event, element in ET.iterparse(file, events=('start', 'end')):
+        if event == 'start':
+            path.append(element)
+            continue
+        path.pop()
+        if element.tag != 'Disorder' or len(path) != 2 or path[1].tag != 'DisorderList':
+            continue
+
+        orpha_code = element.findtext('OrphaCode')
+        orpha_codes.add(orpha_code)
+        for name in element.findall("Name[@lang='en']"):
+            orpha_to_name_map.setdefault(orpha_code, []).append(name.text)
+        for external_code in element.findall('ExternalReferenceList/ExternalReference'):
+            source = external_code.findtext('Source')
+            icd10_code = external_code.findtext('Reference')
+            mapping_type = re.sub(r'^(\S+)\s.*$', r'\1', external_code.findtext('DisorderMappingRelation/Name') or '')
+            if mapping_type == "NTBT":
+                mapping_type_inverse = "BTNT"
+            elif mapping_type == "BTNT":
+                mapping_type_inverse = "NTBT"
+            elif mapping_type == "E":
+                mapping_type_inverse = "E"
+            else:
+                continue
+            if source == "ICD-10":
+                orpha_to_icd10_code_map.setdefault(orpha_code, []).append(
+                    MappingWithType(code=icd10_code, mapping_type=mapping_type)
+                )
+                icd10_to_orpha_code_map.setdefault(icd10_code, []).append(
+                    MappingWithType(code=orpha_code, mapping_type=mapping_type_inverse)
+                )
+                if ICD10CodesHelper.isCancerCode(icd10_code):
+                    orpha_cancer_codes.add(orpha_code)
+        # processed disorders are not needed any more
+        path[-1].remove(element)
+
+    return {
+        'orpha_codes': orpha_codes,
+        'orpha_cancer_codes': orpha_cancer_codes,
+        'orpha_to_icd10_code_map': orpha_to_icd10_code_map,
+        'icd10_to_orpha_code_map': icd10_to_orpha_code_map,
+        'orpha_to_name_map': orpha_to_name_map,
+    }
+
+
 class OrphaCodes:
 
-    def __init__(self, file = None):
+    def __init__(self, file = None, *, use_cache : bool = True, purge_cache : bool = False):
         if file is None:
             file = 'en_product1.xml'
-        orpha_tree = ET.parse(file)
-        orpha_root = orpha_tree.getroot()
-        #self.__orpha_to_icd10_code_map = Dict[str, List[MappingWithType]]
-        #self.__icd10_to_orpha_code_map = Dict[str, List[MappingWithType]]
-        self.__orpha_to_icd10_code_map = {}
-        self.__icd10_to_orpha_code_map = {}
-        self.__orpha_codes = []
-        self.__orpha_cancer_codes = []
-        self.__orpha_to_name_map = {}
-        for disease in orpha_tree.findall('DisorderList/Disorder'):
-            orpha_code = disease.findtext('OrphaCode')
-            self.__orpha_codes.append(orpha_code)
-            log.debug("Processing Orpha code %s"%(orpha_code))
-            for name in disease.findall("Name[@lang='en']"):
-                if orpha_code not in self.__orpha_to_name_map:
-                    self.__orpha_to_name_map[orpha_code] = []
-                self.__orpha_to_name_map[orpha_code].append(name.text)
-            for external_code in disease.findall('ExternalReferenceList/ExternalReference'):
-                source = external_code.findtext('Source')
-                icd10_code = external_code.findtext('Reference')
-                mapping_type = external_code.findtext('DisorderMappingRelation/Name')
-                log.debug("Found %s mapping type"%(mapping_type))
-                mapping_type = re.sub(r'^(\S+)\s.*$',r'\1', mapping_type)
-                if mapping_type == "NTBT":
-                    mapping_type_inverse = "BTNT"
-                elif mapping_type == "BTNT":
-                    mapping_type_inverse = "NTBT"
-                elif mapping_type == "E":
-                    mapping_type_inverse = "E"
-                else:
-                    log.debug("Ignoring unknown mapping type %s"%(mapping_type))
-                    continue
-                if source == "ICD-10":
-                    if orpha_code not in self.__orpha_to_icd10_code_map:
-                        self.__orpha_to_icd10_code_map[orpha_code] = []
-                    if icd10_code not in self.__icd10_to_orpha_code_map:
-                        self.__icd10_to_orpha_code_map[icd10_code] = []
-                    self.__orpha_to_icd10_code_map[orpha_code].append(MappingWithType(code=icd10_code, mapping_type=mapping_type))
-                    log.debug("Orpha code %s maps to ICD-10 codes %s" % (orpha_code, self.__orpha_to_icd10_code_map[orpha_code]))
-                    self.__icd10_to_orpha_code_map[icd10_code].append(MappingWithType(code=orpha_code, mapping_type=mapping_type_inverse))
-                    log.debug("ICD-10 code %s maps to Orpha codes %s" % (icd10_code, self.__icd10_to_orpha_code_map[icd10_code]))
-                    if ICD10CodesHelper.isCancerCode(icd10_code):
-                        self.__orpha_cancer_codes.append(orpha_code)
+        mapping = None
+        if use_cache:
+            cache = Cache(repo_cache_dir('data-check-cache', 'orphacodes'))
+            if purge_cache:
+                log.info("Purging Orpha code mapping cache")
+                cache.clear()
+            cache_key = orphacodes_cache_key(file)
+            mapping = cache.get(cache_key)
+        if mapping is None:
+            mapping = parse_orphacodes_file(file)
+            if use_cache:
+                cache.set(cache_key, mapping)
+            log.info("Parsed %d Orpha codes from %s" % (len(mapping['orpha_codes']), file))
+        else:
+            log.info("Loaded %d Orpha codes for %s from cache" % (len(mapping['orpha_codes']), file))
+        if use_cache:
+            cache.close()
+        self.__orpha_codes = mapping['orpha_codes']
+        self.__orpha_cancer_codes = mapping['orpha_cancer_codes']
+        self.__orpha_to_icd10_code_map = mapping['orpha_to_icd10_code_map']
+        self.__icd10_to_orpha_code_map = mapping['icd10_to_orpha_code_map']
+        self.__orpha_to_name_map = mapping['orpha_to_name_map']
 
     def isValidOrphaCode(self, code : str) -> bool:
-        return True if code in self.__orpha_codes else False
+        return code in self.__orpha_codes
 
     def isCancerOrphaCode(self, code : str) -> bool:
-        return True if code in self.__orpha_cancer_codes else False
+        return code in self.__orpha_cancer_codes
 
     def orphaToIcd10(self, code : str) -> List[MappingWithType]:
         if code not in self.__orpha_to_icd10_code_map:
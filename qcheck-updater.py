@@ -20,9 +20,26 @@ from dotenv import load_dotenv
 from cli_interrupts import log_keyboard_interrupt
 from directory import Directory
 from directory_session_compat import DirectorySession
+from directory_table_fetch import fetch_rows_by_ids, group_ids_by, index_rows_by_id, resolve_column
+from directory_write_engine import (
+    DELETE_ACTION,
+    SAVE_ACTION,
+    WriteEngineError,
+    WriteOperation,
+    add_write_engine_arguments,
+    file_checksum,
+    write_engine_from_args,
+    write_job_key,
+)
 from duo_terms import detect_duo_term_storage_style, normalize_duo_term_ids, serialize_duo_term_id
 from fact_descriptor_sync import parse_collection_multi_value_field
-from fix_proposals import EntityFixProposal, load_fix_plan
+from fix_proposals import (
+    EntityFixProposal,
+    FixProposalStore,
+    hashable_value,
+    load_fix_plan,
+    unique_in_order,
+)
 from nncontacts import NNContacts
 from validation_models import WarningSuppressionEntryModel
 from warning_suppressions import (
@@ -128,6 +145,7 @@ def build_parser() -> argparse.ArgumentParser:
         default=DEFAULT_TOKEN,
         help="Directory access token (overrides DIRECTORYTOKEN env var, alternative to username/password).",
     )
+    add_write_engine_arguments(parser)
     return parser
 
 
@@ -255,17 +273,6 @@ def _split_csv_values(raw_values: list[str] | str | None) -> set[str]:
     return values
 
 
-def _module_filter_matches(update: EntityFixProposal, requested_modules: set[str]) -> bool:
-    """Return True when requested module names match update modules or check prefixes."""
-    if not requested_modules:
-        return True
-    candidates = {update.module}
-    for check_id in update.source_check_ids:
-        if ":" in check_id:
-            candidates.add(check_id.split(":", 1)[0])
-    return any(module in candidates for module in requested_modules)
-
-
 def _confidence_filter(args: argparse.Namespace) -> set[str]:
     if args.confidence:
         requested = {value.strip() for value in args.confidence.split(",") if value.strip()}
@@ -303,35 +310,19 @@ def _entity_ids_for_root(directory: Directory, root_id: str) -> set[str]:
     return set(graph.nodes()) | {biobank["id"]}
 
 
-def _filter_updates(args: argparse.Namespace, payload: dict, directory: Directory | None) -> list[EntityFixProposal]:
-    entity_filter = args.entity_id
-    root_filter = args.root_id
-    root_entities = _entity_ids_for_root(directory, root_filter) if root_filter else None
-    staging_filter = {value.upper() for value in _split_csv_values(args.staging_area)}
-    check_filter = _split_csv_values(args.check_id)
-    update_filter = _split_csv_values(args.update_id)
-    module_filter = _split_csv_values(args.module)
-    confidence_filter = _confidence_filter(args)
-
-    selected = []
-    for raw_update in payload.get("updates", []):
-        update = EntityFixProposal.from_dict(raw_update)
-        if entity_filter and update.entity_id != entity_filter:
-            continue
-        if root_entities is not None and update.entity_id not in root_entities:
-            continue
-        if staging_filter and update.staging_area.upper() not in staging_filter:
-            continue
-        if check_filter and not any(check_id in check_filter for check_id in update.source_check_ids):
-            continue
-        if update_filter and update.update_id not in update_filter:
-            continue
-        if not _module_filter_matches(update, module_filter):
-            continue
-        if update.confidence not in confidence_filter:
-            continue
-        selected.append(update)
-    return selected
+def _filter_updates(args: argparse.Namespace, payload: dict, directory: Directory | None) -> FixProposalStore:
+    entity_ids = {args.entity_id} if args.entity_id else None
+    if args.root_id:
+        root_entities = _entity_ids_for_root(directory, args.root_id)
+        entity_ids = root_entities if entity_ids is None else entity_ids & root_entities
+    return FixProposalStore.from_plan(payload).select(
+        entity_ids=entity_ids,
+        staging_areas=_split_csv_values(args.staging_area) or None,
+        check_ids=_split_csv_values(args.check_id) or None,
+        update_ids=_split_csv_values(args.update_id) or None,
+        modules=_split_csv_values(args.module) or None,
+        confidences=_confidence_filter(args),
+    )
 
 
 def _normalize_scalar(value):
@@ -422,30 +413,70 @@ def _has_live_value_mismatch(update: EntityFixProposal, live_value) -> bool:
     )
 
 
-def _merge_updates(selected_updates: list[EntityFixProposal]) -> tuple[list[EntityFixProposal], list[str]]:
-    grouped = defaultdict(list)
+def _merge_additive_updates(
+    entity_id: str,
+    field: str,
+    updates: list[EntityFixProposal],
+    proposed_values: list,
+) -> tuple[EntityFixProposal | None, str | None]:
+    """Fold append / delete_rows updates of one field into the first one.
+
+    Returns the merged update, or a conflict message when the updates were
+    exported against different current values.
+    """
+    base = updates[0]
+    base_current_value = _canonical_field_value(field, base.current_value_at_export)
+    for update in updates[1:]:
+        if _canonical_field_value(field, update.current_value_at_export) != base_current_value:
+            return None, f"{entity_id} field {field} has inconsistent expected current values across {base.mode} updates."
+    confidences = {update.confidence for update in updates}
+    blocking_reasons = [update.blocking_reason for update in updates if update.blocking_reason]
+    base.proposed_value = unique_in_order(proposed_values)
+    base.source_check_ids = unique_in_order(value for update in updates for value in update.source_check_ids)
+    base.source_warning_messages = unique_in_order(value for update in updates for value in update.source_warning_messages)
+    base.source_warning_actions = unique_in_order(value for update in updates for value in update.source_warning_actions)
+    base.term_explanations = unique_in_order(value for update in updates for value in update.term_explanations)
+    if "uncertain" in confidences:
+        base.confidence = "uncertain"
+    elif "almost_certain" in confidences:
+        base.confidence = "almost_certain"
+    else:
+        base.confidence = "certain"
+    if blocking_reasons:
+        base.blocking_reason = " ".join(dict.fromkeys(blocking_reasons))
+    base.finalize_checksum()
+    return base, None
+
+
+def _merge_updates(
+    selected_updates: FixProposalStore | list[EntityFixProposal],
+) -> tuple[list[EntityFixProposal], list[str]]:
+    """Merge selected updates per (entity, field) and report conflicting groups.
+
+    Each group is checked once for mutually exclusive updates, mixed modes and
+    differing target values; additive updates are folded into one.
+    """
+    if not isinstance(selected_updates, FixProposalStore):
+        selected_updates = FixProposalStore(selected_updates)
     conflicts = []
-    for update in selected_updates:
-        grouped[(update.entity_id, update.field)].append(update)
-
     merged_updates = []
-    for (entity_id, field), updates in grouped.items():
-        group_conflicts = []
+    for (entity_id, field), updates in selected_updates.groups().items():
         exclusive_groups = defaultdict(list)
+        modes = set()
         for update in updates:
+            modes.add(update.mode)
             if update.exclusive_group:
                 exclusive_groups[update.exclusive_group].append(update)
-        for group_name, group_updates in exclusive_groups.items():
-            if len(group_updates) > 1:
-                group_conflicts.append(
-                    f"{entity_id} field {field} has mutually exclusive updates in group {group_name}: "
-                    + ", ".join(update.update_id for update in group_updates)
-                )
+        group_conflicts = [
+            f"{entity_id} field {field} has mutually exclusive updates in group {group_name}: "
+            + ", ".join(update.update_id for update in group_updates)
+            for group_name, group_updates in exclusive_groups.items()
+            if len(group_updates) > 1
+        ]
         if group_conflicts:
             conflicts.extend(group_conflicts)
             continue
 
-        modes = {update.mode for update in updates}
         if len(modes) > 1:
             conflicts.append(
                 f"{entity_id} field {field} has incompatible update modes: "
@@ -454,104 +485,23 @@ def _merge_updates(selected_updates: list[EntityFixProposal]) -> tuple[list[Enti
             continue
         mode = next(iter(modes))
         if mode == "append" and field in MULTI_VALUE_FIELDS:
-            base = updates[0]
-            proposed_values = []
-            source_check_ids = []
-            source_messages = []
-            source_actions = []
-            term_explanations = []
-            confidences = []
-            blocking_reasons = []
-            for update in updates:
-                if _canonical_field_value(field, update.current_value_at_export) != _canonical_field_value(field, base.current_value_at_export):
-                    conflicts.append(f"{entity_id} field {field} has inconsistent expected current values across append updates.")
-                    break
-                for value in update.proposed_value:
-                    if value not in proposed_values:
-                        proposed_values.append(value)
-                for check_id in update.source_check_ids:
-                    if check_id not in source_check_ids:
-                        source_check_ids.append(check_id)
-                for message in update.source_warning_messages:
-                    if message not in source_messages:
-                        source_messages.append(message)
-                for action in update.source_warning_actions:
-                    if action not in source_actions:
-                        source_actions.append(action)
-                for explanation in update.term_explanations:
-                    if explanation not in term_explanations:
-                        term_explanations.append(explanation)
-                confidences.append(update.confidence)
-                if update.blocking_reason:
-                    blocking_reasons.append(update.blocking_reason)
-            else:
-                base.proposed_value = proposed_values
-                base.source_check_ids = source_check_ids
-                base.source_warning_messages = source_messages
-                base.source_warning_actions = source_actions
-                base.term_explanations = term_explanations
-                if "uncertain" in confidences:
-                    base.confidence = "uncertain"
-                elif "almost_certain" in confidences:
-                    base.confidence = "almost_certain"
-                else:
-                    base.confidence = "certain"
-                if blocking_reasons:
-                    base.blocking_reason = " ".join(dict.fromkeys(blocking_reasons))
-                base.finalize_checksum()
-                merged_updates.append(base)
-            continue
-        if mode == FACT_ROW_DELETE_MODE and field == FACT_ROW_DELETE_FIELD:
-            base = updates[0]
-            delete_ids = []
-            source_check_ids = []
-            source_messages = []
-            source_actions = []
-            term_explanations = []
-            confidences = []
-            blocking_reasons = []
-            for update in updates:
-                if _canonical_field_value(field, update.current_value_at_export) != _canonical_field_value(field, base.current_value_at_export):
-                    conflicts.append(f"{entity_id} field {field} has inconsistent expected current values across delete_rows updates.")
-                    break
-                for row_id in _canonical_field_value(field, update.proposed_value):
-                    if row_id not in delete_ids:
-                        delete_ids.append(row_id)
-                for check_id in update.source_check_ids:
-                    if check_id not in source_check_ids:
-                        source_check_ids.append(check_id)
-                for message in update.source_warning_messages:
-                    if message not in source_messages:
-                        source_messages.append(message)
-                for action in update.source_warning_actions:
-                    if action not in source_actions:
-                        source_actions.append(action)
-                for explanation in update.term_explanations:
-                    if explanation not in term_explanations:
-                        term_explanations.append(explanation)
-                confidences.append(update.confidence)
-                if update.blocking_reason:
-                    blocking_reasons.append(update.blocking_reason)
+            proposed_values = [value for update in updates for value in update.proposed_value]
+        elif mode == FACT_ROW_DELETE_MODE and field == FACT_ROW_DELETE_FIELD:
+            proposed_values = [
+                row_id for update in updates for row_id in _canonical_field_value(field, update.proposed_value)
+            ]
+        else:
+            proposed_values = None
+        if proposed_values is not None:
+            merged, conflict = _merge_additive_updates(entity_id, field, updates, proposed_values)
+            if conflict:
+                conflicts.append(conflict)
             else:
-                base.proposed_value = delete_ids
-                base.source_check_ids = source_check_ids
-                base.source_warning_messages = source_messages
-                base.source_warning_actions = source_actions
-                base.term_explanations = term_explanations
-                if "uncertain" in confidences:
-                    base.confidence = "uncertain"
-                elif "almost_certain" in confidences:
-                    base.confidence = "almost_certain"
-                else:
-                    base.confidence = "certain"
-                if blocking_reasons:
-                    base.blocking_reason = " ".join(dict.fromkeys(blocking_reasons))
-                base.finalize_checksum()
-                merged_updates.append(base)
+                merged_updates.append(merged)
             continue
 
         unique_payloads = {
-            (_canonical_field_value(field, update.proposed_value), update.confidence)
+            (hashable_value(_canonical_field_value(field, update.proposed_value)), update.confidence)
             for update in updates
         }
         if len(unique_payloads) > 1:
@@ -669,28 +619,16 @@ def _fetch_target_rows(
     table_name = ENTITY_TABLES.get(entity_type)
     if not table_name:
         raise InputError(f"Unsupported entity type {entity_type!r} for row fetching.")
-    table_df = session.get(table=table_name, schema=schema, as_df=True)
-    rows = {}
+    table_df = fetch_rows_by_ids(session, table=table_name, schema=schema, ids=entity_ids)
+    rows = index_rows_by_id(table_df, entity_ids)
     for entity_id in entity_ids:
-        row_df = table_df[table_df["id"].astype(str) == entity_id]
-        if row_df.empty:
+        if entity_id not in rows:
             raise InputError(
                 f"{entity_type.title()} {entity_id!r} does not exist in schema {schema!r}; no update was applied."
             )
-        rows[entity_id] = row_df.iloc[0].to_dict()
     return table_df, rows
 
 
-def _resolve_column_case_insensitive(df: pd.DataFrame, column_name: str) -> str | None:
-    if column_name in df.columns:
-        return column_name
-    lower_name = column_name.lower()
-    for col in df.columns:
-        if str(col).lower() == lower_name:
-            return col
-    return None
-
-
 def _fetch_collection_fact_ids(
     session: DirectorySession,
     schema: str,
@@ -698,18 +636,20 @@ def _fetch_collection_fact_ids(
 ) -> tuple[pd.DataFrame, dict[str, list[str]]]:
     if not collection_ids:
         return pd.DataFrame(), {}
-    table_df = session.get(table="CollectionFacts", schema=schema, as_df=True)
+    table_df = fetch_rows_by_ids(
+        session,
+        table="CollectionFacts",
+        schema=schema,
+        ids=collection_ids,
+        filter_column="collection.id",
+    )
     if table_df.empty:
         return table_df, {collection_id: [] for collection_id in collection_ids}
-    id_column = _resolve_column_case_insensitive(table_df, "id")
-    collection_column = _resolve_column_case_insensitive(table_df, "collection")
+    id_column = resolve_column(table_df, "id")
+    collection_column = resolve_column(table_df, "collection")
     if id_column is None or collection_column is None:
         raise InputError("CollectionFacts table must contain 'id' and 'collection' columns for delete_rows fixes.")
-    by_collection: dict[str, list[str]] = {}
-    for collection_id in collection_ids:
-        subset = table_df[table_df[collection_column].astype(str) == collection_id]
-        by_collection[collection_id] = sorted(subset[id_column].astype(str))
-    return table_df, by_collection
+    return table_df, group_ids_by(table_df, collection_ids, key_column=collection_column, value_column=id_column)
 
 
 def _apply_update_to_row(row: dict, update: EntityFixProposal) -> dict:
@@ -804,12 +744,13 @@ def run_updater(args: argparse.Namespace) -> int:
             logging.debug("Using token-based authentication.")
         else:
             session.signin(args.directory_username, args.directory_password)
-        fact_row_updates = [
-            update
-            for update in merged_updates
-            if update.mode == FACT_ROW_DELETE_MODE and update.field == FACT_ROW_DELETE_FIELD
-        ]
-        non_fact_updates = [update for update in merged_updates if update not in fact_row_updates]
+        fact_row_updates = []
+        non_fact_updates = []
+        for update in merged_updates:
+            if update.mode == FACT_ROW_DELETE_MODE and update.field == FACT_ROW_DELETE_FIELD:
+                fact_row_updates.append(update)
+            else:
+                non_fact_updates.append(update)
         biobank_updates = [update for update in non_fact_updates if update.entity_type == "BIOBANK"]
         collection_updates = [update for update in non_fact_updates if update.entity_type == "COLLECTION"]
 
@@ -949,6 +890,7 @@ def run_updater(args: argparse.Namespace) -> int:
             logging.info("All approved updates were no-ops against the live data. Nothing was written.")
             return EXIT_OK
 
+        write_operations: list[WriteOperation] = []
         if changed_biobank_ids:
             changed_biobank_rows = pd.DataFrame(
                 [
@@ -958,7 +900,7 @@ def run_updater(args: argparse.Namespace) -> int:
                 ],
                 columns=biobanks_df.columns,
             )
-            session.save_table(table="Biobanks", schema=args.schema, data=changed_biobank_rows)
+            write_operations.append(WriteOperation(SAVE_ACTION, "Biobanks", changed_biobank_rows))
 
         if changed_collection_ids:
             changed_rows = pd.DataFrame(
@@ -969,14 +911,22 @@ def run_updater(args: argparse.Namespace) -> int:
                 ],
                 columns=collections_df.columns,
             )
-            session.save_table(table="Collections", schema=args.schema, data=changed_rows)
+            write_operations.append(WriteOperation(SAVE_ACTION, "Collections", changed_rows))
 
         if fact_rows_to_delete:
-            facts_id_column = _resolve_column_case_insensitive(collection_facts_df, "id")
+            facts_id_column = resolve_column(collection_facts_df, "id")
             if facts_id_column is None:
                 raise InputError("CollectionFacts table does not expose an 'id' column required for delete_rows fixes.")
             delete_df = pd.DataFrame({facts_id_column: sorted(fact_rows_to_delete)})
-            session.delete_records(table="CollectionFacts", schema=args.schema, data=delete_df)
+            write_operations.append(WriteOperation(DELETE_ACTION, "CollectionFacts", delete_df))
+
+        write_engine = write_engine_from_args(
+            session,
+            args.schema,
+            args,
+            job_key=write_job_key("qcheck-updater", args.schema, file_checksum(args.input)),
+        )
+        write_engine.run(write_operations)
 
         logging.info(
             "Applied %d update(s): %d biobank change(s), %d collection change(s), %d fact row deletion(s), in schema %s.",
@@ -1005,6 +955,9 @@ def main() -> int:
     except InputError as exc:
         logging.error("%s", exc)
         return EXIT_INPUT_ERROR
+    except WriteEngineError as exc:
+        logging.error("%s", exc)
+        return EXIT_RUNTIME_ERROR
 
 
 if __name__ == "__main__":
@@ -20,7 +20,9 @@ This work has been partially funded by the following sources:
 and has evolved within the context of the BBMRI-ERIC Common Service IT.
 """
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
+import json
 import pprint
 from datetime import datetime
 
@@ -44,6 +46,9 @@ ORPHA_DIRECTORY_PREFIX = 'ORPHA:'
 ICD_10_ONTOLOGY_PREFIX = 'http://purl.bioontology.org/ontology/ICD10/'
 ICD_10_DIRECTORY_PREFIX = 'urn:miriam:icd:'
 
+BATCH_SIZE = 1000
+ID_QUERY_CHUNK_SIZE = 100
+
 BIOBANKS_ATTRIBUTES = f'id,name,acronym,description,country,juridical_person,contact,collections'
 BIOBANKS_EXPAND_ATTRIBUTES = f'country,juridical_person,contact,collections'
 
@@ -88,49 +93,131 @@ def get_missing_biobanks(session, reset, **kwargs):
         return missing_biobanks
 
     print("Getting ids already present")
-    dest_records_ids = [r['identifier'] for r in session.get(FDP_BIOBANK, attributes='identifier')]
+    dest_records_ids = get_destination_ids(session, FDP_BIOBANK)
     new_records = [sr for sr in missing_biobanks if sr['id'] not in dest_records_ids]
     print("Found {} new records to insert".format(len(new_records)))
     return new_records
 
 
-def create_records(session, entity, records):
+def chunks(items, size):
+    """
+    Yields consecutive slices of :items: with at most :size: elements
+    """
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def run_batches(function, batches, concurrency=1):
+    """
+    Calls :function: on every batch, with up to :concurrency: batches in flight, and returns the results in order
+    """
+    batches = list(batches)
+    if concurrency <= 1 or len(batches) <= 1:
+        return [function(batch) for batch in batches]
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(batches))) as executor:
+        return list(executor.map(function, batches))
+
+
+def create_records(session, entity, records, concurrency=1):
     """
     Send converted data to the destination
 
     :params session: Molgenis session to use
     :params entity: the name of Molgenis entity type of the records to add
     :params records: lists of dictionary with data of the FDP entity to add
+    :params concurrency: number of batches of records sent at the same time
     """
-    created_records = []
-    for i in range(0, len(records), 1000):
+    def add_batch(batch):
         try:
-            created_records.extend(session.add_all(entity, records[i:i + 1000]))
+            return session.add_all(entity, batch)
         except MolgenisRequestError as ex:
             print("Error adding records")
             print(ex)
+            return []
+
+    created_records = []
+    for created in run_batches(add_batch, chunks(records, BATCH_SIZE), concurrency):
+        created_records.extend(created)
     print("Added {} record(s) of type {}".format(len(created_records), entity))
 
 
-def delete_records(session, entity, records_ids):
+def delete_records(session, entity, records_ids, concurrency=1):
     """
     Delete records in the destination Molgenis. Used when reset flag is True
 
     :params session: Molgenis session to use
     :params entity: the name of Molgenis entity type of the records to delete
     :params records_ids: the ids of the records of type :entity: to delete
+    :params concurrency: number of batches of ids deleted at the same time
     """
-    removed_records = []
-    for i in range(0, len(records_ids), 1000):
+    def delete_batch(batch):
         try:
-            removed_records.extend(
-                session.delete_list(entity, [record_id for record_id in records_ids[i:i + 1000]]))
+            return session.delete_list(entity, list(batch))
         except MolgenisRequestError as ex:
             print("Error removing records")
             print(ex)
+            return []
+
+    removed_records = []
+    for removed in run_batches(delete_batch, chunks(records_ids, BATCH_SIZE), concurrency):
+        removed_records.extend(removed)
     print(f"Removed {len(removed_records)} of type {entity}")
 
 
+def get_destination_ids(session, entity, id_attribute='identifier'):
+    """
+    Returns the set of ids of the records of type :entity: in the destination Molgenis
+    """
+    return {r[id_attribute] for r in session.get(entity, attributes=id_attribute)}
+
+
+def get_records_by_id(session, entity, records_ids, id_attribute='id', attributes=None):
+    """
+    Returns a dictionary {id: record} with the records of type :entity: whose :id_attribute: is in :records_ids:.
+    The ids are sent in chunks as RSQL "=in=" queries instead of one get_by_id call per record
+
+    :params session: Molgenis session to use
+    :params entity: the name of Molgenis entity type of the records to get
+    :params records_ids: the ids of the records to get
+    """
+    records = {}
+    for chunk in chunks(sorted(set(records_ids)), ID_QUERY_CHUNK_SIZE):
+        query = f'{id_attribute}=in=({",".join(json.dumps(record_id) for record_id in chunk)})'
+        kwargs = {'q': query}
+        if attributes is not None:
+            kwargs['attributes'] = attributes
+        for record in session.get(entity, **kwargs):
+            records[record[id_attribute]] = record
+    return records
+
+
+def get_reference_data(session, biobanks):
+    """
+    Prefetches, with one query per chunk of ids, the reference records needed to convert :biobanks::
+    contacts and data services from the source and the disease/type IRIs already present in the destination.
+    The result is passed to get_records_to_add to avoid one round trip per record
+    """
+    contact_ids = set()
+    iri_ids = set()
+    data_service_ids = set()
+    for b in biobanks:
+        if 'contact' in b:
+            contact_ids.add(b['contact']['id'])
+        for c in b['collections']:
+            iri_ids.update(d['id'] for d in c['diagnosis_available'])
+            iri_ids.update(t['id'] for t in c['type'])
+            if 'contact' in c:
+                contact_ids.add(c['contact']['id'])
+            if 'record_service' in c:
+                data_service_ids.add(c['record_service']['id'])
+    print(f"Prefetching {len(contact_ids)} contact(s), {len(iri_ids)} IRI(s) and {len(data_service_ids)} data service(s)")
+    return {
+        BBMRI_CONTACT_ENTITY: get_records_by_id(session, BBMRI_CONTACT_ENTITY, contact_ids),
+        FDP_IRI: set(get_records_by_id(session, FDP_IRI, iri_ids, attributes='id')),
+        BBMRI_DATA_SERVICE_ENTITY: get_records_by_id(session, BBMRI_DATA_SERVICE_ENTITY, data_service_ids),
+    }
+
+
 def get_country(country):
     """
     Returns the country code correspondent to the country in input
@@ -157,15 +244,42 @@ def get_collection_type_ontology_code(collection_type):
     return COLLECTION_TYPES_ONTOLOGIES.get(collection_type, None)
 
 
-def get_contact_record(session, contact_id):
+def get_source_record(session, entity, record_id, reference_data=None):
+    """
+    Returns the record with id :record_id: of type :entity:, from :reference_data: when it was prefetched.
+    Like session.get_by_id, it raises MolgenisRequestError when the record does not exist in the source
+    """
+    if reference_data is not None:
+        try:
+            return reference_data[entity][record_id]
+        except KeyError:
+            raise MolgenisRequestError(f'{entity} record {record_id} not found in the source') from None
+    return session.get_by_id(entity, record_id)
+
+
+def iri_exists(session, iri_id, reference_data=None):
+    """
+    Returns whether the IRI with id :iri_id: is already present in the destination
+    """
+    if reference_data is not None:
+        return iri_id in reference_data[FDP_IRI]
+    try:
+        session.get_by_id(FDP_IRI, iri_id, attributes='id')
+    except MolgenisRequestError:
+        return False
+    return True
+
+
+def get_contact_record(session, contact_id, reference_data=None):
     """
     Gets the contact data of the contact with id :contact_id: from the source Molgenis and
     returns the FDP corresponding FDP record
 
     :params session: Molgenis session to use
     :params contact_id: the id of the contact in the Directory
+    :params reference_data: prefetched records returned by get_reference_data, if any
     """
-    contact = session.get_by_id(BBMRI_CONTACT_ENTITY, contact_id)
+    contact = get_source_record(session, BBMRI_CONTACT_ENTITY, contact_id, reference_data)
     return (
         f'{contact["id"]}',
         f'mailto:{contact["email"]}',
@@ -177,7 +291,7 @@ def get_contact_record(session, contact_id):
     )
 
 
-def get_records_to_add(biobank_data, session, directory_prefix):
+def get_records_to_add(biobank_data, session, directory_prefix, reference_data=None):
     """
     It generates the FDP records related to a biobank from the representation of the biobank in the Directory.
     It returns a dictionary with data for entities:
@@ -187,6 +301,8 @@ def get_records_to_add(biobank_data, session, directory_prefix):
     fdp_Contacts: contact of the biobank and the collections to add
     fdp_IRI: codes of diseases and collection types (if not already present in the destination)
     fdp_DataService: data related to the Data service, if present
+    When :reference_data: (see get_reference_data) is given, contacts, IRIs and data services are looked up there
+    instead of being requested one by one
     """
 
     missing_iris = []
@@ -196,35 +312,31 @@ def get_records_to_add(biobank_data, session, directory_prefix):
 
     print("getting biobank's contact data")
     if 'contact' in biobank_data:
-        contacts.append(get_contact_record(session, biobank_data['contact']['id']))
+        contacts.append(get_contact_record(session, biobank_data['contact']['id'], reference_data))
 
     for collection in biobank_data['collections']:
         print("processing collection", collection['id'])
         for d in collection['diagnosis_available']:
             # it checks if the diagnosis is already present in the destination, if not it adds it to the ones to insert
-            try:
-                session.get_by_id('fdp_IRI', d['id'], attributes='id')
-            except MolgenisRequestError:
+            if not iri_exists(session, d['id'], reference_data):
                 ontology_code = get_disease_ontology_code(d['id'])
                 if ontology_code is not None:
                     missing_iris.append((d['id'], ontology_code))
 
         for t in collection['type']:
             # same as diagnosis for collection type
-            try:
-                session.get_by_id('fdp_IRI', t['id'], attributes='id')
-            except MolgenisRequestError:
+            if not iri_exists(session, t['id'], reference_data):
                 ontology_code = get_collection_type_ontology_code(t['id'])
                 if ontology_code is not None:
                     missing_iris.append((t['id'], ontology_code))
 
         if 'contact' in collection:
             # it adds data about the contacts
-            contacts.append(get_contact_record(session, collection['contact']['id']))
+            contacts.append(get_contact_record(session, collection['contact']['id'], reference_data))
 
         if 'record_service' in collection:
             # if the collection has a record service it generates the corresponding DataService
-            rs = session.get_by_id(BBMRI_DATA_SERVICE_ENTITY, collection['record_service']['id'])
+            rs = get_source_record(session, BBMRI_DATA_SERVICE_ENTITY, collection['record_service']['id'], reference_data)
             data_services.append({
                 'identifier': rs['id'],
                 'endpointUrl': rs['url'],
@@ -295,30 +407,49 @@ def get_collections_in_catalog(session):
     return [c['identifier'] for c in catalog['collection']]
 
 
-def reset_catalog(session, collections_to_update):
-    collections_in_catalog = get_collections_in_catalog(session)
-    collections_to_update_ids = list([c['IRI'].split('/')[-1] for c in collections_to_update])
-    for c in collections_in_catalog[:]:
-        if c in collections_to_update_ids:
-            collections_in_catalog.remove(c)
+def reset_catalog(session, collections_to_update, collections_in_catalog=None):
+    """
+    Removes the collections to update from the catalog and returns the collections left in it
+    """
+    if collections_in_catalog is None:
+        collections_in_catalog = get_collections_in_catalog(session)
+    collections_to_update_ids = {c['IRI'].split('/')[-1] for c in collections_to_update}
+    collections_in_catalog = [c for c in collections_in_catalog if c not in collections_to_update_ids]
     session.update_one('fdp_Catalog', 'bbmri-directory', 'collection', collections_in_catalog)
+    return collections_in_catalog
 
 
-def update_catalog(session, new_collections):
-    prev_collections = get_collections_in_catalog(session)
+def update_catalog(session, new_collections, prev_collections=None):
+    if prev_collections is None:
+        prev_collections = get_collections_in_catalog(session)
 
     collections = set(prev_collections + [c['identifier'] for c in new_collections])
 
     session.update_one(FDP_CATALOG, 'bbmri-directory', 'collection', list(collections))
 
 
-def sync(session, directory_prefix, reset, **kwargs):
+def unique_records(records, id_attribute='identifier'):
+    """
+    Returns :records: without the ones whose id is repeated, keeping the first one
+    """
+    unique = {}
+    for r in records:
+        unique.setdefault(r[id_attribute], r)
+    return list(unique.values())
+
+
+def sync(session, directory_prefix, reset, bulk=False, concurrency=1, **kwargs):
     """
     Main function that gets the data of the missing biobanks, convert it and upload the new records.
+
+    In bulk mode the reference records (contacts, IRIs, data services and the catalog collections) are
+    prefetched once, records already present in the destination are skipped by comparing id sets and
+    records are sent in up to :concurrency: concurrent batches per entity.
     """
     # it gets the missing biobanks
     missing_biobanks = get_missing_biobanks(session, reset=reset, attributes=BIOBANKS_ATTRIBUTES,
                                             expand=BIOBANKS_EXPAND_ATTRIBUTES, **kwargs)
+    reference_data = get_reference_data(session, missing_biobanks) if bulk else None
 
     # it gathers the data for all the biobanks
     records = OrderedDict({
@@ -331,7 +462,7 @@ def sync(session, directory_prefix, reset, **kwargs):
     })
     for b in missing_biobanks:
         # it gets the records to add for a biobank
-        new_records = get_records_to_add(b, session, directory_prefix)
+        new_records = get_records_to_add(b, session, directory_prefix, reference_data)
         # it updates the overall records with the ones from of the processed biobank
         for k, v in new_records.items():
             if type(records[k]) == list:
@@ -341,23 +472,30 @@ def sync(session, directory_prefix, reset, **kwargs):
                     records[k].append(new_records[k])
             else:
                 records[k].update(new_records[k])
+    if bulk:
+        # collections sharing a record service produce the same data service
+        records[FDP_DATA_SERVICE] = unique_records(records[FDP_DATA_SERVICE])
+
+    collections_in_catalog = get_collections_in_catalog(session) if bulk else None
 
     # if the reset flag is True, it deletes the old records
     if reset:
-        reset_catalog(session, records[FDP_COLLECTION])
+        collections_in_catalog = reset_catalog(session, records[FDP_COLLECTION], collections_in_catalog)
 
         for k, v in reversed(records.items()):
             if k not in (FDP_IRI, FDP_CONTACT) and len(v) > 0:
-                delete_records(session, k, [i['identifier'] for i in v])
+                delete_records(session, k, [i['identifier'] for i in v], concurrency)
             if k == FDP_CONTACT and len(v) > 0:
-                delete_records(session, k, [i[0] for i in v])
+                delete_records(session, k, [i[0] for i in v], concurrency)
 
     for k, v in records.items():
         if len(v) > 0:
             if k == FDP_IRI:
-                create_records(session, k, [{'id': i[0], 'IRI': i[1]} for i in v])
-            elif k == FDP_CONTACT:
-                create_records(session, k, [{
+                # missing IRIs are already computed against the destination
+                create_records(session, k, [{'id': i[0], 'IRI': i[1]} for i in v], concurrency)
+                continue
+            if k == FDP_CONTACT:
+                rows = [{
                     'identifier': i[0],
                     'email': i[1],
                     'telephone': i[2],
@@ -365,11 +503,15 @@ def sync(session, directory_prefix, reset, **kwargs):
                     'family_name': i[4],
                     'honorific_prefix': i[5],
                     'honorific_suffix': i[6]
-                } for i in v])
+                } for i in v]
             else:
-                create_records(session, k, v)
+                rows = v
+            if bulk:
+                present_ids = get_destination_ids(session, k)
+                rows = [r for r in rows if r['identifier'] not in present_ids]
+            create_records(session, k, rows, concurrency)
 
-    update_catalog(session, records[FDP_COLLECTION])
+    update_catalog(session, records[FDP_COLLECTION], collections_in_catalog)
 
 
 if __name__ == '__main__':
@@ -382,10 +524,18 @@ if __name__ == '__main__':
     parser.add_argument('--directory-prefix', '-d',
                         help='The main prefix of the url to be used to generate IRIs')
     parser.add_argument('--reset', '-r', dest='reset', action='store_true')
+    parser.add_argument('--bulk', '-b', action='store_true',
+                        help='Prefetch contacts, IRIs, data services and catalog data once and skip records '
+                             'already present in the destination')
+    parser.add_argument('--concurrency', '-c', type=int, default=1,
+                        help='Number of add/delete batches sent at the same time (default: 1)')
     args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error('--concurrency must be at least 1')
 
     directory_prefix = args.directory_prefix  # .replace('/', '', -1)  # just in case the input put the last /, it removes it
     s = client.Session(args.molgenis_url)
     s.login(args.molgenis_user, args.molgenis_password)
 
-    sync(s, directory_prefix, args.reset, q="id==bbmri-eric:ID:EU_BBMRI-ERIC")
+    sync(s, directory_prefix, args.reset, bulk=args.bulk, concurrency=args.concurrency,
+         q="id==bbmri-eric:ID:EU_BBMRI-ERIC")
@@ -0,0 +1,121 @@
+#!/usr/bin/python3
+# vim:ts=4:sw=4:tw=0:sts=4:et
+
+"""Bounded-memory streaming of large CSV/TSV table files.
+
+``iter_file_chunks`` reads a file in ``chunk_rows`` slices with pandas'
+``chunksize``. ``align_chunks_to_groups`` moves the trailing rows of a group
+(e.g. one collection) into the next chunk, so per-group checks such as the
+complementary k-anonymity scan see each collection whole as long as the file
+keeps a collection's rows together. ``OverlappedWriter`` hands prepared chunks
+to a background worker so that uploading chunk *n* overlaps with parsing and
+filtering chunk *n + 1*.
+"""
+
+from __future__ import annotations
+
+import logging as log
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional
+
+import pandas as pd
+
+
+DEFAULT_IMPORT_CHUNK_ROWS = 50_000
+
+
+def iter_file_chunks(path, chunk_rows: int = DEFAULT_IMPORT_CHUNK_ROWS, **read_options) -> Iterator[pd.DataFrame]:
+    """Yield ``pd.read_csv`` chunks of at most ``chunk_rows`` rows."""
+    if chunk_rows < 1:
+        raise ValueError("chunk_rows must be positive")
+    with pd.read_csv(path, chunksize=chunk_rows, **read_options) as reader:
+        yield from reader
+
+
+def read_file_header(path, **read_options) -> list[str]:
+    """Return the column names of a CSV/TSV file without reading its rows."""
+    return list(pd.read_csv(path, nrows=0, **read_options).columns)
+
+
+def align_chunks_to_groups(chunks: Iterable[pd.DataFrame], group_column: Optional[str]) -> Iterator[pd.DataFrame]:
+    """Re-cut chunks so that a run of rows sharing ``group_column`` is never split.
+
+    The trailing run of a chunk is moved into the next one (a group larger
+    than a chunk is carried until it ends); the last chunk is yielded whole.
+    Groups that reappear after they were already emitted (unsorted input) are
+    reported once.
+    """
+    if group_column is None:
+        yield from chunks
+        return
+    pending = None
+    emitted = set()
+    warned = False
+
+    def check_contiguous(frame):
+        nonlocal warned
+        groups = set(frame[group_column])
+        if not warned and groups & emitted:
+            log.warning(
+                "Rows of the same %s are not contiguous in the input; per-%s checks only see them chunk by chunk.",
+                group_column,
+                group_column,
+            )
+            warned = True
+        emitted.update(groups)
+
+    for chunk in chunks:
+        if pending is None:
+            pending = chunk
+            continue
+        groups = pending[group_column].to_numpy()
+        start = len(groups)
+        while start > 0 and groups[start - 1] == groups[-1]:
+            start -= 1
+        head = pending.iloc[:start]
+        pending = pd.concat([pending.iloc[start:], chunk], ignore_index=True)
+        if not head.empty:
+            check_contiguous(head)
+            yield head
+    if pending is not None and not pending.empty:
+        check_contiguous(pending)
+        yield pending
+
+
+class OverlappedWriter:
+    """Run ``write(chunk)`` calls on one background thread, in submission order.
+
+    At most ``max_pending`` chunks wait for upload; ``submit`` blocks (and
+    re-raises the first upload error) once that limit is reached.
+    """
+
+    def __init__(self, write: Callable[[pd.DataFrame], object], max_pending: int = 2):
+        self._write = write
+        self._max_pending = max_pending
+        self._pending: deque[Future] = deque()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def __enter__(self) -> "OverlappedWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is not None:
+            for future in self._pending:
+                future.cancel()
+            self._executor.shutdown(wait=True)
+            return False
+        try:
+            self.drain()
+        finally:
+            self._executor.shutdown(wait=True)
+        return False
+
+    def submit(self, chunk: pd.DataFrame) -> None:
+        while len(self._pending) >= self._max_pending:
+            self._pending.popleft().result()
+        self._pending.append(self._executor.submit(self._write, chunk))
+
+    def drain(self) -> None:
+        while self._pending:
+            self._pending.popleft().result()
@@ -36,6 +36,13 @@ def pytest_addoption(parser):
             "Defaults to env DIRECTORY_TEST_MODE or both."
         ),
     )
+    group = parser.getgroup("benchmarks")
+    group.addoption(
+        "--run-benchmarks",
+        action="store_true",
+        default=False,
+        help="Run opt-in performance benchmarks on synthetic data.",
+    )
 
 
 def pytest_configure(config):
@@ -43,6 +50,20 @@ def pytest_configure(config):
         "markers",
         "live_directory: tests that connect to live Directory API data.",
     )
+    config.addinivalue_line(
+        "markers",
+        "benchmark: opt-in performance benchmarks enabled with --run-benchmarks.",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip benchmark-marked tests unless --run-benchmarks is given."""
+    if config.getoption("--run-benchmarks"):
+        return
+    skip_benchmark = pytest.mark.skip(reason="benchmark; use --run-benchmarks to run")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip_benchmark)
 
 
 @pytest.fixture(scope="session")
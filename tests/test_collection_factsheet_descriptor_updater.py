@@ -1,8 +1,10 @@
+import json
 from argparse import Namespace
 from importlib.util import module_from_spec, spec_from_file_location
 from pathlib import Path
 
 import pandas as pd
+import pytest
 
 
 MODULE_PATH = Path(__file__).resolve().parents[1] / "collection-factsheet-descriptor-updater.py"
@@ -58,10 +60,11 @@ def test_update_collection_from_facts_reads_eric_from_configured_target(monkeypa
             assert username == "user"
             assert password == "secret"
 
-        def get(self, *, table, schema, as_df):
+        def get(self, *, table, schema, as_df, query_filter=None):
             assert table == "Collections"
             assert schema == "BBMRI-CZ"
             assert as_df is True
+            assert query_filter == 'id == ["bbmri-eric:ID:CZ_demo:collection:col1"]'
             return pd.DataFrame(
                 [
                     {
@@ -107,3 +110,155 @@ def test_update_collection_from_facts_reads_eric_from_configured_target(monkeypa
     assert directory_calls[0]["directory_url"] == "https://directory.example.org"
     assert directory_calls[0]["include_withdrawn_entities"] is True
     assert session_urls == ["https://directory.example.org"]
+
+
+def _fact(fact_id, sex, sample_type, donors):
+    return {
+        "id": fact_id,
+        "sex": sex,
+        "age_range": "Adult",
+        "sample_type": sample_type,
+        "disease": {"name": "urn:miriam:icd:C18.1"},
+        "number_of_samples": donors,
+        "number_of_donors": donors,
+    }
+
+
+def test_batch_update_reviews_all_collections_and_saves_changed_rows_once(monkeypatch, tmp_path):
+    monkeypatch.setenv("DIRECTORY_CACHE_ROOT", str(tmp_path))
+    module = load_module()
+    prefix = "bbmri-eric:ID:CZ_demo:collection:"
+    facts = {
+        f"{prefix}col1": [_fact("f1", "MALE", "PLASMA", 20)],
+        f"{prefix}col2": [_fact("f2", "FEMALE", "SERUM", 30)],
+        f"{prefix}col3": [],
+        f"{prefix}done": [_fact("f4", "MALE", "PLASMA", 20)],
+    }
+    directory_instances = []
+    saved = []
+    get_requests = []
+
+    class DirectoryStub:
+        def __init__(self, **kwargs):
+            directory_instances.append(kwargs)
+
+        def getCollectionById(self, collection_id, raise_on_missing=False):
+            return {"id": collection_id} if collection_id in facts else None
+
+        def getCollections(self):
+            return [{"id": collection_id} for collection_id in facts] + [{"id": "bbmri-eric:ID:DE_x:collection:other"}]
+
+        def getCollectionFacts(self, collection_id):
+            return facts[collection_id]
+
+    live_rows = pd.DataFrame(
+        [
+            {
+                "id": f"{prefix}{name}",
+                "diagnosis_available": "",
+                "materials": "",
+                "sex": "",
+                "size": "",
+                "number_of_donors": "",
+                "age_low": "",
+                "age_high": "",
+                "age_unit": "",
+            }
+            for name in ("col1", "col2", "col3")
+        ]
+        + [
+            {
+                "id": f"{prefix}done",
+                "diagnosis_available": "urn:miriam:icd:C18.1",
+                "materials": "PLASMA",
+                "sex": "MALE",
+                "size": "20",
+                "number_of_donors": "20",
+                "age_low": "25",
+                "age_high": "44",
+                "age_unit": "YEAR",
+            }
+        ]
+    )
+
+    class DirectorySessionStub:
+        def __init__(self, url, token=None):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
+        def get(self, *, table, schema, as_df, query_filter=None):
+            get_requests.append(query_filter)
+            column, values = query_filter.split(" == ", 1)
+            return live_rows[live_rows[column].isin(json.loads(values))].reset_index(drop=True)
+
+        def save_table(self, *, table, schema, data):
+            saved.append((table, schema, data.copy()))
+
+    monkeypatch.setattr(module, "Directory", DirectoryStub)
+    monkeypatch.setattr(module, "DirectorySession", DirectorySessionStub)
+    args = Namespace(
+        collection_id=None,
+        collections_file=None,
+        id_regex="CZ_demo",
+        jobs=2,
+        schema="BBMRI-CZ",
+        verbose=False,
+        debug=False,
+        dry_run=False,
+        force=True,
+        quiet=True,
+        replace_existing=False,
+        directory_target="https://directory.example.org",
+        directory_token="tok",
+    )
+
+    assert module.update_collection_from_facts(args) == module.EXIT_OK
+
+    assert len(directory_instances) == 1
+    assert len(get_requests) == 1
+    assert len(saved) == 1
+    table, schema, data = saved[0]
+    assert (table, schema) == ("Collections", "BBMRI-CZ")
+    assert sorted(data["id"]) == [f"{prefix}col1", f"{prefix}col2"]
+    assert list(data.columns) == list(live_rows.columns)
+    col2 = data.set_index("id").loc[f"{prefix}col2"]
+    assert (col2["materials"], col2["sex"]) == ("SERUM", "FEMALE")
+
+
+class _EricStub:
+    def __init__(self, collection_ids):
+        self.collection_ids = collection_ids
+
+    def getCollectionById(self, collection_id, raise_on_missing=False):
+        if collection_id in self.collection_ids:
+            return {"id": collection_id}
+        if raise_on_missing:
+            raise KeyError(collection_id)
+        return None
+
+    def getCollections(self):
+        return [{"id": collection_id} for collection_id in self.collection_ids]
+
+
+def test_select_collections_skips_ids_missing_from_eric_in_batch_runs(tmp_path, caplog):
+    module = load_module()
+    prefix = "bbmri-eric:ID:CZ_demo:collection:"
+    eric = _EricStub([f"{prefix}col1", f"{prefix}col2"])
+    collections_file = tmp_path / "collections.txt"
+    collections_file.write_text(f"{prefix}col2\n{prefix}gone2  # withdrawn\n", encoding="utf-8")
+
+    listed = Namespace(collection_id=[f"{prefix}col1,{prefix}gone1"], collections_file=str(collections_file), id_regex=None)
+    assert module.select_collections(listed, eric) == ([f"{prefix}col1", f"{prefix}col2"], True)
+    assert f"{prefix}gone1, {prefix}gone2" in caplog.text
+
+    regex = Namespace(collection_id=f"{prefix}gone1", collections_file=None, id_regex="CZ_demo", schema="BBMRI-CZ")
+    assert module.select_collections(regex, eric) == ([f"{prefix}col1", f"{prefix}col2"], True)
+
+    single = Namespace(collection_id=f"{prefix}gone1", collections_file=None, id_regex=None)
+    with pytest.raises(module.InputError, match="not found in ERIC"):
+        module.select_collections(single, eric)
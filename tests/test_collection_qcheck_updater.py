@@ -4,15 +4,22 @@ from pathlib import Path
 import json
 
 import logging
+import time
 import warnings
 
 import pandas as pd
+import pytest
 
-from fix_proposals import compute_checksum
+from fix_proposals import EntityFixProposal, compute_checksum
 
 MODULE_PATH = Path(__file__).resolve().parents[1] / "qcheck-updater.py"
 
 
+@pytest.fixture(autouse=True)
+def isolated_write_journal(tmp_path, monkeypatch):
+    monkeypatch.setenv("DIRECTORY_CACHE_ROOT", str(tmp_path / "cache"))
+
+
 def load_module():
     spec = spec_from_file_location("collection_qcheck_updater", MODULE_PATH)
     module = module_from_spec(spec)
@@ -141,7 +148,7 @@ def test_collection_qcheck_updater_dry_run_checks_live_mismatch_and_does_not_sav
             assert username == "user"
             assert password == "secret"
 
-        def get(self, *, table, schema, as_df):
+        def get(self, *, table, schema, as_df, query_filter=None):
             assert table == "Collections"
             assert schema == "BBMRI-CZ"
             assert as_df is True
@@ -244,7 +251,7 @@ def test_collection_qcheck_updater_ignores_multi_value_order_only_mismatches(tmp
             assert username == "user"
             assert password == "secret"
 
-        def get(self, *, table, schema, as_df):
+        def get(self, *, table, schema, as_df, query_filter=None):
             assert table == "Collections"
             assert schema == "BBMRI-CZ"
             assert as_df is True
@@ -323,7 +330,7 @@ def test_collection_qcheck_updater_review_display_normalizes_multi_value_order(t
             assert username == "user"
             assert password == "secret"
 
-        def get(self, *, table, schema, as_df):
+        def get(self, *, table, schema, as_df, query_filter=None):
             assert table == "Collections"
             assert schema == "BBMRI-CZ"
             assert as_df is True
@@ -403,7 +410,7 @@ def test_collection_qcheck_updater_does_not_append_duplicate_duo_with_different_
             assert username == "user"
             assert password == "secret"
 
-        def get(self, *, table, schema, as_df):
+        def get(self, *, table, schema, as_df, query_filter=None):
             assert table == "Collections"
             assert schema == "BBMRI-CZ"
             assert as_df is True
@@ -480,7 +487,7 @@ def test_collection_qcheck_updater_saves_changed_rows_without_dtype_assignment_f
             assert username == "user"
             assert password == "secret"
 
-        def get(self, *, table, schema, as_df):
+        def get(self, *, table, schema, as_df, query_filter=None):
             assert table == "Collections"
             assert schema == "BBMRI-CZ"
             assert as_df is True
@@ -573,7 +580,7 @@ def test_collection_qcheck_updater_handles_live_mismatch_per_update_in_interacti
             assert username == "user"
             assert password == "secret"
 
-        def get(self, *, table, schema, as_df):
+        def get(self, *, table, schema, as_df, query_filter=None):
             assert table == "Collections"
             assert schema == "BBMRI-CZ"
             assert as_df is True
@@ -678,7 +685,7 @@ def test_collection_qcheck_updater_applies_fact_row_delete_updates(tmp_path, mon
             assert username == "user"
             assert password == "secret"
 
-        def get(self, *, table, schema, as_df):
+        def get(self, *, table, schema, as_df, query_filter=None):
             assert schema == "BBMRI-CZ"
             assert as_df is True
             if table == "Collections":
@@ -727,7 +734,7 @@ def test_collection_qcheck_updater_can_ignore_and_record_false_positive(tmp_path
             assert username == "user"
             assert password == "secret"
 
-        def get(self, *, table, schema, as_df):
+        def get(self, *, table, schema, as_df, query_filter=None):
             if table == "Collections":
                 return pd.DataFrame(
                     [{"id": "bbmri-eric:ID:CZ_demo:collection:col1", "data_use": ""}]
@@ -827,7 +834,7 @@ def test_collection_qcheck_updater_applies_biobank_updates(tmp_path, monkeypatch
             assert username == "user"
             assert password == "secret"
 
-        def get(self, *, table, schema, as_df):
+        def get(self, *, table, schema, as_df, query_filter=None):
             assert schema == "BBMRI-CZ"
             assert as_df is True
             if table == "Biobanks":
@@ -877,3 +884,97 @@ def test_collection_qcheck_updater_applies_biobank_updates(tmp_path, monkeypatch
     row = saved[0]["data"].iloc[0].to_dict()
     assert row["id"] == "bbmri-eric:ID:CZ_demo"
     assert row["collaboration_non_for_profit"] is True
+
+
+def _plan_update(index, *, entity_id, field, mode, proposed_value, confidence="certain", exclusive_group=""):
+    return {
+        "update_id": f"update.{index}",
+        "module": ("AP", "FT", "CC")[index % 3],
+        "entity_type": "COLLECTION",
+        "entity_id": entity_id,
+        "field": field,
+        "mode": mode,
+        "confidence": confidence,
+        "current_value_at_export": [],
+        "proposed_value": proposed_value,
+        "human_explanation": "x",
+        "term_explanations": [{"term_id": f"T{index}", "label": "term"}],
+        "source_check_ids": [f"{('AP', 'FT', 'CC')[index % 3]}:Check{index % 7}"],
+        "source_warning_messages": [f"message {index % 11}"],
+        "exclusive_group": exclusive_group,
+    }
+
+
+def test_collection_qcheck_updater_merges_groups_in_one_pass():
+    module = load_module()
+    entity = "bbmri-eric:ID:CZ_demo:collection:col1"
+    updates = [
+        EntityFixProposal(**_plan_update(1, entity_id=entity, field="sex", mode="append", proposed_value=["MALE"])),
+        EntityFixProposal(
+            **_plan_update(2, entity_id=entity, field="sex", mode="append", proposed_value=["FEMALE", "MALE"], confidence="almost_certain")
+        ),
+        EntityFixProposal(**_plan_update(3, entity_id=entity, field="materials", mode="replace", proposed_value=["DNA", "SERUM"])),
+        EntityFixProposal(**_plan_update(4, entity_id=entity, field="materials", mode="replace", proposed_value=["SERUM", "DNA"])),
+        EntityFixProposal(**_plan_update(5, entity_id=entity, field="name", mode="set", proposed_value="A")),
+        EntityFixProposal(**_plan_update(6, entity_id=entity, field="name", mode="set", proposed_value="B")),
+    ]
+
+    merged, conflicts = module._merge_updates(updates)
+
+    assert [(update.field, update.proposed_value, update.confidence) for update in merged] == [
+        ("sex", ["MALE", "FEMALE"], "almost_certain"),
+        ("materials", ["DNA", "SERUM"], "certain"),
+    ]
+    assert merged[0].source_check_ids == ["FT:Check1", "CC:Check2"]
+    assert conflicts == [f"{entity} field name has conflicting target values: update.5, update.6"]
+
+
+@pytest.mark.benchmark
+def test_benchmark_collection_qcheck_updater_filters_and_merges_100k_plan(record_property):
+    module = load_module()
+    payload = {
+        "updates": [
+            _plan_update(
+                index,
+                # every 20th update lands on one heavily proposed collection
+                entity_id=(
+                    f"bbmri-eric:ID:{('CZ', 'DE', 'EU')[index % 3]}_demo:collection:col{index // 5}"
+                    if index % 20
+                    else "bbmri-eric:ID:CZ_demo:collection:hot"
+                ),
+                field=("sex", "materials", "diagnosis_available", "name", "facts")[index % 5],
+                mode=("append", "append", "append", "set", "delete_rows")[index % 5],
+                proposed_value=(
+                    "Name" if index % 5 == 3 else [f"row{index}"] if index % 5 == 4 else [f"VALUE{index}"]
+                ),
+                confidence=("certain", "almost_certain", "uncertain")[index % 3],
+                exclusive_group="names" if index % 5 == 3 else "",
+            )
+            for index in range(100_000)
+        ]
+    }
+    payload["updates"] += [dict(update, update_id=update["update_id"] + ".dup") for update in payload["updates"][:20_000]]
+    args = Namespace(
+        entity_id=None,
+        root_id=None,
+        staging_area=["CZ,DE"],
+        check_id=[],
+        update_id=[],
+        module=["AP", "FT"],
+        confidence="all",
+        list=False,
+    )
+
+    start_time = time.perf_counter()
+    selected = module._filter_updates(args, payload, directory=None)
+    filter_elapsed = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    merged, conflicts = module._merge_updates(selected)
+    merge_elapsed = time.perf_counter() - start_time
+
+    record_property("updates", len(payload["updates"]))
+    record_property("filter_seconds", round(filter_elapsed, 3))
+    record_property("merge_seconds", round(merge_elapsed, 3))
+    assert merged
+    assert conflicts
+    assert filter_elapsed + merge_elapsed < 60
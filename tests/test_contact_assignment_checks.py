@@ -2,6 +2,7 @@ from types import SimpleNamespace
 
 from checks.ContactAssignments import ContactAssignments
 from checks.ContactReuse import ContactReuse
+from contact_assignment_utils import ContactIndex
 
 
 class ContactAssignmentDirectoryStub:
@@ -130,6 +131,8 @@ class ContactAssignmentDirectoryStub:
                 },
             ]
         )
+        self.contact_index_builds = 0
+        self._contact_index = None
         self.collections = [
             {
                 "id": "bbmri-eric:ID:AT_MUG:collection:local",
@@ -184,6 +187,12 @@ class ContactAssignmentDirectoryStub:
     def getContacts(self):
         return self.contacts
 
+    def getContactIndex(self):
+        if self._contact_index is None:
+            self.contact_index_builds += 1
+            self._contact_index = ContactIndex(self)
+        return self._contact_index
+
     def getCollections(self):
         return self.collections
 
@@ -261,3 +270,39 @@ def test_contact_assignments_do_not_warn_for_generic_cross_biobank_shared_contac
     assert "ct_multi_owner_service" not in warned_entities
     assert "bbmri-eric:ID:NL_SERVICE_A:collection:service_a" not in warned_entities
     assert "bbmri-eric:ID:NL_SERVICE_B:collection:service_b" not in warned_entities
+
+
+def test_contact_checks_share_one_contact_index_per_directory():
+    directory = ContactAssignmentDirectoryStub()
+
+    ContactReuse().check(directory, SimpleNamespace())
+    ContactAssignments().check(directory, SimpleNamespace())
+
+    assert directory.contact_index_builds == 1
+
+
+def test_contact_index_lookups_by_email_domain_address_and_usage():
+    index = ContactIndex(ContactAssignmentDirectoryStub())
+
+    assert index.get_contacts_by_email(" Biobank@MedUniGraz.at ") == {"ct_at_mug_main"}
+    assert index.get_contacts_by_domain("medunigraz.at") == {"ct_at_mug_main", "ct_at_mug_specialist"}
+    address_key = index.get_contact_address_key("ct_same_institution_split")
+    assert index.get_contacts_by_address_key(address_key) == {
+        "ct_same_institution_split",
+        "ct_same_institution_split_biobank",
+    }
+    assert index.get_domain_owner("ct_at_mug_specialist") == "bbmri-eric:ID:AT_MUG"
+    assert index.get_address_owners("ct_same_institution_split") == [
+        "bbmri-eric:ID:NL_INST_A",
+        "bbmri-eric:ID:NL_INST_B",
+    ]
+    assert sorted(index.contact_to_biobank_counts["ct_shared_study"]) == [
+        "bbmri-eric:ID:DE_A",
+        "bbmri-eric:ID:DE_B",
+    ]
+    assert index.main_contact_to_biobanks["ct_multi_owner_service"] == {
+        "bbmri-eric:ID:NL_SERVICE_MAIN_A",
+        "bbmri-eric:ID:NL_SERVICE_MAIN_B",
+    }
+    assert index.collection_to_contacts["bbmri-eric:ID:DE_A:collection:shared1"] == ["ct_shared_study"]
+    assert index.get_contact("ct_missing") is None
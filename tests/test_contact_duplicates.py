@@ -0,0 +1,163 @@
+import random
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from checks.ContactDuplicates import ContactDuplicates
+from contact_duplicates import (
+    MinHasher,
+    build_contact_shingles,
+    find_near_duplicate_contacts,
+    get_phone_key,
+)
+
+
+CONTACTS = [
+    {
+        "id": "bbmri-eric:contactID:CZ_1",
+        "first_name": "Jana",
+        "last_name": "Nováková",
+        "email": "jana.novakova@mou.cz",
+        "phone": "+420 543 136 201",
+        "address": "Žlutý kopec 7",
+        "zip": "656 53",
+        "city": "Brno",
+    },
+    {
+        "id": "bbmri-eric:contactID:CZ_2",
+        "first_name": "Jana",
+        "last_name": "Novakova",
+        "email": "novakova.jana@mou.cz",
+        "phone": "00420543136201",
+        "address": "Zluty kopec 7",
+        "zip": "65653",
+        "city": "Brno",
+    },
+    {
+        "id": "bbmri-eric:contactID:CZ_3",
+        "first_name": "Petr",
+        "last_name": "Dvořák",
+        "email": "petr.dvorak@mou.cz",
+        "phone": "+420 543 136 201",
+        "address": "Žlutý kopec 7",
+        "zip": "656 53",
+        "city": "Brno",
+    },
+    {
+        "id": "bbmri-eric:contactID:DE_4",
+        "first_name": "Hans",
+        "last_name": "Müller",
+        "email": "h.mueller@uni-example.de",
+    },
+]
+
+
+class ContactDuplicatesDirectoryStub:
+    def getContacts(self):
+        return CONTACTS
+
+    def getContactNN(self, contact_id):
+        return contact_id.split(":")[2][:2]
+
+
+def test_phone_key_ignores_formatting_and_country_prefix():
+    assert get_phone_key({"phone": "+420 543 136 201"}) == get_phone_key({"phone": "00420543136201"})
+    assert get_phone_key({"phone": "123"}) == ""
+
+
+def test_shingles_fold_accents_and_separate_name_features():
+    shingles, name_shingles = build_contact_shingles(CONTACTS[0])
+
+    assert "n:nov" in name_shingles
+    assert "e:jan" in shingles
+    assert "a:zluty" in shingles
+    assert all(shingle.startswith("n:") for shingle in name_shingles)
+
+
+def test_minhash_signatures_estimate_jaccard_similarity():
+    left = {f"x{i}" for i in range(100)}
+    right = {f"x{i}" for i in range(50, 150)}
+    signatures = MinHasher(num_perm=256).signatures([left, right, left])
+
+    assert (signatures[0] == signatures[2]).all()
+    estimate = float((signatures[0] == signatures[1]).mean())
+    assert abs(estimate - 1 / 3) < 0.1
+
+
+def test_near_duplicates_found_with_scores_without_flagging_colleagues():
+    pairs = find_near_duplicate_contacts(CONTACTS)
+
+    assert [(pair.contact_id, pair.other_contact_id) for pair in pairs] == [
+        ("bbmri-eric:contactID:CZ_1", "bbmri-eric:contactID:CZ_2"),
+    ]
+    assert 0.6 <= pairs[0].similarity <= 1
+    assert pairs[0].shared_signals == ["address", "email", "name", "phone"]
+
+
+def test_near_duplicate_detection_validates_lsh_parameters():
+    with pytest.raises(ValueError):
+        find_near_duplicate_contacts(CONTACTS, num_perm=64, bands=10)
+
+
+def test_contact_duplicates_plugin_emits_scored_warning():
+    warnings = ContactDuplicates().check(ContactDuplicatesDirectoryStub(), SimpleNamespace())
+
+    assert len(warnings) == 1
+    warning = warnings[0]
+    assert warning.dataCheckID == "CTD:NearDuplicate"
+    assert warning.level.name == "WARNING"
+    assert warning.directoryEntityID == "bbmri-eric:contactID:CZ_1"
+    assert "bbmri-eric:contactID:CZ_2" in warning.message
+    assert "similarity" in warning.message
+
+
+def _synthetic_contacts(count, duplicate_count, seed=7):
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+
+    def word(length):
+        return "".join(rng.choice(letters) for _ in range(length)).capitalize()
+
+    contacts = []
+    for index in range(count):
+        first_name, last_name = word(rng.randint(4, 8)), word(rng.randint(5, 10))
+        contacts.append(
+            {
+                "id": f"bbmri-eric:contactID:XX_{index}",
+                "first_name": first_name,
+                "last_name": last_name,
+                "email": f"{first_name}.{last_name}@inst{rng.randint(0, 2000)}.org".lower(),
+                "phone": f"+{rng.randint(10**10, 10**11 - 1)}",
+                "address": f"{word(8)} {rng.randint(1, 200)}",
+                "city": word(6),
+            }
+        )
+    for index in range(duplicate_count):
+        original = dict(contacts[index])
+        last_name = original["last_name"]
+        position = rng.randrange(1, len(last_name))
+        original["last_name"] = last_name[:position] + last_name[position + 1:]
+        original["id"] = f"bbmri-eric:contactID:XX_dup{index}"
+        contacts.append(original)
+    return contacts
+
+
+@pytest.mark.benchmark
+def test_benchmark_near_duplicate_detection_on_100k_contacts(record_property):
+    duplicate_count = 1000
+    contacts = _synthetic_contacts(100000, duplicate_count)
+
+    start_time = time.perf_counter()
+    pairs = find_near_duplicate_contacts(contacts)
+    elapsed = time.perf_counter() - start_time
+
+    found = {
+        pair.other_contact_id
+        for pair in pairs
+        if pair.other_contact_id.startswith("bbmri-eric:contactID:XX_dup")
+    }
+    record_property("detection_seconds", round(elapsed, 3))
+    record_property("recall", round(len(found) / duplicate_count, 3))
+    assert len(found) / duplicate_count > 0.95
+    assert len(pairs) < duplicate_count * 1.1
@@ -0,0 +1,129 @@
+import random
+import time
+
+import pytest
+
+import diagnosis_index
+from diagnosis_index import (
+    DiagnosisCategory,
+    DiagnosisIndex,
+    Icd10Range,
+    classify_diagnosis,
+    parse_icd10_range,
+)
+from icd10codeshelper import ICD10CodesHelper
+
+
+class FakeOrphaCodes:
+    def isValidOrphaCode(self, code):
+        return code in {"100", "200"}
+
+    def isCancerOrphaCode(self, code):
+        return code == "100"
+
+
+def test_parse_icd10_range_normalizes_codes_and_blocks():
+    assert parse_icd10_range("C7.1") == Icd10Range("C07.1", "C07.1")
+    assert parse_icd10_range("C00-C14") == Icd10Range("C00", "C14~")
+    assert parse_icd10_range("C7A") == Icd10Range("C07A", "C07A~")
+    assert parse_icd10_range("II") is None
+    assert parse_icd10_range("C00-D49").overlaps(parse_icd10_range("C50.9"))
+    assert not parse_icd10_range("C00-C14").overlaps(parse_icd10_range("C15"))
+
+
+@pytest.mark.parametrize(
+    ("code", "expected", "absent"),
+    [
+        ("urn:miriam:icd:C50.9", DiagnosisCategory.CANCER | DiagnosisCategory.NON_COVID, DiagnosisCategory.NON_CANCER),
+        ("urn:miriam:icd:II", DiagnosisCategory.CANCER, DiagnosisCategory.UNMATCHED),
+        ("urn:miriam:icd:E66", DiagnosisCategory.OBESITY | DiagnosisCategory.NON_CANCER, DiagnosisCategory.CANCER),
+        ("urn:miriam:icd:U07.1", DiagnosisCategory.COVID, DiagnosisCategory.NON_COVID),
+        ("urn:miriam:icd:U07.1-U07.2", DiagnosisCategory.COVID | DiagnosisCategory.NON_COVID | DiagnosisCategory.RANGE, 0),
+        ("urn:miriam:icd:Z03.818", DiagnosisCategory.COVID_CONTROL | DiagnosisCategory.NON_COVID, DiagnosisCategory.COVID),
+        ("urn:miriam:icd:P07.3", DiagnosisCategory.PEDIATRIC, DiagnosisCategory.CANCER),
+        ("urn:miriam:icd:ABC", DiagnosisCategory.UNMATCHED, DiagnosisCategory.NON_CANCER),
+        ("ORPHA:100", DiagnosisCategory.RARE_DISEASE | DiagnosisCategory.CANCER, DiagnosisCategory.NON_CANCER),
+        ("ORPHA:200", DiagnosisCategory.RARE_DISEASE | DiagnosisCategory.NON_CANCER, DiagnosisCategory.CANCER),
+        ("ORPHA:999", DiagnosisCategory.UNMATCHED, DiagnosisCategory.RARE_DISEASE),
+    ],
+)
+def test_classify_diagnosis_matches_helper_semantics(code, expected, absent):
+    parsed = classify_diagnosis(code, FakeOrphaCodes())
+
+    assert parsed.categories & expected == expected
+    assert not parsed.categories & absent
+
+
+def test_index_parses_each_distinct_code_once_and_filters_by_mask(monkeypatch):
+    calls = []
+    original = diagnosis_index.classify_diagnosis
+
+    def counting_classify(code, orphacodes=None):
+        calls.append(code)
+        return original(code, orphacodes)
+
+    monkeypatch.setattr(diagnosis_index, "classify_diagnosis", counting_classify)
+    collections = [
+        {"id": "cancer", "diagnosis_available": [{"name": "urn:miriam:icd:C50"}]},
+        {"id": "mixed", "diagnosis_available": [{"name": "urn:miriam:icd:C50"}, {"name": "urn:miriam:icd:E66"}]},
+        {"id": "obesity", "diagnosis_available": [{"id": "urn:miriam:icd:E66"}]},
+        {"id": "none"},
+    ]
+
+    index = DiagnosisIndex(collections)
+
+    assert sorted(calls) == ["urn:miriam:icd:C50", "urn:miriam:icd:E66"]
+    assert index.select_collection_ids(DiagnosisCategory.CANCER) == ["cancer", "mixed"]
+    assert index.select_collection_ids(DiagnosisCategory.CANCER, DiagnosisCategory.NON_CANCER) == ["cancer"]
+    assert index.get_collection_mask({"id": "none"}) == DiagnosisCategory(0)
+    assert index.count_collections()["OBESITY"] == 2
+
+
+def _legacy_cancer_flags(codes):
+    cancer = non_cancer = False
+    for code in codes:
+        code = code.replace("urn:miriam:icd:", "")
+        is_cancer = ICD10CodesHelper.isCancerCode(code)
+        if is_cancer is None:
+            is_cancer = ICD10CodesHelper.isCancerChapter(code)
+        if is_cancer is True:
+            cancer = True
+        elif is_cancer is False:
+            non_cancer = True
+    return cancer, non_cancer
+
+
+@pytest.mark.benchmark
+def test_benchmark_diagnosis_index_vs_per_collection_classification(record_property):
+    rng = random.Random(7)
+    vocabulary = [
+        f"urn:miriam:icd:{block}{number:02d}.{subcode}"
+        for block in "CDEGIJKMQ"
+        for number in range(0, 100, 4)
+        for subcode in range(3)
+    ]
+    collections = [
+        {
+            "id": f"col{index}",
+            "diagnosis_available": [{"name": code} for code in rng.sample(vocabulary, rng.randint(1, 8))],
+        }
+        for index in range(100_000)
+    ]
+
+    start_time = time.perf_counter()
+    legacy = [
+        _legacy_cancer_flags([diagnosis["name"] for diagnosis in collection["diagnosis_available"]])
+        for collection in collections
+    ]
+    legacy_elapsed = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    index = DiagnosisIndex(collections)
+    cancer_ids = set(index.select_collection_ids(DiagnosisCategory.CANCER))
+    non_cancer_ids = set(index.select_collection_ids(DiagnosisCategory.NON_CANCER))
+    index_elapsed = time.perf_counter() - start_time
+
+    record_property("per_collection_seconds", round(legacy_elapsed, 3))
+    record_property("index_seconds", round(index_elapsed, 3))
+    assert [(c["id"] in cancer_ids, c["id"] in non_cancer_ids) for c in collections] == legacy
+    assert index_elapsed < 30
@@ -2,6 +2,7 @@ import networkx as nx
 import pandas as pd
 import pytest
 
+from diagnosis_index import DiagnosisCategory
 import directory as directory_module
 from directory import Directory, get_directory_ontology_table
 
@@ -927,3 +928,33 @@ def test_directory_nn_methods_prefer_staging_area_over_country():
     assert directory.getContactCountry("bbmri-eric:contactID:EXT_demo:main") == "US"
     assert directory.getNetworkNN("bbmri-eric:networkID:EXT_demo:net1") == "EXT"
     assert directory.getNetworkCountry("bbmri-eric:networkID:EXT_demo:net1") == "US"
+
+
+def test_snapshot_checksum_is_stable_and_tracks_entity_changes():
+    directory = _make_directory_stub()
+    directory._snapshot_checksum = None
+    checksum = directory.getSnapshotChecksum()
+
+    same = _make_directory_stub()
+    same._snapshot_checksum = None
+    assert same.getSnapshotChecksum() == checksum
+
+    changed = _make_directory_stub()
+    changed._snapshot_checksum = None
+    changed.collections[0]["size"] = 123456
+    assert changed.getSnapshotChecksum() != checksum
+
+
+def test_diagnosis_index_is_shared_until_orphacodes_change():
+    directory = _make_directory_stub()
+    directory._diagnosis_index = None
+    directory.collections[0]["diagnosis_available"] = [{"id": "urn:miriam:icd:C50", "name": "urn:miriam:icd:C50"}]
+
+    index = directory.getDiagnosisIndex()
+    collection_id = directory.collections[0]["id"]
+
+    assert directory.getDiagnosisIndex() is index
+    assert index.select_collection_ids(DiagnosisCategory.CANCER) == [collection_id]
+    orphacodes = object()
+    assert directory.getDiagnosisIndex(orphacodes) is not index
+    assert directory.getDiagnosisIndex(orphacodes).orphacodes is orphacodes
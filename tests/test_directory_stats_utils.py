@@ -1,9 +1,17 @@
+import time
+
+import pytest
+
 from directory_stats_utils import (
+    DirectoryStatsCube,
+    build_stats_cube_cache_key,
     build_biobank_stats,
     build_directory_stats,
     build_stats_summary,
     extract_staging_area_from_id,
+    load_or_build_stats_cube,
 )
+from fact_sheet_frame import FactSheetFrame
 
 
 class DirectoryStatsStub:
@@ -255,6 +263,9 @@ class DirectoryStatsStub:
     def getCollectionFacts(self, collection_id):
         return self.facts_by_collection.get(collection_id, [])
 
+    def getFactSheetFrame(self):
+        return FactSheetFrame.from_collection_facts(self.facts_by_collection)
+
 
 def test_build_biobank_stats_include_services_facts_and_subcollection_counts():
     rows = build_biobank_stats(DirectoryStatsStub())
@@ -434,3 +445,141 @@ def test_build_directory_stats_sorts_ext_rows_by_country_then_id():
         "bbmri-eric:ID:EXT_BB5",
         "bbmri-eric:ID:EXT_BB2",
     ]
+
+
+class CountingDirectoryStatsStub(DirectoryStatsStub):
+    def __init__(self):
+        super().__init__()
+        self.collection_walks = 0
+
+    def getCollections(self):
+        self.collection_walks += 1
+        return super().getCollections()
+
+
+def test_stats_cube_answers_filter_combinations_without_reloading_directory():
+    directory = CountingDirectoryStatsStub()
+    stats_cube = DirectoryStatsCube.from_directory(directory)
+    filter_combinations = [
+        {},
+        {"country_filters": ["DE"], "staging_area_filters": ["EXT"]},
+        {"country_filters": ["CZ,DE"], "collection_type_filters": ["CASE_CONTROL,POPULATION"]},
+        {"staging_area_filters": ["EXT"]},
+        {"collection_type_filters": ["disease_specific"]},
+    ]
+
+    results = [stats_cube.build_stats(**filters) for filters in filter_combinations]
+
+    assert directory.collection_walks == 1
+    for filters, stats in zip(filter_combinations, results):
+        assert stats == build_directory_stats(DirectoryStatsStub(), **filters)
+    assert [row["id"] for row in results[4]["biobank_rows"]] == [
+        "bb1",
+        "bbmri-eric:ID:EXT_BB2",
+        "bbmri-eric:ID:EXT_BB4",
+        "bbmri-eric:ID:EXT_BB5",
+    ]
+    assert results[4]["biobank_rows"][0]["collection_records_total"] == 1
+    assert results[4]["fact_sheet_warning_rows"] == []
+
+
+def test_stats_cube_is_persisted_per_snapshot_checksum_and_scope():
+    cache = {}
+    key = build_stats_cube_cache_key("abc", schema="ERIC")
+    directory = CountingDirectoryStatsStub()
+
+    cube, cache_hit = load_or_build_stats_cube(directory, cache, key)
+    assert cache_hit is False
+    cached_cube, cache_hit = load_or_build_stats_cube(directory, cache, key)
+    assert cache_hit is True
+    assert cached_cube is cube
+    assert directory.collection_walks == 1
+    assert build_directory_stats(
+        None, country_filters=["DE"], stats_cube=cached_cube
+    ) == build_directory_stats(DirectoryStatsStub(), country_filters=["DE"])
+
+    assert build_stats_cube_cache_key("abd", schema="ERIC") != key
+    assert build_stats_cube_cache_key("abc", schema="ERIC", include_withdrawn=True) != key
+    assert build_stats_cube_cache_key("abc", schema="ERIC", only_withdrawn=True) != key
+
+
+class LargeDirectoryStatsStub:
+    def __init__(self, biobank_count, collections_per_biobank):
+        countries = ["AT", "CZ", "DE", "IT", "NL"]
+        types = ["CASE_CONTROL", "COHORT", "DISEASE_SPECIFIC", "POPULATION"]
+        self.biobanks = [
+            {"id": f"bbmri-eric:ID:{countries[i % 5]}_BB{i}", "name": f"Biobank {i}", "country": countries[i % 5]}
+            for i in range(biobank_count)
+        ]
+        self.collections = {}
+        for biobank_index, biobank in enumerate(self.biobanks):
+            for offset in range(collections_per_biobank):
+                collection_id = f"{biobank['id']}:collection:{offset}"
+                collection = {
+                    "id": collection_id,
+                    "name": collection_id,
+                    "biobank": {"id": biobank["id"]},
+                    "type": [types[(biobank_index + offset) % 4]],
+                    "order_of_magnitude": 2,
+                    "order_of_magnitude_donors": 1,
+                }
+                if offset % 3:
+                    collection["size"] = offset
+                if offset % 4 == 1:
+                    collection["parent_collection"] = {"id": f"{biobank['id']}:collection:0"}
+                self.collections[collection_id] = collection
+        self.services = [
+            {"id": f"svc{i}", "biobank": {"id": biobank["id"]}, "serviceTypes": ["SEQUENCING"]}
+            for i, biobank in enumerate(self.biobanks)
+        ]
+
+    def getBiobanks(self):
+        return self.biobanks
+
+    def getCollections(self):
+        return list(self.collections.values())
+
+    def getServices(self):
+        return self.services
+
+    def getCollectionBiobankId(self, collection_id):
+        return self.collections[collection_id]["biobank"]["id"]
+
+    def isTopLevelCollection(self, collection_id):
+        return "parent_collection" not in self.collections[collection_id]
+
+    def isCountableCollection(self, collection_id, metric):
+        collection = self.collections[collection_id]
+        if not isinstance(collection.get(metric), int):
+            return False
+        parent = collection.get("parent_collection")
+        return parent is None or not isinstance(self.collections[parent["id"]].get(metric), int)
+
+    def getCollectionFacts(self, collection_id):
+        return []
+
+    def getFactSheetFrame(self):
+        return FactSheetFrame.from_collection_facts({})
+
+
+@pytest.mark.benchmark
+def test_benchmark_stats_cube_filter_combinations_on_100k_collections(record_property):
+    directory = LargeDirectoryStatsStub(biobank_count=2_000, collections_per_biobank=50)
+
+    start_time = time.perf_counter()
+    stats_cube = DirectoryStatsCube.from_directory(directory)
+    build_elapsed = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    filter_combinations = [
+        {"country_filters": [country], "collection_type_filters": [collection_type]}
+        for country in ("AT", "CZ", "DE", "IT", "NL")
+        for collection_type in ("CASE_CONTROL", "COHORT", "DISEASE_SPECIFIC", "POPULATION")
+    ]
+    results = [stats_cube.build_stats(**filters) for filters in filter_combinations]
+    slice_elapsed = time.perf_counter() - start_time
+
+    record_property("build_seconds", round(build_elapsed, 3))
+    record_property("slice_seconds", round(slice_elapsed, 3))
+    assert sum(len(stats["biobank_rows"]) for stats in results) == 2_000 * 4
+    assert slice_elapsed / len(filter_combinations) < 1
@@ -0,0 +1,80 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from directory_table_diff import diff_tables, normalize_cell
+
+
+def test_normalize_cell_aligns_live_types_with_file_strings():
+    assert normalize_cell(True) == normalize_cell("TRUE") == "true"
+    assert normalize_cell(10.0) == normalize_cell(" 10 ") == "10"
+    assert normalize_cell(float("nan")) == normalize_cell(None) == normalize_cell(pd.NA) == ""
+    assert normalize_cell(pd.Timestamp("2024-05-01")) == "2024-05-01"
+    assert normalize_cell(["DUO:0000042", "DUO:0000006"]) == "DUO:0000042,DUO:0000006"
+
+
+def test_diff_tables_classifies_rows_and_ignores_type_only_differences():
+    current = pd.DataFrame(
+        {
+            "id": ["f1", "f2", "f3", "f4"],
+            "Number_of_donors": pd.array([10, 20, None, 5], dtype="Int64"),
+            "public": [True, False, True, True],
+            "facts": ["x", "y", "z", "w"],
+        }
+    )
+    target = pd.DataFrame(
+        {
+            "id": ["f1", "f2", "f3", "f5", "f2"],
+            "number_of_donors": ["10", "20", "", "7", "21"],
+            "public": ["true", "false", "false", "true", "false"],
+        }
+    )
+
+    diff = diff_tables(current, target, current_id_column="id", target_id_column="id")
+
+    assert diff.deleted_ids == ["f4"]
+    assert diff.new_ids == ["f5"]
+    # f2 is repeated in the file; the last row wins
+    assert diff.changed_ids == ["f2", "f3"]
+    assert diff.unchanged_count == 1
+    assert sorted(diff.upserts["id"]) == ["f2", "f3", "f5"]
+    assert diff.upserts.loc[diff.upserts["id"] == "f2", "number_of_donors"].item() == "21"
+    assert list(diff.deletes["id"]) == ["f4"]
+    assert "facts" not in diff.compared_columns
+
+
+def test_diff_tables_against_empty_scope_inserts_everything():
+    target = pd.DataFrame({"id": ["a", "b"], "name": ["A", "B"]})
+
+    diff = diff_tables(pd.DataFrame(), target, current_id_column="id", target_id_column="id")
+
+    assert diff.new_ids == ["a", "b"] and not diff.deleted_ids and not diff.changed_ids
+    assert len(diff.upserts) == 2
+
+
+@pytest.mark.benchmark
+def test_benchmark_row_diff_scales_with_change_size(record_property):
+    rows = 200_000
+    rng = np.random.default_rng(3)
+    current = pd.DataFrame(
+        {
+            "id": [f"fact:{index}" for index in range(rows)],
+            "number_of_donors": pd.array(rng.integers(0, 1000, rows), dtype="Int64"),
+            "sample_type": rng.choice(["DNA", "SERUM", "*"], rows),
+        }
+    )
+    target = current.astype(str)
+    target.loc[rng.choice(rows, 100, replace=False), "number_of_donors"] = "-1"
+    target = target.iloc[50:]
+
+    start_time = time.perf_counter()
+    diff = diff_tables(current, target, current_id_column="id", target_id_column="id")
+    elapsed = time.perf_counter() - start_time
+
+    record_property("diff_seconds", round(elapsed, 3))
+    assert len(diff.deleted_ids) == 50
+    assert 0 < len(diff.changed_ids) <= 100
+    assert len(diff.upserts) == len(diff.changed_ids)
+    assert elapsed < 30
@@ -0,0 +1,127 @@
+import json
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from directory_table_fetch import (
+    LiveTableCache,
+    build_id_filter,
+    chunk_ids,
+    fetch_rows_by_ids,
+    group_ids_by,
+    index_rows_by_id,
+)
+from test_collection_qcheck_updater import load_module
+
+
+class FilteringSessionStub:
+    """Serve in-memory tables, applying ``column == [...]`` filters like the EMX2 API."""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.requests = []
+
+    def get(self, *, table, schema, as_df, query_filter=None):
+        assert as_df is True
+        self.requests.append((table, query_filter))
+        df = self.tables[table]
+        if query_filter is None:
+            return df.copy()
+        column, values = query_filter.split(" == ", 1)
+        column = column.split(".")[0]
+        return df[df[column].isin(json.loads(values))].reset_index(drop=True)
+
+
+def _collections(count):
+    return pd.DataFrame(
+        [{"id": f"bbmri-eric:ID:CZ_demo:collection:col{index}", "name": f"Collection {index}"} for index in range(count)]
+    )
+
+
+def test_chunk_ids_deduplicates_and_splits():
+    assert list(chunk_ids(["a", "b", "a", "c", "d"], 2)) == [["a", "b"], ["c", "d"]]
+    assert build_id_filter("collection.id", ["a", "b"]) == 'collection.id == ["a", "b"]'
+    with pytest.raises(ValueError):
+        list(chunk_ids(["a"], 0))
+
+
+def test_fetch_rows_by_ids_requests_only_affected_ids_in_chunks():
+    session = FilteringSessionStub({"Collections": _collections(1000)})
+    wanted = [f"bbmri-eric:ID:CZ_demo:collection:col{index}" for index in (5, 17, 999, 5, 404)]
+
+    df = fetch_rows_by_ids(session, table="Collections", schema="BBMRI-CZ", ids=wanted, chunk_size=2)
+
+    assert len(session.requests) == 2
+    assert all(query_filter.startswith("id == [") for _, query_filter in session.requests)
+    assert sorted(df["id"]) == sorted(set(wanted))
+    rows = index_rows_by_id(df, wanted + ["missing"])
+    assert rows[wanted[2]]["name"] == "Collection 999"
+    assert "missing" not in rows
+    assert fetch_rows_by_ids(session, table="Collections", schema="BBMRI-CZ", ids=[]).empty
+    assert len(session.requests) == 2
+
+
+def test_group_ids_by_keeps_requested_keys():
+    df = pd.DataFrame([{"id": "f2", "collection": "c1"}, {"id": "f1", "collection": "c1"}, {"id": "f3", "collection": "c2"}])
+
+    assert group_ids_by(df, ["c1", "c3"], key_column="collection", value_column="id") == {"c1": ["f1", "f2"], "c3": []}
+
+
+def test_qcheck_updater_fetches_only_planned_rows():
+    module = load_module()
+    facts = pd.DataFrame(
+        [{"id": f"fact{index}", "collection": f"bbmri-eric:ID:CZ_demo:collection:col{index % 300}"} for index in range(3000)]
+    )
+    session = FilteringSessionStub({"Collections": _collections(300), "CollectionFacts": facts})
+    target_ids = [f"bbmri-eric:ID:CZ_demo:collection:col{index}" for index in range(0, 20)]
+
+    collections_df, rows = module._fetch_target_rows(session, "BBMRI-CZ", entity_type="COLLECTION", entity_ids=target_ids)
+    facts_df, fact_ids = module._fetch_collection_fact_ids(session, "BBMRI-CZ", target_ids[:2])
+
+    assert len(collections_df) == 20 and set(rows) == set(target_ids)
+    assert len(facts_df) == 20
+    assert fact_ids[target_ids[1]] == sorted(f"fact{index}" for index in range(1, 3000, 300))
+    assert session.requests[-1][1].startswith("collection.id == [")
+    with pytest.raises(module.InputError, match="does not exist"):
+        module._fetch_target_rows(session, "BBMRI-CZ", entity_type="COLLECTION", entity_ids=["unknown"])
+
+
+class MetadataSessionStub(FilteringSessionStub):
+    def __init__(self, tables):
+        super().__init__(tables)
+        self.metadata_requests = 0
+
+    def get_schema_metadata(self, schema):
+        self.metadata_requests += 1
+        tables = self.tables
+
+        class Metadata:
+            def get_table(self, by, value):
+                return SimpleNamespace(columns=[SimpleNamespace(name=name) for name in tables[value].columns])
+
+        return Metadata()
+
+
+def test_live_table_cache_fetches_each_table_once_until_invalidated():
+    session = MetadataSessionStub({"Collections": _collections(10), "Biobanks": pd.DataFrame({"ID": ["b1"]})})
+    tables = LiveTableCache(session, "BBMRI-CZ")
+
+    assert tables.table_columns("Collections") == ["id", "name"]
+    assert tables.table_columns("Biobanks") == ["ID"]
+    assert tables.table("Collections") is tables.table("Collections")
+    assert len(tables.ids("Collections", "id")) == 10
+    assert tables.ids("Biobanks", "id") == {"b1"}
+    assert tables.ids("Biobanks", "missing") is None
+    assert session.metadata_requests == 1
+    # ids of a cached frame are derived locally; id-only snapshots keep no frame, so a second id column refetches
+    assert [table for table, _ in session.requests] == ["Collections", "Biobanks", "Biobanks"]
+
+    tables.invalidate("Collections")
+    tables.ids("Collections", "id")
+    tables.ids("Biobanks", "id")
+    assert [table for table, _ in session.requests][3:] == ["Collections"]
+
+    tables.invalidate()
+    tables.table_columns("Collections")
+    assert session.metadata_requests == 2
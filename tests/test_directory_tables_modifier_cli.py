@@ -1,13 +1,27 @@
 #!/usr/bin/python3
 
-"""CLI regression tests for directory-tables-modifier validation paths."""
+"""CLI regression tests for directory-tables-modifier.
+
+Validation paths run the script in a subprocess; import, sync and delete
+flows run it in-process against an in-memory ``FakeDirectory`` session.
+"""
 
 from __future__ import annotations
 
+import logging
+import runpy
 import subprocess
 import sys
 from pathlib import Path
 
+import pandas as pd
+import pytest
+from molgenis_emx2_pyclient.exceptions import PyclientException
+from molgenis_emx2_pyclient.metadata import Schema
+
+import directory_session_compat
+import table_stream
+
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 SCRIPT_PATH = REPO_ROOT / "directory-tables-modifier.py"
@@ -90,3 +104,283 @@ def test_k_anonymity_help_documents_positive_range_only() -> None:
     assert result.returncode == 0
     assert "number_of_donors is >0 and <k" in result.stdout
     assert "number_of_samples is >0 and <k" in result.stdout
+
+
+SCHEMA = "BBMRI-CZ"
+FACT_COLUMNS = ["id", "collection", "sex", "age_range", "sample_type", "disease", "number_of_samples", "number_of_donors"]
+
+
+class FakeDirectory:
+    """In-memory staging area standing in for the DirectorySession the CLI opens.
+
+    Tables are string frames keyed by ``id`` when they have one. Writes to a
+    table listed in ``required_columns`` fail (like the server) when that
+    column is missing or empty; ``failing_saves`` holds the 1-based numbers of
+    ``save_table`` calls rejected with a non-transient error.
+    """
+
+    def __init__(self, tables, *, required_columns=None, failing_saves=()):
+        self.tables = {name: pd.DataFrame(rows, columns=columns, dtype=str) for name, (columns, rows) in tables.items()}
+        self.required_columns = dict(required_columns or {})
+        self.failing_saves = set(failing_saves)
+        self.calls = []
+
+    def __call__(self, **kwargs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def signin(self, username, password):
+        pass
+
+    def set_schema(self, schema):
+        assert schema == SCHEMA
+
+    def get_schema_metadata(self, schema):
+        return Schema(
+            id=schema,
+            name=schema,
+            label=schema,
+            tables=[
+                {
+                    "name": name,
+                    "id": name,
+                    "columns": [{"table": name, "name": column, "id": column, "columnType": "STRING"} for column in frame.columns],
+                }
+                for name, frame in self.tables.items()
+            ],
+        )
+
+    def get(self, *, table, schema, as_df):
+        self.calls.append(("get", table, None))
+        return self.tables[table].copy()
+
+    def save_table(self, *, table, schema, data):
+        data = data.astype(str)
+        self.calls.append(("save", table, sorted(data["id"]) if "id" in data else len(data)))
+        if sum(call[0] == "save" for call in self.calls) in self.failing_saves:
+            raise PyclientException("Invalid value in column name")
+        required = self.required_columns.get(table)
+        if required and (required not in data or (data[required] == "").any()):
+            raise PyclientException(f"Field {required} is required")
+        frame = self.tables[table]
+        if "id" in frame:
+            frame = frame[~frame["id"].isin(data["id"])]
+        self.tables[table] = pd.concat([frame, data], ignore_index=True).fillna("")
+
+    def delete_records(self, table, schema, data):
+        ids = set(data["id"].astype(str))
+        self.calls.append(("delete", table, sorted(ids)))
+        frame = self.tables[table]
+        self.tables[table] = frame[~frame["id"].isin(ids)].reset_index(drop=True)
+
+    def truncate(self, table, schema):
+        self.calls.append(("truncate", table, None))
+        self.tables[table] = self.tables[table].iloc[0:0]
+
+    def rows(self, table):
+        return {row["id"]: row for row in self.tables[table].to_dict("records")}
+
+    def writes(self):
+        return [call for call in self.calls if call[0] != "get"]
+
+
+def _run_modifier_in_process(monkeypatch, tmp_path, server, *args: str) -> int:
+    monkeypatch.setattr(directory_session_compat, "DirectorySession", server)
+    monkeypatch.setenv("DIRECTORY_CACHE_ROOT", str(tmp_path / "cache"))
+    monkeypatch.setattr(sys, "argv", [SCRIPT_PATH.name, *_base_auth_args(), "-s", SCHEMA, "-f", *args])
+    with pytest.raises(SystemExit) as exit_info:
+        runpy.run_path(str(SCRIPT_PATH), run_name="__main__")
+    return exit_info.value.code
+
+
+def _write_table_file(path, columns, rows, sep="\t"):
+    pd.DataFrame(rows, columns=columns).to_csv(path, sep=sep, index=False)
+    return str(path)
+
+
+def _count_file_passes(monkeypatch):
+    passes = []
+    iter_file_chunks = table_stream.iter_file_chunks
+
+    def counting_iter_file_chunks(path, chunk_rows, **read_options):
+        passes.append(chunk_rows)
+        return iter_file_chunks(path, chunk_rows, **read_options)
+
+    monkeypatch.setattr(table_stream, "iter_file_chunks", counting_iter_file_chunks)
+    return passes
+
+
+@pytest.mark.parametrize("chunk_rows, file_passes", [(100, 1), (2, 2)])
+def test_import_streams_file_in_one_pass_or_plan_and_upload_passes(monkeypatch, tmp_path, caplog, chunk_rows, file_passes):
+    caplog.set_level(logging.INFO)
+    server = FakeDirectory({"Biobanks": (["id", "name"], [["bb0", "Old name"], ["bb9", "Kept"]])})
+    rows = [[f"bb{index}", f"Biobank {index}"] for index in range(5)]
+    import_file = _write_table_file(tmp_path / "biobanks.tsv", ["id", "name"], rows)
+    passes = _count_file_passes(monkeypatch)
+
+    code = _run_modifier_in_process(
+        monkeypatch, tmp_path, server, "-T", "Biobanks", "-i", import_file, "--import-chunk-rows", str(chunk_rows), "--write-chunk-size", "2"
+    )
+
+    assert code == 0
+    assert passes == [chunk_rows] * file_passes
+    assert "Import summary for BBMRI-CZ::Biobanks: 4 new, 1 updates." in caplog.text
+    assert {row_id: row["name"] for row_id, row in server.rows("Biobanks").items()} == {
+        **{row_id: name for row_id, name in rows},
+        "bb9": "Kept",
+    }
+    assert server.writes() == [
+        ("save", "Biobanks", ["bb0", "bb1"]),
+        ("save", "Biobanks", ["bb2", "bb3"]),
+        ("save", "Biobanks", ["bb4"]),
+    ]
+
+
+@pytest.mark.parametrize(
+    "file_columns, node_args, expected_node",
+    [
+        (["id", "name"], ["-N", "CZ"], "CZ"),
+        (["id", "name"], [], SCHEMA),
+        (["id", "name", "national_node"], ["-N", "CZ"], "EU"),
+    ],
+)
+def test_import_sets_national_node_from_option_file_or_schema_fallback(monkeypatch, tmp_path, file_columns, node_args, expected_node):
+    server = FakeDirectory({"Biobanks": (["id", "name", "national_node"], [])}, required_columns={"Biobanks": "national_node"})
+    rows = [[f"bb{index}", f"Biobank {index}", "EU"][: len(file_columns)] for index in range(3)]
+    import_file = _write_table_file(tmp_path / "biobanks.csv", file_columns, rows, sep=",")
+
+    code = _run_modifier_in_process(
+        monkeypatch, tmp_path, server, "-T", "Biobanks", "-i", import_file, "--import-chunk-rows", "2", *node_args
+    )
+
+    assert code == 0
+    assert {row["national_node"] for row in server.rows("Biobanks").values()} == {expected_node}
+    assert len(server.rows("Biobanks")) == 3
+
+
+def test_import_drops_small_cells_and_reports_complementary_disclosures(monkeypatch, tmp_path, caplog):
+    caplog.set_level(logging.INFO)
+    server = FakeDirectory({"CollectionFacts": (FACT_COLUMNS, [])})
+    facts = [
+        ["c1-all", "col1", "*", "*", "*", "*", "100", "40"],
+        ["c1-male", "col1", "MALE", "*", "*", "*", "5", "2"],
+        ["c1-female", "col1", "FEMALE", "*", "*", "*", "95", "38"],
+        ["c2-all", "col2", "*", "*", "*", "*", "0", "0"],
+        ["c2-plasma", "col2", "*", "*", "PLASMA", "*", "3", "3"],
+    ]
+    import_file = _write_table_file(tmp_path / "facts.tsv", FACT_COLUMNS, facts)
+
+    code = _run_modifier_in_process(
+        monkeypatch, tmp_path, server, "-T", "CollectionFacts", "-i", import_file, "-K", "10", "--import-chunk-rows", "2"
+    )
+
+    assert code == 0
+    assert sorted(server.rows("CollectionFacts")) == ["c1-all", "c1-female", "c2-all"]
+    assert "skipped total=2" in caplog.text
+    assert "Complementary disclosure in collection col1" in caplog.text
+
+
+NOTE_ROWS = [
+    ["n1", "col1", "first"],
+    ["n2", "col1", "second"],
+    ["n3", "col1", "third"],
+    ["n4", "col2", "other collection"],
+]
+
+
+def test_filtered_sync_writes_only_the_row_level_diff(monkeypatch, tmp_path):
+    server = FakeDirectory({"Notes": (["id", "collection", "text"], NOTE_ROWS)})
+    sync_file = _write_table_file(
+        tmp_path / "notes.tsv",
+        ["id", "collection", "text"],
+        [["n1", "col1", "first"], ["n2", "col1", "second (edited)"], ["n5", "col1", "fifth"]],
+    )
+
+    code = _run_modifier_in_process(monkeypatch, tmp_path, server, "-T", "Notes", "-y", sync_file, "-C", "col1")
+
+    assert code == 0
+    assert server.writes() == [("delete", "Notes", ["n3"]), ("save", "Notes", ["n2", "n5"])]
+    assert {row_id: row["text"] for row_id, row in server.rows("Notes").items()} == {
+        "n1": "first",
+        "n2": "second (edited)",
+        "n4": "other collection",
+        "n5": "fifth",
+    }
+
+    server.calls.clear()
+    assert _run_modifier_in_process(monkeypatch, tmp_path, server, "-T", "Notes", "-y", sync_file, "-C", "col1") == 0
+    assert server.writes() == []
+
+
+def test_failed_diff_sync_is_rolled_back_from_the_backup(monkeypatch, tmp_path):
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+    server = FakeDirectory({"Notes": (["id", "collection", "text"], NOTE_ROWS)}, failing_saves={1})
+    before = server.rows("Notes")
+    sync_file = _write_table_file(
+        tmp_path / "notes.tsv",
+        ["id", "collection", "text"],
+        [["n2", "col1", "second (edited)"], ["n4", "col2", "other collection"], ["n5", "col1", "fifth"]],
+    )
+
+    code = _run_modifier_in_process(monkeypatch, tmp_path, server, "-T", "Notes", "-y", sync_file)
+
+    assert code == 1
+    assert server.writes() == [
+        ("delete", "Notes", ["n1", "n3"]),
+        ("save", "Notes", ["n2", "n5"]),
+        ("delete", "Notes", ["n5"]),
+        ("save", "Notes", ["n1", "n2", "n3"]),
+    ]
+    assert server.rows("Notes") == before
+    assert not list(tmp_path.glob("dtm-sync-backup-*"))
+
+
+def test_failed_sync_without_ids_restores_the_truncated_table(monkeypatch, tmp_path):
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+    rows = [[collection, text] for _, collection, text in NOTE_ROWS]
+    server = FakeDirectory({"Notes": (["collection", "text"], rows)}, failing_saves={1})
+    sync_file = _write_table_file(tmp_path / "notes.tsv", ["collection", "text"], [["col1", "replacement"]])
+
+    code = _run_modifier_in_process(monkeypatch, tmp_path, server, "-T", "Notes", "-y", sync_file)
+
+    assert code == 1
+    assert server.writes() == [("truncate", "Notes", None), ("save", "Notes", 1), ("truncate", "Notes", None), ("save", "Notes", 4)]
+    assert server.tables["Notes"].values.tolist() == rows
+    assert not list(tmp_path.glob("dtm-sync-backup-*"))
+
+
+def test_sync_reads_the_live_table_once(monkeypatch, tmp_path):
+    server = FakeDirectory({"Notes": (["id", "collection", "text"], NOTE_ROWS)})
+    sync_file = _write_table_file(tmp_path / "notes.tsv", ["id", "collection", "text"], [["n1", "col1", "first"]])
+
+    code = _run_modifier_in_process(monkeypatch, tmp_path, server, "-T", "Notes", "-y", sync_file, "-C", "col1")
+
+    assert code == 0
+    assert server.calls.count(("get", "Notes", None)) == 1
+    assert sorted(server.rows("Notes")) == ["n1", "n4"]
+
+
+def test_writes_and_truncate_invalidate_the_live_table_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(sys, "argv", [SCRIPT_PATH.name, *_base_auth_args(), "-s", SCHEMA, "-T", "Notes", "-e", str(tmp_path / "out.tsv")])
+    modifier = runpy.run_path(str(SCRIPT_PATH), run_name="directory_tables_modifier")
+    server = FakeDirectory({"Notes": (["id", "collection", "text"], NOTE_ROWS)}, failing_saves={2})
+    live_tables = modifier["LiveTableCache"](server, SCHEMA)
+    new_row = pd.DataFrame([["n5", "col1", "fifth"]], columns=["id", "collection", "text"])
+
+    assert len(live_tables.table("Notes")) == 4
+    modifier["write_rows"](live_tables, modifier["SAVE_ACTION"], "Notes", new_row)
+    assert len(live_tables.table("Notes")) == 5
+    assert live_tables.ids("Notes", "id") == {"n1", "n2", "n3", "n4", "n5"}
+    with pytest.raises(modifier["WriteEngineError"]):
+        modifier["write_rows"](live_tables, modifier["SAVE_ACTION"], "Notes", new_row)
+    # a failed write may have reached the server, so it is dropped from the cache as well
+    assert len(live_tables.table("Notes")) == 5
+    assert server.calls.count(("get", "Notes", None)) == 3
+    modifier["truncate_table"](live_tables, "Notes")
+    assert live_tables.table("Notes").empty
+    assert server.calls.count(("get", "Notes", None)) == 4
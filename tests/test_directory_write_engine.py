@@ -0,0 +1,306 @@
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+import requests
+from molgenis_emx2_pyclient.exceptions import PyclientException
+
+from directory_session_compat import DirectorySession
+from directory_write_engine import (
+    DELETE_ACTION,
+    SAVE_ACTION,
+    DirectoryWriteEngine,
+    WriteEngineError,
+    WriteJournal,
+    WriteOperation,
+    is_transient_write_error,
+    order_parents_first,
+    split_operation,
+)
+
+
+SCHEMA = "BBMRI-CZ"
+
+
+def _column(table, name, column_type="STRING", ref_table=None):
+    column = {"table": table, "name": name, "id": name, "columnType": column_type}
+    if ref_table is not None:
+        column["refTableName"] = ref_table
+    return column
+
+
+SCHEMA_METADATA = {
+    "id": SCHEMA,
+    "name": SCHEMA,
+    "label": SCHEMA,
+    "tables": [
+        {"name": "Biobanks", "id": "Biobanks", "columns": [_column("Biobanks", "id"), _column("Biobanks", "name")]},
+        {
+            "name": "Collections",
+            "id": "Collections",
+            "columns": [
+                _column("Collections", "id"),
+                _column("Collections", "name"),
+                _column("Collections", "biobank", "REF", "Biobanks"),
+                _column("Collections", "parent_collection", "REF", "Collections"),
+            ],
+        },
+        {"name": "CollectionFacts", "id": "CollectionFacts", "columns": [_column("CollectionFacts", "id")]},
+    ],
+}
+
+ERROR_BODIES = {
+    # proxies answer with HTML pages the client cannot decode as json
+    502: ("text/html", "<html><body>Bad Gateway</body></html>"),
+    504: ("text/html", "<html><body>Gateway Timeout</body></html>"),
+    500: ("application/json", json.dumps({"errors": [{"message": "Internal server error"}]})),
+    400: ("application/json", json.dumps({"errors": [{"message": "Invalid value in column name"}]})),
+}
+
+
+class StubDirectoryServer:
+    """Local stand-in for an EMX2 server: the GraphQL schema queries and the CSV API.
+
+    CSV POSTs save rows and DELETEs remove ids; a saved ``parent_collection``
+    must already exist or be part of the same request, as on the real server.
+    ``failures`` maps the 1-based number of a CSV request to the HTTP status
+    returned instead of applying it.
+    """
+
+    def __init__(self, failures=None, delay=0.0):
+        self.tables = {}
+        self.failures = dict(failures or {})
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, content_type="application/json", body=""):
+                payload = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _graphql(self):
+                if self.path == "/api/graphql":
+                    data = {"_schemas": [{"id": SCHEMA, "name": SCHEMA, "label": SCHEMA, "description": ""}]}
+                else:
+                    data = {"_schema": SCHEMA_METADATA}
+                self._reply(200, body=json.dumps({"data": data}))
+
+            def _apply(self, method, schema, table, rows):
+                table_rows = server.tables.setdefault((schema, table), {})
+                if method == "DELETE":
+                    for row in rows:
+                        table_rows.pop(row["id"], None)
+                    return True
+                if table == "Collections":
+                    known = set(table_rows) | {row["id"] for row in rows}
+                    if any(isinstance(row.get("parent_collection"), str) and row["parent_collection"] not in known for row in rows):
+                        return False
+                for row in rows:
+                    table_rows[row["id"]] = row
+                return True
+
+            def _csv(self, method):
+                body = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+                schema, _, _, table = self.path.strip("/").split("/")
+                with server.lock:
+                    server.requests.append((method, table))
+                    number = len(server.requests)
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    threading.Event().wait(server.delay)
+                    status = server.failures.pop(number, 200)
+                    if status != 200:
+                        self._reply(status, *ERROR_BODIES[status])
+                        return
+                    rows = pd.read_csv(io.StringIO(body), dtype=str).to_dict("records")
+                    with server.lock:
+                        applied = self._apply(method, schema, table, rows)
+                    if applied:
+                        self._reply(200)
+                    else:
+                        message = "insert or update on table violates foreign key constraint"
+                        self._reply(400, body=json.dumps({"errors": [{"message": message}]}))
+                finally:
+                    with server.lock:
+                        server.in_flight -= 1
+
+            def do_HEAD(self):
+                self._reply(200)
+
+            def do_POST(self):
+                if self.path.endswith("/api/graphql"):
+                    self.rfile.read(int(self.headers["Content-Length"]))
+                    self._graphql()
+                else:
+                    self._csv("POST")
+
+            def do_DELETE(self):
+                self._csv("DELETE")
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def session(self):
+        return DirectorySession(url=self.url)
+
+
+def _rows(count, prefix="row"):
+    return pd.DataFrame({"id": [f"{prefix}{index}" for index in range(count)], "name": [f"Name {index}" for index in range(count)]})
+
+
+def test_engine_writes_chunks_with_bounded_concurrency():
+    with StubDirectoryServer(delay=0.02) as server, server.session() as session:
+        engine = DirectoryWriteEngine(session, SCHEMA, chunk_size=100, concurrency=4)
+        summary = engine.run(
+            [
+                WriteOperation(SAVE_ACTION, "CollectionFacts", _rows(1050)),
+                WriteOperation(DELETE_ACTION, "CollectionFacts", _rows(150)[["id"]]),
+            ]
+        )
+
+    assert (summary.chunks_sent, summary.rows_sent) == (13, 1200)
+    assert server.requests[:11] == [("POST", "CollectionFacts")] * 11
+    assert server.requests[11:] == [("DELETE", "CollectionFacts")] * 2
+    assert 1 <= server.max_in_flight <= 4
+    assert len(server.tables[(SCHEMA, "CollectionFacts")]) == 900
+
+
+def test_engine_retries_server_errors_raised_by_the_pyclient():
+    delays = []
+    with StubDirectoryServer(failures={1: 503, 2: 502, 3: 500, 4: 504}) as server, server.session() as session:
+        engine = DirectoryWriteEngine(session, SCHEMA, chunk_size=10, concurrency=1, retries=4, backoff=0.5, sleep=delays.append)
+        engine.run([WriteOperation(SAVE_ACTION, "Biobanks", _rows(5))])
+
+    assert delays == [0.5, 1.0, 2.0, 4.0]
+    assert len(server.requests) == 5
+    assert len(server.tables[(SCHEMA, "Biobanks")]) == 5
+
+
+def test_engine_does_not_retry_rejected_rows():
+    delays = []
+    with StubDirectoryServer(failures={1: 400}) as server, server.session() as session:
+        engine = DirectoryWriteEngine(session, SCHEMA, chunk_size=10, concurrency=1, sleep=delays.append)
+        with pytest.raises(WriteEngineError) as error:
+            engine.run([WriteOperation(SAVE_ACTION, "Biobanks", _rows(5))])
+
+    assert isinstance(error.value.__cause__, PyclientException)
+    assert delays == []
+    assert len(server.requests) == 1
+
+
+def test_engine_writes_self_referencing_tables_parents_first_and_sequentially():
+    # children are listed before their parents and would land in earlier chunks
+    collections = pd.DataFrame(
+        {
+            "id": [f"col{index}" for index in range(12)],
+            "name": [f"Collection {index}" for index in range(12)],
+            "parent_collection": [f"col{index + 4}" if index < 8 else None for index in range(12)],
+        }
+    )
+    with StubDirectoryServer(delay=0.01) as server, server.session() as session:
+        engine = DirectoryWriteEngine(session, SCHEMA, chunk_size=2, concurrency=4)
+        engine.run([WriteOperation(SAVE_ACTION, "Collections", collections)])
+        saved = dict(server.tables[(SCHEMA, "Collections")])
+        engine.run([WriteOperation(DELETE_ACTION, "Collections", collections[["id"]])])
+
+    assert set(saved) == set(collections["id"])
+    assert server.max_in_flight == 1
+    assert server.tables[(SCHEMA, "Collections")] == {}
+    assert engine.self_references() == {"Collections": ["parent_collection"]}
+
+
+def test_engine_resumes_interrupted_apply_from_journal(tmp_path):
+    journal = WriteJournal.for_job("job", tmp_path)
+    operations = [WriteOperation(SAVE_ACTION, "CollectionFacts", _rows(50, "fact"))]
+
+    with StubDirectoryServer(failures={3: 400}) as server, server.session() as session:
+        engine = DirectoryWriteEngine(session, SCHEMA, chunk_size=10, concurrency=1, journal=journal)
+        with pytest.raises(WriteEngineError, match="rerun to resume"):
+            engine.run(operations)
+        assert len(journal.acknowledged()) == 2
+
+        summary = engine.run(operations)
+
+    assert (summary.chunks_skipped, summary.chunks_sent) == (2, 3)
+    assert len(server.requests) == 3 + 3
+    assert len(server.tables[(SCHEMA, "CollectionFacts")]) == 50
+    assert not journal.path.exists()
+
+
+def test_engine_without_schema_metadata_writes_chunks_sequentially():
+    calls = []
+    lock = threading.Lock()
+    active = []
+
+    class SessionStub:
+        def save_table(self, *, table, schema, data):
+            with lock:
+                active.append(table)
+                calls.append(len(active))
+            threading.Event().wait(0.01)
+            with lock:
+                active.pop()
+
+    DirectoryWriteEngine(SessionStub(), SCHEMA, chunk_size=1, concurrency=4).run([WriteOperation(SAVE_ACTION, "Biobanks", _rows(6))])
+
+    assert calls == [1] * 6
+
+
+def test_split_operation_keys_chunks_by_content():
+    first = split_operation(WriteOperation(SAVE_ACTION, "Collections", _rows(25)), 10)
+    second = split_operation(WriteOperation(SAVE_ACTION, "Collections", _rows(25)), 10)
+
+    assert [len(chunk.data) for chunk in first] == [10, 10, 5]
+    assert [chunk.key for chunk in first] == [chunk.key for chunk in second]
+    assert first[0].key != split_operation(WriteOperation(DELETE_ACTION, "Collections", _rows(25)), 10)[0].key
+
+
+def test_order_parents_first_is_stable_and_tolerates_cycles():
+    data = pd.DataFrame(
+        {
+            "id": ["c3", "c2", "c1", "x", "a", "b"],
+            "parent_collection": ["c2", "c1", None, "outside", "b", "a"],
+        }
+    )
+
+    assert order_parents_first(data, ["parent_collection"])["id"].tolist() == ["c1", "x", "b", "c2", "a", "c3"]
+
+
+def test_only_server_side_failures_are_transient():
+    response = requests.Response()
+    response.status_code = 500
+    assert is_transient_write_error(requests.HTTPError(response=response))
+    assert is_transient_write_error(requests.ConnectionError())
+    assert is_transient_write_error(PyclientException("Internal server error"), 500)
+    assert is_transient_write_error(requests.exceptions.JSONDecodeError("Expecting value", "<html>", 0), 502)
+    response.status_code = 400
+    assert not is_transient_write_error(requests.HTTPError(response=response))
+    assert not is_transient_write_error(PyclientException("Invalid value"), 400)
+    assert not is_transient_write_error(PyclientException("Invalid value"))
+    assert not is_transient_write_error(ValueError("bad row"))
@@ -0,0 +1,170 @@
+import copy
+import logging
+
+from openpyxl import load_workbook
+
+from diagnosis_index import DiagnosisIndex
+from directory import Directory
+from directory_exports import EXPORTS, ObesityExport
+from export_pipeline import run_export_pipeline
+from test_exporter_consistency import SharedDirectoryStub, _run_script
+
+
+class ThematicExportDirectoryStub(SharedDirectoryStub):
+    """Directory stub with COVID, obesity, pediatric and ECRAID-relevant content."""
+
+    BASE_BIOBANKS = copy.deepcopy(SharedDirectoryStub.BASE_BIOBANKS)
+    BASE_BIOBANKS[0].update({"juridical_person": "Charles University", "covid19biobank": [{"id": "BSL2"}]})
+    BASE_BIOBANKS[1].update({"juridical_person": "Charite"})
+    BASE_BIOBANKS[2].update({"juridical_person": "UMC Utrecht"})
+
+    BASE_COLLECTIONS = copy.deepcopy(SharedDirectoryStub.BASE_COLLECTIONS)
+    BASE_COLLECTIONS[0].update(
+        {
+            "diagnosis_available": [{"id": "urn:miriam:icd:U07.1", "name": "urn:miriam:icd:U07.1"}],
+            "age_low": 2,
+            "age_high": 16,
+        }
+    )
+    BASE_COLLECTIONS[1].update(
+        {
+            "diagnosis_available": [
+                {"id": "urn:miriam:icd:U07.1", "name": "urn:miriam:icd:U07.1"},
+                {"id": "urn:miriam:icd:E66", "name": "urn:miriam:icd:E66"},
+            ],
+            "age_low": 10,
+            "age_high": 40,
+            "materials": ["PATHOGEN"],
+        }
+    )
+    BASE_COLLECTIONS[2].update(
+        {
+            "name": "Obese adults cohort",
+            "type": ["PROSPECTIVE_STUDY"],
+            "diagnosis_available": [{"id": "urn:miriam:icd:Z03.818", "name": "urn:miriam:icd:Z03.818"}],
+            "age_low": 30,
+            "age_high": 80,
+        }
+    )
+    BASE_COLLECTIONS[4].update(
+        {
+            "id": "bbmri-eric:ID:NL_BB3:collection:COVID19PROSPECTIVE",
+            "network": [{"id": "bbmri-eric:networkID:EU_BBMRI-ERIC:networks:COVID19"}],
+            "description": "Childhood obesity follow-up",
+            "age_low": -1,
+            "age_high": 0,
+        }
+    )
+    BASE_FACTS = copy.deepcopy(SharedDirectoryStub.BASE_FACTS)
+    BASE_FACTS["bbmri-eric:ID:NL_BB3:collection:COVID19PROSPECTIVE"] = BASE_FACTS.pop("col5")
+
+    getEntityAttributeId = staticmethod(Directory.getEntityAttributeId)
+    getListOfEntityAttributeIds = staticmethod(Directory.getListOfEntityAttributeIds)
+
+    def getContact(self, contact_id):
+        return copy.deepcopy(self.contactHashmap[contact_id])
+
+
+def _workbook_rows(path):
+    workbook = load_workbook(path)
+    return {
+        sheet.title: [[cell.value for cell in row] for row in sheet.iter_rows()]
+        for sheet in workbook.worksheets
+    }
+
+
+class CountingDirectoryStub(ThematicExportDirectoryStub):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.collection_scans = 0
+        self.diagnosis_index_builds = 0
+
+    def getCollections(self):
+        self.collection_scans += 1
+        return super().getCollections()
+
+    def getDiagnosisIndex(self, orphacodes=None):
+        self.diagnosis_index_builds += 1
+        return DiagnosisIndex(super().getCollections(), orphacodes=orphacodes)
+
+
+def test_pipeline_feeds_all_exports_from_one_collection_scan():
+    directory = CountingDirectoryStub(include_withdrawn_entities=True)
+    exports = {name: export_class() for name, export_class in EXPORTS.items()}
+
+    run_export_pipeline(directory, exports.values())
+
+    assert directory.collection_scans == 1
+    assert directory.diagnosis_index_builds == 1
+    assert [c["id"] for c in exports["covid"].diagnosed.collections] == ["col1", "col2"]
+    assert [c["id"] for c in exports["covid"].only_diagnosed.collections] == ["col1"]
+    assert [c["id"] for c in exports["covid"].prospective.collections] == [
+        "col3",
+        "bbmri-eric:ID:NL_BB3:collection:COVID19PROSPECTIVE",
+    ]
+    assert [c["id"] for c in exports["obesity"].pediatric_only.collections] == [
+        "bbmri-eric:ID:NL_BB3:collection:COVID19PROSPECTIVE"
+    ]
+    assert [c["id"] for c in exports["obesity"].pediatric.collections] == ["col2"]
+    assert [c["id"] for c in exports["obesity"].obesity.collections] == ["col3"]
+    assert exports["ecraid"].biobank_ids.keys() == {"bbmri-eric:ID:CZ_BB1"}
+    assert exports["institutions"].country_institutions["CZ"] == {"Charles University"}
+
+
+def test_pipeline_builds_diagnosis_index_only_for_exports_using_it():
+    directory = CountingDirectoryStub()
+    institutions = EXPORTS["institutions"]()
+
+    run_export_pipeline(directory, [institutions])
+
+    assert directory.diagnosis_index_builds == 0
+    assert institutions.country_institutions["CZ"] == {"Charles University"}
+
+
+def test_obesity_export_does_not_mutate_shared_collections():
+    directory = ThematicExportDirectoryStub()
+    export = ObesityExport()
+
+    run_export_pipeline(directory, [export])
+
+    exported = export.pediatric.collections[0]
+    shared = next(c for c in directory.getCollections() if c["id"] == exported["id"])
+    assert exported is not shared
+    assert shared["contact"] == {"id": shared["contact"]["id"]}
+    assert exported["contact"]["email"]
+
+
+def test_suite_writes_same_workbooks_as_standalone_exporters(monkeypatch, tmp_path):
+    _, suite_stdout, _ = _run_script(
+        monkeypatch,
+        tmp_path,
+        "exporter-suite.py",
+        ["-o", str(tmp_path / "suite")],
+        directory_class=ThematicExportDirectoryStub,
+    )
+
+    for name, export_class in EXPORTS.items():
+        standalone = tmp_path / f"{name}.xlsx"
+        _, stdout, _ = _run_script(
+            monkeypatch,
+            tmp_path,
+            f"exporter-{name}.py",
+            ["-X", str(standalone)],
+            directory_class=ThematicExportDirectoryStub,
+        )
+        assert _workbook_rows(tmp_path / "suite" / f"{name}.xlsx") == _workbook_rows(standalone)
+        assert f"==== {export_class.title} ====\n{stdout}" in suite_stdout
+
+
+def test_pediatric_exporter_warns_that_orphacodes_option_is_ignored(monkeypatch, tmp_path, caplog):
+    with caplog.at_level(logging.WARNING):
+        _, stdout, _ = _run_script(
+            monkeypatch,
+            tmp_path,
+            "exporter-pediatric.py",
+            ["-O", str(tmp_path / "missing-orphacodes.txt")],
+            directory_class=ThematicExportDirectoryStub,
+        )
+
+    assert "-O/--orphacodes-mapfile is deprecated and ignored" in caplog.text
+    assert stdout
@@ -1,12 +1,17 @@
 import copy
+import hashlib
 import io
 import json
 import runpy
 import sys
+import tempfile
 import types
 from contextlib import redirect_stderr, redirect_stdout
 from pathlib import Path
 
+from diagnosis_index import DiagnosisIndex
+from fact_sheet_frame import FactSheetFrame
+
 
 REPO_ROOT = Path(__file__).resolve().parent.parent
 
@@ -238,6 +243,10 @@ class SharedDirectoryStub:
     def getSchema(self):
         return self._schema
 
+    def getSnapshotChecksum(self):
+        payload = [self.biobanks, self.collections, self.services, self.collectionFactMap]
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
     def getDirectoryUrl(self):
         return self._directory_url
 
@@ -327,6 +336,12 @@ class SharedDirectoryStub:
     def getCollectionFacts(self, collection_id):
         return self.collectionFactMap.get(collection_id, [])
 
+    def getFactSheetFrame(self):
+        return FactSheetFrame.from_collection_facts(self.collectionFactMap)
+
+    def getDiagnosisIndex(self, orphacodes=None):
+        return DiagnosisIndex.from_directory(self, orphacodes=orphacodes)
+
     def getCollectionCountry(self, collection_id):
         collection = self.getCollectionById(collection_id)
         return collection["country"]
@@ -448,11 +463,12 @@ class SharedDirectoryStub:
         return True
 
 
-def _run_script(monkeypatch, script_name, argv, directory_class=SharedDirectoryStub):
+def _run_script(monkeypatch, tmp_path, script_name, argv, directory_class=SharedDirectoryStub):
     fake_directory_module = types.ModuleType("directory")
     fake_directory_module.Directory = directory_class
     monkeypatch.setitem(sys.modules, "directory", fake_directory_module)
     monkeypatch.setattr(sys, "argv", [script_name, *argv])
+    monkeypatch.setenv("DIRECTORY_CACHE_ROOT", tempfile.mkdtemp(prefix="directory-cache-", dir=tmp_path))
 
     stdout = io.StringIO()
     stderr = io.StringIO()
@@ -480,14 +496,16 @@ class CohortTotalsDirectoryStub(SharedDirectoryStub):
     BASE_COLLECTIONS[2]["type"] = ["POPULATION_BASED"]
 
 
-def test_directory_stats_matches_exporter_all_active_totals(monkeypatch):
+def test_directory_stats_matches_exporter_all_active_totals(monkeypatch, tmp_path):
     stats_globals, _, _ = _run_script(
         monkeypatch,
+        tmp_path,
         "directory-stats.py",
         ["-N"],
     )
     exporter_globals, _, _ = _run_script(
         monkeypatch,
+        tmp_path,
         "exporter-all.py",
         ["-N"],
     )
@@ -502,9 +520,10 @@ def test_directory_stats_matches_exporter_all_active_totals(monkeypatch):
     assert summary["donors_total"] == exporter_globals["allCollectionDonorsIncOoM"]
 
 
-def test_exporter_all_collects_services_and_studies_in_active_scope(monkeypatch):
+def test_exporter_all_collects_services_and_studies_in_active_scope(monkeypatch, tmp_path):
     exporter_globals, _, _ = _run_script(
         monkeypatch,
+        tmp_path,
         "exporter-all.py",
         ["-N"],
     )
@@ -519,6 +538,7 @@ def test_exporter_all_can_append_withdrawn_sheets_to_main_workbook(monkeypatch,
     workbook = tmp_path / "all.xlsx"
     _run_script(
         monkeypatch,
+        tmp_path,
         "exporter-all.py",
         [
             "-N",
@@ -556,6 +576,7 @@ def test_exporter_all_writes_clickable_id_hyperlinks(monkeypatch, tmp_path):
     workbook = tmp_path / "links.xlsx"
     _run_script(
         monkeypatch,
+        tmp_path,
         "exporter-all.py",
         [
             "-N",
@@ -590,6 +611,7 @@ def test_exporter_cohorts_only_withdrawn_handles_active_parent_biobank(
 
     exporter_globals, _, _ = _run_script(
         monkeypatch,
+        tmp_path,
         "exporter-cohorts.py",
         ["-N", "--only-withdrawn", "-X", str(workbook)],
         directory_class=WithdrawnCohortUnderActiveBiobankDirectoryStub,
@@ -602,9 +624,10 @@ def test_exporter_cohorts_only_withdrawn_handles_active_parent_biobank(
     assert exporter_globals["cohortCountries"] == {"DE"}
 
 
-def test_exporter_cohorts_reports_explicit_and_oom_totals(monkeypatch):
+def test_exporter_cohorts_reports_explicit_and_oom_totals(monkeypatch, tmp_path):
     exporter_globals, stdout, _ = _run_script(
         monkeypatch,
+        tmp_path,
         "exporter-cohorts.py",
         [],
         directory_class=CohortTotalsDirectoryStub,
@@ -641,6 +664,7 @@ def test_exporter_cohorts_writes_fact_sheet_summary_sheets(monkeypatch, tmp_path
 
     _run_script(
         monkeypatch,
+        tmp_path,
         "exporter-cohorts.py",
         ["-N", "-X", str(workbook)],
         directory_class=CohortTotalsDirectoryStub,
@@ -658,9 +682,10 @@ def test_exporter_cohorts_writes_fact_sheet_summary_sheets(monkeypatch, tmp_path
     assert summary["populated_all_star_rows"] == 3
 
 
-def test_exporter_cmdr_lists_biobanks_collections_and_studies(monkeypatch):
+def test_exporter_cmdr_lists_biobanks_collections_and_studies(monkeypatch, tmp_path):
     exporter_globals, stdout, _ = _run_script(
         monkeypatch,
+        tmp_path,
         "exporter-cMDR.py",
         [],
     )
@@ -693,6 +718,7 @@ def test_exporter_cmdr_writes_sorted_hyperlinked_workbook(monkeypatch, tmp_path)
     workbook = tmp_path / "cmdr.xlsx"
     _run_script(
         monkeypatch,
+        tmp_path,
         "exporter-cMDR.py",
         [
             "-N",
@@ -733,6 +759,7 @@ def test_exporter_cmdr_writes_geojson_with_entity_and_biobank_fallback(monkeypat
     output_file = tmp_path / "cmdr.geojson"
     _run_script(
         monkeypatch,
+        tmp_path,
         "exporter-cMDR.py",
         [
             "-N",
@@ -766,14 +793,16 @@ def test_exporter_cmdr_writes_geojson_with_entity_and_biobank_fallback(monkeypat
     assert study_feature_fallback["properties"]["coordinate_source_id"] == "col1"
 
 
-def test_directory_stats_can_include_withdrawn_biobanks(monkeypatch):
+def test_directory_stats_can_include_withdrawn_biobanks(monkeypatch, tmp_path):
     default_globals, _, _ = _run_script(
         monkeypatch,
+        tmp_path,
         "directory-stats.py",
         ["-N"],
     )
     include_globals, _, _ = _run_script(
         monkeypatch,
+        tmp_path,
         "directory-stats.py",
         ["-N", "-w"],
     )
@@ -791,9 +820,10 @@ def test_directory_stats_can_include_withdrawn_biobanks(monkeypatch):
     assert include_summary["services_total"] == default_summary["services_total"] + 1
 
 
-def test_directory_stats_can_select_only_withdrawn_biobanks(monkeypatch):
+def test_directory_stats_can_select_only_withdrawn_biobanks(monkeypatch, tmp_path):
     only_globals, _, _ = _run_script(
         monkeypatch,
+        tmp_path,
         "directory-stats.py",
         ["-N", "--only-withdrawn"],
     )
@@ -807,16 +837,19 @@ def test_directory_stats_can_select_only_withdrawn_biobanks(monkeypatch):
 
 def test_directory_stats_matches_exporter_all_when_oom_policy_changes(
     monkeypatch,
+    tmp_path,
 ):
     monkeypatch.setenv("DIRECTORY_OOM_UPPER_BOUND_COEFFICIENT", "0.3")
 
     stats_globals, _, _ = _run_script(
         monkeypatch,
+        tmp_path,
         "directory-stats.py",
         ["-N"],
     )
     exporter_globals, _, _ = _run_script(
         monkeypatch,
+        tmp_path,
         "exporter-all.py",
         ["-N"],
     )
@@ -827,9 +860,10 @@ def test_directory_stats_matches_exporter_all_when_oom_policy_changes(
     assert summary["donors_total"] == exporter_globals["allCollectionDonorsIncOoM"]
 
 
-def test_directory_stats_script_applies_country_and_staging_area_filters(monkeypatch):
+def test_directory_stats_script_applies_country_and_staging_area_filters(monkeypatch, tmp_path):
     globals_dict, _, _ = _run_script(
         monkeypatch,
+        tmp_path,
         "directory-stats.py",
         ["-N", "-c", "DE", "-A", "EXT"],
     )
@@ -845,9 +879,11 @@ def test_directory_stats_script_applies_country_and_staging_area_filters(monkeyp
 
 def test_directory_stats_script_supports_comma_delimited_filters_and_collection_types(
     monkeypatch,
+    tmp_path,
 ):
     globals_dict, _, _ = _run_script(
         monkeypatch,
+        tmp_path,
         "directory-stats.py",
         ["-N", "-c", "CZ,DE", "-T", "CASE_CONTROL,POPULATION"],
     )
@@ -1,4 +1,16 @@
-from fact_descriptor_sync import build_collection_descriptor_proposal
+import random
+import time
+
+import pytest
+
+from fact_descriptor_sync import (
+    Icd10PrefixIndex,
+    build_collection_descriptor_proposal,
+    build_collection_descriptor_proposals,
+    build_descriptor_proposals_from_frame,
+    icd10_covers,
+)
+from fact_sheet_frame import FactSheetFrame
 from check_fix_helpers import build_fact_alignment_fix_proposals
 
 
@@ -374,3 +386,117 @@ def test_fact_alignment_count_fix_rationale_mentions_all_star_requirement():
 
     assert "all-star aggregate fact row" in proposal_map["size"].rationale
     assert "all-star aggregate fact row" in proposal_map["number_of_donors"].rationale
+
+
+def _random_descriptor_targets(collection_count, facts_per_collection, seed=3):
+    rng = random.Random(seed)
+    ages = ["*", "Adult", "Infant", "Aged (>80 years)", "0-11 months", "20-30 years", "Unknown", None, {"name": "Child"}]
+    sexes = ["*", "FEMALE", "MALE", {"id": "FEMALE"}, None]
+    materials = ["*", "NAV", "SERUM", "DNA", {"name": "TISSUE_FROZEN"}]
+    diseases = ["*", {"name": "*"}, {"name": "urn:miriam:icd:C18"}, {"name": "urn:miriam:icd:C18.1"}, "urn:miriam:icd:C19.2", "ORPHA:123", None]
+    counts = [0, 1, 3, 5, 10, "7", "0", None, ""]
+    targets = []
+    for index in range(collection_count):
+        collection_id = f"bbmri-eric:ID:CZ_demo:collection:col{index}"
+        facts = [
+            {
+                "id": f"{collection_id}:fact{fact_index}",
+                "sex": rng.choice(sexes),
+                "age_range": rng.choice(ages),
+                "sample_type": rng.choice(materials),
+                "disease": rng.choice(diseases),
+                "number_of_donors": rng.choice(counts),
+                "number_of_samples": rng.choice(counts),
+            }
+            for fact_index in range(rng.randint(0, facts_per_collection))
+        ]
+        if rng.random() < 0.5:
+            facts.append(
+                {
+                    "id": f"{collection_id}:all",
+                    "sex": "*",
+                    "age_range": "*",
+                    "sample_type": "*",
+                    "disease": "*",
+                    "number_of_donors": rng.choice(counts),
+                    "number_of_samples": rng.choice(counts),
+                }
+            )
+        collection = {
+            "id": collection_id,
+            "diagnosis_available": ",".join(
+                rng.sample(["urn:miriam:icd:C18", "urn:miriam:icd:C18.1", "urn:miriam:icd:C50", "ORPHA:123"], rng.randint(0, 3))
+            ),
+            "materials": rng.choice(["", "SERUM", "NAV,DNA"]),
+            "sex": rng.choice(["", "FEMALE", "MALE,FEMALE"]),
+            "age_low": rng.choice(["", "10"]),
+            "age_high": rng.choice(["", "60"]),
+            "age_unit": rng.choice(["", "YEAR", "MONTH"]),
+            "size": "3",
+            "number_of_donors": "",
+        }
+        targets.append((collection_id, collection, facts))
+    return targets
+
+
+@pytest.mark.parametrize("replace_existing", [False, True])
+def test_bulk_descriptor_proposals_match_per_collection_proposals(replace_existing):
+    targets = _random_descriptor_targets(300, 12)
+
+    proposals = build_collection_descriptor_proposals(targets, replace_existing=replace_existing)
+
+    assert list(proposals) == [collection_id for collection_id, _, _ in targets]
+    for collection_id, collection, facts in targets:
+        assert proposals[collection_id] == build_collection_descriptor_proposal(
+            collection,
+            facts,
+            replace_existing=replace_existing,
+        )
+
+
+def test_icd10_prefix_index_matches_pairwise_coverage():
+    values = ["urn:miriam:icd:C18", "urn:miriam:icd:C50.1", "ORPHA:123"]
+    candidates = [
+        "urn:miriam:icd:C18",
+        "urn:miriam:icd:c18.4",
+        "urn:miriam:icd:C50",
+        "urn:miriam:icd:C50.1",
+        "urn:miriam:icd:C50.2",
+        "urn:miriam:icd:C19",
+        "ORPHA:123",
+        "ORPHA:1234",
+    ]
+    index = Icd10PrefixIndex(values)
+
+    for candidate in candidates:
+        assert index.covers(candidate) == any(
+            value == candidate or icd10_covers(value, candidate) for value in values
+        )
+        assert index.is_covering(candidate) == any(
+            value == candidate or icd10_covers(candidate, value) for value in values
+        )
+
+
+@pytest.mark.benchmark
+def test_benchmark_bulk_descriptor_proposals(record_property):
+    targets = _random_descriptor_targets(2000, 60)
+    collections = [collection for _, collection, _ in targets]
+
+    start_time = time.perf_counter()
+    for collection_id, collection, facts in targets:
+        build_collection_descriptor_proposal(collection, facts)
+    loop_elapsed = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    fact_frame = FactSheetFrame.from_collection_facts({collection_id: facts for collection_id, _, facts in targets})
+    frame_elapsed = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    proposals = build_descriptor_proposals_from_frame(collections, fact_frame)
+    bulk_elapsed = time.perf_counter() - start_time
+
+    record_property("per_collection_seconds", round(loop_elapsed, 3))
+    record_property("frame_seconds", round(frame_elapsed, 3))
+    record_property("bulk_seconds", round(bulk_elapsed, 3))
+    assert len(proposals) == len(targets)
+    assert bulk_elapsed < loop_elapsed
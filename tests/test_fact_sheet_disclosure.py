@@ -0,0 +1,151 @@
+import random
+import time
+
+import pytest
+
+from checks.FactTables import FactTables
+from fact_sheet_disclosure import find_differencing_disclosures
+from fact_sheet_frame import FactSheetFrame
+from fact_sheet_utils import FactSheetCube, analyze_collection_fact_sheet
+
+
+BASE = {"sex": "*", "age_range": "*", "sample_type": "*", "disease": "*"}
+
+
+def _row(fact_id, donors=None, samples=None, **dimensions):
+    return {**BASE, **dimensions, "id": fact_id, "number_of_donors": donors, "number_of_samples": samples}
+
+
+def test_suppressed_cell_derivable_from_margin_minus_published_sibling():
+    facts = [
+        _row("total", 50),
+        _row("female", 30, sex="FEMALE"),
+        _row("male", 20, sex="MALE"),
+        _row("c50", 25, disease="C50"),
+        _row("female-c50", 22, sex="FEMALE", disease="C50"),
+        _row("male-c50", 3, sex="MALE", disease="C50"),
+    ]
+
+    disclosures = find_differencing_disclosures(
+        FactSheetCube(facts),
+        analyze_collection_fact_sheet({"id": "col"}, facts),
+    )
+
+    assert len(disclosures) == 1
+    derived = disclosures[0]
+    assert derived.describe_cell() == "sex=MALE, disease=C50"
+    assert derived.value == 3
+    assert derived.dimension == "sex"
+    assert derived.published_fact_ids == ["c50", "female-c50"]
+    assert derived.suppressed_fact_ids == ["male-c50"]
+
+
+def test_chained_derivation_through_unpublished_intermediate_total():
+    facts = [
+        _row("total", samples=40),
+        _row("female-dna", samples=20, sex="FEMALE", sample_type="DNA"),
+        _row("male-dna", samples=15, sex="MALE", sample_type="DNA"),
+        _row("serum", samples=5, sample_type="SERUM"),
+    ]
+
+    disclosures = find_differencing_disclosures(
+        FactSheetCube(facts),
+        count_field="number_of_samples",
+    )
+
+    assert [(item.describe_cell(), item.value) for item in disclosures] == [("sample_type=SERUM", 5)]
+
+
+def test_no_disclosure_when_two_cells_stay_unknown_or_totals_are_ambiguous():
+    facts = [
+        _row("total", 50),
+        _row("female", 44, sex="FEMALE"),
+        _row("male", 3, sex="MALE"),
+        _row("unknown", 3, sex="UNKNOWN"),
+    ]
+    assert find_differencing_disclosures(FactSheetCube(facts)) == []
+
+    ambiguous = [_row("total-a", 50), _row("total-b", 40), _row("female", 45, sex="FEMALE"), _row("male", 5, sex="MALE")]
+    assert find_differencing_disclosures(
+        FactSheetCube(ambiguous),
+        analyze_collection_fact_sheet({"id": "col"}, ambiguous),
+    ) == []
+
+
+class DifferencingDirectoryStub:
+    def __init__(self, facts):
+        self.facts = facts
+
+    def getCollections(self):
+        return [{"id": "col1", "withdrawn": False, "facts": [{"id": "total"}], "size": 500}]
+
+    def getCollectionFacts(self, collection_id):
+        return self.facts
+
+    def getFactSheetFrame(self):
+        return FactSheetFrame.from_collection_facts(
+            {collection["id"]: self.getCollectionFacts(collection["id"]) for collection in self.getCollections()}
+        )
+
+    def getCollectionBiobankId(self, collection_id):
+        return "bb1"
+
+    def getBiobankById(self, biobank_id):
+        return {"id": "bb1"}
+
+    def getCollectionNN(self, collection_id):
+        return "CZ"
+
+    def getCollectionContact(self, collection_id):
+        return {"email": "contact@example.org"}
+
+
+def test_facttables_reports_differencing_without_duplicating_complementary_warning():
+    facts = [
+        _row("total", 50, 500),
+        _row("female", 47, 470, sex="FEMALE"),
+        _row("male", 3, 30, sex="MALE"),
+        _row("c50", 25, 250, disease="C50"),
+        _row("female-c50", 22, 220, sex="FEMALE", disease="C50"),
+        _row("male-c50", 3, 30, sex="MALE", disease="C50"),
+    ]
+
+    warnings = FactTables().check(DifferencingDirectoryStub(facts), args=None)
+    by_id = {}
+    for warning in warnings:
+        by_id.setdefault(warning.dataCheckID, []).append(warning)
+
+    assert len(by_id["FT:KAnonComplementary"]) == 1
+    assert len(by_id["FT:KAnonDifferencing"]) == 1
+    assert "sex=MALE, disease=C50" in by_id["FT:KAnonDifferencing"][0].message
+
+
+def _synthetic_fact_sheet(rng):
+    sexes = ("FEMALE", "MALE")
+    diseases = [f"D{index}" for index in range(rng.randint(3, 12))]
+    total = rng.randint(200, 2000)
+    facts = [_row("total", total)]
+    for sex in sexes:
+        facts.append(_row(f"s-{sex}", rng.randint(1, total), sex=sex))
+    for disease in diseases:
+        disease_total = rng.randint(1, 200)
+        facts.append(_row(f"d-{disease}", disease_total, disease=disease))
+        for sex in sexes:
+            facts.append(_row(f"d-{disease}-{sex}", rng.randint(0, disease_total), sex=sex, disease=disease))
+    return facts
+
+
+@pytest.mark.benchmark
+def test_benchmark_differencing_detection_over_10k_fact_sheets(record_property):
+    rng = random.Random(5)
+    fact_sheets = [_synthetic_fact_sheet(rng) for _ in range(10_000)]
+
+    start_time = time.perf_counter()
+    derived_cells = 0
+    for facts in fact_sheets:
+        derived_cells += len(find_differencing_disclosures(FactSheetCube(facts)))
+    elapsed = time.perf_counter() - start_time
+
+    record_property("detection_seconds", round(elapsed, 3))
+    record_property("derivable_cells", derived_cells)
+    assert elapsed < 60
@@ -0,0 +1,154 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fact_sheet_frame import FactSheetFrame
+from fact_sheet_utils import (
+    FACT_DIMENSION_KEYS,
+    analyze_collection_fact_sheet,
+    count_star_dimensions,
+    get_dimension_values,
+    get_matching_one_star_rows,
+)
+from k_anonymity import donor_value_violates_k
+
+
+def _fact(fact_id, sex="*", age_range="*", sample_type="*", disease="*", samples=None, donors=None):
+    fact = {
+        "id": fact_id,
+        "sex": sex,
+        "age_range": age_range,
+        "sample_type": sample_type,
+        "disease": disease,
+    }
+    if samples is not None:
+        fact["number_of_samples"] = samples
+    if donors is not None:
+        fact["number_of_donors"] = donors
+    return fact
+
+
+COLLECTION_FACTS = {
+    "col1": [
+        _fact("f1", samples=100, donors=40),
+        _fact("f2", disease={"id": "urn:miriam:icd:C50", "label": "Breast cancer"}, samples=60, donors=6),
+        _fact("f3", sex={"id": "FEMALE"}, samples=70, donors=30),
+        _fact("f4", sex={"id": "FEMALE"}, disease={"id": "urn:miriam:icd:C50"}, samples=50, donors=5),
+        _fact("f5", sample_type={"name": "DNA"}, age_range=None, samples=10, donors=0),
+    ],
+    "col2": [
+        _fact("f6", samples=20, donors=2),
+        _fact("f7", samples=30, donors=3),
+        _fact("f8", sample_type="DNA", donors=12),
+    ],
+    "col3": [
+        _fact("f9", sex="MALE", disease="ORPHA:1", samples=5, donors=1),
+    ],
+}
+COLLECTIONS = [
+    {"id": "col1", "size": 90, "number_of_donors": 40},
+    {"id": "col2", "size": 20},
+    {"id": "col3", "size": 5},
+    {"id": "col4"},
+]
+
+
+class FactFrameDirectoryStub:
+    def getCollections(self):
+        return COLLECTIONS
+
+    def getCollectionFacts(self, collection_id):
+        return COLLECTION_FACTS.get(collection_id, [])
+
+    def getFactSheetFrame(self):
+        return FactSheetFrame.from_collection_facts(COLLECTION_FACTS)
+
+
+def test_frame_encodes_star_and_fixed_bitfields():
+    frame = FactSheetFrame.from_collection_facts(COLLECTION_FACTS)
+
+    row = frame.frame.iloc[frame.positions("col1")[4]]
+    assert row["star_mask"] == 0b1001
+    assert row["fixed_mask"] == 0b0100
+    assert row["star_count"] == 2
+    assert isinstance(frame.frame["disease"].dtype, pd.CategoricalDtype)
+    assert frame.all_star_mask().sum() == 3
+
+
+def test_frame_analysis_matches_per_collection_helpers():
+    frame = FactFrameDirectoryStub().getFactSheetFrame()
+
+    for collection in COLLECTIONS:
+        facts = COLLECTION_FACTS.get(collection["id"], [])
+        assert frame.analyze_collection(collection) == analyze_collection_fact_sheet(collection, facts)
+        assert frame.get_dimension_values(collection["id"]) == get_dimension_values(facts)
+        histogram = {star_count: 0 for star_count in range(len(FACT_DIMENSION_KEYS) + 1)}
+        for fact in facts:
+            histogram[count_star_dimensions(fact)] += 1
+        assert frame.get_star_count_histogram(collection["id"]) == histogram
+
+        cube = frame.get_cube(collection["id"])
+        for key, values in get_dimension_values(facts).items():
+            for value in values:
+                assert cube.get_one_star_rows(key, value) == get_matching_one_star_rows(facts, key, value)
+
+
+def test_frame_k_anonymity_and_sample_totals_per_collection():
+    frame = FactSheetFrame.from_collection_facts(COLLECTION_FACTS)
+
+    for collection_id, facts in COLLECTION_FACTS.items():
+        assert frame.get_k_anonymity_violations(collection_id, 10) == [
+            fact for fact in facts if donor_value_violates_k(fact.get("number_of_donors"), 10)
+        ]
+    assert frame.get_samples_total("col1") == 290
+    assert frame.get_samples_total("col4") == 0
+
+
+def test_frame_cube_reuses_normalized_values():
+    frame = FactSheetFrame.from_collection_facts(COLLECTION_FACTS)
+    cube = frame.get_cube("col1")
+
+    assert cube is frame.get_cube("col1")
+    assert [row["id"] for row in cube.get_one_star_rows("disease", "urn:miriam:icd:C50")] == ["f2"]
+    assert [row["id"] for row in cube.get_rows(sex="FEMALE", disease="urn:miriam:icd:C50")] == ["f4"]
+    assert frame.get_cube("col4").get_all_star_rows() == []
+
+
+def _synthetic_fact_frame(row_count, rows_per_collection=100, seed=3):
+    rng = np.random.default_rng(seed)
+    columns = {
+        "collection_id": pd.Categorical.from_codes(
+            np.arange(row_count) // rows_per_collection,
+            categories=[f"col{i}" for i in range((row_count - 1) // rows_per_collection + 1)],
+        ),
+        "fact_id": pd.RangeIndex(row_count).astype(str),
+    }
+    for key, cardinality in zip(FACT_DIMENSION_KEYS, (3, 20, 15, 500)):
+        categories = ["*"] + [f"{key}:{i}" for i in range(cardinality)]
+        codes = np.where(rng.random(row_count) < 0.6, 0, rng.integers(1, cardinality + 1, row_count))
+        columns[key] = pd.Categorical.from_codes(codes, categories=categories)
+    columns["number_of_samples"] = pd.array(rng.integers(0, 500, row_count), dtype="Int64")
+    columns["number_of_donors"] = pd.array(rng.integers(0, 200, row_count), dtype="Int64")
+    return pd.DataFrame(columns)
+
+
+@pytest.mark.benchmark
+def test_benchmark_fact_sheet_frame_on_5m_rows(record_property):
+    data = _synthetic_fact_frame(5_000_000)
+
+    start_time = time.perf_counter()
+    frame = FactSheetFrame(data)
+    summary = frame.collection_summary()
+    k_violations = frame.k_anonymity_violation_mask(10)
+    k_scan = frame.scan_k_anonymity(k_donors=10, k_samples=10)
+    values = frame.get_dimension_values("col0")
+    elapsed = time.perf_counter() - start_time
+
+    record_property("frame_seconds", round(elapsed, 3))
+    record_property("k_anonymity_findings", len(k_scan))
+    assert len(summary) == 50_000
+    assert int(summary["fact_rows"].sum()) == 5_000_000
+    assert set(values) == set(frame.dimension_keys)
+
@@ -1,3 +1,4 @@
+from fact_sheet_frame import FactSheetFrame
 from fact_sheet_summary import build_fact_sheet_summary, print_fact_sheet_summary
 
 
@@ -8,6 +9,9 @@ class FactDirectoryStub:
     def getCollectionFacts(self, collection_id):
         return self.facts_by_collection.get(collection_id, [])
 
+    def getFactSheetFrame(self):
+        return FactSheetFrame.from_collection_facts(self.facts_by_collection)
+
 
 def test_fact_sheet_summary_keeps_fact_values_as_observations():
     collections = [
@@ -1,4 +1,5 @@
 from fact_sheet_utils import (
+    FactSheetCube,
     analyze_collection_fact_sheet,
     count_star_dimensions,
     get_all_star_rows,
@@ -87,3 +88,32 @@ def test_analyze_collection_fact_sheet_reports_missing_and_mismatched_all_star()
         "all_star_samples_mismatch",
         "all_star_donors_mismatch",
     }
+
+
+def test_fact_sheet_cube_supports_partial_aggregate_lookups_and_additivity():
+    base = {"sex": "*", "age_range": "*", "sample_type": "*", "disease": "*"}
+    facts = [
+        {**base, "id": "total", "number_of_samples": 10},
+        {**base, "id": "female", "sex": {"id": "FEMALE"}, "number_of_samples": 6},
+        {**base, "id": "male", "sex": "MALE", "number_of_samples": 5},
+        {**base, "id": "dna", "sample_type": "DNA", "number_of_samples": 4},
+        {**base, "id": "female-dna", "sex": "FEMALE", "sample_type": "DNA", "number_of_samples": 3},
+    ]
+    cube = FactSheetCube(facts)
+
+    assert [row["id"] for row in cube.get_all_star_rows()] == ["total"]
+    assert [row["id"] for row in cube.get_one_star_rows("sex", {"id": "FEMALE"})] == ["female"]
+    assert [row["id"] for row in cube.get_rows(sex="FEMALE", sample_type="DNA")] == ["female-dna"]
+    assert cube.get_rows(disease="ORPHA:1") == []
+    assert get_matching_one_star_rows(facts, "sample_type", "DNA") == [facts[3]]
+
+    mismatches = cube.check_margin_additivity("number_of_samples", ("sex", "sample_type"))
+    assert mismatches == [
+        {
+            "dimension": "sex",
+            "count_field": "number_of_samples",
+            "margin_total": 11,
+            "all_star_total": 10,
+            "values": {"FEMALE": 6, "MALE": 5},
+        }
+    ]
@@ -1,4 +1,5 @@
 from checks.FactTables import FactTables
+from fact_sheet_frame import FactSheetFrame
 
 
 class FactTablesDirectoryStub:
@@ -99,6 +100,9 @@ class FactTablesDirectoryStub:
     def getCollectionFacts(self, collection_id):
         return self.facts_by_collection.get(collection_id, [])
 
+    def getFactSheetFrame(self):
+        return FactSheetFrame.from_collection_facts(self.facts_by_collection)
+
     def getCollectionBiobankId(self, collection_id):
         return "bb1"
 
@@ -159,6 +163,11 @@ class FactTablesAgeRangeBroadStub:
     def getCollectionFacts(self, collection_id):
         return self.facts
 
+    def getFactSheetFrame(self):
+        return FactSheetFrame.from_collection_facts(
+            {collection["id"]: self.getCollectionFacts(collection["id"]) for collection in self.getCollections()}
+        )
+
     def getCollectionBiobankId(self, collection_id):
         return "bb1"
 
@@ -246,6 +255,11 @@ class FactTablesCrcLikeAgeRangeStub:
     def getCollectionFacts(self, collection_id):
         return self.facts
 
+    def getFactSheetFrame(self):
+        return FactSheetFrame.from_collection_facts(
+            {collection["id"]: self.getCollectionFacts(collection["id"]) for collection in self.getCollections()}
+        )
+
     def getCollectionBiobankId(self, collection_id):
         return "bb1"
 
@@ -341,3 +355,71 @@ def test_facttables_age_range_uses_label_based_rows_for_crc_like_cohort():
     assert "Fact-sheet age range (2+ YEAR (open upper bound))" in message
     assert "collection age range (18-99 YEAR)" in message
     assert "Open-ended fact-sheet age groups are present" in message
+
+
+def test_facttables_check_reports_margins_exceeding_all_star_total():
+    directory = FactTablesDirectoryStub()
+    directory.collections.append(
+        {
+            "id": "col4",
+            "name": "Collection 4",
+            "withdrawn": False,
+            "facts": [{"id": "f4a"}],
+            "size": 20,
+            "number_of_donors": 20,
+        }
+    )
+    base = {"sex": "*", "age_range": "*", "sample_type": "*", "disease": "*"}
+    directory.facts_by_collection["col4"] = [
+        {**base, "id": "f4a", "number_of_samples": 20, "number_of_donors": 20},
+        {**base, "id": "f4b", "sex": "FEMALE", "number_of_samples": 15, "number_of_donors": 15},
+        {**base, "id": "f4c", "sex": "MALE", "number_of_samples": 12, "number_of_donors": 12},
+        {**base, "id": "f4d", "disease": {"name": "ORPHA:1"}, "number_of_samples": 18, "number_of_donors": 18},
+        {**base, "id": "f4e", "disease": {"name": "ORPHA:2"}, "number_of_samples": 18, "number_of_donors": 18},
+    ]
+
+    warnings = FactTables().check(directory, args=None)
+    margin_warnings = [
+        warning for warning in warnings if warning.dataCheckID == "FT:MarginSumExceedsTotal"
+    ]
+
+    assert {warning.directoryEntityID for warning in margin_warnings} == {"col4"}
+    assert len(margin_warnings) == 2
+    assert all("sex sum to 27" in warning.message for warning in margin_warnings)
+
+
+def test_facttables_check_reports_complementary_disclosure_with_suppression_fix():
+    directory = FactTablesDirectoryStub()
+    directory.collections.append(
+        {
+            "id": "col5",
+            "name": "Collection 5",
+            "withdrawn": False,
+            "facts": [{"id": "f5a"}],
+            "size": 40,
+            "number_of_donors": 40,
+        }
+    )
+    base = {"sex": "*", "age_range": "*", "sample_type": "*", "disease": "*"}
+    directory.facts_by_collection["col5"] = [
+        {**base, "id": "f5a", "number_of_samples": 40, "number_of_donors": 40},
+        {**base, "id": "f5b", "sex": "FEMALE", "number_of_samples": 36, "number_of_donors": 36},
+        {**base, "id": "f5c", "sex": "MALE", "number_of_samples": 4, "number_of_donors": 4},
+    ]
+
+    warnings = FactTables().check(directory, args=None)
+    complementary = [
+        warning
+        for warning in warnings
+        if warning.dataCheckID == "FT:KAnonComplementary" and warning.directoryEntityID == "col5"
+    ]
+
+    assert len(complementary) == 1
+    assert "residual of 4" in complementary[0].message
+    assert [proposal.proposed_value for proposal in complementary[0].fix_proposals] == [["f5b"]]
+    k_anon = next(
+        warning
+        for warning in warnings
+        if warning.dataCheckID == "FT:KAnonViolation" and warning.directoryEntityID == "col5"
+    )
+    assert [proposal.proposed_value for proposal in k_anon.fix_proposals] == [["f5c"]]
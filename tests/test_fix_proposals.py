@@ -2,6 +2,7 @@ from pathlib import Path
 
 from customwarnings import DataCheckEntityType, DataCheckWarning, DataCheckWarningLevel
 from fix_proposals import (
+    FixProposalStore,
     build_fix_plan_payload,
     load_fix_plan,
     make_fix_proposal,
@@ -181,3 +182,45 @@ def test_fix_plan_payload_skips_fixes_when_source_warning_id_is_suppressed():
         },
     )
     assert payload["updates"] == []
+
+
+def _store_proposal(update_id, entity_id, field, *, module="AP", confidence="certain", source_check_ids=()):
+    return make_fix_proposal(
+        update_id=update_id,
+        module=module,
+        entity_type="COLLECTION",
+        entity_id=entity_id,
+        field=field,
+        mode="append",
+        confidence=confidence,
+        current_value_at_export=[],
+        proposed_value=["DUO:0000020"],
+        human_explanation="x",
+        source_check_ids=list(source_check_ids),
+    )
+
+
+def test_fix_proposal_store_selects_through_indexes_in_plan_order():
+    proposals = [
+        _store_proposal("u1", "bbmri-eric:ID:CZ_demo:collection:col1", "data_use", source_check_ids=["FT:Facts"]),
+        _store_proposal("u2", "bbmri-eric:ID:EU_demo:collection:col2", "sex", confidence="uncertain"),
+        _store_proposal("u3", "bbmri-eric:ID:CZ_demo:collection:col1", "data_use", module="CC"),
+        _store_proposal("u4", "bbmri-eric:ID:CZ_demo:collection:col3", "materials", confidence="almost_certain"),
+    ]
+    store = FixProposalStore(proposals)
+
+    assert [p.update_id for p in store.select(staging_areas={"cz"})] == ["u1", "u3", "u4"]
+    assert [p.update_id for p in store.select(modules={"FT", "CC"})] == ["u1", "u3"]
+    assert [p.update_id for p in store.select(confidences={"certain", "almost_certain"}, staging_areas={"CZ"})] == [
+        "u1",
+        "u3",
+        "u4",
+    ]
+    assert len(store.select(entity_ids=set())) == 0
+    assert len(store.select()) == 4
+    assert list(store.groups()) == [
+        ("bbmri-eric:ID:CZ_demo:collection:col1", "data_use"),
+        ("bbmri-eric:ID:EU_demo:collection:col2", "sex"),
+        ("bbmri-eric:ID:CZ_demo:collection:col3", "materials"),
+    ]
+    assert [p.update_id for p in store.groups()[("bbmri-eric:ID:CZ_demo:collection:col1", "data_use")]] == ["u1", "u3"]
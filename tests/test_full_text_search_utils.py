@@ -0,0 +1,355 @@
+import random
+import statistics
+import time
+
+import pytest
+from whoosh.index import create_in, open_dir
+from whoosh.qparser import QueryParser
+
+from full_text_search_utils import (
+    build_contact_name_map,
+    build_filter_query,
+    build_index,
+    build_index_schema,
+    get_contact_full_name,
+    index_schema_matches,
+    parse_fuzzy_query,
+    parse_search_query,
+    resolve_index_procs,
+    search_index,
+)
+
+
+class FullTextDirectoryStub:
+    def __init__(self):
+        self.contacts = [
+            {
+                "id": "bbmri-eric:contactID:CZ_1",
+                "title_before_name": "Dr.",
+                "first_name": "Jana",
+                "last_name": "Nováková",
+                "email": "jana@example.org",
+                "city": "Brno",
+            },
+            {
+                "id": "bbmri-eric:contactID:DE_2",
+                "first_name": "Hans",
+                "last_name": "Müller",
+                "phone": "+49 123",
+            },
+        ]
+        self.biobanks = [
+            {
+                "id": "bbmri-eric:ID:CZ_BB1",
+                "name": "Masaryk Biobank",
+                "juridical_person": "Masaryk Memorial Cancer Institute",
+                "contact": {"id": "bbmri-eric:contactID:CZ_1"},
+                "head": {"id": "bbmri-eric:contactID:DE_2"},
+                "country": "CZ",
+            },
+            {
+                "id": "bbmri-eric:ID:DE_BB2",
+                "name": "Munich Cancer Biobank",
+                "country": {"id": "DE"},
+            },
+        ]
+        self.collections = [
+            {
+                "id": "bbmri-eric:ID:CZ_BB1:collection:C1",
+                "name": "Colorectal cancer cohort",
+                "biobank": {"id": "bbmri-eric:ID:CZ_BB1"},
+            },
+            {
+                "id": "bbmri-eric:ID:CZ_BB1:collection:C2",
+                "name": "Blood donors",
+                "biobank": {"id": "bbmri-eric:ID:CZ_BB1"},
+                "contact": {"id": "bbmri-eric:contactID:MISSING"},
+            },
+            {
+                "id": "bbmri-eric:ID:DE_BB2:collection:C3",
+                "name": "Breast cancer cohort",
+                "biobank": {"id": "bbmri-eric:ID:DE_BB2"},
+                "country": "DE",
+                "withdrawn": True,
+            },
+        ]
+        self.networks = [
+            {
+                "id": "bbmri-eric:networkID:EU_N1",
+                "name": "Cancer network",
+                "contact": {"id": "bbmri-eric:contactID:DE_2"},
+                "also_known": [{"id": "alias-1"}],
+            },
+        ]
+
+    def getContacts(self):
+        return self.contacts
+
+    def getBiobanks(self):
+        return self.biobanks
+
+    def getCollections(self):
+        return self.collections
+
+    def getNetworks(self):
+        return self.networks
+
+    def getCollectionBiobankId(self, collection_id):
+        for collection in self.collections:
+            if collection["id"] == collection_id:
+                return collection["biobank"]["id"]
+        raise KeyError(collection_id)
+
+    def getBiobankById(self, biobank_id):
+        for biobank in self.biobanks:
+            if biobank["id"] == biobank_id:
+                return biobank
+        return None
+
+    @staticmethod
+    def _country(entity):
+        country = entity.get("country", "")
+        if isinstance(country, dict):
+            country = country["id"]
+        return country
+
+    @staticmethod
+    def _nn(entity_id):
+        return entity_id.split(":")[2].split("_")[0]
+
+    def getBiobankCountry(self, biobank_id):
+        return self._country(self.getBiobankById(biobank_id))
+
+    def getBiobankNN(self, biobank_id):
+        return self._nn(biobank_id)
+
+    def isBiobankWithdrawn(self, biobank_id):
+        return bool(self.getBiobankById(biobank_id).get("withdrawn"))
+
+    def getCollectionCountry(self, collection_id):
+        collection = next(c for c in self.collections if c["id"] == collection_id)
+        return self._country(collection) or self.getBiobankCountry(collection["biobank"]["id"])
+
+    def getCollectionNN(self, collection_id):
+        return self._nn(collection_id)
+
+    def isCollectionWithdrawn(self, collection_id):
+        collection = next(c for c in self.collections if c["id"] == collection_id)
+        return bool(collection.get("withdrawn"))
+
+    def getContactCountry(self, contact_id):
+        return ""
+
+    def getContactNN(self, contact_id):
+        return self._nn(contact_id)
+
+    def getNetworkCountry(self, network_id):
+        return ""
+
+    def getNetworkNN(self, network_id):
+        return self._nn(network_id)
+
+
+def _search_ids(indexdir, field, text):
+    ix = open_dir(str(indexdir))
+    with ix.searcher() as searcher:
+        query = QueryParser(field, ix.schema).parse(text)
+        return sorted(hit["id"] for hit in searcher.search(query, limit=None))
+
+
+def test_contact_name_map_includes_titles_and_skips_missing_parts():
+    directory = FullTextDirectoryStub()
+
+    names = build_contact_name_map(directory.getContacts())
+
+    assert names["bbmri-eric:contactID:CZ_1"] == "Dr. Jana Nováková"
+    assert names["bbmri-eric:contactID:DE_2"] == "Hans Müller"
+    assert get_contact_full_name(None) == ""
+
+
+def test_build_index_reports_timings_per_entity_type(tmp_path):
+    timings = build_index(FullTextDirectoryStub(), str(tmp_path))
+
+    assert {"contact_names", "COLLECTION", "BIOBANK", "CONTACT", "NETWORK", "commit"} <= set(timings)
+    assert all(value >= 0 for value in timings.values())
+
+
+def test_build_index_resolves_contacts_from_precomputed_map(tmp_path):
+    build_index(FullTextDirectoryStub(), str(tmp_path))
+
+    assert _search_ids(tmp_path, "contact_name", "novakova") == [
+        "bbmri-eric:ID:CZ_BB1",
+        "bbmri-eric:ID:CZ_BB1:collection:C1",
+    ]
+    assert _search_ids(tmp_path, "name", "blood") == ["bbmri-eric:ID:CZ_BB1:collection:C2"]
+    assert _search_ids(tmp_path, "head_name", "muller") == ["bbmri-eric:ID:CZ_BB1"]
+    assert _search_ids(tmp_path, "also_known", "alias-1") == ["bbmri-eric:networkID:EU_N1"]
+
+
+def test_parallel_index_build_matches_serial_build(tmp_path):
+    serial_dir = tmp_path / "serial"
+    parallel_dir = tmp_path / "parallel"
+    serial_dir.mkdir()
+    parallel_dir.mkdir()
+
+    build_index(FullTextDirectoryStub(), str(serial_dir))
+    build_index(FullTextDirectoryStub(), str(parallel_dir), procs=2, multisegment=True)
+
+    for field, text in (("name", "cancer"), ("contact_name", "hans"), ("juridical_person", "memorial")):
+        assert _search_ids(parallel_dir, field, text) == _search_ids(serial_dir, field, text)
+
+
+def test_resolve_index_procs_maps_zero_to_cpu_count():
+    assert resolve_index_procs(0) >= 1
+    assert resolve_index_procs(3) == 3
+
+
+def _filtered_search(indexdir, text, **kwargs):
+    ix = open_dir(str(indexdir))
+    with ix.searcher() as searcher:
+        return search_index(searcher, parse_search_query(ix, text), **kwargs)
+
+
+def test_filter_query_restricts_hits_inside_the_search(tmp_path):
+    build_index(FullTextDirectoryStub(), str(tmp_path))
+
+    hits, total, _ = _filtered_search(
+        tmp_path,
+        "cancer",
+        filter_query=build_filter_query(types=["COLLECTION"], countries=["de"]),
+    )
+
+    assert total == 1
+    assert [hit["id"] for hit in hits] == ["bbmri-eric:ID:DE_BB2:collection:C3"]
+    assert hits[0]["staging_area"] == "DE"
+    assert hits[0]["withdrawn"] is True
+
+
+def test_filter_query_combines_values_as_or_and_facets_as_and(tmp_path):
+    build_index(FullTextDirectoryStub(), str(tmp_path))
+
+    _, total, _ = _filtered_search(
+        tmp_path,
+        "cancer",
+        filter_query=build_filter_query(staging_areas=["CZ,DE"], withdrawn=False),
+    )
+
+    assert total == 3
+    assert build_filter_query() is None
+
+
+def test_search_index_paginates_and_counts_facets_over_all_matches(tmp_path):
+    build_index(FullTextDirectoryStub(), str(tmp_path))
+
+    hits, total, facets = _filtered_search(
+        tmp_path,
+        "cancer",
+        page=2,
+        page_len=2,
+        facet_fields=("type", "country", "withdrawn"),
+    )
+
+    assert total == 5
+    assert len(hits) == 2
+    assert facets["type"] == {"COLLECTION": 2, "BIOBANK": 2, "NETWORK": 1}
+    assert facets["country"]["DE"] == 2
+    assert facets["withdrawn"][True] == 1
+
+
+def test_search_index_rejects_unknown_facets(tmp_path):
+    build_index(FullTextDirectoryStub(), str(tmp_path))
+
+    with pytest.raises(ValueError):
+        _filtered_search(tmp_path, "cancer", facet_fields=("name",))
+
+
+def test_index_schema_matches_detects_outdated_index(tmp_path):
+    build_index(FullTextDirectoryStub(), str(tmp_path))
+    assert index_schema_matches(open_dir(str(tmp_path)))
+
+    outdated_dir = tmp_path / "outdated"
+    outdated_dir.mkdir()
+    schema = build_index_schema()
+    schema.remove("country")
+    create_in(str(outdated_dir), schema)
+
+    assert not index_schema_matches(open_dir(str(outdated_dir)))
+
+
+def _fuzzy_ids(indexdir, text, **kwargs):
+    ix = open_dir(str(indexdir))
+    with ix.searcher() as searcher:
+        hits, _, _ = search_index(searcher, parse_fuzzy_query(ix, text), **kwargs)
+        return [hit["id"] for hit in hits]
+
+
+def test_fuzzy_query_finds_misspelled_contact_names(tmp_path):
+    build_index(FullTextDirectoryStub(), str(tmp_path))
+
+    exact_hits, _, _ = _filtered_search(tmp_path, "Novakva")
+    assert exact_hits == []
+
+    contact_filter = build_filter_query(types=["CONTACT"])
+    assert _fuzzy_ids(tmp_path, "Novakva", filter_query=contact_filter) == ["bbmri-eric:contactID:CZ_1"]
+    assert _fuzzy_ids(tmp_path, "Myller", filter_query=contact_filter) == ["bbmri-eric:contactID:DE_2"]
+
+
+def test_fuzzy_query_covers_head_and_institution_names(tmp_path):
+    build_index(FullTextDirectoryStub(), str(tmp_path))
+
+    biobank_filter = build_filter_query(types=["BIOBANK"])
+    assert _fuzzy_ids(tmp_path, "Masarik Memorail", filter_query=biobank_filter)[0] == "bbmri-eric:ID:CZ_BB1"
+    assert "bbmri-eric:ID:CZ_BB1" in _fuzzy_ids(tmp_path, "Hanz Muler", filter_query=biobank_filter)
+
+
+def test_fuzzy_query_ranks_exact_match_above_near_match(tmp_path):
+    build_index(FullTextDirectoryStub(), str(tmp_path))
+
+    hits = _fuzzy_ids(tmp_path, "Munich", filter_query=build_filter_query(types=["BIOBANK"]))
+
+    assert hits[0] == "bbmri-eric:ID:DE_BB2"
+
+
+class SyntheticContactsDirectoryStub(FullTextDirectoryStub):
+    FIRST_NAMES = ["Jana", "Petr", "Hans", "Anna", "Maria", "Jiří", "Sophie", "Lukas", "Eva", "Tomáš", "Laura", "Marco"]
+    LAST_NAMES = ["Nováková", "Müller", "Schmidt", "Dvořák", "Rossi", "Bianchi", "Kowalski", "Novak", "Fischer", "Weber", "Horváth", "Janssen"]
+
+    def __init__(self, contact_count):
+        super().__init__()
+        rng = random.Random(42)
+        self.biobanks = []
+        self.collections = []
+        self.networks = []
+        self.contacts = [
+            {
+                "id": f"bbmri-eric:contactID:CZ_{index}",
+                "first_name": rng.choice(self.FIRST_NAMES),
+                "last_name": rng.choice(self.LAST_NAMES) + rng.choice(["", "ová", "er", "i", "son"]),
+                "email": f"person{index}@example.org",
+            }
+            for index in range(contact_count)
+        ]
+
+
+@pytest.mark.benchmark
+def test_benchmark_fuzzy_contact_search_latency(tmp_path, record_property):
+    contact_count = 20000
+    build_index(SyntheticContactsDirectoryStub(contact_count), str(tmp_path), procs=0)
+    ix = open_dir(str(tmp_path))
+    queries = ["Novakva", "Myller", "Shmidt", "Dvorak", "Horvat", "Jansen Laura", "Kovalski Petr", "Fisher Hanz"]
+    latencies = []
+    with ix.searcher() as searcher:
+        for query_text in queries * 5:
+            start_time = time.perf_counter()
+            hits, total, _ = search_index(
+                searcher,
+                parse_fuzzy_query(ix, query_text),
+                filter_query=build_filter_query(types=["CONTACT"]),
+                page=1,
+                page_len=20,
+            )
+            latencies.append(time.perf_counter() - start_time)
+            assert hits
+    record_property("median_latency_ms", round(statistics.median(latencies) * 1000, 1))
+    record_property("max_latency_ms", round(max(latencies) * 1000, 1))
+    assert statistics.median(latencies) < 0.5
@@ -0,0 +1,99 @@
+import random
+import time
+
+import pytest
+
+from icd10codeshelper import (
+    ICD10CategoryMatcher,
+    ICD10CodesHelper,
+    Icd10RangeIndex,
+    parse_icd10_code,
+)
+
+
+@pytest.mark.parametrize(
+    ("code", "expected"),
+    [
+        ("C50", True),
+        ("C50.9", True),
+        ("C7A", True),
+        ("D05.1", True),
+        ("D20", False),
+        ("D37", True),
+        ("D49", False),
+        ("E66", False),
+        ("C00-C14", True),
+        ("A00-C14", True),
+        ("A00-B99", False),
+        ("II", None),
+        ("C50.X", None),
+    ],
+)
+def test_is_cancer_code_keeps_legacy_semantics(code, expected):
+    assert ICD10CodesHelper.isCancerCode(code) is expected
+
+
+def test_obesity_and_chapter_helpers():
+    assert ICD10CodesHelper.isObesityCode("E66.0") is True
+    assert ICD10CodesHelper.isObesityCode("E65-E68") is True
+    assert ICD10CodesHelper.isObesityCode("E60-E64") is False
+    # ranges overlapping the obesity blocks do not match unless listed verbatim
+    assert ICD10CodesHelper.isObesityCode("E66-E70") is False
+    assert ICD10CodesHelper.isObesityCode("E60-E65") is False
+    assert ICD10CodesHelper.isObesityCode("garbage") is False
+    assert ICD10CodesHelper.isCancerChapter("II") is True
+    assert ICD10CodesHelper.isCancerChapter("IV") is False
+    assert ICD10CodesHelper.isCancerChapter("C50") is None
+
+
+def test_matcher_registers_overlapping_categories_and_updates_lookups():
+    matcher = ICD10CategoryMatcher(cache_size=16)
+    matcher.register("metabolic", ["E00-E90"])
+    matcher.register("diabetes", ["E10-E14", "O24"])
+
+    assert matcher.categories_of("E11.9") == {"metabolic", "diabetes"}
+    assert matcher.categories_of("E66") == {"metabolic"}
+    assert matcher.categories_of("O24.4") == {"diabetes"}
+    assert matcher.categories_of("F32") == frozenset()
+    assert matcher.categories_of("not-a-code") is None
+    assert matcher.matches("D50-E11", "diabetes") is True
+    assert matcher.matches("E15", "diabetes") is False
+
+    # registering after lookups drops the memoized results of the old ranges
+    matcher.register("diabetes", ["E15"])
+    assert matcher.matches("E15", "diabetes") is True
+    assert matcher.categories_of("E15") == {"metabolic", "diabetes"}
+    with pytest.raises(ValueError):
+        matcher.register("broken", ["E90-E10"])
+
+
+def test_range_index_returns_labels_of_all_covering_ranges():
+    index = Icd10RangeIndex([(0, 10, "a"), (5, 20, "b"), (30, 30, "c")])
+
+    assert index.query(-1) == frozenset()
+    assert index.query(4) == {"a"}
+    assert index.query(10) == {"a", "b"}
+    assert index.query(21) == frozenset()
+    assert index.query(30) == {"c"}
+    same_label = Icd10RangeIndex([(0, 10, "a"), (5, 15, "a")])
+    assert same_label.query(12) == {"a"}
+    assert same_label.query(16) == frozenset()
+    assert parse_icd10_code("C05.12").ordinal == 205
+
+
+@pytest.mark.benchmark
+def test_benchmark_category_lookup_with_many_registered_ranges(record_property):
+    rng = random.Random(11)
+    matcher = ICD10CategoryMatcher()
+    for category in range(500):
+        start = rng.randint(0, 2500)
+        matcher.register(f"cat{category}", [f"{chr(65 + start // 100)}{start % 100:02d}-{chr(65 + start // 100)}99"])
+    codes = [f"{chr(65 + rng.randint(0, 25))}{rng.randint(0, 99):02d}.{rng.randint(0, 9)}" for _ in range(200_000)]
+
+    start_time = time.perf_counter()
+    matched = sum(1 for code in codes if matcher.categories_of(code))
+    elapsed = time.perf_counter() - start_time
+
+    record_property("lookup_seconds", round(elapsed, 3))
+    record_property("matched_codes", matched)
+    assert elapsed < 30
@@ -0,0 +1,145 @@
+import json
+import threading
+from importlib.util import module_from_spec, spec_from_file_location
+from pathlib import Path
+
+import requests
+from diskcache import Cache
+
+
+MODULE_PATH = Path(__file__).resolve().parents[1] / "importer-ecrin-mdr.py"
+
+
+def load_module():
+    spec = spec_from_file_location("importer_ecrin_mdr", MODULE_PATH)
+    module = module_from_spec(spec)
+    assert spec.loader is not None
+    spec.loader.exec_module(module)
+    return module
+
+
+class ResponseStub:
+    def __init__(self, status_code, payload=None, etag=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = {"ETag": etag} if etag else {}
+
+    def json(self):
+        return self.payload
+
+
+class HttpStub:
+    """Thread-safe stand-in for requests.Session answering from a url -> (payload, etag) map."""
+
+    def __init__(self, documents, failing=()):
+        self.documents = documents
+        self.failing = set(failing)
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def get(self, url, headers=None, timeout=None):
+        assert timeout is not None
+        with self.lock:
+            self.requests.append((url, dict(headers or {})))
+        if url in self.failing:
+            raise requests.ConnectionError(f"cannot reach {url}")
+        if url not in self.documents:
+            return ResponseStub(404)
+        payload, etag = self.documents[url]
+        if etag is not None and (headers or {}).get("If-None-Match") == etag:
+            return ResponseStub(304)
+        return ResponseStub(200, payload, etag)
+
+
+def _full_study(mdr_id):
+    return {"full_study": {"id": mdr_id, "display_title": f"Study {mdr_id}"}}
+
+
+def test_fetch_studies_uses_alternative_url_and_reports_missing_studies():
+    module = load_module()
+    alternative = json.dumps({
+        "study_id": "3",
+        "description": "Alternative",
+        "min_age": 18,
+        "max_age": None,
+        "type_name": "Observational",
+        "gender_elig": "All",
+        "study_name": "Study 3",
+    })
+    http = HttpStub(
+        {
+            f"{module.ECRIN_STUDY_API_ENDPOINT}/1": (_full_study("1"), '"e1"'),
+            f"{module.ECRIN_STUDY_API_ENDPOINT}/2": (_full_study("2"), None),
+            f"{module.ECRIN_STUDY_ALTERNATIVE_URL}/3": ([alternative], None),
+        },
+        failing={f"{module.ECRIN_STUDY_API_ENDPOINT}/5"},
+    )
+
+    studies = module.fetch_studies_from_ecrin_mdr(["1", "2", "3", "4", "5", "1"], workers=4, http=http)
+
+    assert list(studies) == ["1", "2", "3", "4", "5"]
+    assert studies["1"]["display_title"] == "Study 1"
+    assert studies["2"]["id"] == "2"
+    assert studies["3"] == {
+        "id": "3",
+        "brief_description": "Alternative",
+        "study_enrolment": "",
+        "min_age": {"value": 18, "unit_name": "YEAR"},
+        "max_age": None,
+        "study_type": {"name": "Observational"},
+        "study_gender_elig": {"name": "All"},
+        "display_title": "Study 3",
+    }
+    assert studies["4"] is None
+    assert studies["5"] is None
+    assert sum(1 for url, _ in http.requests if url.endswith("/AllDetails/1")) == 1
+
+
+def test_fetch_studies_revalidates_cached_responses_with_etag(tmp_path):
+    module = load_module()
+    url = f"{module.ECRIN_STUDY_API_ENDPOINT}/1"
+    http = HttpStub({url: (_full_study("1"), '"v1"'), f"{module.ECRIN_STUDY_API_ENDPOINT}/2": (_full_study("2"), None)})
+
+    with Cache(str(tmp_path / "ecrin-mdr")) as cache:
+        first = module.fetch_studies_from_ecrin_mdr(["1", "2"], cache=cache, http=http)
+        http.documents[url] = ({"full_study": {"id": "1", "display_title": "changed"}}, '"v1"')
+        second = module.fetch_studies_from_ecrin_mdr(["1", "2"], cache=cache, http=http)
+        http.documents[url] = ({"full_study": {"id": "1", "display_title": "changed"}}, '"v2"')
+        third = module.fetch_studies_from_ecrin_mdr(["1"], cache=cache, http=http)
+
+        assert list(cache) == [url]
+
+    assert first["1"]["display_title"] == second["1"]["display_title"] == "Study 1"
+    assert third["1"]["display_title"] == "changed"
+    assert [headers for request_url, headers in http.requests if request_url == url] == [
+        {},
+        {"If-None-Match": '"v1"'},
+        {"If-None-Match": '"v1"'},
+    ]
+
+
+def test_get_collections_data_from_directory_fetches_ids_in_chunks(caplog):
+    module = load_module()
+    rows = {
+        f"bbmri-eric:ID:CZ_bb:collection:c{index}": {
+            "id": f"bbmri-eric:ID:CZ_bb:collection:c{index}",
+            "national_node": "CZ",
+            "studies": "",
+        }
+        for index in range(120)
+    }
+    calls = []
+
+    class ClientStub:
+        def get(self, table, query_filter, schema):
+            calls.append((table, schema))
+            column, ids = query_filter.split(" == ", 1)
+            assert column == "id"
+            return [rows[collection_id] for collection_id in json.loads(ids) if collection_id in rows]
+
+    wanted = list(rows) + ["bbmri-eric:ID:CZ_bb:collection:missing", "bbmri-eric:ID:CZ_bb:collection:c0"]
+    collections = module.get_collections_data_from_directory(ClientStub(), "ERIC", wanted)
+
+    assert calls == [("Collections", "ERIC")] * 3
+    assert collections == rows
+    assert "bbmri-eric:ID:CZ_bb:collection:missing" in caplog.text
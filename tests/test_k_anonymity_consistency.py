@@ -10,7 +10,8 @@ from pathlib import Path
 import pandas as pd
 
 from check_fix_helpers import build_fact_k_anonymity_drop_fixes
-from k_anonymity import positive_below_k_mask
+from fact_sheet_frame import FactSheetFrame
+from k_anonymity import donor_value_violates_k, donor_values_violate_k_mask, positive_below_k_mask
 
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
@@ -71,5 +72,83 @@ def test_modifier_and_facttables_use_shared_k_anonymity_helpers():
     assert _count_named_calls(modifier_tree, "positive_below_k_mask") >= 2
 
     facttables_tree = _parse_module(REPO_ROOT / "checks" / "FactTables.py")
-    assert _has_import_from(facttables_tree, "k_anonymity", "donor_value_violates_k")
-    assert _count_named_calls(facttables_tree, "donor_value_violates_k") >= 1
+    assert any(isinstance(node, ast.Attribute) and node.attr == "getFactSheetFrame" for node in ast.walk(facttables_tree))
+
+    frame_tree = _parse_module(REPO_ROOT / "fact_sheet_frame.py")
+    assert _has_import_from(frame_tree, "k_anonymity", "parse_count_values")
+    assert _has_import_from(frame_tree, "k_anonymity", "positive_below_k_mask")
+    assert _has_import_from(frame_tree, "k_anonymity", "scan_fact_k_anonymity")
+
+
+def test_bulk_donor_mask_matches_per_value_k_anonymity_rule():
+    values = [None, "", "abc", 0, 1, "9", 9, 10, 11, True, False, " 3 "]
+
+    assert donor_values_violate_k_mask(values, 10).tolist() == [
+        donor_value_violates_k(value, 10) for value in values
+    ]
+
+
+def _fact(fact_id, donors, samples=None, **dimensions):
+    return {
+        "id": fact_id,
+        "sex": dimensions.get("sex", "*"),
+        "age_range": dimensions.get("age_range", "*"),
+        "sample_type": dimensions.get("sample_type", "*"),
+        "disease": dimensions.get("disease", "*"),
+        "number_of_donors": donors,
+        "number_of_samples": samples,
+    }
+
+
+def test_bulk_scan_reports_small_cells_and_complementary_disclosure():
+    frame = FactSheetFrame.from_collection_facts(
+        {
+            "col1": [
+                _fact("c1-total", 40, 400),
+                _fact("c1-female", 36, 396, sex="FEMALE"),
+                _fact("c1-male", 4, 4, sex="MALE"),
+                _fact("c1-c50", 12, 50, disease="C50"),
+            ],
+            "col2": [
+                _fact("c2-total", 30, 300),
+                _fact("c2-female", 15, 150, sex={"id": "FEMALE"}),
+                _fact("c2-male", "15", 150, sex="MALE"),
+            ],
+        }
+    )
+
+    scan = frame.scan_k_anonymity(k_donors=10, k_samples=10)
+
+    assert set(scan) == {"col1"}
+    violations = scan["col1"]
+    assert violations.donor_fact_ids == ["c1-male"]
+    assert violations.sample_fact_ids == ["c1-male"]
+    assert [(item.count_field, item.dimension, item.residual) for item in violations.complementary] == [
+        ("number_of_donors", "sex", 4),
+        ("number_of_samples", "sex", 4),
+    ]
+    assert violations.complementary[0].suppress_fact_ids == ["c1-female"]
+    assert violations.drop_fact_ids == ["c1-female", "c1-male"]
+    assert frame.scan_k_anonymity(k_donors=10, k_samples=10) is scan
+
+
+def test_bulk_scan_on_uploaded_table_matches_modifier_masks():
+    table = pd.DataFrame(
+        [
+            {"id": "r1", "collection": "col1", "sex": "*", "number_of_donors": 25},
+            {"id": "r2", "collection": "col1", "sex": "FEMALE", "number_of_donors": 17},
+            {"id": "r3", "collection": "col1", "sex": "MALE", "number_of_donors": 8},
+            {"id": "r4", "collection": "col2", "sex": "*", "number_of_donors": 0},
+        ]
+    ).assign(age_range="*", sample_type="*", disease="*")
+
+    scan = FactSheetFrame.from_table(
+        table,
+        collection_column="collection",
+        id_column="id",
+    ).scan_k_anonymity(k_donors=10)
+
+    modifier_ids = sorted(table.loc[positive_below_k_mask(table["number_of_donors"], 10), "id"])
+    assert [fact_id for item in scan.values() for fact_id in item.donor_fact_ids] == modifier_ids
+    assert scan["col1"].complementary[0].residual == 8
+    assert scan["col1"].complementary[0].suppress_fact_ids == ["r2"]
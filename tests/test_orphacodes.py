@@ -0,0 +1,108 @@
+import time
+
+import pytest
+
+import orphacodes as orphacodes_module
+from orphacodes import OrphaCodes, orphacodes_cache_key
+
+
+def _disorder(code, names, references):
+    reference_xml = "".join(
+        f"<ExternalReference><Source>{source}</Source><Reference>{reference}</Reference>"
+        f"<DisorderMappingRelation><Name lang=\"en\">{relation}</Name></DisorderMappingRelation></ExternalReference>"
+        for source, reference, relation in references
+    )
+    name_xml = "".join(f"<Name lang=\"en\">{name}</Name>" for name in names)
+    return (
+        f"<Disorder><OrphaCode>{code}</OrphaCode>{name_xml}"
+        f"<ExternalReferenceList>{reference_xml}</ExternalReferenceList></Disorder>"
+    )
+
+
+def _write_product(path, disorders):
+    path.write_text(
+        "<?xml version=\"1.0\"?><JDBOR><DisorderList>" + "".join(disorders) + "</DisorderList>"
+        "<Other><DisorderList><Disorder><OrphaCode>999</OrphaCode></Disorder></DisorderList></Other></JDBOR>",
+        encoding="utf-8",
+    )
+
+
+@pytest.fixture
+def product_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("DIRECTORY_CACHE_ROOT", str(tmp_path / "cache"))
+    path = tmp_path / "en_product1.xml"
+    _write_product(
+        path,
+        [
+            _disorder(
+                "100",
+                ["Rare sarcoma"],
+                [
+                    ("ICD-10", "C49.9", "NTBT (narrower term maps to a broader term)"),
+                    ("OMIM", "123456", "E (Exact mapping)"),
+                ],
+            ),
+            _disorder("200", ["Rare anemia"], [("ICD-10", "D61.9", "E (Exact mapping)")]),
+            _disorder("300", [], [("ICD-10", "Q87.1", "ND (not yet decided)")]),
+        ],
+    )
+    return path
+
+
+def test_streaming_loader_builds_mappings(product_file):
+    codes = OrphaCodes(str(product_file), use_cache=False)
+
+    assert codes.isValidOrphaCode("100") and codes.isValidOrphaCode("300")
+    assert not codes.isValidOrphaCode("999")
+    assert codes.isCancerOrphaCode("100") and not codes.isCancerOrphaCode("200")
+    assert codes.orphaToIcd10("100") == [{"code": "C49.9", "mapping_type": "NTBT"}]
+    assert codes.icd10ToOrpha("C49.9") == [{"code": "100", "mapping_type": "BTNT"}]
+    assert codes.icd10ToOrpha("Q87.1") == []
+    assert codes.orphaToNamesString("200") == "Rare anemia"
+    assert codes.orphaToNamesString("300") == "300"
+
+
+def test_mapping_is_cached_by_file_hash(product_file, monkeypatch):
+    first = OrphaCodes(str(product_file))
+
+    def fail_parse(file):
+        raise AssertionError("mapping should come from the cache")
+
+    monkeypatch.setattr(orphacodes_module, "parse_orphacodes_file", fail_parse)
+    cached = OrphaCodes(str(product_file))
+    assert cached.orphaToIcd10("100") == first.orphaToIcd10("100")
+
+    key = orphacodes_cache_key(str(product_file))
+    _write_product(product_file, [_disorder("400", ["New"], [])])
+    assert orphacodes_cache_key(str(product_file)) != key
+    with pytest.raises(AssertionError, match="from the cache"):
+        OrphaCodes(str(product_file))
+
+
+@pytest.mark.benchmark
+def test_benchmark_orphacodes_parse_vs_cache_load(tmp_path, monkeypatch, record_property):
+    monkeypatch.setenv("DIRECTORY_CACHE_ROOT", str(tmp_path / "cache"))
+    path = tmp_path / "en_product1.xml"
+    _write_product(
+        path,
+        [
+            _disorder(
+                str(code),
+                [f"Disorder {code}"],
+                [("ICD-10", f"{'CDEQ'[code % 4]}{code % 100:02d}.{code % 10}", "E (Exact mapping)")],
+            )
+            for code in range(10_000)
+        ],
+    )
+
+    start_time = time.perf_counter()
+    OrphaCodes(str(path))
+    parse_elapsed = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    cached = OrphaCodes(str(path))
+    load_elapsed = time.perf_counter() - start_time
+
+    record_property("parse_ms", round(parse_elapsed * 1000))
+    record_property("cache_load_ms", round(load_elapsed * 1000))
+    assert cached.isValidOrphaCode("9999")
+    assert load_elapsed < parse_elapsed
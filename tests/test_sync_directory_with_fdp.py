@@ -0,0 +1,257 @@
+import json
+import re
+import sys
+import threading
+import types
+
+import pytest
+
+
+def _install_molgenis_client_stub():
+    """Provide the molgenis v1 client surface the script imports when the package is not installed."""
+    try:
+        import molgenis.client
+        return
+    except ImportError:
+        pass
+
+    class MolgenisRequestError(Exception):
+        def __init__(self, error, response=False):
+            super().__init__(error)
+            self.message = error
+            self.response = response
+
+    class Session:
+        def __init__(self, url, token=None):
+            self.url = url
+            self.token = token
+
+    client = types.ModuleType("molgenis.client")
+    client.MolgenisRequestError = MolgenisRequestError
+    client.Session = Session
+    package = types.ModuleType("molgenis")
+    package.client = client
+    sys.modules["molgenis"] = package
+    sys.modules["molgenis.client"] = client
+
+
+_install_molgenis_client_stub()
+
+import sync_directory_with_fdp as fdp_sync
+
+
+DIRECTORY_PREFIX = "https://directory.example.org"
+TIMESTAMP_FIELDS = {"issued", "modified"}
+
+
+class MolgenisStub:
+    """In-memory Molgenis endpoint serving the source Directory and destination FDP entities."""
+
+    ID_ATTRIBUTES = {fdp_sync.FDP_IRI: "id"}
+
+    def __init__(self, tables):
+        self.tables = {entity: {key: dict(record) for key, record in records.items()} for entity, records in tables.items()}
+        self.calls = []
+        self.queries = []
+        self.lock = threading.Lock()
+
+    def _id_attribute(self, entity):
+        if entity.startswith("eu_bbmri_eric_"):
+            return "id"
+        return self.ID_ATTRIBUTES.get(entity, "identifier")
+
+    def _record(self, record, attributes):
+        if attributes is None:
+            return dict(record)
+        return {attribute: record[attribute] for attribute in attributes.split(",") if attribute in record}
+
+    def get(self, entity, q=None, attributes=None, expand=None, **kwargs):
+        with self.lock:
+            self.calls.append(("get", entity))
+            self.queries.append((entity, q))
+        records = list(self.tables.get(entity, {}).values())
+        if q:
+            match = re.fullmatch(r"(\w+)=in=\((.*)\)", q)
+            if match:
+                attribute, values = match.group(1), set(json.loads(f"[{match.group(2)}]"))
+            else:
+                attribute, value = q.split("==", 1)
+                values = {value}
+            records = [record for record in records if record.get(attribute) in values]
+        return [self._record(record, attributes) for record in records]
+
+    def get_by_id(self, entity, record_id, attributes=None, **kwargs):
+        with self.lock:
+            self.calls.append(("get_by_id", entity))
+        try:
+            return self._record(self.tables[entity][record_id], attributes)
+        except KeyError:
+            raise fdp_sync.MolgenisRequestError(f"{entity} {record_id} not found")
+
+    def add_all(self, entity, records):
+        with self.lock:
+            self.calls.append(("add_all", entity))
+            table = self.tables.setdefault(entity, {})
+            id_attribute = self._id_attribute(entity)
+            ids = [record[id_attribute] for record in records]
+            if any(record_id in table for record_id in ids) or len(set(ids)) != len(ids):
+                raise fdp_sync.MolgenisRequestError(f"duplicate {entity} ids")
+            for record in records:
+                table[record[id_attribute]] = dict(record)
+            return ids
+
+    def delete_list(self, entity, records_ids):
+        with self.lock:
+            self.calls.append(("delete_list", entity))
+            table = self.tables.get(entity, {})
+            return [table.pop(record_id) for record_id in records_ids if record_id in table]
+
+    def update_one(self, entity, record_id, attribute, value):
+        with self.lock:
+            self.calls.append(("update_one", entity))
+            self.tables[entity][record_id][attribute] = [{"identifier": item} for item in value]
+
+    def count(self, method, exclude=()):
+        return sum(1 for call, entity in self.calls if call == method and entity not in exclude)
+
+
+def _collection(biobank_index, index, *, record_service=None, diagnoses=("urn:miriam:icd:C18",)):
+    collection = {
+        "id": f"bbmri-eric:ID:CZ_bb{biobank_index}:collection:col{index}",
+        "name": f"Collection {index}",
+        "diagnosis_available": [{"id": diagnosis} for diagnosis in diagnoses],
+        "type": [{"id": "COHORT"}, {"id": "SAMPLE"}],
+        "contact": {"id": f"contact{index % 3}"},
+        "size": 10,
+    }
+    if record_service:
+        collection["record_service"] = {"id": record_service}
+    return collection
+
+
+def _tables(biobank_count=4, collections_per_biobank=3, *, service_biobanks=None, existing_contacts=(), existing_biobanks=()):
+    if service_biobanks is None:
+        service_biobanks = range(biobank_count)
+    biobanks = {}
+    for biobank_index in range(biobank_count):
+        biobank_id = f"bbmri-eric:ID:CZ_bb{biobank_index}"
+        biobanks[biobank_id] = {
+            "id": biobank_id,
+            "name": f"Biobank {biobank_index}",
+            "country": {"id": "UK" if biobank_index % 2 else "CZ"},
+            "juridical_person": f"Institute {biobank_index}",
+            "contact": {"id": f"contact{biobank_index % 3}"},
+            "collections": [
+                _collection(
+                    biobank_index,
+                    biobank_index * collections_per_biobank + index,
+                    record_service="service1" if index == 0 and biobank_index in service_biobanks else None,
+                    diagnoses=("urn:miriam:icd:C18", f"ORPHA:{index}"),
+                )
+                for index in range(collections_per_biobank)
+            ],
+        }
+    contacts = {
+        f"contact{index}": {"id": f"contact{index}", "email": f"c{index}@example.org", "phone": "+420 123", "first_name": "A"}
+        for index in range(3)
+    }
+    return {
+        fdp_sync.BBMRI_BIOBANK_ENTITY: biobanks,
+        fdp_sync.BBMRI_CONTACT_ENTITY: contacts,
+        fdp_sync.BBMRI_DATA_SERVICE_ENTITY: {
+            "service1": {"id": "service1", "url": "https://beacon.example.org", "conformsTo": "beacon", "type": "API"}
+        },
+        fdp_sync.FDP_IRI: {"urn:miriam:icd:C18": {"id": "urn:miriam:icd:C18", "IRI": "http://icd/C18"}},
+        fdp_sync.FDP_BIOBANK: {biobank_id: {"identifier": biobank_id} for biobank_id in existing_biobanks},
+        fdp_sync.FDP_CONTACT: {contact_id: {"identifier": contact_id} for contact_id in existing_contacts},
+        fdp_sync.FDP_CATALOG: {"bbmri-directory": {"identifier": "bbmri-directory", "collection": [{"identifier": "old"}]}},
+    }
+
+
+def _destination(stub):
+    return {
+        entity: {
+            key: {field: value for field, value in record.items() if field not in TIMESTAMP_FIELDS}
+            for key, record in records.items()
+        }
+        for entity, records in stub.tables.items()
+        if entity.startswith("fdp_") and entity != fdp_sync.FDP_CATALOG
+    }
+
+
+def _catalog(stub):
+    return sorted(item["identifier"] for item in stub.tables[fdp_sync.FDP_CATALOG]["bbmri-directory"]["collection"])
+
+
+def test_bulk_sync_prefetches_references_and_matches_per_record_sync():
+    # a single data service reference: the per-record sync cannot add the same service twice
+    tables = _tables(service_biobanks=[0], existing_biobanks=["bbmri-eric:ID:CZ_bb3"])
+    legacy = MolgenisStub(tables)
+    bulk = MolgenisStub(tables)
+
+    fdp_sync.sync(legacy, DIRECTORY_PREFIX, False)
+    fdp_sync.sync(bulk, DIRECTORY_PREFIX, False, bulk=True, concurrency=4)
+
+    expected = _destination(legacy)
+    assert _destination(bulk) == expected
+    assert set(bulk.tables[fdp_sync.FDP_BIOBANK]) == {f"bbmri-eric:ID:CZ_bb{index}" for index in range(4)}
+    assert "ORPHA:1" in bulk.tables[fdp_sync.FDP_IRI]
+    assert _catalog(bulk) == _catalog(legacy)
+    # only the catalog row is still read by id
+    assert bulk.count("get_by_id", exclude={fdp_sync.FDP_CATALOG}) == 0
+    assert legacy.count("get_by_id") > 20
+    assert bulk.count("get") < 15
+
+
+def test_bulk_sync_skips_records_already_in_destination():
+    stub = MolgenisStub(_tables(existing_contacts=["contact0"]))
+
+    fdp_sync.sync(stub, DIRECTORY_PREFIX, False, bulk=True)
+
+    assert set(stub.tables[fdp_sync.FDP_CONTACT]) == {"contact0", "contact1", "contact2"}
+    assert stub.tables[fdp_sync.FDP_CONTACT]["contact0"] == {"identifier": "contact0"}
+    assert set(stub.tables[fdp_sync.FDP_DATA_SERVICE]) == {"service1"}
+
+
+def test_bulk_reset_sync_replaces_records_and_catalog_entries():
+    stub = MolgenisStub(_tables(biobank_count=6))
+    fdp_sync.sync(stub, DIRECTORY_PREFIX, False, bulk=True)
+    stub.tables[fdp_sync.FDP_BIOBANK]["bbmri-eric:ID:CZ_bb0"]["title"] = "stale"
+
+    fdp_sync.sync(stub, DIRECTORY_PREFIX, True, bulk=True, concurrency=3)
+
+    assert stub.tables[fdp_sync.FDP_BIOBANK]["bbmri-eric:ID:CZ_bb0"]["title"] == "Biobank 0"
+    assert _catalog(stub) == sorted(["old"] + [f"bbmri-eric:ID:CZ_bb{index // 3}:collection:col{index}" for index in range(18)])
+
+
+def test_bulk_sync_reports_missing_reference_record_by_id():
+    tables = _tables(biobank_count=1)
+    del tables[fdp_sync.BBMRI_DATA_SERVICE_ENTITY]["service1"]
+    stub = MolgenisStub(tables)
+
+    with pytest.raises(fdp_sync.MolgenisRequestError, match=f"{fdp_sync.BBMRI_DATA_SERVICE_ENTITY} record service1 not found"):
+        fdp_sync.sync(stub, DIRECTORY_PREFIX, False, bulk=True)
+
+
+def test_bulk_sync_chunks_id_queries_and_batches_concurrent_writes(monkeypatch):
+    monkeypatch.setattr(fdp_sync, "ID_QUERY_CHUNK_SIZE", 2)
+    monkeypatch.setattr(fdp_sync, "BATCH_SIZE", 4)
+    stub = MolgenisStub(_tables(biobank_count=5))
+    fdp_sync.sync(stub, DIRECTORY_PREFIX, False, bulk=True)
+    stub.calls.clear()
+    stub.queries.clear()
+
+    fdp_sync.sync(stub, DIRECTORY_PREFIX, True, bulk=True, concurrency=3)
+
+    contact_queries = [q for entity, q in stub.queries if entity == fdp_sync.BBMRI_CONTACT_ENTITY]
+    assert contact_queries == ['id=in=("contact0","contact1")', 'id=in=("contact2")']
+    iri_queries = [q for entity, q in stub.queries if entity == fdp_sync.FDP_IRI and q]
+    assert len(iri_queries) == 3
+    assert all(q.startswith("id=in=(") for q in iri_queries)
+    # 15 collections are deleted and re-added in batches of 4
+    assert stub.calls.count(("delete_list", fdp_sync.FDP_COLLECTION)) == 4
+    assert stub.calls.count(("add_all", fdp_sync.FDP_COLLECTION)) == 4
+    assert stub.calls.count(("add_all", fdp_sync.FDP_DATA_SERVICE)) == 1
+    assert len(stub.tables[fdp_sync.FDP_COLLECTION]) == 15
+    assert set(stub.tables[fdp_sync.FDP_DATA_SERVICE]) == {"service1"}
+    assert stub.count("get_by_id", exclude={fdp_sync.FDP_CATALOG}) == 0
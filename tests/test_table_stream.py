@@ -0,0 +1,111 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from table_stream import OverlappedWriter, align_chunks_to_groups, iter_file_chunks, read_file_header
+
+
+def _write_facts(path, collections, rows_per_collection):
+    rows = [
+        {"id": f"{collection}:fact{index}", "collection": collection, "number_of_donors": str(index)}
+        for collection in collections
+        for index in range(rows_per_collection)
+    ]
+    pd.DataFrame(rows).to_csv(path, sep="\t", index=False)
+    return rows
+
+
+def test_iter_file_chunks_reads_bounded_slices(tmp_path):
+    path = tmp_path / "facts.tsv"
+    rows = _write_facts(path, ["c1", "c2", "c3"], 5)
+
+    chunks = list(iter_file_chunks(path, 4, sep="\t", dtype=str, keep_default_na=False))
+
+    assert [len(chunk) for chunk in chunks] == [4, 4, 4, 3]
+    assert pd.concat(chunks)["id"].tolist() == [row["id"] for row in rows]
+    assert read_file_header(path, sep="\t") == ["id", "collection", "number_of_donors"]
+    with pytest.raises(ValueError):
+        next(iter_file_chunks(path, 0, sep="\t"))
+
+
+def test_align_chunks_keeps_each_group_in_one_chunk(tmp_path):
+    path = tmp_path / "facts.tsv"
+    _write_facts(path, ["c1", "c2", "c3"], 5)
+
+    chunks = list(align_chunks_to_groups(iter_file_chunks(path, 4, sep="\t", dtype=str), "collection"))
+
+    groups_per_chunk = [set(chunk["collection"]) for chunk in chunks]
+    for index, groups in enumerate(groups_per_chunk):
+        for other in groups_per_chunk[index + 1 :]:
+            assert not groups & other
+    assert sum(len(chunk) for chunk in chunks) == 15
+
+
+def test_align_chunks_warns_once_about_non_contiguous_groups(caplog):
+    chunks = [pd.DataFrame({"collection": ["c1", "c2"]}), pd.DataFrame({"collection": ["c1", "c3"]}), pd.DataFrame({"collection": ["c2"]})]
+
+    aligned = list(align_chunks_to_groups(chunks, "collection"))
+
+    assert sum(len(chunk) for chunk in aligned) == 5
+    assert caplog.text.count("not contiguous") == 1
+
+
+def test_overlapped_writer_preserves_order_and_overlaps_parsing():
+    written = []
+    started = threading.Event()
+
+    def write(chunk):
+        started.set()
+        time.sleep(0.05)
+        written.append(chunk["id"].tolist())
+
+    with OverlappedWriter(write) as writer:
+        writer.submit(pd.DataFrame({"id": [1]}))
+        # the first upload runs while the caller prepares the next chunk
+        assert started.wait(1)
+        assert written == []
+        writer.submit(pd.DataFrame({"id": [2]}))
+        writer.submit(pd.DataFrame({"id": [3]}))
+
+    assert written == [[1], [2], [3]]
+
+
+def test_overlapped_writer_reraises_upload_errors():
+    def write(chunk):
+        raise RuntimeError("upload failed")
+
+    with pytest.raises(RuntimeError, match="upload failed"):
+        with OverlappedWriter(write, max_pending=1) as writer:
+            writer.submit(pd.DataFrame({"id": [1]}))
+            writer.submit(pd.DataFrame({"id": [2]}))
+
+
+@pytest.mark.benchmark
+def test_benchmark_streamed_chunks_bound_resident_rows(tmp_path, record_property):
+    rows = 500_000
+    rng = np.random.default_rng(5)
+    path = tmp_path / "facts.tsv"
+    pd.DataFrame(
+        {
+            "id": [f"fact:{index}" for index in range(rows)],
+            "collection": [f"col{index // 40}" for index in range(rows)],
+            "number_of_donors": rng.integers(0, 1000, rows).astype(str),
+        }
+    ).to_csv(path, sep="\t", index=False)
+
+    start_time = time.perf_counter()
+    largest_chunk = 0
+    total = 0
+    for chunk in align_chunks_to_groups(iter_file_chunks(path, 50_000, sep="\t", dtype=str), "collection"):
+        largest_chunk = max(largest_chunk, len(chunk))
+        total += len(chunk)
+    elapsed = time.perf_counter() - start_time
+
+    record_property("stream_seconds", round(elapsed, 3))
+    record_property("largest_chunk_rows", largest_chunk)
+    assert total == rows
+    assert largest_chunk <= 50_000 + 40
+    assert elapsed < 60
@@ -8,6 +8,7 @@ Cygwin). The API keeps compatibility with existing callers:
 
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass, field
 from typing import Any, Optional
 
@@ -222,10 +223,16 @@ class TableModifierSettingsModel(ToolConnectionSettingsModel):
 
 @dataclass
 class FactsheetUpdaterSettingsModel(ToolConnectionSettingsModel):
-    """Validate resolved ``collection-factsheet-descriptor-updater.py`` settings."""
+    """Validate resolved ``collection-factsheet-descriptor-updater.py`` settings.
+
+    Collections are selected by ``collection_id`` / ``collection_ids`` and/or an
+    ``id_regex``; at least one selector is required.
+    """
 
     schema_name: str = ""
     collection_id: str = ""
+    collection_ids: list[str] = field(default_factory=list)
+    id_regex: Optional[str] = None
 
     @classmethod
     def parse_obj(cls, payload: Any) -> "FactsheetUpdaterSettingsModel":
@@ -248,7 +255,30 @@ class FactsheetUpdaterSettingsModel(ToolConnectionSettingsModel):
                 return ""
 
         schema_name = parse_non_empty("schema_name", aliases=("schema",))
-        collection_id = parse_non_empty("collection_id")
+
+        collection_ids: list[str] = []
+        single_id = payload.get("collection_id")
+        if single_id not in (None, ""):
+            collection_ids.append(str(single_id).strip())
+        raw_ids = payload.get("collection_ids") or []
+        if not isinstance(raw_ids, (list, tuple)):
+            errors.append(_make_error(("collection_ids",), "must be a list of collection IDs"))
+            raw_ids = []
+        for index, raw_id in enumerate(raw_ids):
+            try:
+                collection_ids.append(_non_empty_string(raw_id, field_name="collection_ids"))
+            except ValidationError:
+                errors.append(_make_error(("collection_ids", index), "field must not be empty"))
+
+        id_regex_raw = payload.get("id_regex")
+        id_regex = None if id_regex_raw in (None, "") else str(id_regex_raw)
+        if id_regex is not None:
+            try:
+                re.compile(id_regex)
+            except re.error as exc:
+                errors.append(_make_error(("id_regex",), f"invalid regular expression: {exc}"))
+        if not collection_ids and id_regex is None:
+            errors.append(_make_error(("collection_id",), "field is required (or select collections with collection_ids/id_regex)"))
         _raise_if_errors(errors)
         return cls(
             directory_target=base.directory_target,
@@ -256,7 +286,9 @@ class FactsheetUpdaterSettingsModel(ToolConnectionSettingsModel):
             directory_password=base.directory_password,
             directory_token=base.directory_token,
             schema_name=schema_name,
-            collection_id=collection_id,
+            collection_id=collection_ids[0] if collection_ids else "",
+            collection_ids=collection_ids,
+            id_regex=id_regex,
         )
 
 